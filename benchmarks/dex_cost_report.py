@@ -0,0 +1,376 @@
+"""
+Opcode cost report of the TokilityDEX approval program. Every AppMethods branch is executed on the emulator with
+a group that the contract approves, and the report shows for every branch:
+- the opcode cost of the app call and the budget it is checked against,
+- the cost of the shared prefix, i.e the check of the configuration arguments against the metadata hash of the ASA
+  that runs before the dispatch,
+- the size of the branch compiled on its own and the opcodes and the pcs where most of the cost goes.
+
+Run from the root of the repository:
+    python -m benchmarks.dex_cost_report
+    python -m benchmarks.dex_cost_report --budget 500 --branch-budget buy_from_seller=300 --hotspots 5
+    python -m benchmarks.dex_cost_report --json
+
+Exits with 1 when a branch costs more than its budget, a branch can not be profiled, or the programs do not fit in
+the program pages of the application.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from algosdk import account, encoding, logic
+from algosdk.future import transaction as algo_txn
+from pyteal import compileTeal, Mode, Seq
+
+from src.emulator.assembler import assemble
+from src.emulator.avm import APPLICATION_MAX_COST, EvalResult, load_program
+from src.emulator.ledger import Ledger, MAX_APP_PROGRAM_LENGTH
+from src.models.asset_configurations import ASAConfiguration, ASAInitialOfferingConfiguration, \
+    ASAEconomyConfiguration
+from src.services.asa_service import ASAService
+from src.services.tokility_dex_service import TokilityDEXService
+from src.smart_contracts.compilation_cache import get_compilation_cache, dex_approval_program, dex_clear_program, \
+    clawback_program
+from src.smart_contracts.tokility_dex_asc1 import TokilityDEX
+
+TEAL_VERSION = 4
+ACCOUNT_FUNDING = 1000000000
+TOP_OPCODES = 5
+
+
+def app_methods() -> List[str]:
+    return [value for name, value in vars(TokilityDEX.AppMethods).items() if not name.startswith('_')]
+
+
+def _instruction_text(instruction) -> str:
+    immediates = " ".join(str(immediate) for immediate in instruction.immediates)
+    return f'{instruction.op.name} {immediates}'.strip()
+
+
+class DEXCostProfiler:
+    """
+    Deploys the TokilityDEX on an in-memory ledger next to a probe application that only contains the shared
+    prefix of the approval program, so the prefix is measured with the same arguments as every branch.
+    """
+
+    def __init__(self):
+        self.ledger = Ledger(profile=True)
+        self.dex = TokilityDEX()
+
+        self.platform_pk, self.platform_address = self._account()
+        self.company_pk, self.company_address = self._account()
+
+        self.approval_program = assemble(get_compilation_cache().teal(dex_approval_program()))
+        self.clear_program = assemble(get_compilation_cache().teal(dex_clear_program()))
+        self.prefix_program = assemble(self.compile_teal(Seq([self.dex.verify_asa_configuration(),
+                                                              self.dex.approve])))
+
+        self.app_id = self._deploy(self.approval_program)
+        self.probe_app_id = self._deploy_probe()
+
+        self.clawback_bytes = assemble(get_compilation_cache().teal(clawback_program(app_id=self.app_id)))
+        self.clawback_address = logic.address(self.clawback_bytes)
+        self.ledger.fund(self.clawback_address, ACCOUNT_FUNDING)
+
+        self.dex_service = TokilityDEXService(app_creator_addr=self.platform_address,
+                                              app_creator_pk=self.platform_pk,
+                                              client=None,
+                                              app_id=self.app_id)
+        self.asa_service = ASAService(creator_addr=self.company_address,
+                                      creator_pk=self.company_pk,
+                                      tokility_dex_app_id=self.app_id,
+                                      client=None)
+
+        self.asa_configuration = ASAConfiguration(
+            asa_creator_address=self.company_address,
+            unit_name="TOK",
+            asset_name="Cost report",
+            initial_offering_configuration=ASAInitialOfferingConfiguration(asa_price=2000000,
+                                                                           tokiliy_fee=100000),
+            economy_configuration=ASAEconomyConfiguration(max_sell_price=5000000,
+                                                          owner_fee=50000,
+                                                          reselling_allowed=1,
+                                                          reselling_end_date=int(time.time()) + 365 * 24 * 3600,
+                                                          gifting_allowed=1))
+
+    @staticmethod
+    def compile_teal(expression) -> str:
+        return compileTeal(expression, mode=Mode.Application, version=TEAL_VERSION)
+
+    def _account(self) -> Tuple[str, str]:
+        private_key, address = account.generate_account()
+        self.ledger.fund(address, ACCOUNT_FUNDING)
+        return private_key, address
+
+    def _deploy(self, approval_program: bytes) -> int:
+        txn = algo_txn.ApplicationCreateTxn(self.platform_address,
+                                            self.ledger.suggested_params(),
+                                            algo_txn.OnComplete.NoOpOC,
+                                            approval_program,
+                                            self.clear_program,
+                                            self.dex.global_schema,
+                                            self.dex.local_schema,
+                                            app_args=[encoding.decode_address(self.platform_address)])
+        return self.ledger.apply_group([txn.sign(self.platform_pk)])[0].application_index
+
+    def _deploy_probe(self) -> int:
+        """
+        The prefix can not approve the creation, so the probe is created with an approving program and then
+        updated to the prefix.
+        """
+        probe_app_id = self._deploy(self.clear_program)
+        txn = algo_txn.ApplicationUpdateTxn(self.platform_address,
+                                            self.ledger.suggested_params(),
+                                            probe_app_id,
+                                            self.prefix_program,
+                                            self.clear_program)
+        self.ledger.apply_group([txn.sign(self.platform_pk)])
+        return probe_app_id
+
+    def _buyer(self) -> Tuple[str, str]:
+        private_key, address = self._account()
+        self.ledger.apply_group([algo_txn.ApplicationOptInTxn(address,
+                                                              self.ledger.suggested_params(),
+                                                              self.app_id).sign(private_key)])
+        return private_key, address
+
+    def _mint(self) -> ASAConfiguration:
+        txn = self.asa_service.create_asa_transaction(asa_configuration=self.asa_configuration,
+                                                      clawback_address=self.clawback_address,
+                                                      suggested_params=self.ledger.suggested_params())
+        asset_index = self.ledger.apply_group([txn])[0].asset_index
+
+        return self.asa_configuration.copy(update={"asa_id": asset_index})
+
+    def _asa_opt_in(self, private_key: str, address: str, asa_configuration: ASAConfiguration):
+        self.ledger.apply_group([algo_txn.AssetTransferTxn(address,
+                                                           self.ledger.suggested_params(),
+                                                           address,
+                                                           0,
+                                                           asa_configuration.asa_id).sign(private_key)])
+
+    def _owner(self, asa_configuration: ASAConfiguration) -> Tuple[str, str]:
+        owner_pk, owner_address = self._buyer()
+        self._asa_opt_in(owner_pk, owner_address, asa_configuration)
+        self.ledger.apply_group(self._initial_buy_group(owner_pk, owner_address, asa_configuration))
+        return owner_pk, owner_address
+
+    def _seller(self, asa_configuration: ASAConfiguration) -> Tuple[str, str]:
+        seller_pk, seller_address = self._owner(asa_configuration)
+        self.ledger.apply_group(self._sell_asa_group(seller_pk, asa_configuration))
+        return seller_pk, seller_address
+
+    # The approved group of every branch, the app call is the first transaction.
+
+    def _initial_buy_group(self, buyer_pk: str, buyer_address: str, asa_configuration: ASAConfiguration) -> list:
+        return self.dex_service.initial_buy_group(buyer_addr=buyer_address,
+                                                  buyer_pk=buyer_pk,
+                                                  asa_configuration=asa_configuration,
+                                                  asa_clawback_addr=self.clawback_address,
+                                                  asa_clawback_bytes=self.clawback_bytes,
+                                                  suggested_params=self.ledger.suggested_params())
+
+    def _sell_asa_group(self, seller_pk: str, asa_configuration: ASAConfiguration) -> list:
+        return [self.dex_service.make_sell_offer_transaction(
+            seller_pk=seller_pk,
+            sell_price=asa_configuration.economy_configuration.max_sell_price,
+            asa_configuration=asa_configuration,
+            suggested_params=self.ledger.suggested_params())]
+
+    def group_initial_buy(self) -> Tuple[list, str]:
+        # Every application call of the group sums the prices of all tickets, so the largest group costs the most.
+        asa_configurations = [self._mint() for _ in range(TokilityDEX.MAX_INITIAL_BUY_TICKETS)]
+        buyer_pk, buyer_address = self._buyer()
+        for asa_configuration in asa_configurations:
+            self._asa_opt_in(buyer_pk, buyer_address, asa_configuration)
+        group = self.dex_service.initial_buy_many_group(buyer_addr=buyer_address,
+                                                        buyer_pk=buyer_pk,
+                                                        asa_configurations=asa_configurations,
+                                                        asa_clawback_addr=self.clawback_address,
+                                                        asa_clawback_bytes=self.clawback_bytes,
+                                                        suggested_params=self.ledger.suggested_params())
+        return group, buyer_pk
+
+    def group_sell_asa(self) -> Tuple[list, str]:
+        asa_configuration = self._mint()
+        owner_pk, _ = self._owner(asa_configuration)
+        return self._sell_asa_group(owner_pk, asa_configuration), owner_pk
+
+    def group_buy_from_seller(self) -> Tuple[list, str]:
+        asa_configuration = self._mint()
+        _, seller_address = self._seller(asa_configuration)
+        buyer_pk, buyer_address = self._buyer()
+        self._asa_opt_in(buyer_pk, buyer_address, asa_configuration)
+        group = self.dex_service.buy_from_seller_group(buyer_addr=buyer_address,
+                                                       buyer_pk=buyer_pk,
+                                                       seller_addr=seller_address,
+                                                       price=asa_configuration.economy_configuration.max_sell_price,
+                                                       asa_configuration=asa_configuration,
+                                                       asa_clawback_addr=self.clawback_address,
+                                                       asa_clawback_bytes=self.clawback_bytes,
+                                                       suggested_params=self.ledger.suggested_params())
+        return group, buyer_pk
+
+    def group_stop_selling(self) -> Tuple[list, str]:
+        asa_configuration = self._mint()
+        seller_pk, _ = self._seller(asa_configuration)
+        group = [self.dex_service.stop_selling_transaction(seller_pk=seller_pk,
+                                                           asa_configuration=asa_configuration,
+                                                           suggested_params=self.ledger.suggested_params())]
+        return group, seller_pk
+
+    def group_gift_asa(self) -> Tuple[list, str]:
+        asa_configuration = self._mint()
+        owner_pk, owner_address = self._owner(asa_configuration)
+        receiver_pk, receiver_address = self._account()
+        self._asa_opt_in(receiver_pk, receiver_address, asa_configuration)
+        group = self.dex_service.gift_asa_group(asa_owner_addr=owner_address,
+                                                asa_owner_pk=owner_pk,
+                                                asa_receiver_addr=receiver_address,
+                                                asa_configuration=asa_configuration,
+                                                asa_clawback_addr=self.clawback_address,
+                                                asa_clawback_bytes=self.clawback_bytes,
+                                                suggested_params=self.ledger.suggested_params())
+        return group, owner_pk
+
+    # Profiling.
+
+    def _prefix_cost(self, app_call: algo_txn.ApplicationCallTxn, caller_pk: str) -> EvalResult:
+        """
+        Calls the probe application with the arguments of the branch, the cost of its approving tail is left out.
+        """
+        probe_call = algo_txn.ApplicationNoOpTxn(app_call.sender,
+                                                 self.ledger.suggested_params(),
+                                                 self.probe_app_id,
+                                                 app_args=app_call.app_args,
+                                                 accounts=app_call.accounts,
+                                                 foreign_assets=app_call.foreign_assets)
+        result = self.ledger.apply_group([probe_call.sign(caller_pk)], commit=False)[0].app_result
+
+        approve_tail = load_program(self.prefix_program)[1][-2:]
+        for instruction in approve_tail:
+            result.cost -= result.pc_costs.pop(instruction.pc, 0)
+            result.opcode_costs[instruction.op.name] -= instruction.op.cost
+
+        return result
+
+    def branch_size(self, method: str) -> int:
+        return len(assemble(self.compile_teal(getattr(self.dex, method)())))
+
+    def profile(self, method: str, hotspots: int) -> dict:
+        group, caller_pk = getattr(self, f'group_{method}')()
+        app_call = group[0].transaction
+
+        app_result = self.ledger.apply_group(group, commit=False)[0].app_result
+        prefix_result = self._prefix_cost(app_call, caller_pk)
+
+        instructions = {instruction.pc: instruction for instruction in load_program(self.approval_program)[1]}
+        top_pcs = sorted(app_result.pc_costs.items(), key=lambda pc_cost: (-pc_cost[1], pc_cost[0]))[:hotspots]
+
+        return {
+            "cost": app_result.cost,
+            "prefix_cost": prefix_result.cost,
+            "branch_cost": app_result.cost - prefix_result.cost,
+            "branch_size": self.branch_size(method),
+            "opcode_costs": dict(app_result.opcode_costs.most_common()),
+            "prefix_opcode_costs": dict((+prefix_result.opcode_costs).most_common()),
+            "hotspots": [{"pc": pc, "cost": cost, "instruction": _instruction_text(instructions[pc])}
+                         for pc, cost in top_pcs]
+        }
+
+
+def build_report(budget: int, branch_budgets: Dict[str, int], hotspots: int) -> dict:
+    profiler = DEXCostProfiler()
+
+    program_length = len(profiler.approval_program) + len(profiler.clear_program)
+    report = {
+        "approval_program_size": len(profiler.approval_program),
+        "clear_program_size": len(profiler.clear_program),
+        "max_program_size": MAX_APP_PROGRAM_LENGTH,
+        "prefix_size": len(profiler.prefix_program),
+        "branches": dict(),
+        "failures": []
+    }
+
+    if program_length > MAX_APP_PROGRAM_LENGTH:
+        report["failures"].append(f'the approval and the clear program take {program_length} bytes, '
+                                  f'more than {MAX_APP_PROGRAM_LENGTH}')
+
+    for method in app_methods():
+        method_budget = branch_budgets.get(method, budget)
+        try:
+            branch = profiler.profile(method, hotspots=hotspots)
+        except Exception as e:
+            report["failures"].append(f'{method} could not be profiled: {e}')
+            continue
+
+        branch["budget"] = method_budget
+        report["branches"][method] = branch
+        if branch["cost"] > method_budget:
+            report["failures"].append(f'{method} costs {branch["cost"]}, more than its budget of {method_budget}')
+
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = [f'TokilityDEX approval program: {report["approval_program_size"]} bytes, '
+             f'clear program: {report["clear_program_size"]} bytes, '
+             f'limit: {report["max_program_size"]} bytes']
+
+    branches = report["branches"]
+    if branches:
+        # The prefix does the same work for every branch.
+        prefix_branch = max(branches.values(), key=lambda branch: branch["prefix_cost"])
+        top_prefix_opcodes = ", ".join(f'{name} {cost}' for name, cost in
+                                       list(prefix_branch["prefix_opcode_costs"].items())[:TOP_OPCODES])
+        lines.append(f'Shared prefix (configuration hash check): cost {prefix_branch["prefix_cost"]}, '
+                     f'{report["prefix_size"]} bytes compiled on its own. Top opcodes: {top_prefix_opcodes}')
+
+    lines.append("")
+    lines.append(f'{"branch":<18}{"cost":>6}{"budget":>8}{"prefix":>8}{"branch":>8}{"size":>6}  top opcodes')
+    for method, branch in branches.items():
+        top_opcodes = ", ".join(f'{name} {cost}' for name, cost in list(branch["opcode_costs"].items())[:TOP_OPCODES])
+        lines.append(f'{method:<18}{branch["cost"]:>6}{branch["budget"]:>8}{branch["prefix_cost"]:>8}'
+                     f'{branch["branch_cost"]:>8}{branch["branch_size"]:>6}  {top_opcodes}')
+
+    for method, branch in branches.items():
+        if branch["hotspots"]:
+            lines.append("")
+            lines.append(f'{method} hotspots:')
+            for hotspot in branch["hotspots"]:
+                lines.append(f'  pc {hotspot["pc"]:>4}  cost {hotspot["cost"]:>3}  {hotspot["instruction"]}')
+
+    for failure in report["failures"]:
+        lines.append(f'FAILED: {failure}')
+
+    return "\n".join(lines)
+
+
+def _branch_budget(value: str) -> Tuple[str, int]:
+    method, _, budget = value.partition("=")
+    if method not in app_methods() or not budget.isdigit():
+        raise argparse.ArgumentTypeError(f'expected METHOD=COST with a method of {", ".join(app_methods())}')
+    return method, int(budget)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Opcode cost report of the TokilityDEX approval program.")
+    parser.add_argument("--budget", type=int, default=APPLICATION_MAX_COST,
+                        help="opcode budget of every branch")
+    parser.add_argument("--branch-budget", type=_branch_budget, action="append", default=[],
+                        metavar="METHOD=COST", help="opcode budget of a single branch")
+    parser.add_argument("--hotspots", type=int, default=0, help="number of the most expensive pcs shown per branch")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(args)
+
+    report = build_report(budget=args.budget, branch_budgets=dict(args.branch_budget), hotspots=args.hotspots)
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+    return 1 if report["failures"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
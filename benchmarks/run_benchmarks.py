@@ -0,0 +1,582 @@
+"""
+End-to-end benchmarks of the Tokility marketplace operations. Every operation goes through the same services as the
+UIs, against the local algod and indexer stand-in of src/emulator/server.py, so the numbers include the signing,
+the HTTP round trips, the evaluation of the smart contracts and the confirmation tracking.
+
+Each scale point seeds a fresh marketplace with the given number of tickets, generated with the helpers of
+helper_scripts/generate_dummy_data.py, and puts a fraction of them on the second hand market. The read operations
+are measured first, so they see exactly the seeded marketplace. Every iteration of a write operation prepares its
+own ticket and accounts directly on the ledger, outside of the measured time.
+
+Run from the root of the repository:
+    python -m benchmarks.run_benchmarks --scales 10,1000,100000 --output benchmark.json
+    python -m benchmarks.run_benchmarks --scales 10,1000 --baseline benchmark.json --max-regression 0.2
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from algosdk import account, logic
+from algosdk.future import transaction as algo_txn
+
+from helper_scripts.generate_dummy_data import create_random_asa_configuration, create_random_concert_ticket, \
+    create_random_conference_ticket, create_random_restaurant_ticket, micro_algo
+from src.blockchain_utils.throttled_clients import ThrottledAlgodClient, ThrottledIndexerClient, RequestBudget
+from src.blockchain_utils.transaction_repository import ASATransactionRepository
+from src.emulator.server import LocalAlgorandNode, LocalAlgorandServer
+from src.models.asset_configurations import ASAConfiguration
+from src.services import NetworkInteraction
+from src.services.asa_service import ASAService
+from src.services.sale_offer_service import SecondHandOfferingsService, InitialBuyOfferingsService
+from src.services.ticket_configuration_cache import get_ticket_configuration_cache
+from src.services.tokility_dex_service import TokilityDEXService
+from src.smart_contracts.compilation_cache import get_compilation_cache
+from src.smart_contracts.tokility_dex_asc1 import TokilityDEX
+
+DEFAULT_SCALES = [10, 1000, 100000]
+DEFAULT_ITERATIONS = 100
+DEFAULT_READ_ITERATIONS = 5
+DEFAULT_RESALE_FRACTION = 0.1
+
+# The tickets share a pool of distinct configurations, it fits in the memory LRU of the ticket configuration cache.
+CONFIGURATION_POOL_SIZE = 1000
+
+# The clients of the benchmark should never wait for the rate limiter.
+UNTHROTTLED_REQUESTS_PER_SECOND = 100000
+
+API_TOKEN = "benchmark"
+
+ACCOUNT_FUNDING = micro_algo(10000)
+RESELLING_PERIOD_SECONDS = 10 * 365 * 24 * 3600
+
+READ_OPERATIONS = ["available_offers", "offer_for_asa", "available_sell_offers"]
+WRITE_OPERATIONS = ["create_asa", "initial_buy", "initial_buy_many", "make_sell_offer", "stop_selling", "buy_from_seller", "gift_asa"]
+
+
+def percentile(sorted_samples: List[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of already sorted samples.
+    """
+    rank = max(1, math.ceil(percent / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    """
+    :param latencies: the latency of every iteration in seconds.
+    :return: the throughput and the latency percentiles in milliseconds of sequentially executed iterations.
+    """
+    samples = sorted(latencies)
+    total = sum(samples)
+
+    return {
+        "iterations": len(samples),
+        "throughput_per_second": round(len(samples) / total, 3) if total > 0 else None,
+        "mean_ms": round(total / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3)
+    }
+
+
+def _random_ticket(asa_configuration: ASAConfiguration):
+    ticket_factory = random.choice([
+        lambda: create_random_concert_ticket(asa_configuration,
+                                             issuer="Foo Fighters",
+                                             name="Foo Fighters - Sonic Highways Tour",
+                                             ipfs_image="https://gateway.pinata.cloud/ipfs/QmaXe7kVV2dAYTovruC8aBoReWC6peykvPS9FdYGqu4Qip"),
+        lambda: create_random_conference_ticket(asa_configuration,
+                                                issuer="Algorand",
+                                                name="Algorand Conference",
+                                                ipfs_image="https://gateway.pinata.cloud/ipfs/QmaXe7kVV2dAYTovruC8aBoReWC6peykvPS9FdYGqu4Qip"),
+        lambda: create_random_restaurant_ticket(asa_configuration,
+                                                issuer="Jamie Oliver Inc",
+                                                name="Jamie Oliver",
+                                                ipfs_image="https://gateway.pinata.cloud/ipfs/QmaXe7kVV2dAYTovruC8aBoReWC6peykvPS9FdYGqu4Qip")
+    ])
+
+    return ticket_factory()
+
+
+class BenchmarkMarketplace:
+    """
+    A TokilityDEX deployment on a fresh local node, seeded with tickets_count tickets of which resale_fraction are
+    offered on the second hand market. The setup transactions are applied directly on the ledger of the node, while
+    the measured operations go through the services and the HTTP API.
+    """
+
+    def __init__(self, tickets_count: int, resale_fraction: float, work_dir: Path):
+        self.tickets_count = tickets_count
+        self.resale_fraction = resale_fraction
+
+        self.static_dir = work_dir / 'ipfs'
+        self.static_dir.mkdir(parents=True, exist_ok=True)
+
+        self.node = LocalAlgorandNode()
+        self.ledger = self.node.ledger
+        self.server = LocalAlgorandServer(port=0, node=self.node, static_dir=str(self.static_dir))
+        self.server.start()
+
+        self.client = ThrottledAlgodClient(API_TOKEN,
+                                           self.server.address,
+                                           headers={'X-Api-key': API_TOKEN},
+                                           budget=RequestBudget(requests_per_second=UNTHROTTLED_REQUESTS_PER_SECOND))
+        self.indexer = ThrottledIndexerClient(indexer_token=API_TOKEN,
+                                              indexer_address=self.server.indexer_address,
+                                              headers={'X-Api-key': API_TOKEN},
+                                              budget=RequestBudget(requests_per_second=UNTHROTTLED_REQUESTS_PER_SECOND))
+
+        self.platform_pk, self.platform_address = self.funded_account()
+        self.company_pk, self.company_address = self.funded_account(amount=ACCOUNT_FUNDING * (tickets_count + 1))
+
+        self.dex_service = TokilityDEXService(app_creator_addr=self.platform_address,
+                                              app_creator_pk=self.platform_pk,
+                                              client=self.client)
+        self.asa_service = ASAService(creator_addr=self.company_address,
+                                      creator_pk=self.company_pk,
+                                      tokility_dex_app_id=self.dex_service.app_id,
+                                      client=self.client)
+
+        self.clawback_bytes = self.asa_service.clawback_address_bytes
+        self.clawback_address = logic.address(self.clawback_bytes)
+        self.ledger.fund(self.clawback_address, ACCOUNT_FUNDING)
+
+        self.max_offers_per_seller = TokilityDEX.MAX_SELL_OFFERS
+        self.configurations = self._configuration_pool()
+        self.open_offers = 0
+        self.offered_asa_ids: List[int] = []
+        self._notes = 0
+
+    def stop(self):
+        self.server.stop()
+
+    # Setup, applied directly on the ledger.
+
+    def _apply(self, signed_group: list):
+        with self.node.lock:
+            return self.ledger.apply_group(signed_group)
+
+    def _suggested_params(self) -> algo_txn.SuggestedParams:
+        with self.node.lock:
+            return self.ledger.suggested_params()
+
+    def _configuration_pool(self) -> List[ASAConfiguration]:
+        """
+        Generates the distinct ticket configurations and serves them under /ipfs, like the configurations pinned
+        to IPFS when the tickets are deployed.
+        """
+        reselling_end_date = self.ledger.timestamp + RESELLING_PERIOD_SECONDS
+
+        configurations = []
+        for i in range(CONFIGURATION_POOL_SIZE):
+            asa_configuration = create_random_asa_configuration(creator_address=self.company_address,
+                                                                asset_name=f"Ticket {i}",
+                                                                reselling_end_date=reselling_end_date)
+            asa_configuration.configuration_ipfs_url = f'{self.server.address}/ipfs/{i}.json'
+
+            with open(self.static_dir / f'{i}.json', 'w') as f:
+                json.dump(_random_ticket(asa_configuration).dict(), f)
+
+            configurations.append(asa_configuration)
+
+        return configurations
+
+    def _configuration(self, reselling: bool = False, gifting: bool = False) -> ASAConfiguration:
+        while True:
+            asa_configuration = random.choice(self.configurations)
+            economy_configuration = asa_configuration.economy_configuration
+            if reselling and economy_configuration.reselling_allowed != 1:
+                continue
+            if gifting and economy_configuration.gifting_allowed != 1:
+                continue
+
+            return asa_configuration
+
+    def funded_account(self, amount: int = ACCOUNT_FUNDING) -> Tuple[str, str]:
+        private_key, address = account.generate_account()
+        with self.node.lock:
+            self.ledger.fund(address, amount)
+        return private_key, address
+
+    def buyer_account(self) -> Tuple[str, str]:
+        """
+        :return: a funded account that is opted in the TokilityDEX application.
+        """
+        private_key, address = self.funded_account()
+        self._apply([algo_txn.ApplicationOptInTxn(address,
+                                                  self._suggested_params(),
+                                                  self.dex_service.app_id).sign(private_key)])
+        return private_key, address
+
+    def mint(self, reselling: bool = False, gifting: bool = False) -> ASAConfiguration:
+        """
+        Creates a ticket owned by the company.
+        """
+        asa_configuration = self._configuration(reselling=reselling, gifting=gifting)
+
+        # The note keeps the creation transactions of the same configuration unique within a round.
+        self._notes += 1
+        txn = self.asa_service.create_asa_transaction(asa_configuration=asa_configuration,
+                                                      clawback_address=self.clawback_address,
+                                                      suggested_params=self._suggested_params(),
+                                                      note=self._notes.to_bytes(8, 'big'))
+        asset_index = self._apply([txn])[0].asset_index
+
+        return asa_configuration.copy(update={"asa_id": asset_index})
+
+    def asa_opt_in(self, private_key: str, asa_configuration: ASAConfiguration):
+        self._apply([ASATransactionRepository.asa_opt_in(client=self.client,
+                                                         sender_private_key=private_key,
+                                                         asa_id=asa_configuration.asa_id,
+                                                         suggested_params=self._suggested_params())])
+
+    def buy(self, buyer: Tuple[str, str], asa_configuration: ASAConfiguration):
+        buyer_pk, buyer_address = buyer
+        self.asa_opt_in(buyer_pk, asa_configuration)
+        self._apply(self.dex_service.initial_buy_group(buyer_addr=buyer_address,
+                                                       buyer_pk=buyer_pk,
+                                                       asa_configuration=asa_configuration,
+                                                       asa_clawback_addr=self.clawback_address,
+                                                       asa_clawback_bytes=self.clawback_bytes,
+                                                       suggested_params=self._suggested_params()))
+
+    def offer(self, seller: Tuple[str, str], asa_configuration: ASAConfiguration):
+        self._apply([self.dex_service.make_sell_offer_transaction(
+            seller_pk=seller[0],
+            sell_price=asa_configuration.economy_configuration.max_sell_price,
+            asa_configuration=asa_configuration,
+            suggested_params=self._suggested_params())])
+
+    def seed(self):
+        """
+        Mints the tickets of the scale point and resells a fraction of them, each seller holds as many offers as
+        its local state allows.
+        """
+        offers_count = max(1, round(self.tickets_count * self.resale_fraction)) if self.tickets_count > 0 else 0
+
+        seller = None
+        for i in range(offers_count):
+            if i % self.max_offers_per_seller == 0:
+                seller = self.buyer_account()
+
+            asa_configuration = self.mint(reselling=True)
+            self.buy(seller, asa_configuration)
+            self.offer(seller, asa_configuration)
+            self.offered_asa_ids.append(asa_configuration.asa_id)
+
+        for _ in range(self.tickets_count - offers_count):
+            self.mint()
+
+        self.open_offers = offers_count
+        self.node.seal_block()
+
+    # Measured operations, every preparation returns the callable that is timed.
+
+    def prepare_available_offers(self) -> Callable:
+        return lambda: SecondHandOfferingsService.available_offers(app_id=self.dex_service.app_id,
+                                                                   indexer=self.indexer)
+
+    def prepare_offer_for_asa(self) -> Callable:
+        asa_id = self.offered_asa_ids[len(self.offered_asa_ids) // 2]
+        return lambda: SecondHandOfferingsService.offer_for_asa(app_id=self.dex_service.app_id,
+                                                                asa_id=asa_id,
+                                                                indexer=self.indexer)
+
+    def prepare_available_sell_offers(self) -> Callable:
+        return lambda: InitialBuyOfferingsService.available_sell_offers(creator_address=self.company_address,
+                                                                        indexer=self.indexer)
+
+    def prepare_create_asa(self) -> Callable:
+        # A new random configuration, so the creation transactions never repeat.
+        asa_configuration = create_random_asa_configuration(creator_address=self.company_address,
+                                                            asset_name="Benchmark",
+                                                            reselling_end_date=self.ledger.timestamp + RESELLING_PERIOD_SECONDS)
+        asa_configuration.configuration_ipfs_url = self.configurations[0].configuration_ipfs_url
+
+        return lambda: self.asa_service.create_asa(asa_configuration)
+
+    def prepare_initial_buy(self) -> Callable:
+        asa_configuration = self.mint()
+        buyer_pk, buyer_address = self.buyer_account()
+        self.asa_opt_in(buyer_pk, asa_configuration)
+
+        def run():
+            tx_id = self.dex_service.initial_buy(buyer_addr=buyer_address,
+                                                 buyer_pk=buyer_pk,
+                                                 asa_configuration=asa_configuration,
+                                                 asa_clawback_addr=self.clawback_address,
+                                                 asa_clawback_bytes=self.clawback_bytes)
+            NetworkInteraction.wait_for_confirmation(self.client, tx_id)
+
+        return run
+
+    def prepare_initial_buy_many(self) -> Callable:
+        asa_configurations = [self.mint() for _ in range(TokilityDEX.MAX_INITIAL_BUY_TICKETS)]
+        buyer_pk, buyer_address = self.buyer_account()
+        for asa_configuration in asa_configurations:
+            self.asa_opt_in(buyer_pk, asa_configuration)
+
+        def run():
+            tx_id = self.dex_service.initial_buy_many(buyer_addr=buyer_address,
+                                                      buyer_pk=buyer_pk,
+                                                      asa_configurations=asa_configurations,
+                                                      asa_clawback_addr=self.clawback_address,
+                                                      asa_clawback_bytes=self.clawback_bytes)
+            NetworkInteraction.wait_for_confirmation(self.client, tx_id)
+
+        return run
+
+    def prepare_make_sell_offer(self) -> Callable:
+        asa_configuration = self.mint(reselling=True)
+        seller = self.buyer_account()
+        self.buy(seller, asa_configuration)
+
+        return lambda: self.dex_service.make_sell_offer(
+            seller_pk=seller[0],
+            sell_price=asa_configuration.economy_configuration.max_sell_price,
+            asa_configuration=asa_configuration)
+
+    def prepare_stop_selling(self) -> Callable:
+        asa_configuration = self.mint(reselling=True)
+        seller = self.buyer_account()
+        self.buy(seller, asa_configuration)
+        self.offer(seller, asa_configuration)
+
+        return lambda: self.dex_service.stop_selling(seller_pk=seller[0], asa_configuration=asa_configuration)
+
+    def prepare_buy_from_seller(self) -> Callable:
+        asa_configuration = self.mint(reselling=True)
+        seller = self.buyer_account()
+        self.buy(seller, asa_configuration)
+        self.offer(seller, asa_configuration)
+
+        buyer_pk, buyer_address = self.buyer_account()
+        self.asa_opt_in(buyer_pk, asa_configuration)
+
+        def run():
+            tx_id = self.dex_service.buy_from_seller(buyer_addr=buyer_address,
+                                                     buyer_pk=buyer_pk,
+                                                     seller_addr=seller[1],
+                                                     price=asa_configuration.economy_configuration.max_sell_price,
+                                                     asa_configuration=asa_configuration,
+                                                     asa_clawback_addr=self.clawback_address,
+                                                     asa_clawback_bytes=self.clawback_bytes)
+            NetworkInteraction.wait_for_confirmation(self.client, tx_id)
+
+        return run
+
+    def prepare_gift_asa(self) -> Callable:
+        asa_configuration = self.mint(gifting=True)
+        owner_pk, owner_address = self.buyer_account()
+        self.buy((owner_pk, owner_address), asa_configuration)
+
+        receiver_pk, receiver_address = self.funded_account()
+        self.asa_opt_in(receiver_pk, asa_configuration)
+
+        def run():
+            tx_id = self.dex_service.gift_asa(asa_owner_addr=owner_address,
+                                              asa_owner_pk=owner_pk,
+                                              asa_receiver_addr=receiver_address,
+                                              asa_configuration=asa_configuration,
+                                              asa_clawback_addr=self.clawback_address,
+                                              asa_clawback_bytes=self.clawback_bytes)
+            NetworkInteraction.wait_for_confirmation(self.client, tx_id)
+
+        return run
+
+
+def measure(prepare: Callable[[], Callable], iterations: int, warm_up: bool = False) -> dict:
+    """
+    Runs prepare and then times the returned callable, iteration by iteration.
+    :param prepare: builds the state of a single iteration outside of the measured time.
+    :param iterations:
+    :param warm_up: when set, an extra first run is timed separately as cold_ms, e.g. before the caches are filled.
+    :return: the latency summary of the iterations.
+    """
+    cold_seconds = None
+    if warm_up:
+        run = prepare()
+        start = time.perf_counter()
+        run()
+        cold_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(iterations):
+        run = prepare()
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+
+    summary = latency_summary(latencies)
+    if cold_seconds is not None:
+        summary["cold_ms"] = round(cold_seconds * 1000, 3)
+
+    return summary
+
+
+def run_scale_point(tickets_count: int,
+                    operations: List[str],
+                    iterations: int,
+                    read_iterations: int,
+                    resale_fraction: float,
+                    work_dir: Path) -> dict:
+    setup_start = time.perf_counter()
+    marketplace = BenchmarkMarketplace(tickets_count=tickets_count, resale_fraction=resale_fraction, work_dir=work_dir)
+
+    try:
+        marketplace.seed()
+        setup_seconds = time.perf_counter() - setup_start
+
+        results = dict()
+        for operation in operations:
+            prepare = getattr(marketplace, f'prepare_{operation}')
+            _progress(f'{tickets_count} tickets: {operation}')
+
+            if operation in READ_OPERATIONS:
+                results[operation] = measure(prepare, iterations=read_iterations, warm_up=True)
+            else:
+                results[operation] = measure(prepare, iterations=iterations)
+
+        return {
+            "tickets": tickets_count,
+            "open_offers": marketplace.open_offers,
+            "setup_seconds": round(setup_seconds, 3),
+            "operations": results
+        }
+    finally:
+        marketplace.stop()
+
+
+def compare(results: dict, baseline: dict, max_regression: Optional[float]) -> Tuple[List[str], bool]:
+    """
+    Compares the p50 latencies with the ones of a previous run.
+    :param results:
+    :param baseline: the JSON output of a previous run.
+    :param max_regression: the allowed relative increase of the p50 latency, e.g 0.2 for 20%.
+    :return: the report lines and whether any operation regressed more than max_regression.
+    """
+    baseline_scales = {scale["tickets"]: scale for scale in baseline.get("scales", [])}
+
+    lines = []
+    regressed = False
+    for scale in results["scales"]:
+        baseline_scale = baseline_scales.get(scale["tickets"])
+        if baseline_scale is None:
+            continue
+
+        for operation, summary in scale["operations"].items():
+            baseline_summary = baseline_scale["operations"].get(operation)
+            if baseline_summary is None or baseline_summary["p50_ms"] == 0:
+                continue
+
+            change = summary["p50_ms"] / baseline_summary["p50_ms"] - 1
+            marker = ""
+            if max_regression is not None and change > max_regression:
+                regressed = True
+                marker = "  REGRESSION"
+
+            lines.append(f'{scale["tickets"]:>7} {operation:<22} p50 {baseline_summary["p50_ms"]:>10.3f}ms -> '
+                         f'{summary["p50_ms"]:>10.3f}ms ({change:+.1%}){marker}')
+
+    return lines, regressed
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _progress(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks of the Tokility marketplace operations.")
+    parser.add_argument("--scales", default=",".join(str(scale) for scale in DEFAULT_SCALES),
+                        help="comma separated numbers of seeded tickets")
+    parser.add_argument("--operations", default=",".join(READ_OPERATIONS + WRITE_OPERATIONS),
+                        help="comma separated operations to measure")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="measured iterations of every write operation")
+    parser.add_argument("--read-iterations", type=int, default=DEFAULT_READ_ITERATIONS,
+                        help="measured iterations of every read operation, after a cold run")
+    parser.add_argument("--resale-fraction", type=float, default=DEFAULT_RESALE_FRACTION,
+                        help="fraction of the seeded tickets that are offered on the second hand market")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated ticket configurations")
+    parser.add_argument("--output", default=None, help="file to write the JSON results to, stdout by default")
+    parser.add_argument("--baseline", default=None, help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit with 1 when a p50 latency grows more than this fraction over the baseline")
+    args = parser.parse_args(args)
+
+    operations = [operation.strip() for operation in args.operations.split(",") if operation.strip()]
+    unknown_operations = set(operations) - set(READ_OPERATIONS + WRITE_OPERATIONS)
+    if unknown_operations:
+        parser.error(f'unknown operations: {", ".join(sorted(unknown_operations))}')
+    # The read operations run first, before the write operations change the seeded marketplace.
+    operations = [operation for operation in READ_OPERATIONS + WRITE_OPERATIONS if operation in operations]
+
+    random.seed(args.seed)
+
+    results = {
+        "created_at": datetime.utcnow().isoformat(timespec='seconds') + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "parameters": {
+            "iterations": args.iterations,
+            "read_iterations": args.read_iterations,
+            "resale_fraction": args.resale_fraction,
+            "seed": args.seed
+        },
+        "scales": []
+    }
+
+    with tempfile.TemporaryDirectory(prefix="tokility-benchmark-") as work_dir:
+        # Keep the process-wide caches of the benchmark out of the caches of the repository.
+        get_compilation_cache().cache_dir = Path(work_dir) / 'teal_cache'
+        get_ticket_configuration_cache().cache_dir = Path(work_dir) / 'ticket_cache'
+
+        # The services report every step on stdout.
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for tickets_count in [int(scale) for scale in args.scales.split(",")]:
+                results["scales"].append(run_scale_point(tickets_count=tickets_count,
+                                                         operations=operations,
+                                                         iterations=args.iterations,
+                                                         read_iterations=args.read_iterations,
+                                                         resale_fraction=args.resale_fraction,
+                                                         work_dir=Path(work_dir) / str(tickets_count)))
+
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            lines, regressed = compare(results, json.load(f), args.max_regression)
+        for line in lines:
+            _progress(line)
+        if regressed:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Cold start benchmark of the marketplace. Every scenario runs in a fresh interpreter, the way a newly scaled
+marketplace pod starts, and reports the seconds until the scenario is done and whether PyTeal was imported on the
+way. The read path, offer discovery and rendering, must never import PyTeal.
+
+The clawback scenarios resolve the clawback logic signature of the UIs, once from a cache directory filled by
+src/smart_contracts/compilation_cache.py ahead of time and once from an empty one, in which case the program is
+generated with PyTeal and compiled by the local algod stand-in of src/emulator/server.py.
+
+Run from the root of the repository:
+    python -m benchmarks.startup_report --output startup.json
+    python -m benchmarks.startup_report --baseline startup.json --max-regression 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.blockchain_utils.throttled_clients import ThrottledAlgodClient, RequestBudget
+from src.emulator.server import LocalAlgorandServer
+from src.smart_contracts.compilation_cache import CompilationCache, prebuild
+
+DEFAULT_REPEATS = 5
+
+REPOSITORY_ROOT = Path(__file__).resolve().parent.parent
+
+# The app id of the clawback logic signature, the program does not depend on a deployed application.
+CLAWBACK_APP_ID = 1
+
+_CLAWBACK = """
+from pathlib import Path
+from src.blockchain_utils.throttled_clients import ThrottledAlgodClient
+from src.smart_contracts.compilation_cache import get_compilation_cache, clawback_program
+
+cache = get_compilation_cache()
+cache.cache_dir = Path(os.environ["STARTUP_REPORT_CACHE_DIR"])
+client = ThrottledAlgodClient("startup", os.environ["STARTUP_REPORT_ALGOD_ADDRESS"])
+cache.compile(client=client, program=clawback_program(app_id=int(os.environ["STARTUP_REPORT_APP_ID"])))
+"""
+
+SCENARIOS = {
+    "read_path": """
+from src.blockchain_utils.credentials import get_client, get_indexer
+from src.models.asset_sale_offer import SaleOffer
+from src.models.ticket_models import Ticket, ConferenceTicket
+from src.services.asset_metadata_fetcher import get_asset_metadata_fetcher
+from src.services.order_book_service import get_order_book
+from src.services.sale_offer_service import InitialBuyOfferingsService, SecondHandOfferingsService
+""",
+    "write_path": """
+from src.services.asa_service import ASAService
+from src.services.tokility_dex_service import TokilityDEXService
+""",
+    "clawback_prebuilt": _CLAWBACK,
+    "clawback_compiled": _CLAWBACK
+}
+
+# The scenarios that may not import PyTeal.
+PYTEAL_FREE_SCENARIOS = ["read_path", "write_path", "clawback_prebuilt"]
+
+_CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+{body}
+print(json.dumps({{"seconds": time.perf_counter() - start, "pyteal_imported": "pyteal" in sys.modules}}))
+"""
+
+
+def run_scenario(name: str, env: Dict[str, str]) -> dict:
+    """
+    Runs the scenario in a new interpreter.
+    :return: the seconds spent in the scenario, the seconds of the whole process including the start of the
+    interpreter and whether PyTeal was imported.
+    """
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, "-c", _CHILD.format(body=SCENARIOS[name])],
+                                     cwd=str(REPOSITORY_ROOT),
+                                     env=env)
+    process_seconds = time.perf_counter() - start
+
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    result["process_seconds"] = process_seconds
+
+    return result
+
+
+def measure(name: str, repeats: int, env: Dict[str, str], fresh_cache_dir: Optional[Path] = None) -> dict:
+    """
+    :param fresh_cache_dir: when set, every repeat gets a new, empty compilation cache directory under it.
+    :return: the median seconds over the repeats.
+    """
+    runs = []
+    for i in range(repeats):
+        run_env = dict(env)
+        if fresh_cache_dir is not None:
+            run_env["STARTUP_REPORT_CACHE_DIR"] = str(fresh_cache_dir / str(i))
+        runs.append(run_scenario(name, run_env))
+
+    return {
+        "repeats": repeats,
+        "median_seconds": round(statistics.median(run["seconds"] for run in runs), 4),
+        "median_process_seconds": round(statistics.median(run["process_seconds"] for run in runs), 4),
+        "pyteal_imported": any(run["pyteal_imported"] for run in runs)
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression: Optional[float]) -> Tuple[List[str], bool]:
+    """
+    Compares the median seconds with the ones of a previous run.
+    :param results:
+    :param baseline: the JSON output of a previous run.
+    :param max_regression: the allowed relative increase of the median seconds, e.g 0.2 for 20%.
+    :return: the report lines and whether any scenario regressed more than max_regression.
+    """
+    lines = []
+    regressed = False
+    for name, summary in results["scenarios"].items():
+        baseline_summary = baseline.get("scenarios", dict()).get(name)
+        if baseline_summary is None or baseline_summary["median_seconds"] == 0:
+            continue
+
+        change = summary["median_seconds"] / baseline_summary["median_seconds"] - 1
+        marker = ""
+        if max_regression is not None and change > max_regression:
+            regressed = True
+            marker = "  REGRESSION"
+
+        lines.append(f'{name:<20} {baseline_summary["median_seconds"]:>8.4f}s -> {summary["median_seconds"]:>8.4f}s '
+                     f'({change:+.1%}){marker}')
+
+    return lines, regressed
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _progress(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the Tokility marketplace.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenarios to measure")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="fresh interpreters per scenario")
+    parser.add_argument("--output", default=None, help="file to write the JSON results to, stdout by default")
+    parser.add_argument("--baseline", default=None, help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit with 1 when a median grows more than this fraction over the baseline")
+    args = parser.parse_args(args)
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown_scenarios = set(scenarios) - set(SCENARIOS)
+    if unknown_scenarios:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown_scenarios))}')
+
+    results = {
+        "created_at": datetime.utcnow().isoformat(timespec='seconds') + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "parameters": {
+            "repeats": args.repeats
+        },
+        "scenarios": dict()
+    }
+
+    server = LocalAlgorandServer(port=0)
+    server.start()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="tokility-startup-") as work_dir:
+            prebuilt_dir = Path(work_dir) / 'prebuilt'
+            prebuild(client=ThrottledAlgodClient("startup", server.address,
+                                                 budget=RequestBudget(requests_per_second=1000)),
+                     app_id=CLAWBACK_APP_ID,
+                     cache=CompilationCache(cache_dir=prebuilt_dir))
+
+            env = dict(os.environ,
+                       PYTHONPATH=str(REPOSITORY_ROOT),
+                       STARTUP_REPORT_ALGOD_ADDRESS=server.address,
+                       STARTUP_REPORT_APP_ID=str(CLAWBACK_APP_ID),
+                       STARTUP_REPORT_CACHE_DIR=str(prebuilt_dir))
+
+            for name in scenarios:
+                _progress(f'{name}')
+                fresh_cache_dir = Path(work_dir) / name if name == "clawback_compiled" else None
+                results["scenarios"][name] = measure(name, args.repeats, env, fresh_cache_dir=fresh_cache_dir)
+    finally:
+        server.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    failed = False
+    for name in PYTEAL_FREE_SCENARIOS:
+        if results["scenarios"].get(name, dict()).get("pyteal_imported"):
+            _progress(f'{name} imported PyTeal')
+            failed = True
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            lines, regressed = compare(results, json.load(f), args.max_regression)
+        for line in lines:
+            _progress(line)
+        failed = failed or regressed
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,6 @@ import json
 import time
 import uuid
 from datetime import date
-from typing import List
 from PIL import Image
 
 import streamlit as st
@@ -10,11 +9,9 @@ import streamlit as st
 from src.blockchain_utils.credentials import get_account_with_name
 from src.models.asset_configurations import *
 from src.models.ticket_models import *
-
-
-COLORS = [
-    ("#9E392B", "#B98888"),
-]
+from src.services.ticket_store import get_ticket_store
+from src.ui.card_renderer import CardRenderer
+from src.ui.cards import TicketCard
 
 
 def run_app():
@@ -101,26 +98,16 @@ def micro_algo(algo):
 
 
 def show_tickets(asa_type: str) -> None:
-    # seller tickets
-    if asa_type == 'concert':
-        seller_tokens = load_concert_tickets()
-
-    if asa_type == 'cinema':
-        seller_tokens = load_cinema_tickets()
-
-    if asa_type == 'conference':
-        seller_tokens = load_conference_tickets()
-
-    if asa_type == 'appointment':
-        seller_tokens = load_appointment_tickets()
-
-    if asa_type == 'restaurant':
-        seller_tokens = load_restaurant_tickets()
+    # seller tickets, only the page that is rendered is read from the store
+    seller_tokens = get_ticket_store().tickets(business_type=asa_type)
 
     # seller all tickets overview
     with st.expander("Tickets", expanded=False):
-        for ticket in seller_tokens:
-            show_ticket_info(ticket,  COLORS[0])
+        # The asa_id of the dummy tickets is not unique, so the cards are keyed by everything that they show.
+        renderer = CardRenderer(name=f"{asa_type}_tickets",
+                                card_key=ticket_card,
+                                build_card=ticket_card)
+        renderer.render(seller_tokens)
 
     # seller transactions overview
     with st.expander("All transactions", expanded=False):
@@ -167,10 +154,7 @@ def store_concert_input(asa_price: float,
                                        location=location,
                                        datetime=str(date_time))
 
-        concert_tickets.append(concert_ticket)
-        json_data = read_json('data/ui/concert_tickets_dummy.json')
-        json_data['concert_tickets'].append(concert_ticket.dict())
-        save_json('data/ui/concert_tickets_dummy.json', json_data)
+        get_ticket_store().insert(concert_ticket)
 
     except ValueError as error:
         st.error(f"Error! Ticket cannot be stored due to inconsistent formats. {error}")
@@ -216,10 +200,7 @@ def store_cinema_input(asa_price: int,
                                      row=row,
                                      datetime=str(date_time))
 
-        cinema_tickets.append(cinema_ticket)
-        json_data = read_json('data/ui/cinema_tickets_dummy.json')
-        json_data['cinema_tickets'].append(cinema_ticket.dict())
-        save_json('data/ui/cinema_tickets_dummy.json', json_data)
+        get_ticket_store().insert(cinema_ticket)
 
     except ValueError as error:
         st.error(f"Error! Ticket cannot be stored due to inconsistent formats. {error}")
@@ -263,10 +244,7 @@ def store_conference_input(asa_price: int,
                                              duration=duration,
                                              datetime=str(date_time))
 
-        conference_tickets.append(conference_ticket)
-        json_data = read_json('data/ui/conference_tickets_dummy.json')
-        json_data['conference_tickets'].append(conference_ticket.dict())
-        save_json('data/ui/conference_tickets_dummy.json', json_data)
+        get_ticket_store().insert(conference_ticket)
 
     except ValueError as error:
         st.error(f"Error! Ticket cannot be stored due to inconsistent formats. {error}")
@@ -308,10 +286,7 @@ def store_appointment_input(asa_price: int,
                                                duration=duration,
                                                datetime=str(date_time))
 
-        appointment_tickets.append(appointment_ticket)
-        json_data = read_json('data/ui/appointment_tickets_dummy.json')
-        json_data['appointment_tickets'].append(appointment_ticket.dict())
-        save_json('data/ui/appointment_tickets_dummy.json', json_data)
+        get_ticket_store().insert(appointment_ticket)
 
     except ValueError as error:
         st.error(f"Error! Ticket cannot be stored due to inconsistent formats. {error}")
@@ -353,10 +328,7 @@ def store_restaurant_input(asa_price: int,
                                              type=ticket_type,
                                              datetime=str(date_time))
 
-        restaurant_tickets.append(restaurant_ticket)
-        json_data = read_json('data/ui/restaurant_tickets_dummy.json')
-        json_data['restaurant_tickets'].append(restaurant_ticket.dict())
-        save_json('data/ui/restaurant_tickets_dummy.json', json_data)
+        get_ticket_store().insert(restaurant_ticket)
 
     except ValueError as error:
         st.error(f"Error! Ticket cannot be stored due to inconsistent formats. {error}")
@@ -474,139 +446,9 @@ def validate_input(asa_price: int,
     return True
 
 
-def show_ticket_info(ticket: Ticket, color: (str, str)):
-    html_format = f"""
-        <div class="card">
-            <header>
-                <time datetime="2018-05-15T19:00">{ticket.datetime}</time>
-                <div class="id">{round(float(ticket.asa_configuration.initial_offering_configuration.asa_price / 1000000), 2)} algos</div>
-        <div class="sponsor">ID: {ticket.asa_configuration.asa_id}</div>
-            </header>
-        <div class="announcement">
-            <h1>{ticket.ticket_name}</h1>
-            <h3>{ticket.ticket_info}</h3>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row1()}</h4>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row2()}</h4>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row3()}</h4>
-        </div>    
-        </div>
-    """
-    st.write(
-        html_format
-        ,
-        unsafe_allow_html=True
-    )
-
-    st.write(
-        f"""
-                <style>
-                @import url('https://fonts.googleapis.com/css?family=Asap+Condensed:600i,700');
-
-                    h1 {{
-                      font-size: 25px;
-                      color: #fff;
-                      text-transform: uppercase;
-                    }}
-                    h3 {{
-                      font-size: 20px;
-                      color: #fff;
-                      text-transform: uppercase;
-                    }}
-
-                    h4 {{
-                      font-size: 18px;
-                      color: #fff;
-                    }}
-
-                    .card {{
-                      display: flex;
-                      font-family: 'Asap Condensed', sans-serif;
-                      position: relative;
-                      margin: auto;
-                      height: 350px;
-                      width: 600px;
-                      text-align: center;
-                      background: linear-gradient({color[0]}, {color[1]});
-                      border-radius: 2px;
-                      box-shadow: 0 6px 12px -3px rgba(0,0,0,.3);
-                      color: #fff;
-                      padding: 30px;
-
-                    }}
-
-                    .card header {{
-                      position: absolute;
-                      top: 31px;
-                      left: 0;
-                      width: 100%;
-                      padding: 0 10%;
-                      transform: translateY(-50%);
-                      display: grid;
-                      grid-template-columns: 1fr 1fr 1fr;
-                      align-items: center;
-                    }}
-
-                    .card header > *:first-child {{
-                      text-align: left;
-                    }}
-                    .card header > *:last-child {{
-                      text-align: right;
-                    }}
-
-                    .id {{
-                      font-size: 24px;
-                      position: relative;
-                    }}
-
-                    .announcement {{
-                      position: relative;
-                      border: 3px solid currentColor;
-                      border-top: 0;
-                      width: 100%;
-                      height: 100%;
-                      display: flex;
-                      flex-direction: column;
-                      justify-content: center;
-                      align-items: center;
-                    }}
-
-                    .announcement:before,
-                    .announcement:after {{
-                      content: '';
-                      position: absolute;
-                      top: 0px;
-                      border-top: 3px solid currentColor;
-                      height: 0;
-                      width: 15px;
-                    }}
-                    .announcement:before {{
-                      left: -3px;
-                    }}
-                    .announcement:after {{
-                      right: -3px;
-                    }}
-
-                    * {{
-                      box-sizing: border-box;
-                      margin: 0;
-                      padding: 0;
-                    }}
-
-                    html, body {{
-                      height: 100%;
-                    }}
-
-                    h1, h2, h3, h4 {{
-                      margin: .15em 0;
-                    }}
-                """,
-        unsafe_allow_html=True,
-        key=f"{ticket.asa_configuration.asa_id}"
-    )
-
-def save_json(file_name, data):
-    with open(file_name, 'w') as f:
-        json.dump(data, f)
+def ticket_card(ticket: Ticket) -> TicketCard:
+    asa_price = ticket.asa_configuration.initial_offering_configuration.asa_price
+    return TicketCard.from_ticket(ticket, badge=f'{round(float(asa_price / 1000000), 2)} algos')
 
 
 def read_json(file_name: str) -> dict:
@@ -616,68 +458,7 @@ def read_json(file_name: str) -> dict:
     return data
 
 
-def load_concert_tickets() -> List[ConcertTicket]:
-    json_data = read_json('data/ui/concert_tickets_dummy.json')
-
-    tickets = []
-
-    for ticket_data in json_data['concert_tickets']:
-        tickets.append(ConcertTicket(**ticket_data))
-
-    return tickets
-
-
-def load_cinema_tickets() -> List[CinemaTicket]:
-    json_data = read_json('data/ui/cinema_tickets_dummy.json')
-
-    tickets = []
-
-    for ticket_data in json_data['cinema_tickets']:
-        tickets.append(CinemaTicket(**ticket_data))
-
-    return tickets
-
-
-def load_conference_tickets() -> List[ConferenceTicket]:
-    json_data = read_json('data/ui/conference_tickets_dummy.json')
-
-    tickets = []
-
-    for ticket_data in json_data['conference_tickets']:
-        tickets.append(ConferenceTicket(**ticket_data))
-
-    return tickets
-
-
-def load_appointment_tickets() -> List[AppointmentTicket]:
-    json_data = read_json('data/ui/appointment_tickets_dummy.json')
-
-    tickets = []
-
-    for ticket_data in json_data['appointment_tickets']:
-        tickets.append(AppointmentTicket(**ticket_data))
-
-    return tickets
-
-
-def load_restaurant_tickets() -> List[RestaurantTicket]:
-    json_data = read_json('data/ui/restaurant_tickets_dummy.json')
-
-    tickets = []
-
-    for ticket_data in json_data['restaurant_tickets']:
-        tickets.append(RestaurantTicket(**ticket_data))
-
-    return tickets
-
-
 if __name__ == '__main__':
     all_sellers_dict = read_json('data/ui/sellers_database.json')
 
-    concert_tickets = load_concert_tickets()
-    cinema_tickets = load_cinema_tickets()
-    conference_tickets = load_conference_tickets()
-    appointment_tickets = load_appointment_tickets()
-    restaurant_tickets = load_restaurant_tickets()
-
     run_app()
@@ -3,6 +3,7 @@ from src.models.asset_configurations import ASAConfiguration, ASAInitialOffering
 from src.models.ticket_models import ConferenceTicket, Ticket
 import random
 from src.services.asa_service import ASAService
+from src.services.mint_journal import journal_path
 from src.blockchain_utils.credentials import get_client
 import requests
 
@@ -92,10 +93,18 @@ asa_service = ASAService(creator_addr=config['conference_company_address'],
                          tokility_dex_app_id=config['app_id'],
                          client=client)
 
+asa_configurations = []
 for i, ipfs_data_url in enumerate(ipfs_deployed_configurations):
     r = requests.get(ipfs_data_url)
     concert_ticket = ConferenceTicket(**r.json())
     concert_ticket.asa_configuration.configuration_ipfs_url = ipfs_data_url
+    asa_configurations.append(concert_ticket.asa_configuration)
+
+# Rerunning the script skips the tokens which are already recorded as minted in the journal.
+minted_asas = asa_service.create_asas(asa_configurations=asa_configurations,
+                                      journal_path=journal_path(name='conference',
+                                                                client=client,
+                                                                app_id=config['app_id']))
+for asa_id, tx_id in minted_asas:
     print('-' * 50)
-    asa_id, tx_id = asa_service.create_asa(asa_configuration=concert_ticket.asa_configuration)
     print(f'Utility token deployed with asa_id: {asa_id}')
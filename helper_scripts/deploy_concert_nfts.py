@@ -5,6 +5,7 @@ from src.models.ticket_models import *
 from src.blockchain_utils.credentials import get_account_with_name
 import random
 from src.services.asa_service import ASAService
+from src.services.mint_journal import journal_path
 from src.blockchain_utils.credentials import get_client, get_account_credentials, get_indexer
 import requests
 
@@ -112,11 +113,16 @@ asa_service = ASAService(creator_addr=CONCERT_COMPANY_ADDR,
                          tokility_dex_app_id=APP_ID,
                          client=client)
 
+asa_configurations = []
 for i, ipfs_data_url in enumerate(ipfs_deployed_configurations):
     r = requests.get(ipfs_data_url)
     concert_ticket = ConcertTicket(**r.json())
     concert_ticket.asa_configuration.configuration_ipfs_url = ipfs_data_url
-    asa_id, tx_id = asa_service.create_asa(asa_configuration=concert_ticket.asa_configuration)
+    asa_configurations.append(concert_ticket.asa_configuration)
+
+minted_asas = asa_service.create_asas(asa_configurations=asa_configurations,
+                                      journal_path=journal_path(name='concerts', client=client, app_id=APP_ID))
+for asa_id, tx_id in minted_asas:
     print(asa_id, tx_id)
 
 # indexer = get_indexer()
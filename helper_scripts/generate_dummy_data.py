@@ -5,8 +5,13 @@ import random
 import json
 import uuid
 
-FOO_FIGHTERS_ADDRESS = get_account_with_name(account_name="foo_fighters")[1]
-U2_ADDRESS = get_account_with_name(account_name="U2")[1]
+
+def foo_fighters_address() -> str:
+    return get_account_with_name(account_name="foo_fighters")[1]
+
+
+def u2_address() -> str:
+    return get_account_with_name(account_name="U2")[1]
 
 
 def save_json(file_name, data):
@@ -130,7 +135,7 @@ def generate_concert_json_list():
     tickets_dummy['concert_tickets'] = []
 
     for i in range(10):
-        foo_fighters_config = create_random_asa_configuration(creator_address=FOO_FIGHTERS_ADDRESS,
+        foo_fighters_config = create_random_asa_configuration(creator_address=foo_fighters_address(),
                                                               asset_name="Foo Fighters")
         foo_fighters_config.asa_id = generate_id()
 
@@ -139,7 +144,7 @@ def generate_concert_json_list():
                                                            name="Foo Fighters - Sonic Highways Tour",
                                                            ipfs_image="https://gateway.pinata.cloud/ipfs/QmaXe7kVV2dAYTovruC8aBoReWC6peykvPS9FdYGqu4Qip")
 
-        u2_fighters_config = create_random_asa_configuration(creator_address=U2_ADDRESS,
+        u2_fighters_config = create_random_asa_configuration(creator_address=u2_address(),
                                                              asset_name="U2")
         u2_fighters_config.asa_id = generate_id()
 
@@ -159,7 +164,7 @@ def generate_movie_json_list():
     tickets_dummy['cinema_tickets'] = []
 
     for i in range(10):
-        primal_fear_config = create_random_asa_configuration(creator_address=FOO_FIGHTERS_ADDRESS,
+        primal_fear_config = create_random_asa_configuration(creator_address=foo_fighters_address(),
                                                              asset_name="Primal Fear")
         primal_fear_config.asa_id = generate_id()
 
@@ -168,7 +173,7 @@ def generate_movie_json_list():
                                                                 ipfs_image="https://gateway.pinata.cloud/ipfs/QmY7Ywogdc2q6du8TyFjaCegpTpuZqZSpL9WiBJ5uLgV99",
                                                                 movie_name="Primal Fear")
 
-        gone_girl_config = create_random_asa_configuration(creator_address=U2_ADDRESS,
+        gone_girl_config = create_random_asa_configuration(creator_address=u2_address(),
                                                            asset_name="Gone Girl")
         gone_girl_config.asa_id = generate_id()
 
@@ -188,7 +193,7 @@ def generate_conference_json_list():
     tickets_dummy['conference_tickets'] = []
 
     for i in range(10):
-        algorand_conference_config = create_random_asa_configuration(creator_address=FOO_FIGHTERS_ADDRESS,
+        algorand_conference_config = create_random_asa_configuration(creator_address=foo_fighters_address(),
                                                                      asset_name="Foo Fighters")
         algorand_conference_config.asa_id = generate_id()
 
@@ -207,7 +212,7 @@ def generate_appointment_json_list():
     tickets_dummy['appointment_tickets'] = []
 
     for i in range(10):
-        appointment_config = create_random_asa_configuration(creator_address=FOO_FIGHTERS_ADDRESS,
+        appointment_config = create_random_asa_configuration(creator_address=foo_fighters_address(),
                                                              asset_name="Psychologist Appointment")
         appointment_config.asa_id = generate_id()
 
@@ -226,7 +231,7 @@ def generate_restaurant_json_list():
     tickets_dummy['restaurant_tickets'] = []
 
     for i in range(10):
-        restaurant_config = create_random_asa_configuration(creator_address=FOO_FIGHTERS_ADDRESS,
+        restaurant_config = create_random_asa_configuration(creator_address=foo_fighters_address(),
                                                             asset_name="Jamie Oliver")
         restaurant_config.asa_id = generate_id()
 
@@ -1,13 +1,13 @@
-from src.services.sale_offer_service import InitialBuyOfferingsService, SecondHandOfferingsService
+from src.services.offer_snapshot import OfferSnapshot, get_offer_snapshot_refresher, DEFAULT_REFRESH_SECONDS
 from src.models.asset_sale_offer import SaleOffer
 from src.models.ticket_models import Ticket, ConferenceTicket
-import time
-from typing import List
+from src.ui.card_renderer import CardRenderer
+from src.ui.cards import TicketCard
+from typing import Sequence
 import streamlit as st
-from src.services.asa_service import ASAService
-from src.services.tokility_dex_service import TokilityDEXService
 from PIL import Image
 import json
+import math
 from src.blockchain_utils.credentials import get_client
 
 
@@ -17,162 +17,68 @@ def load_json(file_name):
         return data
 
 
-COLORS = [
-    ("#9E392B", "#B98888"),
-]
+# Only the first page of a new process waits for the offers, at most this long.
+OFFER_SNAPSHOT_TIMEOUT_SECONDS = 30
 
 
 def algos(micro_algos) -> float:
     return float(micro_algos / 1000000)
 
 
-def show_sale_offer(sale_offer: SaleOffer, color: (str, str)):
-    ticket = sale_offer.ticket
-    html_format = f"""
-        <div class="card">
-            <header>
-                <time datetime="2018-05-15T19:00">{ticket.datetime}</time>
-                <div class="id">{algos(sale_offer.amount)} algos</div>
-        <div class="sponsor">ID: {ticket.asa_configuration.asa_id}</div>
-            </header>
-        <div class="announcement">
-            <h1>{ticket.ticket_name}</h1>
-            <h3>{ticket.ticket_info}</h3>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row1()}</h4>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row2()}</h4>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row3()}</h4>
-        </div>    
-        </div>
+def micro_algos(algos_amount: float) -> int:
+    return int(round(algos_amount * 1000000))
+
+
+def sale_offer_card(sale_offer: SaleOffer) -> TicketCard:
+    # TODO: This should be improved, currently is hard cast
+    return TicketCard.from_ticket(ConferenceTicket(**sale_offer.ticket.dict()),
+                                  badge=f'{algos(sale_offer.amount)} algos')
+
+
+@st.cache(allow_output_mutation=True)
+def write_services():
+    """
+    The services that sign and submit transactions, built on the first purchase instead of on every start of the
+    marketplace. The clawback logic signature is loaded from the compilation cache at the same time.
+    :return: the TokilityDEXService, the ASAService, the clawback address and the clawback program bytes.
     """
-    st.write(
-        html_format
-        ,
-        unsafe_allow_html=True
-    )
-
-    st.write(
-        f"""
-            <style>
-            @import url('https://fonts.googleapis.com/css?family=Asap+Condensed:600i,700');
-
-                h1 {{
-                  font-size: 25px;
-                  color: #fff;
-                  text-transform: uppercase;
-                }}
-                h3 {{
-                  font-size: 20px;
-                  color: #fff;
-                  text-transform: uppercase;
-                }}
-
-                h4 {{
-                  font-size: 18px;
-                  color: #fff;
-                }}
-
-                .card {{
-                  display: flex;
-                  font-family: 'Asap Condensed', sans-serif;
-                  position: relative;
-                  margin: auto;
-                  height: 350px;
-                  width: 600px;
-                  text-align: center;
-                  background: linear-gradient({color[0]}, {color[1]});
-                  border-radius: 2px;
-                  box-shadow: 0 6px 12px -3px rgba(0,0,0,.3);
-                  color: #fff;
-                  padding: 30px;
-
-                }}
-
-                .card header {{
-                  position: absolute;
-                  top: 31px;
-                  left: 0;
-                  width: 100%;
-                  padding: 0 10%;
-                  transform: translateY(-50%);
-                  display: grid;
-                  grid-template-columns: 1fr 1fr 1fr;
-                  align-items: center;
-                }}
-
-                .card header > *:first-child {{
-                  text-align: left;
-                }}
-                .card header > *:last-child {{
-                  text-align: right;
-                }}
-
-                .id {{
-                  font-size: 24px;
-                  position: relative;
-                }}
-
-                .announcement {{
-                  position: relative;
-                  border: 3px solid currentColor;
-                  border-top: 0;
-                  width: 100%;
-                  height: 100%;
-                  display: flex;
-                  flex-direction: column;
-                  justify-content: center;
-                  align-items: center;
-                }}
-
-                .announcement:before,
-                .announcement:after {{
-                  content: '';
-                  position: absolute;
-                  top: 0px;
-                  border-top: 3px solid currentColor;
-                  height: 0;
-                  width: 15px;
-                }}
-                .announcement:before {{
-                  left: -3px;
-                }}
-                .announcement:after {{
-                  right: -3px;
-                }}
-
-                * {{
-                  box-sizing: border-box;
-                  margin: 0;
-                  padding: 0;
-                }}
-
-                html, body {{
-                  height: 100%;
-                }}
-
-                h1, h2, h3, h4 {{
-                  margin: .15em 0;
-                }}
-            """,
-        unsafe_allow_html=True,
-        key=f"{ticket.asa_configuration.asa_id}"
-    )
+    from src.services.asa_service import ASAService
+    from src.services.tokility_dex_service import TokilityDEXService
+
+    client = get_client()
+
+    tokility_dex_service = TokilityDEXService(app_creator_addr=PLATFORM_ADDRESS,
+                                              app_creator_pk=PLATFORM_PK,
+                                              client=client,
+                                              app_id=APP_ID)
+
+    asa_service = ASAService(creator_addr=CONFERENCE_COMPANY_ADDR,
+                             creator_pk=CONFERENCE_COMPANY_PK,
+                             tokility_dex_app_id=tokility_dex_service.app_id,
+                             client=client)
+
+    return tokility_dex_service, asa_service, asa_service.clawback_address, asa_service.clawback_address_bytes
 
 
 def buy_ticket_first_sale(buyer_private_key, buyer_address, asa_configuration):
+    tokility_dex_service, concert_company_asa_service, clawback_address, clawback_address_bytes = write_services()
+
     concert_company_asa_service.asa_opt_in(asa_id=asa_configuration.asa_id,
                                            user_pk=buyer_private_key)
 
     tx_id = tokility_dex_service.initial_buy(buyer_addr=buyer_address,
                                              buyer_pk=buyer_private_key,
                                              asa_configuration=asa_configuration,
-                                             asa_clawback_addr=CLAWBACK_ADDRESS,
-                                             asa_clawback_bytes=CLAWBACK_ADDRESS_BYTES)
+                                             asa_clawback_addr=clawback_address,
+                                             asa_clawback_bytes=clawback_address_bytes)
     print(f'initial buy completed in: {tx_id}')
 
 
 def buy_ticket_second_hand(buyer_private_key: str,
                            buyer_address: str,
                            sale_offer: SaleOffer):
+    tokility_dex_service, concert_company_asa_service, clawback_address, clawback_address_bytes = write_services()
+
     concert_company_asa_service.asa_opt_in(asa_id=sale_offer.ticket.asa_configuration.asa_id,
                                            user_pk=buyer_private_key)
 
@@ -181,23 +87,27 @@ def buy_ticket_second_hand(buyer_private_key: str,
                                                  seller_addr=sale_offer.seller_address,
                                                  price=sale_offer.second_hand_amount,
                                                  asa_configuration=sale_offer.ticket.asa_configuration,
-                                                 asa_clawback_addr=CLAWBACK_ADDRESS,
-                                                 asa_clawback_bytes=CLAWBACK_ADDRESS_BYTES)
+                                                 asa_clawback_addr=clawback_address,
+                                                 asa_clawback_bytes=clawback_address_bytes)
 
     print(f'Second hand buy completed in: {tx_id}')
 
 
-def load_offers():
-    time.sleep(2)
-    initial_offers = InitialBuyOfferingsService.available_sell_offers(creator_address=CONFERENCE_COMPANY_ADDR)
-    time.sleep(3)
-    second_hand_offers = SecondHandOfferingsService.available_offers(app_id=APP_ID)
+def offer_snapshot_refresher():
+    return get_offer_snapshot_refresher(app_id=APP_ID,
+                                        creator_address=CONFERENCE_COMPANY_ADDR,
+                                        interval_seconds=OFFER_REFRESH_SECONDS)
 
-    curr_offers: List[SaleOffer] = []
-    curr_offers.extend(initial_offers)
-    curr_offers.extend(second_hand_offers)
 
-    st.session_state.sale_offers = curr_offers
+def show_offers_staleness(snapshot: OfferSnapshot):
+    if snapshot.refreshed_at is None:
+        st.sidebar.write("Offers are loading")
+    else:
+        st.sidebar.write(f"Offers refreshed {snapshot.age_seconds:.0f}s ago at round {snapshot.last_round}, "
+                         f"every {OFFER_REFRESH_SECONDS:.0f}s")
+
+    if snapshot.error is not None:
+        st.sidebar.warning(f"The last refresh failed: {snapshot.error}")
 
 
 def buy_sell_offer(sale_offer: SaleOffer):
@@ -210,25 +120,28 @@ def buy_sell_offer(sale_offer: SaleOffer):
                                buyer_address=CREDENTIALS[1],
                                sale_offer=sale_offer)
 
-    load_offers()
+    # The buyer waits for the refresh, so the bought ticket is gone from the next page. The other sessions get the
+    # same snapshot.
+    offer_snapshot_refresher().refresh()
 
 
-def list_sale_offers(available_sale_offers: List[SaleOffer]):
-    for sale_offer in available_sale_offers:
-        ID = sale_offer.ticket.asa_configuration.asa_id
-        # TODO: This should be improved, currently is hard cast
-        sale_offer.ticket = ConferenceTicket(**sale_offer.ticket.dict())
+def show_buy_button(sale_offer: SaleOffer):
+    col1, col2, col3, col4, col5 = st.columns(5)
+    st.write("_______")
+    st.write("")
+    _ = col3.button("⬆ ️Buy token",
+                    key=f"buy_button_{sale_offer.asa_id}_{sale_offer.seller_address}",
+                    on_click=buy_sell_offer,
+                    args=(sale_offer,))
 
-        show_sale_offer(sale_offer=sale_offer, color=COLORS[0])
 
-        # Buy token.
-        col1, col2, col3, col4, col5 = st.columns(5)
-        st.write("_______")
-        st.write("")
-        _ = col3.button("⬆ ️Buy token",
-                        key=f"buy_button_{ID}",
-                        on_click=buy_sell_offer,
-                        args=(sale_offer,))
+def list_sale_offers(available_sale_offers: Sequence[SaleOffer]):
+    # The offers of the snapshot are shared by all of the sessions, so they are only read while rendering. The query
+    # result looks up only the offers of the rendered page.
+    renderer = CardRenderer(name="sale_offers",
+                            card_key=lambda offer: (offer.sale_type, offer.seller_address, offer.asa_id, offer.amount),
+                            build_card=sale_offer_card)
+    renderer.render(available_sale_offers, actions=show_buy_button)
 
 
 config = load_json('config.json')
@@ -248,20 +161,7 @@ BUYERS = [(BUYER_1_PK, BUYER_1_ADDRESS), (BUYER_2_PK, BUYER_2_ADDRESS)]
 CONFERENCE_COMPANY_PK = config['conference_company_pk']
 CONFERENCE_COMPANY_ADDR = config['conference_company_address']
 
-client = get_client()
-
-tokility_dex_service = TokilityDEXService(app_creator_addr=PLATFORM_ADDRESS,
-                                          app_creator_pk=PLATFORM_PK,
-                                          client=client,
-                                          app_id=APP_ID)
-
-concert_company_asa_service = ASAService(creator_addr=CONFERENCE_COMPANY_ADDR,
-                                         creator_pk=CONFERENCE_COMPANY_PK,
-                                         tokility_dex_app_id=tokility_dex_service.app_id,
-                                         client=client)
-
-CLAWBACK_ADDRESS = concert_company_asa_service.clawback_address
-CLAWBACK_ADDRESS_BYTES = concert_company_asa_service.clawback_address_bytes
+OFFER_REFRESH_SECONDS = config.get('offer_refresh_seconds', DEFAULT_REFRESH_SECONDS)
 
 image = Image.open("data/ui/tokility-logo.png")
 st.sidebar.header(f"Marketplace UI")
@@ -273,15 +173,13 @@ BUYER_ADDRESS = st.sidebar.selectbox(
     tuple([credentials[1] for credentials in BUYERS])
 )
 
-if 'sale_offers' not in st.session_state:
-    load_offers()
+offer_snapshot = offer_snapshot_refresher().snapshot(timeout_seconds=OFFER_SNAPSHOT_TIMEOUT_SECONDS)
+show_offers_staleness(offer_snapshot)
 
-sale_offers = st.session_state.sale_offers
+catalog = offer_snapshot.catalog
 
 CREDENTIALS = [cred for cred in BUYERS if cred[1] == BUYER_ADDRESS][0]
 
-sale_offers = [offer for offer in sale_offers if offer.seller_address != BUYER_ADDRESS]
-
 # Ticket type
 ticket_type = st.sidebar.selectbox(
     "Ticket type",
@@ -289,21 +187,20 @@ ticket_type = st.sidebar.selectbox(
      Ticket.BusinessType.restaurant, Ticket.BusinessType.appointment)
 )
 
-if ticket_type != 'all':
-    sale_offers = [offer for offer in sale_offers if offer.ticket.business_type == ticket_type]
-
-# Price range.
-# TODO: Implement proper max price. Take the max
-price_slider = st.sidebar.slider('Select price range', 0.0, 30.0, (0.0, 15.0))
+business_type = None if ticket_type == 'all' else ticket_type
 
-sale_offers = [offer for offer in sale_offers if algos(offer.amount) >= price_slider[0]]
-sale_offers = [offer for offer in sale_offers if algos(offer.amount) <= price_slider[1]]
+# Price range, up to the most expensive offer that the buyer can see.
+amount_bounds = catalog.amount_bounds(business_type=business_type, exclude_seller=BUYER_ADDRESS)
+max_price = 1.0 if amount_bounds is None else max(1.0, float(math.ceil(algos(amount_bounds[1]))))
+price_slider = st.sidebar.slider('Select price range', 0.0, max_price, (0.0, max_price))
 
 # Re-selling allowed
 reselling_allowed_checkbox = st.sidebar.checkbox('Reselling allowed', value=False)
 
-if reselling_allowed_checkbox:
-    sale_offers = [offer for offer in sale_offers
-                   if offer.ticket.asa_configuration.economy_configuration.reselling_allowed == 1]
+sale_offers = catalog.query(min_amount=micro_algos(price_slider[0]),
+                            max_amount=micro_algos(price_slider[1]),
+                            business_type=business_type,
+                            reselling_allowed=True if reselling_allowed_checkbox else None,
+                            exclude_seller=BUYER_ADDRESS)
 
 list_sale_offers(available_sale_offers=sale_offers)
@@ -1,20 +1,16 @@
 from src.services.sale_offer_service import SecondHandOfferingsService
+from src.services.asset_metadata_fetcher import get_asset_metadata_fetcher
 from src.models.asset_sale_offer import SaleOffer
 from src.models.ticket_models import Ticket, ConferenceTicket
+from src.ui.card_renderer import CardRenderer
+from src.ui.cards import TicketCard
 import time
-from typing import List
+from typing import List, Optional
 import streamlit as st
-from src.services.asa_service import ASAService
-from src.services.tokility_dex_service import TokilityDEXService
 from src.blockchain_utils.credentials import get_client, get_indexer
-import requests
 from PIL import Image
 import json
 
-COLORS = [
-    ("#9E392B", "#B98888"),
-]
-
 
 def load_json(file_name):
     with open(file_name) as f:
@@ -26,135 +22,8 @@ def algos(micro_algos) -> float:
     return float(micro_algos / 1000000)
 
 
-def show_ticket_info(ticket: Ticket, color: (str, str)):
-    html_format = f"""
-        <div class="card">
-            <header>
-                <time datetime="2018-05-15T19:00">{ticket.datetime}</time>
-                <div class="id"></div>
-        <div class="sponsor">ID: {ticket.asa_configuration.asa_id}</div>
-            </header>
-        <div class="announcement">
-            <h1>{ticket.ticket_name}</h1>
-            <h3>{ticket.ticket_info}</h3>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row1()}</h4>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row2()}</h4>
-            <h4>{ticket.asa_configuration.economy_configuration.show_info_row3()}</h4>
-        </div>    
-        </div>
-    """
-    st.write(
-        html_format,
-        unsafe_allow_html=True,
-        key=ticket.asa_configuration.asa_id
-    )
-
-    st.write(
-        f"""
-        <style>
-        @import url('https://fonts.googleapis.com/css?family=Asap+Condensed:600i,700');
-
-            h1 {{
-              font-size: 25px;
-              color: #fff;
-              text-transform: uppercase;
-            }}
-            h3 {{
-              font-size: 20px;
-              color: #fff;
-              text-transform: uppercase;
-            }}
-
-            h4 {{
-              font-size: 18px;
-              color: #fff;
-            }}
-            
-            .card {{
-              display: flex;
-              font-family: 'Asap Condensed', sans-serif;
-              position: relative;
-              margin: auto;
-              height: 350px;
-              width: 600px;
-              text-align: center;
-              background: linear-gradient({color[0]}, {color[1]});
-              border-radius: 2px;
-              box-shadow: 0 6px 12px -3px rgba(0,0,0,.3);
-              color: #fff;
-              padding: 30px;
-
-            }}
-
-            .card header {{
-              position: absolute;
-              top: 31px;
-              left: 0;
-              width: 100%;
-              padding: 0 10%;
-              transform: translateY(-50%);
-              display: grid;
-              grid-template-columns: 1fr 1fr 1fr;
-              align-items: center;
-            }}
-
-            .card header > *:first-child {{
-              text-align: left;
-            }}
-            .card header > *:last-child {{
-              text-align: right;
-            }}
-
-            .id {{
-              font-size: 24px;
-              position: relative;
-            }}
-
-            .announcement {{
-              position: relative;
-              border: 3px solid currentColor;
-              border-top: 0;
-              width: 100%;
-              height: 100%;
-              display: flex;
-              flex-direction: column;
-              justify-content: center;
-              align-items: center;
-            }}
-
-            .announcement:before,
-            .announcement:after {{
-              content: '';
-              position: absolute;
-              top: 0px;
-              border-top: 3px solid currentColor;
-              height: 0;
-              width: 15px;
-            }}
-            .announcement:before {{
-              left: -3px;
-            }}
-            .announcement:after {{
-              right: -3px;
-            }}
-
-            * {{
-              box-sizing: border-box;
-              margin: 0;
-              padding: 0;
-            }}
-
-            html, body {{
-              height: 100%;
-            }}
-
-            h1, h2, h3, h4 {{
-              margin: .15em 0;
-            }}
-        """,
-        unsafe_allow_html=True,
-        key=f"{ticket.asa_configuration.asa_id}"
-    )
+def ticket_card(ticket: Ticket) -> TicketCard:
+    return TicketCard.from_ticket(ConferenceTicket(**ticket.dict()))
 
 
 # TODO: This needs to be extracted in the service.
@@ -162,7 +31,6 @@ def ticket_holdings(account_address: str, creator_address: str) -> List[Ticket]:
     indexer = get_indexer()
 
     account_info = indexer.account_info(address=account_address)
-    time.sleep(2)
     concert_assets_response = indexer.account_info(address=creator_address)
     concert_assets = set([asset['index'] for asset in concert_assets_response['account']['created-assets']])
 
@@ -172,80 +40,97 @@ def ticket_holdings(account_address: str, creator_address: str) -> List[Ticket]:
     else:
         owning_concert_assets = set()
 
-    tickets: List[Ticket] = []
-    for asset in concert_assets_response['account']['created-assets']:
-        if asset['index'] not in owning_concert_assets:
-            continue
-
-        r = requests.get(asset['params']['url'])
-        ticket = Ticket(**r.json())
-        ticket.asa_configuration.asa_id = asset['index']
-        tickets.append(ticket)
+    tickets = get_asset_metadata_fetcher(indexer).tickets_from_params(
+        {asset['index']: asset['params'] for asset in concert_assets_response['account']['created-assets']
+         if asset['index'] in owning_concert_assets})
 
-    return tickets
+    return list(tickets.values())
 
 
 def update_state():
     st.session_state[f"ticket_holdings_{SELLER_ADDRESS}"] = ticket_holdings(account_address=SELLER_ADDRESS,
                                                                             creator_address=CONFERENCE_COMPANY_ADDR)
-    time.sleep(2)
     st.session_state[f"sell_offers_{SELLER_ADDRESS}"] = \
         SecondHandOfferingsService.available_offers(app_id=APP_ID,
                                                     sellers_of_interest={SELLER_ADDRESS})
 
 
+@st.cache(allow_output_mutation=True)
+def dex_service():
+    """
+    The TokilityDEXService signs and submits the sell offers, it is built on the first offer instead of on every
+    start of the UI.
+    """
+    from src.services.tokility_dex_service import TokilityDEXService
+
+    return TokilityDEXService(app_creator_addr=PLATFORM_ADDRESS,
+                              app_creator_pk=PLATFORM_PK,
+                              client=get_client(),
+                              app_id=APP_ID)
+
+
 def stop_selling(asa_configuration):
-    tokility_dex_service.stop_selling(seller_pk=CURR_CREDENTIALS[0],
-                                      asa_configuration=asa_configuration)
+    dex_service().stop_selling(seller_pk=CURR_CREDENTIALS[0],
+                               asa_configuration=asa_configuration)
     time.sleep(1)
     update_state()
 
 
 def sell_token(asa_configuration, price):
-    tokility_dex_service.make_sell_offer(seller_pk=CURR_CREDENTIALS[0],
-                                         sell_price=int(price * 1000000),
-                                         asa_configuration=asa_configuration)
+    from src.services.tokility_dex_service import SellOfferLimitError
+
+    try:
+        dex_service().make_sell_offer(seller_pk=CURR_CREDENTIALS[0],
+                                      sell_price=int(price * 1000000),
+                                      asa_configuration=asa_configuration)
+    except SellOfferLimitError as error:
+        st.error(f"Error! The ticket cannot be put on sale. {error}")
+        return
+
     time.sleep(1)
     update_state()
 
 
-def list_tickets():
-    tickets: List[Ticket] = st.session_state[f"ticket_holdings_{SELLER_ADDRESS}"]
-    sale_offers: List[SaleOffer] = st.session_state[f"sell_offers_{SELLER_ADDRESS}"]
+def show_ticket_actions(ticket: Ticket, curr_sell_offer: Optional[SaleOffer]):
+    ID = ticket.asa_configuration.asa_id
 
-    for curr_ticket in tickets:
-        ID = curr_ticket.asa_configuration.asa_id
-        concert_ticket = ConferenceTicket(**curr_ticket.dict())
-        show_ticket_info(ticket=concert_ticket, color=COLORS[0])
+    # Show the current selling offer.
+    cols = st.columns(2)
+    if curr_sell_offer is not None:
+        cols[0].write(f'Ticket already on sale for {algos(curr_sell_offer.second_hand_amount)} algos')
+        _ = cols[1].button("Stop selling",
+                           key=f"{SELLER_ADDRESS}_stop_sell_button_{ID}",
+                           on_click=stop_selling,
+                           args=(ticket.asa_configuration,))
+    else:
+        cols[0].write("")
+        cols[1].write("")
 
-        # Show the current selling offer.
-        curr_sell_offer = None
-        for offer in sale_offers:
-            if offer.asa_id == curr_ticket.asa_configuration.asa_id:
-                curr_sell_offer = offer
+    sell_price = st.number_input('Insert sell price in Algos', key=f"{SELLER_ADDRESS}_number_input_{ID}")
 
-        cols = st.columns(2)
-        if curr_sell_offer is not None:
-            cols[0].write(f'Ticket already on sale for {algos(curr_sell_offer.second_hand_amount)} algos')
-            _ = cols[1].button("Stop selling",
-                               key=f"{SELLER_ADDRESS}_stop_sell_button_{ID}",
-                               on_click=stop_selling,
-                               args=(concert_ticket.asa_configuration,))
-        else:
-            cols[0].write("")
-            cols[1].write("")
+    sell_cols = st.columns(5)
+    st.write("")
 
-        sell_price = st.number_input('Insert sell price in Algos', key=f"{SELLER_ADDRESS}_number_input_{ID}")
+    _ = sell_cols[2].button("Sell token",
+                            key=f"{SELLER_ADDRESS}_sell_button_{ID}",
+                            on_click=sell_token,
+                            args=(ticket.asa_configuration, sell_price))
 
-        sell_cols = st.columns(5)
-        st.write("")
+    st.write("_______")
 
-        _ = sell_cols[2].button("Sell token",
-                                key=f"{SELLER_ADDRESS}_sell_button_{ID}",
-                                on_click=sell_token,
-                                args=(concert_ticket.asa_configuration, sell_price))
 
-        st.write("_______")
+def list_tickets():
+    tickets: List[Ticket] = st.session_state[f"ticket_holdings_{SELLER_ADDRESS}"]
+    sale_offers: List[SaleOffer] = st.session_state[f"sell_offers_{SELLER_ADDRESS}"]
+    sale_offers_by_asa_id = {offer.asa_id: offer for offer in sale_offers}
+
+    renderer = CardRenderer(name=f"{SELLER_ADDRESS}_tickets",
+                            card_key=lambda ticket: ticket.asa_configuration.asa_id,
+                            build_card=ticket_card)
+    renderer.render(tickets,
+                    actions=lambda ticket: show_ticket_actions(
+                        ticket=ticket,
+                        curr_sell_offer=sale_offers_by_asa_id.get(ticket.asa_configuration.asa_id)))
 
 
 config = load_json('config.json')
@@ -265,18 +150,6 @@ BUYERS = [(BUYER_1_PK, BUYER_1_ADDRESS), (BUYER_2_PK, BUYER_2_ADDRESS)]
 CONFERENCE_COMPANY_PK = config['conference_company_pk']
 CONFERENCE_COMPANY_ADDR = config['conference_company_address']
 
-client = get_client()
-
-tokility_dex_service = TokilityDEXService(app_creator_addr=PLATFORM_ADDRESS,
-                                          app_creator_pk=PLATFORM_PK,
-                                          client=client,
-                                          app_id=APP_ID)
-
-concert_company_asa_service = ASAService(creator_addr=CONFERENCE_COMPANY_ADDR,
-                                         creator_pk=CONFERENCE_COMPANY_PK,
-                                         tokility_dex_app_id=tokility_dex_service.app_id,
-                                         client=client)
-
 image = Image.open("data/ui/tokility-logo.png")
 st.sidebar.header(f"Sell UI")
 st.sidebar.image(image, width=300)
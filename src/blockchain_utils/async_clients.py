@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import copy
+import json
+from typing import Optional
+from urllib import parse
+
+import aiohttp
+from algosdk import constants, encoding
+from algosdk.error import AlgodHTTPError, IndexerHTTPError
+from algosdk.future.transaction import SuggestedParams, Transaction
+
+from src.blockchain_utils.fee_estimator import FeeEstimator
+from src.blockchain_utils.suggested_params_provider import SuggestedParamsProvider
+
+
+class _AsyncRESTClient:
+    """
+    Shared aiohttp session handling for the algod and indexer REST APIs. All requests of a client go through
+    a single connection pool, so concurrent calls reuse the same keep-alive connections.
+    """
+
+    def __init__(self,
+                 token: str,
+                 address: str,
+                 auth_header: str,
+                 headers: Optional[dict] = None,
+                 connection_limit: int = 100):
+        self.token = token
+        self.address = address.rstrip('/')
+        self.auth_header = auth_header
+        self.headers = headers
+        self.connection_limit = connection_limit
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    def _build_headers(self, headers: Optional[dict]) -> dict:
+        header = {self.auth_header: self.token}
+
+        if self.headers:
+            header.update(self.headers)
+
+        if headers:
+            header.update(headers)
+
+        return header
+
+    async def _request(self, method: str, requrl: str, params=None, data=None, headers=None,
+                       response_format="json"):
+        url = self.address + "/v2" + requrl
+        if params:
+            url = url + "?" + parse.urlencode(params)
+
+        async with self.session.request(method, url, data=data, headers=self._build_headers(headers)) as resp:
+            body = await resp.read()
+
+            if resp.status >= 400:
+                raise self._http_error(body.decode("utf-8"), resp.status)
+
+            if response_format == "json":
+                return json.loads(body)
+
+            return body
+
+    def _http_error(self, body: str, code: int) -> Exception:
+        try:
+            message = json.loads(body)["message"]
+        except Exception:
+            message = body
+
+        return AlgodHTTPError(message, code)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class AsyncAlgodClient(_AsyncRESTClient):
+    """
+    asyncio counterpart of algod.AlgodClient, implementing the endpoints used by the Tokility services.
+    """
+
+    def __init__(self, algod_token: str, algod_address: str, headers: Optional[dict] = None,
+                 connection_limit: int = 100):
+        super().__init__(token=algod_token,
+                         address=algod_address,
+                         auth_header=constants.algod_auth_header,
+                         headers=headers,
+                         connection_limit=connection_limit)
+
+    async def status(self):
+        return await self._request("GET", "/status")
+
+    async def status_after_block(self, round_num: int):
+        return await self._request("GET", f"/status/wait-for-block-after/{round_num}")
+
+    async def pending_transaction_info(self, transaction_id: str):
+        return await self._request("GET", f"/transactions/pending/{transaction_id}", params={"format": "json"})
+
+    async def account_info(self, address: str):
+        return await self._request("GET", f"/accounts/{address}")
+
+    async def asset_info(self, asset_id: int):
+        return await self._request("GET", f"/assets/{asset_id}")
+
+    async def suggested_params(self) -> SuggestedParams:
+        res = await self._request("GET", "/transactions/params")
+
+        return SuggestedParams(res["fee"],
+                               res["last-round"],
+                               res["last-round"] + 1000,
+                               res["genesis-hash"],
+                               res["genesis-id"],
+                               False,
+                               res["consensus-version"],
+                               res["min-fee"])
+
+    async def send_raw_transaction(self, raw_transaction: bytes) -> str:
+        response = await self._request("POST", "/transactions",
+                                       data=raw_transaction,
+                                       headers={'Content-Type': 'application/x-binary'})
+        return response["txId"]
+
+    async def send_transaction(self, txn) -> str:
+        assert not isinstance(txn, Transaction), f"Attempt to send UNSIGNED transaction {txn}"
+        return await self.send_raw_transaction(base64.b64decode(encoding.msgpack_encode(txn)))
+
+    async def send_transactions(self, txns: list) -> str:
+        serialized = []
+        for txn in txns:
+            assert not isinstance(txn, Transaction), f"Attempt to send UNSIGNED transaction {txn}"
+            serialized.append(base64.b64decode(encoding.msgpack_encode(txn)))
+
+        return await self.send_raw_transaction(b''.join(serialized))
+
+    async def compile(self, source: str):
+        return await self._request("POST", "/teal/compile",
+                                   data=source.encode('utf-8'),
+                                   headers={'Content-Type': 'application/x-binary'})
+
+
+class AsyncIndexerClient(_AsyncRESTClient):
+    """
+    asyncio counterpart of indexer.IndexerClient, implementing the endpoints used by the Tokility services.
+    """
+
+    def __init__(self, indexer_token: str, indexer_address: str, headers: Optional[dict] = None,
+                 connection_limit: int = 100):
+        super().__init__(token=indexer_token,
+                         address=indexer_address,
+                         auth_header=constants.indexer_auth_header,
+                         headers=headers,
+                         connection_limit=connection_limit)
+
+    def _http_error(self, body: str, code: int) -> Exception:
+        try:
+            message = json.loads(body)["message"]
+        except Exception:
+            message = body
+
+        return IndexerHTTPError(message)
+
+    async def accounts(self, application_id: Optional[int] = None, limit: Optional[int] = None,
+                       next_page: Optional[str] = None):
+        params = dict()
+        if application_id is not None:
+            params["application-id"] = application_id
+        if limit is not None:
+            params["limit"] = limit
+        if next_page is not None:
+            params["next"] = next_page
+
+        return await self._request("GET", "/accounts", params=params)
+
+    async def account_info(self, address: str):
+        return await self._request("GET", f"/accounts/{address}")
+
+    async def asset_info(self, asset_id: int):
+        return await self._request("GET", f"/assets/{asset_id}")
+
+
+class AsyncSuggestedParamsProvider(SuggestedParamsProvider):
+    """
+    SuggestedParamsProvider for AsyncAlgodClient. Concurrent callers that find the cache stale wait for a
+    single refresh instead of each fetching the params.
+    """
+
+    def __init__(self, client: AsyncAlgodClient, **kwargs):
+        super().__init__(client=client, **kwargs)
+        self._async_lock = asyncio.Lock()
+
+    async def get(self) -> SuggestedParams:
+        async with self._async_lock:
+            if self._is_stale():
+                self._store(await self.client.suggested_params())
+            else:
+                self.hits += 1
+
+            suggested_params = copy.copy(self._suggested_params)
+
+        return self._with_flat_fee(suggested_params)
+
+    async def fee_estimator(self) -> FeeEstimator:
+        async with self._async_lock:
+            if self._is_stale():
+                self._store(await self.client.suggested_params())
+
+            return FeeEstimator.from_suggested_params(self._suggested_params)
+
@@ -1,10 +1,13 @@
-from algosdk.v2client import algod
 from algosdk import account as algo_acc
 import yaml
 import os
+import threading
 from pathlib import Path
+from typing import Dict, Optional
 from algosdk import mnemonic
-from algosdk.v2client import indexer
+from src.blockchain_utils.throttled_clients import ThrottledAlgodClient, ThrottledIndexerClient, get_request_budget
+
+DEFAULT_INDEXER_ADDRESS = "https://testnet-algorand.api.purestake.io/idx2"
 
 
 def get_project_root_path() -> Path:
@@ -12,12 +15,121 @@ def get_project_root_path() -> Path:
     return path.parent.parent
 
 
-def load_config():
-    root_path = get_project_root_path()
-    config_location = os.path.join(root_path, 'config.yml')
+class ClientRegistry:
+    """
+    Process-wide registry of the parsed config.yml and of the algod and indexer clients built from it. The config is
+    parsed once and parsed again only after the file changes on disk. Every caller of get_client and get_indexer
+    shares the same client, and with it the keep-alive connections of its session, as long as the credentials in the
+    config stay the same.
+    """
+
+    def __init__(self, config_location: Optional[str] = None):
+        self.config_location = config_location or os.path.join(get_project_root_path(), 'config.yml')
+
+        self.config_loads = 0
+
+        self._config = None
+        self._config_version = None
+        self._clients: Dict[tuple, object] = dict()
+        self._lock = threading.RLock()
+
+    def _file_version(self) -> tuple:
+        stat = os.stat(self.config_location)
+        return stat.st_mtime_ns, stat.st_size
+
+    def config(self) -> dict:
+        """
+        :return: the parsed config. The returned dict is shared between the callers, so it must not be modified.
+        """
+        version = self._file_version()
+
+        with self._lock:
+            if self._config is None or version != self._config_version:
+                with open(self.config_location) as file:
+                    self._config = yaml.full_load(file)
+                self._config_version = version
+                self.config_loads += 1
+
+            return self._config
+
+    def _shared_client(self, key: tuple, build_client):
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = build_client()
+                self._clients[key] = client
+
+            return client
+
+    def algod_client(self) -> ThrottledAlgodClient:
+        config = self.config()
+
+        token = config.get('client_credentials').get('token')
+        address = config.get('client_credentials').get('address')
+        budget_config = _request_budget_config(config, 'algod_requests_per_second')
+
+        def build_client():
+            budget = get_request_budget(api="algod", address=address, **budget_config)
+            return ThrottledAlgodClient(token, address, headers={'X-Api-key': token}, budget=budget)
+
+        return self._shared_client(("algod", address, token, tuple(sorted(budget_config.items()))), build_client)
+
+    def indexer_client(self) -> ThrottledIndexerClient:
+        config = self.config()
+
+        token = config.get('client_credentials').get('token')
+        indexer_address = _indexer_address(config)
+        budget_config = _request_budget_config(config, 'indexer_requests_per_second')
+
+        def build_client():
+            budget = get_request_budget(api="indexer", address=indexer_address, **budget_config)
+            return ThrottledIndexerClient(indexer_token=token,
+                                          indexer_address=indexer_address,
+                                          headers={'X-Api-key': token},
+                                          budget=budget)
+
+        return self._shared_client(("indexer", indexer_address, token, tuple(sorted(budget_config.items()))),
+                                   build_client)
+
+    def clear(self):
+        """
+        Drops the cached config and clients, e.g. after the config was modified within the same second on a file
+        system with a coarse modification time.
+        """
+        with self._lock:
+            for client in self._clients.values():
+                client.session.close()
+            self._clients.clear()
+            self._config = None
+            self._config_version = None
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            clients = list(self._clients.items())
+
+        return {
+            "config_loads": self.config_loads,
+            "clients": {f'{key[0]} {key[1]}': client.pool_stats for key, client in clients}
+        }
+
+
+_client_registry = None
+_client_registry_lock = threading.Lock()
 
-    with open(config_location) as file:
-        return yaml.full_load(file)
+
+def get_client_registry() -> ClientRegistry:
+    global _client_registry
+
+    with _client_registry_lock:
+        if _client_registry is None:
+            _client_registry = ClientRegistry()
+
+        return _client_registry
+
+
+def load_config():
+    return get_client_registry().config()
 
 
 def get_client():
@@ -25,26 +137,68 @@ def get_client():
     :return:
         Returns algod_client
     """
+    return get_client_registry().algod_client()
+
+
+def get_indexer():
+    return get_client_registry().indexer_client()
+
+
+def _indexer_address(config: dict) -> str:
+    """
+    Reads the optional indexer_address of the client_credentials section, e.g. to point the indexer to the local
+    stand-in server of src/emulator/server.py.
+    """
+    return config.get('client_credentials').get('indexer_address') or DEFAULT_INDEXER_ADDRESS
+
+
+def _request_budget_config(config: dict, requests_per_second_key: str) -> dict:
+    """
+    Reads the optional rate limit settings from the client_credentials section of the config.
+    """
+    client_credentials = config.get('client_credentials')
+
+    budget_config = dict()
+    if client_credentials.get(requests_per_second_key) is not None:
+        budget_config["requests_per_second"] = client_credentials.get(requests_per_second_key)
+    for key in ('max_retries', 'connect_timeout_seconds', 'read_timeout_seconds'):
+        if client_credentials.get(key) is not None:
+            budget_config[key] = client_credentials.get(key)
+
+    return budget_config
+
+
+def get_async_client():
+    """
+    :return:
+        Returns an AsyncAlgodClient configured with the same credentials as get_client.
+    """
+    from src.blockchain_utils.async_clients import AsyncAlgodClient
+
     config = load_config()
 
     token = config.get('client_credentials').get('token')
     address = config.get('client_credentials').get('address')
     purestake_token = {'X-Api-key': token}
 
-    algod_client = algod.AlgodClient(token, address, headers=purestake_token)
-    return algod_client
+    return AsyncAlgodClient(token, address, headers=purestake_token)
 
 
-def get_indexer():
+def get_async_indexer():
+    """
+    :return:
+        Returns an AsyncIndexerClient configured with the same credentials as get_indexer.
+    """
+    from src.blockchain_utils.async_clients import AsyncIndexerClient
+
     config = load_config()
 
     token = config.get('client_credentials').get('token')
     headers = {'X-Api-key': token}
-    my_indexer = indexer.IndexerClient(indexer_token=token,
-                                       indexer_address="https://testnet-algorand.api.purestake.io/idx2",
-                                       headers=headers)
 
-    return my_indexer
+    return AsyncIndexerClient(indexer_token=token,
+                              indexer_address=_indexer_address(config),
+                              headers=headers)
 
 
 def get_account_credentials(account_id: int) -> (str, str, str):
@@ -0,0 +1,85 @@
+import base64
+from typing import Dict, List, Optional
+
+from algosdk import constants, encoding
+from algosdk.future.transaction import SuggestedParams, Transaction, LogicSig
+
+# msgpack overhead of the fields that are set after the fees are estimated: the signature, the group id and the
+# pooled fee, which can take more bytes than the fee of the unsigned transaction.
+SIGNATURE_SIZE = 70
+GROUP_ID_SIZE = 38
+FEE_SIZE = 9
+LOGIC_SIG_OVERHEAD = 48
+
+
+class FeeEstimator:
+    """
+    Congestion aware transaction fees. algod suggests a fee per byte, which is 0 while the network is not
+    congested, and the min fee. A transaction pays the larger of the min fee and its size times the fee per byte.
+
+    With fee pooling the fees of a group only have to add up to the fees of all of its transactions, so a single
+    transaction can pay for the whole group while the logic signature transactions pay nothing.
+    """
+
+    def __init__(self, fee_per_byte: int = 0, min_fee: int = constants.min_txn_fee):
+        self.fee_per_byte = fee_per_byte
+        self.min_fee = min_fee
+
+    @classmethod
+    def from_suggested_params(cls, suggested_params: SuggestedParams) -> 'FeeEstimator':
+        """
+        :param suggested_params: the params as returned by algod, or flat params in which case their fee is the
+        fee of every transaction.
+        """
+        if suggested_params.flat_fee:
+            return cls(fee_per_byte=0, min_fee=max(suggested_params.fee, suggested_params.min_fee or 0))
+
+        return cls(fee_per_byte=suggested_params.fee,
+                   min_fee=suggested_params.min_fee or constants.min_txn_fee)
+
+    @property
+    def congested(self) -> bool:
+        return self.fee_per_byte > 0
+
+    @staticmethod
+    def estimated_size(transaction: Transaction, logic_sig: Optional[LogicSig] = None) -> int:
+        """
+        :return: the estimated size of the signed transaction, once it is part of a group.
+        """
+        size = len(base64.b64decode(encoding.msgpack_encode(transaction))) + GROUP_ID_SIZE + FEE_SIZE
+
+        if logic_sig is None:
+            return size + SIGNATURE_SIZE
+
+        return size + len(logic_sig.logic) + sum(len(arg) for arg in logic_sig.args or []) + LOGIC_SIG_OVERHEAD
+
+    def transaction_fee(self, transaction: Transaction, logic_sig: Optional[LogicSig] = None) -> int:
+        if not self.congested:
+            return self.min_fee
+
+        return max(self.min_fee, self.fee_per_byte * self.estimated_size(transaction, logic_sig))
+
+    def group_fee(self, transactions: List[Transaction], logic_sigs: Optional[Dict[int, LogicSig]] = None) -> int:
+        """
+        :param transactions: the transactions of the group.
+        :param logic_sigs: the logic signatures of the transactions that are not signed with a key, by group index.
+        :return: the fee that the group has to pay in total.
+        """
+        logic_sigs = logic_sigs or dict()
+        return sum(self.transaction_fee(transaction, logic_sigs.get(i)) for i, transaction in enumerate(transactions))
+
+    def pool(self,
+             transactions: List[Transaction],
+             payer_index: int = 0,
+             logic_sigs: Optional[Dict[int, LogicSig]] = None) -> int:
+        """
+        Sets the fees of a group that is not yet signed, so that the transaction at payer_index pays the fee of the
+        whole group and the rest of the transactions pay 0.
+        :return: the fee of the group.
+        """
+        fee = self.group_fee(transactions, logic_sigs)
+
+        for i, transaction in enumerate(transactions):
+            transaction.fee = fee if i == payer_index else 0
+
+        return fee
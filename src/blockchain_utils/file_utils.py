@@ -0,0 +1,19 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Union
+
+
+def write_json_atomically(path: Union[str, Path], data) -> None:
+    """
+    Writes the data as JSON to a temporary file next to the path and renames it over the path. The rename is
+    atomic, so concurrent threads and processes read either the previous or the new file, never a partially
+    written one.
+    :param path: the file to write.
+    :param data: JSON serializable data.
+    """
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,44 @@
+import threading
+import weakref
+from hashlib import sha256
+
+from src.blockchain_utils.suggested_params_provider import get_suggested_params_provider
+
+_genesis_hashes = weakref.WeakKeyDictionary()
+_genesis_hashes_lock = threading.Lock()
+
+
+def _cached_genesis_hash(client, lookup) -> str:
+    with _genesis_hashes_lock:
+        genesis_hash = _genesis_hashes.get(client)
+
+    if genesis_hash is None:
+        genesis_hash = lookup()
+        with _genesis_hashes_lock:
+            _genesis_hashes[client] = genesis_hash
+
+    return genesis_hash
+
+
+def algod_genesis_hash(client) -> str:
+    """
+    :param client: algorand client
+    :return: the base64 genesis hash of the network of the client, it tells networks apart even when they are
+    served at the same address, e.g. a restarted local node.
+    """
+    return _cached_genesis_hash(client, lambda: get_suggested_params_provider(client).get().gh)
+
+
+def indexer_genesis_hash(indexer) -> str:
+    """
+    :param indexer: indexer client
+    :return: the base64 genesis hash of the network of the indexer, read from its first block.
+    """
+    return _cached_genesis_hash(indexer, lambda: indexer.block_info(block=1)['genesis-hash'])
+
+
+def network_key(genesis_hash: str) -> str:
+    """
+    :return: a short key of the network that is safe to use in file names and cache keys.
+    """
+    return sha256(genesis_hash.encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens are refilled continuously with `rate` tokens per second up to `capacity`,
+    so short bursts are allowed while the average request rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError('The rate of the token bucket must be positive.')
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.waited_seconds = 0.0
+
+    def set_rate(self, rate: float):
+        """
+        Changes the rate of the bucket, the capacity follows the rate so a lowered rate does not allow old bursts.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.capacity = max(1.0, rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def drain(self):
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes the tokens if they are available.
+        :param tokens:
+        :return: 0 if the tokens were taken, otherwise the number of seconds until they will be available.
+        """
+        with self._lock:
+            self._refill()
+
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Blocks until the tokens are available and takes them.
+        :param tokens:
+        """
+        while True:
+            wait_seconds = self.try_acquire(tokens)
+            if wait_seconds == 0.0:
+                return
+
+            with self._lock:
+                self.waited_seconds += wait_seconds
+            time.sleep(wait_seconds)
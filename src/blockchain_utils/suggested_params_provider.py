@@ -0,0 +1,147 @@
+import copy
+import threading
+import time
+import weakref
+from typing import Optional
+
+from algosdk.future.transaction import SuggestedParams
+from algosdk.v2client import algod
+
+from src.blockchain_utils.fee_estimator import FeeEstimator
+
+
+class SuggestedParamsProvider:
+    """
+    Caches the suggested params of a single algod client so that the transaction builders do not hit
+    /v2/transactions/params for every single transaction.
+
+    The cached params are refreshed when:
+    - the chain has advanced more than refresh_rounds rounds since the params were fetched, or
+    - the estimated current round gets within validity_margin_rounds of the params' last valid round.
+
+    The current round is estimated from the elapsed time and the average block time, and it is corrected
+    whenever a caller reports a round it has observed through observe_round.
+    """
+
+    def __init__(self,
+                 client: algod.AlgodClient,
+                 refresh_rounds: int = 5,
+                 validity_margin_rounds: int = 100,
+                 block_time: float = 4.5,
+                 flat_fee: int = 1000):
+        self.client = client
+        self.refresh_rounds = refresh_rounds
+        self.validity_margin_rounds = validity_margin_rounds
+        self.block_time = block_time
+        self.flat_fee = flat_fee
+
+        self.hits = 0
+        self.misses = 0
+
+        self._suggested_params: Optional[SuggestedParams] = None
+        self._fetched_at = 0.0
+        self._observed_round = 0
+        self._lock = threading.Lock()
+
+    def estimated_round(self) -> int:
+        """
+        :return: the estimated current round of the chain, or 0 if the params have never been fetched.
+        """
+        if self._suggested_params is None:
+            return self._observed_round
+
+        elapsed_rounds = int((time.monotonic() - self._fetched_at) / self.block_time)
+        return max(self._suggested_params.first + elapsed_rounds, self._observed_round)
+
+    def _is_stale(self) -> bool:
+        if self._suggested_params is None:
+            return True
+
+        current_round = self.estimated_round()
+
+        if current_round - self._suggested_params.first >= self.refresh_rounds:
+            return True
+
+        if self._suggested_params.last - current_round <= self.validity_margin_rounds:
+            return True
+
+        return False
+
+    def get(self) -> SuggestedParams:
+        """
+        Gets the suggested params with flat transaction fee, fetching them from algod only when the cached
+        ones are stale. Every call returns a new copy, so callers can freely modify the result.
+        :return:
+        """
+        with self._lock:
+            if self._is_stale():
+                self._store(self.client.suggested_params())
+            else:
+                self.hits += 1
+
+            suggested_params = copy.copy(self._suggested_params)
+
+        return self._with_flat_fee(suggested_params)
+
+    def fee_estimator(self) -> FeeEstimator:
+        """
+        Unlike the flat fee of get, the estimator follows the fee per byte that algod suggests when the network is
+        congested. It is built from the same cached params.
+        :return:
+        """
+        with self._lock:
+            if self._is_stale():
+                self._store(self.client.suggested_params())
+
+            return FeeEstimator.from_suggested_params(self._suggested_params)
+
+    def _store(self, suggested_params: SuggestedParams):
+        self.misses += 1
+        self._suggested_params = suggested_params
+        self._fetched_at = time.monotonic()
+
+    def _with_flat_fee(self, suggested_params: SuggestedParams) -> SuggestedParams:
+        suggested_params.flat_fee = True
+        suggested_params.fee = self.flat_fee
+
+        return suggested_params
+
+    def observe_round(self, current_round: int):
+        """
+        Reports a round observed on the network, e.g. from status or status_after_block responses.
+        :param current_round:
+        """
+        with self._lock:
+            self._observed_round = max(self._observed_round, current_round)
+
+    def invalidate(self):
+        with self._lock:
+            self._suggested_params = None
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total > 0 else 0.0
+        }
+
+
+_providers = weakref.WeakKeyDictionary()
+_providers_lock = threading.Lock()
+
+
+def get_suggested_params_provider(client: algod.AlgodClient) -> SuggestedParamsProvider:
+    """
+    Returns the process-wide SuggestedParamsProvider for the given client, creating it on first use.
+    :param client:
+    :return:
+    """
+    with _providers_lock:
+        provider = _providers.get(client)
+        if provider is None:
+            provider = SuggestedParamsProvider(client=client)
+            _providers[client] = provider
+
+        return provider
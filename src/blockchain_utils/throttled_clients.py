@@ -0,0 +1,359 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib import parse
+
+import requests
+import requests.adapters
+import requests.utils
+from algosdk import constants, error
+from algosdk.v2client import algod, indexer
+from algosdk.v2client.algod import api_version_path_prefix
+
+from src.blockchain_utils.rate_limiter import TokenBucket
+
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+
+# algod answers status/wait-for-block-after after at most a minute, the read timeout has to outlast that long-poll.
+ALGOD_LONG_POLL_SECONDS = 60
+
+
+class RequestBudget:
+    """
+    Requests-per-second budget shared by all of the clients of a single API. The budget is adaptive: every
+    HTTP 429 halves the rate, while every successful request slowly raises it back to the configured maximum,
+    so the clients settle at the actual limit of the provider.
+    """
+
+    def __init__(self,
+                 requests_per_second: float = 10,
+                 min_requests_per_second: float = 1,
+                 max_retries: int = 5,
+                 max_throttled_retries: int = 20,
+                 backoff_base_seconds: float = 0.25,
+                 backoff_max_seconds: float = 8,
+                 connect_timeout_seconds: float = 5,
+                 read_timeout_seconds: float = ALGOD_LONG_POLL_SECONDS + 15):
+        self.max_requests_per_second = requests_per_second
+        self.min_requests_per_second = min(min_requests_per_second, requests_per_second)
+        self.max_retries = max_retries
+        self.max_throttled_retries = max_throttled_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        # A half-open keep-alive connection fails the request after the timeout instead of blocking the client.
+        self.timeout = (connect_timeout_seconds, read_timeout_seconds)
+
+        self.bucket = TokenBucket(rate=requests_per_second)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self.retry_after_seconds = 0.0
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+
+    def acquire(self):
+        # A Retry-After pauses all of the clients that share the budget, not only the throttled request.
+        while True:
+            with self._lock:
+                pause_seconds = self._paused_until - time.monotonic()
+            if pause_seconds <= 0:
+                break
+            time.sleep(pause_seconds)
+
+        self.bucket.acquire()
+        with self._lock:
+            self.requests += 1
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter.
+        """
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt)))
+
+    def on_success(self):
+        with self._lock:
+            if self.bucket.rate < self.max_requests_per_second:
+                self.bucket.set_rate(min(self.max_requests_per_second,
+                                         self.bucket.rate + self.max_requests_per_second / 50))
+
+    def on_throttled(self, retry_after: float):
+        with self._lock:
+            self.throttled += 1
+            self.retry_after_seconds += retry_after
+
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+            # Concurrent requests are usually throttled together, so the rate is decreased at most once a second.
+            if now - self._last_decrease >= 1:
+                self._last_decrease = now
+                self.bucket.set_rate(max(self.min_requests_per_second, self.bucket.rate / 2))
+            self.bucket.drain()
+
+    def on_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+            "current_requests_per_second": round(self.bucket.rate, 2),
+            "max_requests_per_second": self.max_requests_per_second,
+            "rate_limiter_wait_seconds": round(self.bucket.waited_seconds, 3),
+            "retry_after_seconds": round(self.retry_after_seconds, 3)
+        }
+
+
+_request_budgets: Dict[Tuple[str, str, tuple], RequestBudget] = dict()
+_request_budgets_lock = threading.Lock()
+
+
+def get_request_budget(api: str, address: str, **kwargs) -> RequestBudget:
+    """
+    :param api: "algod" or "indexer".
+    :param address: the address of the API.
+    :param kwargs: RequestBudget arguments. They are part of the key of the budget, so a reloaded configuration gets
+    a budget with the new settings.
+    :return: the process-wide RequestBudget of the API at the given address with the given settings.
+    """
+    key = (api, address, tuple(sorted(kwargs.items())))
+
+    with _request_budgets_lock:
+        if key not in _request_budgets:
+            _request_budgets[key] = RequestBudget(**kwargs)
+
+        return _request_budgets[key]
+
+
+def new_session(address: Optional[str] = None, pool_maxsize: int = 32) -> requests.Session:
+    """
+    :param address: the address of the API the session is used for. The proxy and CA bundle settings of the
+    environment are resolved for it once, instead of on every request.
+    :param pool_maxsize: the number of keep-alive connections kept open per host.
+    :return: a session whose connections are reused between requests, instead of a new TCP and TLS handshake per
+    request. The retries are handled by the RequestBudget, not by the session.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    if address is not None:
+        session.trust_env = False
+        session.proxies.update(requests.utils.get_environ_proxies(address))
+        session.verify = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or True
+
+    return session
+
+
+def session_stats(session: requests.Session) -> dict:
+    """
+    :return: the number of requests sent through the connection pools of the session and the number of connections
+    that were opened for them.
+    """
+    opened_connections = 0
+    sent_requests = 0
+    idle_connections = 0
+
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            opened_connections += pool.num_connections
+            sent_requests += pool.num_requests
+            if pool.pool is not None:
+                # The queue of the pool is filled with None placeholders for the connections not yet opened.
+                idle_connections += sum(1 for connection in list(pool.pool.queue) if connection is not None)
+
+    return {
+        "requests": sent_requests,
+        "opened_connections": opened_connections,
+        "reused_connections": max(0, sent_requests - opened_connections),
+        "idle_connections": idle_connections
+    }
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        return None
+
+
+def _throttled_request(budget: RequestBudget, session: requests.Session, method: str, url: str, headers: dict,
+                       data=None) -> requests.Response:
+    """
+    Executes the request within the budget. Throttled requests (HTTP 429) were not processed by the API, so they
+    are always retried after the Retry-After delay, up to max_throttled_retries times. Server errors and connection
+    errors are retried with jittered exponential backoff up to max_retries times, only for the idempotent GET
+    requests.
+    :return: the successful response of the request.
+    :raises requests.HTTPError: once the request can not be retried anymore.
+    """
+    attempt = 0
+    throttled_attempt = 0
+
+    while True:
+        budget.acquire()
+
+        try:
+            response = session.request(method, url, headers=headers, data=data, timeout=budget.timeout)
+            response.raise_for_status()
+            budget.on_success()
+            return response
+        except requests.HTTPError as e:
+            code = e.response.status_code
+            if code == 429 and throttled_attempt < budget.max_throttled_retries:
+                retry_after = _retry_after_seconds(e.response)
+                if retry_after is None:
+                    retry_after = budget.backoff_seconds(throttled_attempt)
+                budget.on_throttled(retry_after)
+                throttled_attempt += 1
+                budget.on_retry()
+                continue
+
+            if code in RETRYABLE_STATUS_CODES and method == "GET" and attempt < budget.max_retries:
+                time.sleep(budget.backoff_seconds(attempt))
+            else:
+                budget.on_failure()
+                raise
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= budget.max_retries or method != "GET":
+                budget.on_failure()
+                raise
+
+            time.sleep(budget.backoff_seconds(attempt))
+
+        attempt += 1
+        budget.on_retry()
+
+
+def _build_request(address: str, requrl: str, auth_header: str, token: str, client_headers: Optional[dict],
+                   params=None, headers=None) -> Tuple[str, dict]:
+    """
+    :return: the url and the headers of the request.
+    """
+    header = {}
+
+    if client_headers:
+        header.update(client_headers)
+
+    if headers:
+        header.update(headers)
+
+    if (requrl not in constants.no_auth) and token:
+        header.update({
+            auth_header: token
+        })
+
+    if requrl not in constants.unversioned_paths:
+        requrl = api_version_path_prefix + requrl
+    if params:
+        requrl = requrl + "?" + parse.urlencode(params)
+
+    return address + requrl, header
+
+
+def _error_message(response: requests.Response) -> str:
+    try:
+        return response.json()["message"]
+    except Exception:
+        return response.text
+
+
+class ThrottledAlgodClient(algod.AlgodClient):
+    """
+    AlgodClient whose requests are executed within a RequestBudget, over the keep-alive connections of its session.
+    """
+
+    def __init__(self, algod_token, algod_address, headers=None, budget: Optional[RequestBudget] = None,
+                 session: Optional[requests.Session] = None):
+        super().__init__(algod_token, algod_address, headers=headers)
+        self.budget = budget or RequestBudget()
+        self.session = session or new_session(algod_address)
+
+    def algod_request(self, method, requrl, params=None, data=None,
+                      headers=None, response_format="json"):
+        url, request_headers = _build_request(address=self.algod_address,
+                                              requrl=requrl,
+                                              auth_header=constants.algod_auth_header,
+                                              token=self.algod_token,
+                                              client_headers=self.headers,
+                                              params=params,
+                                              headers=headers)
+
+        try:
+            resp = _throttled_request(self.budget, self.session, method, url, request_headers, data=data)
+        except requests.HTTPError as e:
+            raise error.AlgodHTTPError(_error_message(e.response), e.response.status_code)
+
+        if response_format == "json":
+            try:
+                return resp.json()
+            except Exception as e:
+                raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+        else:
+            return resp.content
+
+    @property
+    def pool_stats(self) -> dict:
+        return session_stats(self.session)
+
+
+class ThrottledIndexerClient(indexer.IndexerClient):
+    """
+    IndexerClient whose requests are executed within a RequestBudget, over the keep-alive connections of its
+    session.
+    """
+
+    def __init__(self, indexer_token, indexer_address, headers=None, budget: Optional[RequestBudget] = None,
+                 session: Optional[requests.Session] = None):
+        super().__init__(indexer_token, indexer_address, headers=headers)
+        self.budget = budget or RequestBudget()
+        self.session = session or new_session(indexer_address)
+
+    def indexer_request(self, method, requrl, params=None, data=None,
+                        headers=None):
+        url, request_headers = _build_request(address=self.indexer_address,
+                                              requrl=requrl,
+                                              auth_header=constants.indexer_auth_header,
+                                              token=self.indexer_token,
+                                              client_headers=self.headers,
+                                              params=params,
+                                              headers=headers)
+
+        try:
+            resp = _throttled_request(self.budget, self.session, method, url, request_headers, data=data)
+        except requests.HTTPError as e:
+            raise error.IndexerHTTPError(_error_message(e.response))
+
+        response_dict = json.loads(resp.content.decode("utf-8"))
+
+        def recursively_sort_dict(dictionary):
+            return {k: recursively_sort_dict(v) if isinstance(v, dict) else v
+                    for k, v in sorted(dictionary.items())}
+        return recursively_sort_dict(response_dict)
+
+    @property
+    def pool_stats(self) -> dict:
+        return session_stats(self.session)
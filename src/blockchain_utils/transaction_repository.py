@@ -4,20 +4,17 @@ from algosdk.future import transaction as algo_txn
 from typing import List, Any, Optional, Union
 from algosdk import account as algo_acc
 from algosdk.future.transaction import Transaction, SignedTransaction
+from src.blockchain_utils.suggested_params_provider import get_suggested_params_provider
 
 
 def get_default_suggested_params(client: algod.AlgodClient):
     """
-    Gets default suggested params with flat transaction fee and fee amount of 1000.
+    Gets default suggested params with flat transaction fee and fee amount of 1000. The params are served
+    from the shared per-client cache, so consecutive builders reuse a single algod round-trip.
     :param client:
     :return:
     """
-    suggested_params = client.suggested_params()
-
-    suggested_params.flat_fee = True
-    suggested_params.fee = 1000
-
-    return suggested_params
+    return get_suggested_params_provider(client).get()
 
 
 class ApplicationTransactionRepository:
@@ -35,10 +32,12 @@ class ApplicationTransactionRepository:
                            local_schema: algo_txn.StateSchema,
                            app_args: Optional[List[Any]] = None,
                            foreign_assets: Optional[List[int]] = None,
-                           sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                           sign_transaction: bool = True,
+                           suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
 
         creator_address = algo_acc.address_from_private_key(private_key=creator_private_key)
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
 
         txn = algo_txn.ApplicationCreateTxn(sender=creator_address,
                                             sp=suggested_params,
@@ -64,10 +63,12 @@ class ApplicationTransactionRepository:
                          app_args: Optional[List[Any]] = None,
                          foreign_assets: Optional[List[int]] = None,
                          accounts: Optional[List[str]] = None,
-                         sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                         sign_transaction: bool = True,
+                         suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
 
         caller_address = algo_acc.address_from_private_key(private_key=caller_private_key)
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
 
         txn = algo_txn.ApplicationCallTxn(sender=caller_address,
                                           sp=suggested_params,
@@ -87,9 +88,11 @@ class ApplicationTransactionRepository:
     def app_opt_in(cls,
                    client: algod.AlgodClient,
                    caller_private_key: str,
-                   app_id):
+                   app_id,
+                   suggested_params: Optional[algo_txn.SuggestedParams] = None):
         caller_address = algo_acc.address_from_private_key(private_key=caller_private_key)
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
 
         txn = algo_txn.ApplicationOptInTxn(sender=caller_address,
                                            sp=suggested_params,
@@ -121,9 +124,11 @@ class ASATransactionRepository:
                    url: Optional[str] = None,
                    default_frozen: bool = False,
                    metadata_hash: Optional[Any] = None,
-                   sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                   sign_transaction: bool = True,
+                   suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
 
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
 
         creator_address = algo_acc.address_from_private_key(private_key=creator_private_key)
 
@@ -162,7 +167,8 @@ class ASATransactionRepository:
                                 url: Optional[str] = None,
                                 default_frozen: bool = False,
                                 metadata_hash: Optional[Any] = None,
-                                sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                                sign_transaction: bool = True,
+                                suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
 
         return ASATransactionRepository.create_asa(client=client,
                                                    creator_private_key=creator_private_key,
@@ -178,24 +184,28 @@ class ASATransactionRepository:
                                                    url=url,
                                                    default_frozen=default_frozen,
                                                    metadata_hash=metadata_hash,
-                                                   sign_transaction=sign_transaction)
+                                                   sign_transaction=sign_transaction,
+                                                   suggested_params=suggested_params)
 
     @classmethod
     def asa_opt_in(cls,
                    client: algod.AlgodClient,
                    sender_private_key: str,
                    asa_id: int,
-                   sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                   sign_transaction: bool = True,
+                   suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
         """
         Opts-in the sender's account to the specified asa with an id: asa_id.
         :param client:
         :param sender_private_key:
         :param asa_id:
         :param sign_transaction:
+        :param suggested_params: params to use instead of the client's default suggested params.
         :return:
         """
 
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
         sender_address = algo_acc.address_from_private_key(sender_private_key)
 
         txn = algo_txn.AssetTransferTxn(sender=sender_address,
@@ -218,7 +228,8 @@ class ASATransactionRepository:
                      amount: int,
                      revocation_target: Optional[str],
                      sender_private_key: Optional[str],
-                     sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                     sign_transaction: bool = True,
+                     suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
         """
         :param client:
         :param sender_address:
@@ -228,9 +239,11 @@ class ASATransactionRepository:
         :param revocation_target:
         :param sender_private_key:
         :param sign_transaction:
+        :param suggested_params: params to use instead of the client's default suggested params.
         :return:
         """
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
 
         txn = algo_txn.AssetTransferTxn(sender=sender_address,
                                         sp=suggested_params,
@@ -298,7 +311,8 @@ class PaymentTransactionRepository:
                 receiver_address: str,
                 amount: int,
                 sender_private_key: Optional[str],
-                sign_transaction: bool = True) -> Union[Transaction, SignedTransaction]:
+                sign_transaction: bool = True,
+                suggested_params: Optional[algo_txn.SuggestedParams] = None) -> Union[Transaction, SignedTransaction]:
         """
         Creates a payment transaction in ALGOs.
         :param client:
@@ -307,9 +321,11 @@ class PaymentTransactionRepository:
         :param amount:
         :param sender_private_key:
         :param sign_transaction:
+        :param suggested_params: params to use instead of the client's default suggested params.
         :return:
         """
-        suggested_params = get_default_suggested_params(client=client)
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=client)
 
         txn = algo_txn.PaymentTxn(sender=sender_address,
                                   sp=suggested_params,
@@ -0,0 +1,3 @@
+from src.emulator.assembler import assemble, disassemble, TealAssemblyError
+from src.emulator.avm import Evaluator, EvalResult, EvalError, SIGNATURE_MODE, APPLICATION_MODE
+from src.emulator.ledger import Ledger, GroupRejectedError, TransactionResult
@@ -0,0 +1,438 @@
+import base64
+from typing import List, Tuple, Dict
+
+from algosdk import encoding
+
+from src.emulator.opcodes import OPS_BY_NAME, OPS_BY_OPCODE, TXN_FIELDS, GLOBAL_FIELDS, ASSET_HOLDING_FIELDS, \
+    ASSET_PARAMS_FIELDS, NAMED_INTEGER_CONSTANTS, MAX_TEAL_VERSION
+
+# The immediate arguments that follow each opcode in the bytecode.
+IMMEDIATES = {
+    'intc': ['uint8'],
+    'bytec': ['uint8'],
+    'arg': ['uint8'],
+    'load': ['uint8'],
+    'store': ['uint8'],
+    'dig': ['uint8'],
+    'gaid': ['uint8'],
+    'gloads': ['uint8'],
+    'txn': ['txn_field'],
+    'gtxns': ['txn_field'],
+    'global': ['global_field'],
+    'gtxn': ['uint8', 'txn_field'],
+    'txna': ['txn_field', 'uint8'],
+    'gtxnsa': ['txn_field', 'uint8'],
+    'gtxna': ['uint8', 'txn_field', 'uint8'],
+    'gload': ['uint8', 'uint8'],
+    'substring': ['uint8', 'uint8'],
+    'bnz': ['label'],
+    'bz': ['label'],
+    'b': ['label'],
+    'callsub': ['label'],
+    'asset_holding_get': ['asset_holding_field'],
+    'asset_params_get': ['asset_params_field'],
+    'intcblock': ['varuint_list'],
+    'bytecblock': ['bytes_list'],
+    'pushint': ['varuint'],
+    'pushbytes': ['bytes'],
+}
+
+FIELD_ENUMS = {
+    'txn_field': TXN_FIELDS,
+    'global_field': GLOBAL_FIELDS,
+    'asset_holding_field': ASSET_HOLDING_FIELDS,
+    'asset_params_field': ASSET_PARAMS_FIELDS,
+}
+
+
+class TealAssemblyError(Exception):
+    def __init__(self, message: str, line_number: int = None):
+        if line_number is not None:
+            message = f'line {line_number}: {message}'
+        super().__init__(message)
+        self.line_number = line_number
+
+
+def _tokenize(line: str) -> List[str]:
+    """
+    Splits a line of TEAL source in tokens, keeping quoted strings together and dropping comments.
+    """
+    tokens = []
+    current = ''
+    in_string = False
+    escaped = False
+
+    i = 0
+    while i < len(line):
+        char = line[i]
+
+        if in_string:
+            current += char
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            current += char
+            in_string = True
+        elif line.startswith('//', i):
+            break
+        elif char.isspace():
+            if current:
+                tokens.append(current)
+                current = ''
+        else:
+            current += char
+
+        i += 1
+
+    if in_string:
+        raise TealAssemblyError(f'unterminated string in: {line}')
+
+    if current:
+        tokens.append(current)
+
+    return tokens
+
+
+def _parse_string_literal(token: str) -> bytes:
+    content = token[1:-1]
+    result = bytearray()
+
+    i = 0
+    while i < len(content):
+        char = content[i]
+        if char != '\\':
+            result.extend(char.encode('utf-8'))
+            i += 1
+            continue
+
+        escape = content[i + 1]
+        if escape == 'x':
+            result.append(int(content[i + 2:i + 4], 16))
+            i += 4
+            continue
+
+        result.extend({'n': b'\n', 'r': b'\r', 't': b'\t', '\\': b'\\', '"': b'"'}[escape])
+        i += 2
+
+    return bytes(result)
+
+
+def _parse_bytes(tokens: List[str]) -> bytes:
+    """
+    Parses the byte constant forms of TEAL: "string", 0xHEX, base64 X, b64 X, base64(X), b64(X),
+    base32 X, b32 X, base32(X) and b32(X).
+    """
+    token = tokens[0]
+
+    if token.startswith('"'):
+        return _parse_string_literal(token)
+
+    if token.startswith('0x'):
+        return bytes.fromhex(token[2:])
+
+    for prefix, decoder in (('base64', base64.b64decode),
+                            ('b64', base64.b64decode),
+                            ('base32', lambda value: base64.b32decode(value + '=' * (-len(value) % 8))),
+                            ('b32', lambda value: base64.b32decode(value + '=' * (-len(value) % 8)))):
+        if token == prefix:
+            return decoder(tokens[1])
+        if token.startswith(prefix + '(') and token.endswith(')'):
+            return decoder(token[len(prefix) + 1:-1])
+
+    raise TealAssemblyError(f'unknown byte constant: {" ".join(tokens)}')
+
+
+def _parse_int(token: str) -> int:
+    if token in NAMED_INTEGER_CONSTANTS:
+        return NAMED_INTEGER_CONSTANTS[token]
+
+    if token.startswith('0x'):
+        value = int(token, 16)
+    elif token.startswith('0') and len(token) > 1:
+        value = int(token, 8)
+    else:
+        value = int(token)
+
+    if value < 0 or value >= 2 ** 64:
+        raise TealAssemblyError(f'integer out of range: {token}')
+
+    return value
+
+
+def _parse_field(field_kind: str, token: str) -> int:
+    fields = FIELD_ENUMS[field_kind]
+    if token in fields:
+        return fields.index(token)
+
+    # Numeric field indexes are accepted as well.
+    if token.isdigit() and int(token) < len(fields):
+        return int(token)
+
+    raise TealAssemblyError(f'unknown field {token}')
+
+
+def encode_varuint(value: int) -> bytes:
+    result = bytearray()
+    while value >= 0x80:
+        result.append((value & 0x7F) | 0x80)
+        value >>= 7
+    result.append(value)
+
+    return bytes(result)
+
+
+def decode_varuint(program: bytes, pc: int) -> Tuple[int, int]:
+    """
+    :return: the decoded value and the position after it.
+    """
+    value = 0
+    shift = 0
+    while True:
+        if pc >= len(program):
+            raise TealAssemblyError('truncated varuint')
+        byte = program[pc]
+        value |= (byte & 0x7F) << shift
+        pc += 1
+        if byte < 0x80:
+            return value, pc
+        shift += 7
+
+
+def _encode_instruction(name: str, tokens: List[str], labels: Dict[str, int], pc: int) -> bytes:
+    """
+    Encodes a single instruction, the pseudo opcodes int, byte and addr are encoded as pushint and pushbytes.
+    :param name: the name of the opcode.
+    :param tokens: the immediate arguments in the source.
+    :param labels: label -> position, labels that are not known yet are encoded as a zero offset.
+    :param pc: the position of the instruction in the program.
+    """
+    if name == 'int':
+        return bytes([OPS_BY_NAME['pushint'].opcode]) + encode_varuint(_parse_int(tokens[0]))
+
+    if name == 'byte':
+        value = _parse_bytes(tokens)
+        return bytes([OPS_BY_NAME['pushbytes'].opcode]) + encode_varuint(len(value)) + value
+
+    if name == 'addr':
+        value = encoding.decode_address(tokens[0])
+        return bytes([OPS_BY_NAME['pushbytes'].opcode]) + encode_varuint(len(value)) + value
+
+    if name not in OPS_BY_NAME:
+        raise TealAssemblyError(f'unknown opcode {name}')
+
+    encoded = bytearray([OPS_BY_NAME[name].opcode])
+    immediates = IMMEDIATES.get(name, [])
+
+    if immediates and immediates[0] == 'varuint_list':
+        values = [_parse_int(token) for token in tokens]
+        encoded.extend(encode_varuint(len(values)))
+        for value in values:
+            encoded.extend(encode_varuint(value))
+        return bytes(encoded)
+
+    if immediates and immediates[0] == 'bytes_list':
+        values = []
+        i = 0
+        while i < len(tokens):
+            # base64 X and base32 X span two tokens.
+            span = 2 if tokens[i] in ('base64', 'b64', 'base32', 'b32') else 1
+            values.append(_parse_bytes(tokens[i:i + span]))
+            i += span
+        encoded.extend(encode_varuint(len(values)))
+        for value in values:
+            encoded.extend(encode_varuint(len(value)) + value)
+        return bytes(encoded)
+
+    if immediates and immediates[0] == 'varuint':
+        return bytes(encoded) + encode_varuint(_parse_int(tokens[0]))
+
+    if immediates and immediates[0] == 'bytes':
+        value = _parse_bytes(tokens)
+        return bytes(encoded) + encode_varuint(len(value)) + value
+
+    if len(tokens) != len(immediates):
+        raise TealAssemblyError(f'{name} expects {len(immediates)} immediate arguments, got {len(tokens)}')
+
+    for kind, token in zip(immediates, tokens):
+        if kind == 'uint8':
+            value = int(token)
+            if not 0 <= value <= 255:
+                raise TealAssemblyError(f'{name} argument out of range: {token}')
+            encoded.append(value)
+        elif kind == 'label':
+            # The offset is relative to the end of the 3 byte branch instruction.
+            offset = labels.get(token, pc + 3) - (pc + 3)
+            encoded.extend(offset.to_bytes(2, 'big', signed=True))
+        else:
+            encoded.append(_parse_field(kind, token))
+
+    return bytes(encoded)
+
+
+def assemble(source: str) -> bytes:
+    """
+    Assembles TEAL source, as produced by compileTeal, to bytecode that can be executed by the emulator and is
+    accepted by algosdk.logic.check_program.
+    :param source: TEAL source code.
+    :return: the bytecode of the program.
+    """
+    version = 1
+    instructions: List[Tuple[int, str, List[str]]] = []
+    label_lines: List[Tuple[int, str]] = []
+
+    for line_number, line in enumerate(source.splitlines(), start=1):
+        stripped = line.strip()
+        if stripped.startswith('#pragma'):
+            tokens = stripped.split()
+            if len(tokens) == 3 and tokens[1] == 'version':
+                version = int(tokens[2])
+                if version > MAX_TEAL_VERSION:
+                    raise TealAssemblyError(f'unsupported TEAL version {version}', line_number)
+            continue
+
+        try:
+            tokens = _tokenize(line)
+        except TealAssemblyError as e:
+            raise TealAssemblyError(str(e), line_number)
+
+        if len(tokens) == 0:
+            continue
+
+        if tokens[0].endswith(':') and len(tokens) == 1:
+            label_lines.append((len(instructions), tokens[0][:-1]))
+            continue
+
+        instructions.append((line_number, tokens[0], tokens[1:]))
+
+    # First pass computes the positions of the labels, the second one encodes the branch offsets.
+    labels: Dict[str, int] = dict()
+    for _ in range(2):
+        pc = len(encode_varuint(version))
+        positions = []
+        for line_number, name, tokens in instructions:
+            positions.append(pc)
+            try:
+                pc += len(_encode_instruction(name, tokens, labels, pc))
+            except Exception as e:
+                raise TealAssemblyError(str(e), line_number)
+        positions.append(pc)
+
+        labels = {label: positions[instruction_index] for instruction_index, label in label_lines}
+
+    program = bytearray(encode_varuint(version))
+    for (line_number, name, tokens), pc in zip(instructions, positions):
+        if name in ('bnz', 'bz', 'b', 'callsub') and tokens[0] not in labels:
+            raise TealAssemblyError(f'unknown label {tokens[0]}', line_number)
+        program.extend(_encode_instruction(name, tokens, labels, pc))
+
+    return bytes(program)
+
+
+class Instruction:
+    """
+    A decoded instruction of a program.
+    """
+    __slots__ = ('pc', 'op', 'immediates', 'next_pc')
+
+    def __init__(self, pc: int, op, immediates: list, next_pc: int):
+        self.pc = pc
+        self.op = op
+        self.immediates = immediates
+        self.next_pc = next_pc
+
+
+def decode_program(program: bytes) -> Tuple[int, List[Instruction]]:
+    """
+    Decodes the bytecode of a program.
+    :return: the version of the program and its instructions.
+    """
+    version, pc = decode_varuint(program, 0)
+    instructions = []
+
+    while pc < len(program):
+        opcode = program[pc]
+        if opcode not in OPS_BY_OPCODE:
+            raise TealAssemblyError(f'invalid opcode {opcode} at {pc}')
+
+        op = OPS_BY_OPCODE[opcode]
+        start = pc
+        pc += 1
+        immediates = []
+
+        for kind in IMMEDIATES.get(op.name, []):
+            if kind == 'varuint_list':
+                count, pc = decode_varuint(program, pc)
+                for _ in range(count):
+                    value, pc = decode_varuint(program, pc)
+                    immediates.append(value)
+            elif kind == 'bytes_list':
+                count, pc = decode_varuint(program, pc)
+                for _ in range(count):
+                    length, pc = decode_varuint(program, pc)
+                    immediates.append(bytes(program[pc:pc + length]))
+                    pc += length
+            elif kind == 'varuint':
+                value, pc = decode_varuint(program, pc)
+                immediates.append(value)
+            elif kind == 'bytes':
+                length, pc = decode_varuint(program, pc)
+                immediates.append(bytes(program[pc:pc + length]))
+                pc += length
+            elif kind == 'label':
+                offset = int.from_bytes(program[pc:pc + 2], 'big', signed=True)
+                pc += 2
+                immediates.append(pc + offset)
+            else:
+                immediates.append(program[pc])
+                pc += 1
+
+        if pc > len(program):
+            raise TealAssemblyError(f'truncated instruction {op.name} at {start}')
+
+        instructions.append(Instruction(pc=start, op=op, immediates=immediates, next_pc=pc))
+
+    return version, instructions
+
+
+def disassemble(program: bytes) -> str:
+    """
+    :param program: the bytecode of a program.
+    :return: TEAL source of the program, with labels of the form label<pc> for the branch targets.
+    """
+    version, instructions = decode_program(program)
+    targets = set(instruction.immediates[0] for instruction in instructions
+                  if IMMEDIATES.get(instruction.op.name) == ['label'])
+
+    lines = [f'#pragma version {version}']
+    for instruction in instructions:
+        if instruction.pc in targets:
+            lines.append(f'label{instruction.pc}:')
+
+        name = instruction.op.name
+        kinds = IMMEDIATES.get(name, [])
+        arguments = []
+
+        if kinds in (['varuint_list'], ['varuint']):
+            arguments = [str(value) for value in instruction.immediates]
+        elif kinds in (['bytes_list'], ['bytes']):
+            arguments = ['0x' + value.hex() for value in instruction.immediates]
+        else:
+            for kind, value in zip(kinds, instruction.immediates):
+                if kind == 'label':
+                    arguments.append(f'label{value}')
+                elif kind in FIELD_ENUMS:
+                    arguments.append(FIELD_ENUMS[kind][value])
+                else:
+                    arguments.append(str(value))
+
+        lines.append(' '.join([name] + arguments))
+
+    end = len(program)
+    if end in targets:
+        lines.append(f'label{end}:')
+
+    return '\n'.join(lines) + '\n'
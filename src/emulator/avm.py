@@ -0,0 +1,1186 @@
+import base64
+import hashlib
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional, Dict, Tuple, Union
+
+from algosdk import encoding, constants
+from algosdk.future import transaction as algo_txn
+
+from src.emulator.assembler import decode_program, Instruction
+from src.emulator.opcodes import TXN_FIELDS, GLOBAL_FIELDS, ASSET_HOLDING_FIELDS, ASSET_PARAMS_FIELDS, TYPE_ENUMS
+
+TealValue = Union[int, bytes]
+
+MAX_UINT64 = 2 ** 64 - 1
+MAX_STACK_DEPTH = 1000
+MAX_BYTE_LENGTH = 4096
+MAX_CALLSUB_DEPTH = 1024
+
+LOGIC_SIG_MAX_COST = 20000
+APPLICATION_MAX_COST = 700
+
+ZERO_ADDRESS = bytes(32)
+
+APPLICATION_ONLY_GLOBALS = {'Round', 'LatestTimestamp', 'CurrentApplicationID', 'CreatorAddress'}
+
+SIGNATURE_MODE = "Signature"
+APPLICATION_MODE = "Application"
+
+SIGNATURE_ONLY_OPS = {'arg', 'arg_0', 'arg_1', 'arg_2', 'arg_3'}
+APPLICATION_ONLY_OPS = {'balance', 'app_opted_in', 'app_local_get', 'app_local_get_ex', 'app_global_get',
+                        'app_global_get_ex', 'app_local_put', 'app_global_put', 'app_local_del', 'app_global_del',
+                        'asset_holding_get', 'asset_params_get', 'min_balance', 'gload', 'gloads', 'gaid', 'gaids'}
+
+
+class EvalError(Exception):
+    def __init__(self, message: str, pc: Optional[int] = None):
+        super().__init__(message if pc is None else f'pc={pc}: {message}')
+        self.pc = pc
+
+
+class EvalResult:
+    """
+    The outcome of a single program evaluation.
+    - passed: whether the program approved the transaction.
+    - cost: the total opcode cost of the evaluation.
+    - error: the reason of the rejection, None when the program approved.
+    - opcode_costs: opcode name -> accumulated cost.
+    - pc_costs: pc -> accumulated cost, only collected when profiling.
+    - scratch: the final scratch space of the evaluation.
+    """
+
+    def __init__(self,
+                 passed: bool,
+                 cost: int,
+                 error: Optional[str],
+                 opcode_costs: Counter,
+                 pc_costs: Optional[Counter],
+                 scratch: List[TealValue]):
+        self.passed = passed
+        self.cost = cost
+        self.error = error
+        self.opcode_costs = opcode_costs
+        self.pc_costs = pc_costs
+        self.scratch = scratch
+
+    def __repr__(self):
+        return f'EvalResult(passed={self.passed}, cost={self.cost}, error={self.error})'
+
+
+@lru_cache(maxsize=256)
+def load_program(program: bytes) -> Tuple[int, Tuple[Instruction, ...], Dict[int, int]]:
+    """
+    Decodes the program once, the decoded instructions are reused for every evaluation of the same bytecode.
+    :return: the version, the instructions and the pc -> instruction index map of the program.
+    """
+    version, instructions = decode_program(program)
+    index_by_pc = {instruction.pc: i for i, instruction in enumerate(instructions)}
+    index_by_pc[len(program)] = len(instructions)
+
+    return version, tuple(instructions), index_by_pc
+
+
+@lru_cache(maxsize=256)
+def _mode_violation(program: bytes, mode: str) -> Optional[Instruction]:
+    """
+    The mode restrictions are checked once on the whole program, the same way as algod checks them.
+    :return: the first instruction that is not allowed in the mode, None if the program is valid in the mode.
+    """
+    disallowed_ops = APPLICATION_ONLY_OPS if mode == SIGNATURE_MODE else SIGNATURE_ONLY_OPS
+    for instruction in load_program(program)[1]:
+        if instruction.op.name in disallowed_ops:
+            return instruction
+
+    return None
+
+
+@lru_cache(maxsize=65536)
+def address_bytes(address: Optional[str]) -> bytes:
+    """
+    Cached decoding of addresses, the same few addresses are read by every evaluation of a group.
+    """
+    if not address:
+        return ZERO_ADDRESS
+
+    return encoding.decode_address(address)
+
+
+def txid_bytes(txid: str) -> bytes:
+    return base64.b32decode(txid + '=' * (-len(txid) % 8))
+
+
+def transaction_field(txn: algo_txn.Transaction, field: str, group_index: int,
+                      array_index: Optional[int] = None) -> TealValue:
+    """
+    Reads a transaction field as seen by the AVM.
+    """
+    txn_type = txn.type
+
+    if field == 'Sender':
+        return address_bytes(txn.sender)
+    if field == 'Fee':
+        return txn.fee or 0
+    if field == 'FirstValid':
+        return txn.first_valid_round
+    if field == 'LastValid':
+        return txn.last_valid_round
+    if field == 'Note':
+        return txn.note or b''
+    if field == 'Lease':
+        return txn.lease or ZERO_ADDRESS
+    if field == 'RekeyTo':
+        return address_bytes(txn.rekey_to)
+    if field == 'Type':
+        return txn_type.encode()
+    if field == 'TypeEnum':
+        return TYPE_ENUMS.get(txn_type, 0)
+    if field == 'GroupIndex':
+        return group_index
+    if field == 'TxID':
+        return txid_bytes(txn.get_txid())
+
+    is_pay = txn_type == constants.payment_txn
+    is_axfer = txn_type == constants.assettransfer_txn
+    is_acfg = txn_type == constants.assetconfig_txn
+    is_afrz = txn_type == constants.assetfreeze_txn
+    is_appl = txn_type == constants.appcall_txn
+
+    if field == 'Receiver':
+        return address_bytes(txn.receiver if is_pay else None)
+    if field == 'Amount':
+        return (txn.amt or 0) if is_pay else 0
+    if field == 'CloseRemainderTo':
+        return address_bytes(txn.close_remainder_to if is_pay else None)
+
+    if field == 'XferAsset':
+        return txn.index if is_axfer else 0
+    if field == 'AssetAmount':
+        return (txn.amount or 0) if is_axfer else 0
+    if field == 'AssetSender':
+        return address_bytes(txn.revocation_target if is_axfer else None)
+    if field == 'AssetReceiver':
+        return address_bytes(txn.receiver if is_axfer else None)
+    if field == 'AssetCloseTo':
+        return address_bytes(txn.close_assets_to if is_axfer else None)
+
+    if field == 'ConfigAsset':
+        return (txn.index or 0) if is_acfg else 0
+    if field == 'ConfigAssetTotal':
+        return (txn.total or 0) if is_acfg else 0
+    if field == 'ConfigAssetDecimals':
+        return (txn.decimals or 0) if is_acfg else 0
+    if field == 'ConfigAssetDefaultFrozen':
+        return int(bool(txn.default_frozen)) if is_acfg else 0
+    if field == 'ConfigAssetUnitName':
+        return (txn.unit_name or '').encode() if is_acfg else b''
+    if field == 'ConfigAssetName':
+        return (txn.asset_name or '').encode() if is_acfg else b''
+    if field == 'ConfigAssetURL':
+        return (txn.url or '').encode() if is_acfg else b''
+    if field == 'ConfigAssetMetadataHash':
+        return (txn.metadata_hash or b'') if is_acfg else b''
+    if field in ('ConfigAssetManager', 'ConfigAssetReserve', 'ConfigAssetFreeze', 'ConfigAssetClawback'):
+        attribute = {'ConfigAssetManager': 'manager',
+                     'ConfigAssetReserve': 'reserve',
+                     'ConfigAssetFreeze': 'freeze',
+                     'ConfigAssetClawback': 'clawback'}[field]
+        return address_bytes(getattr(txn, attribute) if is_acfg else None)
+
+    if field == 'FreezeAsset':
+        return txn.index if is_afrz else 0
+    if field == 'FreezeAssetAccount':
+        return address_bytes(txn.target if is_afrz else None)
+    if field == 'FreezeAssetFrozen':
+        return int(bool(txn.new_freeze_state)) if is_afrz else 0
+
+    if field == 'ApplicationID':
+        return (txn.index or 0) if is_appl else 0
+    if field == 'OnCompletion':
+        return int(txn.on_complete or 0) if is_appl else 0
+    if field == 'ApprovalProgram':
+        return (txn.approval_program or b'') if is_appl else b''
+    if field == 'ClearStateProgram':
+        return (txn.clear_program or b'') if is_appl else b''
+    if field in ('GlobalNumUint', 'GlobalNumByteSlice', 'LocalNumUint', 'LocalNumByteSlice'):
+        schema = (txn.global_schema if field.startswith('Global') else txn.local_schema) if is_appl else None
+        if schema is None:
+            return 0
+        return (schema.num_uints if field.endswith('Uint') else schema.num_byte_slices) or 0
+    if field == 'ExtraProgramPages':
+        return (getattr(txn, 'extra_pages', 0) or 0) if is_appl else 0
+
+    app_args = (txn.app_args or []) if is_appl else []
+    accounts = (txn.accounts or []) if is_appl else []
+    foreign_assets = (txn.foreign_assets or []) if is_appl else []
+    foreign_apps = (txn.foreign_apps or []) if is_appl else []
+
+    if field == 'NumAppArgs':
+        return len(app_args)
+    if field == 'NumAccounts':
+        return len(accounts)
+    if field == 'NumAssets':
+        return len(foreign_assets)
+    if field == 'NumApplications':
+        return len(foreign_apps)
+
+    if field in ('ApplicationArgs', 'Accounts', 'Assets', 'Applications'):
+        if array_index is None:
+            raise EvalError(f'{field} must be accessed with an array index')
+
+        if field == 'ApplicationArgs':
+            values = app_args
+        elif field == 'Accounts':
+            # Accounts[0] is the sender of the transaction.
+            values = [address_bytes(txn.sender)] + [address_bytes(account) for account in accounts]
+        elif field == 'Assets':
+            values = foreign_assets
+        else:
+            # Applications[0] is the called application.
+            values = [txn.index or 0] + foreign_apps
+
+        if array_index >= len(values):
+            raise EvalError(f'invalid {field} index {array_index}')
+
+        value = values[array_index]
+        return value.encode() if isinstance(value, str) else value
+
+    raise EvalError(f'unsupported transaction field {field}')
+
+
+class Evaluator:
+    """
+    Executes the bytecode of a TEAL program, either as a logic signature (Signature mode) or as an approval or
+    clear state program of an application (Application mode). In Application mode the reads and writes of the
+    ledger state go through the state view, which buffers the writes until the ledger commits them.
+    """
+
+    def __init__(self,
+                 program: bytes,
+                 mode: str,
+                 group: List[algo_txn.Transaction],
+                 group_index: int,
+                 args: Optional[List[bytes]] = None,
+                 state=None,
+                 globals_provider=None,
+                 budget: Optional[int] = None,
+                 profile: bool = False):
+        self.program = program
+        self.mode = mode
+        self.group = group
+        self.group_index = group_index
+        self.txn = group[group_index]
+        self.args = args or []
+        self.state = state
+        self.globals_provider = globals_provider
+        self.budget = budget if budget is not None else \
+            (LOGIC_SIG_MAX_COST if mode == SIGNATURE_MODE else APPLICATION_MAX_COST)
+        self.profile = profile
+
+        self.stack: List[TealValue] = []
+        self.scratch: List[TealValue] = [0] * 256
+        self.call_stack: List[int] = []
+        self.int_constants: List[int] = []
+        self.byte_constants: List[bytes] = []
+        self.cost = 0
+        self.opcode_costs: Counter = Counter()
+        self.pc_costs: Optional[Counter] = Counter() if profile else None
+
+    # Stack helpers.
+
+    def _push(self, value: TealValue):
+        if isinstance(value, bytes) and len(value) > MAX_BYTE_LENGTH:
+            raise EvalError(f'byte value of length {len(value)} exceeds {MAX_BYTE_LENGTH}')
+        if len(self.stack) >= MAX_STACK_DEPTH:
+            raise EvalError('stack overflow')
+        self.stack.append(value)
+
+    def _pop(self) -> TealValue:
+        if len(self.stack) == 0:
+            raise EvalError('stack underflow')
+        return self.stack.pop()
+
+    def _pop_uint(self) -> int:
+        value = self._pop()
+        if not isinstance(value, int):
+            raise EvalError('expected uint64 but got bytes')
+        return value
+
+    def _pop_bytes(self) -> bytes:
+        value = self._pop()
+        if not isinstance(value, bytes):
+            raise EvalError('expected bytes but got uint64')
+        return value
+
+    @staticmethod
+    def _check_uint(value: int) -> int:
+        if value < 0:
+            raise EvalError('uint64 underflow')
+        if value > MAX_UINT64:
+            raise EvalError('uint64 overflow')
+        return value
+
+    # Reference resolution of Application mode opcodes.
+
+    def _resolve_account(self, value: TealValue) -> str:
+        accounts = [self.txn.sender] + list(self.txn.accounts or [])
+        if isinstance(value, int):
+            if value >= len(accounts):
+                raise EvalError(f'invalid account offset {value}')
+            return accounts[value]
+
+        address = encoding.encode_address(value)
+        if address not in accounts:
+            raise EvalError(f'unavailable account {address}')
+        return address
+
+    def _resolve_asset(self, value: int) -> int:
+        foreign_assets = list(self.txn.foreign_assets or [])
+        if value < len(foreign_assets):
+            return foreign_assets[value]
+        if value not in foreign_assets:
+            raise EvalError(f'unavailable asset {value}')
+        return value
+
+    def _resolve_app(self, value: int) -> int:
+        current_app_id = self.state.app_id
+        foreign_apps = list(self.txn.foreign_apps or [])
+        if value == 0:
+            return current_app_id
+        if value <= len(foreign_apps):
+            return foreign_apps[value - 1]
+        if value != current_app_id and value not in foreign_apps:
+            raise EvalError(f'unavailable application {value}')
+        return value
+
+    def _global_field(self, field: str) -> TealValue:
+        if field == 'ZeroAddress':
+            return ZERO_ADDRESS
+        if field == 'GroupSize':
+            return len(self.group)
+        if field == 'LogicSigVersion':
+            return 4
+        if self.mode != APPLICATION_MODE and field in APPLICATION_ONLY_GLOBALS:
+            raise EvalError(f'global {field} is only available in Application mode')
+        if field == 'CurrentApplicationID':
+            return self.state.app_id
+        if field == 'CreatorAddress':
+            return address_bytes(self.state.app_creator())
+        if self.globals_provider is not None:
+            return self.globals_provider(field)
+        raise EvalError(f'global {field} is not available')
+
+    # Execution.
+
+    def run(self) -> EvalResult:
+        try:
+            passed = self._execute()
+            error = None if passed else 'program rejected the transaction'
+        except EvalError as e:
+            passed = False
+            error = str(e)
+
+        return EvalResult(passed=passed,
+                          cost=self.cost,
+                          error=error,
+                          opcode_costs=self.opcode_costs,
+                          pc_costs=self.pc_costs,
+                          scratch=self.scratch)
+
+    def _execute(self) -> bool:
+        try:
+            version, instructions, index_by_pc = load_program(self.program)
+        except Exception as e:
+            raise EvalError(f'invalid program: {e}')
+
+        if version > 4:
+            raise EvalError(f'unsupported program version {version}')
+
+        violation = _mode_violation(self.program, self.mode)
+        if violation is not None:
+            raise EvalError(f'{violation.op.name} is not allowed in {self.mode} mode', violation.pc)
+
+        index = 0
+        while index < len(instructions):
+            instruction = instructions[index]
+            op = instruction.op
+            name = op.name
+
+            self.cost += op.cost
+            self.opcode_costs[name] += op.cost
+            if self.pc_costs is not None:
+                self.pc_costs[instruction.pc] += op.cost
+            if self.cost > self.budget:
+                raise EvalError(f'dynamic cost budget exceeded, {self.cost} > {self.budget}', instruction.pc)
+
+            handler = _HANDLERS.get(name)
+            if handler is None:
+                raise EvalError(f'unsupported opcode {name}', instruction.pc)
+
+            try:
+                next_pc = handler(self, instruction)
+            except EvalError as e:
+                if e.pc is None:
+                    raise EvalError(str(e), instruction.pc)
+                raise
+
+            if next_pc is _RETURN:
+                return self._final_result()
+
+            if next_pc is None:
+                index += 1
+            else:
+                if next_pc not in index_by_pc:
+                    raise EvalError(f'branch target {next_pc} is not an instruction', instruction.pc)
+                index = index_by_pc[next_pc]
+
+        return self._final_result(require_single=True)
+
+    def _final_result(self, require_single: bool = False) -> bool:
+        if require_single and len(self.stack) != 1:
+            raise EvalError(f'stack must contain exactly one value at the end of the program, got {len(self.stack)}')
+        if len(self.stack) == 0:
+            raise EvalError('stack is empty at the end of the program')
+
+        result = self.stack[-1]
+        if not isinstance(result, int):
+            raise EvalError('the program must end with an uint64 on the stack')
+
+        return result != 0
+
+
+_RETURN = object()
+
+
+def _binary_uint(function):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        b = evaluator._pop_uint()
+        a = evaluator._pop_uint()
+        evaluator._push(Evaluator._check_uint(function(a, b)))
+
+    return handler
+
+
+def _binary_bytes_math(function, result_bytes: bool = True):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        b = evaluator._pop_bytes()
+        a = evaluator._pop_bytes()
+        if len(a) > 64 or len(b) > 64:
+            raise EvalError('byte math arguments are limited to 64 bytes')
+        result = function(int.from_bytes(a, 'big'), int.from_bytes(b, 'big'))
+        if not result_bytes:
+            evaluator._push(int(result))
+            return
+        if result < 0:
+            raise EvalError('byte math underflow')
+        evaluator._push(result.to_bytes((result.bit_length() + 7) // 8, 'big'))
+
+    return handler
+
+
+def _division(a: int, b: int) -> int:
+    if b == 0:
+        raise EvalError('division by zero')
+    return a // b
+
+
+def _modulo(a: int, b: int) -> int:
+    if b == 0:
+        raise EvalError('modulo by zero')
+    return a % b
+
+
+def _op_err(evaluator: Evaluator, instruction: Instruction):
+    raise EvalError('err opcode executed')
+
+
+def _op_hash(function):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        evaluator._push(function(evaluator._pop_bytes()))
+
+    return handler
+
+
+def _sha512_256(value: bytes) -> bytes:
+    return hashlib.new('sha512_256', value).digest()
+
+
+def _keccak256(value: bytes) -> bytes:
+    from Cryptodome.Hash import keccak
+
+    return keccak.new(data=value, digest_bits=256).digest()
+
+
+def _op_ed25519verify(evaluator: Evaluator, instruction: Instruction):
+    from nacl.exceptions import BadSignatureError
+    from nacl.signing import VerifyKey
+
+    public_key = evaluator._pop_bytes()
+    signature = evaluator._pop_bytes()
+    data = evaluator._pop_bytes()
+
+    program_hash = encoding.checksum(b'Program' + evaluator.program)
+    try:
+        VerifyKey(public_key).verify(b'ProgData' + program_hash + data, signature)
+        evaluator._push(1)
+    except (BadSignatureError, ValueError):
+        evaluator._push(0)
+
+
+def _op_compare(function):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        b = evaluator._pop()
+        a = evaluator._pop()
+        if type(a) != type(b):
+            raise EvalError('cannot compare uint64 to bytes')
+        evaluator._push(int(function(a, b)))
+
+    return handler
+
+
+def _op_not(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(int(evaluator._pop_uint() == 0))
+
+
+def _op_len(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(len(evaluator._pop_bytes()))
+
+
+def _op_itob(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(evaluator._pop_uint().to_bytes(8, 'big'))
+
+
+def _op_btoi(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator._pop_bytes()
+    if len(value) > 8:
+        raise EvalError(f'btoi argument of length {len(value)} exceeds 8 bytes')
+    evaluator._push(int.from_bytes(value, 'big'))
+
+
+def _op_bitwise_not(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(evaluator._pop_uint() ^ MAX_UINT64)
+
+
+def _op_mulw(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_uint()
+    a = evaluator._pop_uint()
+    result = a * b
+    evaluator._push(result >> 64)
+    evaluator._push(result & MAX_UINT64)
+
+
+def _op_addw(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_uint()
+    a = evaluator._pop_uint()
+    result = a + b
+    evaluator._push(result >> 64)
+    evaluator._push(result & MAX_UINT64)
+
+
+def _op_divmodw(evaluator: Evaluator, instruction: Instruction):
+    divisor_low = evaluator._pop_uint()
+    divisor_high = evaluator._pop_uint()
+    dividend_low = evaluator._pop_uint()
+    dividend_high = evaluator._pop_uint()
+
+    divisor = (divisor_high << 64) | divisor_low
+    if divisor == 0:
+        raise EvalError('division by zero')
+    dividend = (dividend_high << 64) | dividend_low
+
+    quotient, remainder = divmod(dividend, divisor)
+    evaluator._push(quotient >> 64)
+    evaluator._push(quotient & MAX_UINT64)
+    evaluator._push(remainder >> 64)
+    evaluator._push(remainder & MAX_UINT64)
+
+
+def _op_intcblock(evaluator: Evaluator, instruction: Instruction):
+    evaluator.int_constants = list(instruction.immediates)
+
+
+def _op_bytecblock(evaluator: Evaluator, instruction: Instruction):
+    evaluator.byte_constants = list(instruction.immediates)
+
+
+def _int_constant(index: Optional[int] = None):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        position = instruction.immediates[0] if index is None else index
+        if position >= len(evaluator.int_constants):
+            raise EvalError(f'intc {position} is not defined')
+        evaluator._push(evaluator.int_constants[position])
+
+    return handler
+
+
+def _byte_constant(index: Optional[int] = None):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        position = instruction.immediates[0] if index is None else index
+        if position >= len(evaluator.byte_constants):
+            raise EvalError(f'bytec {position} is not defined')
+        evaluator._push(evaluator.byte_constants[position])
+
+    return handler
+
+
+def _argument(index: Optional[int] = None):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        position = instruction.immediates[0] if index is None else index
+        if position >= len(evaluator.args):
+            raise EvalError(f'arg {position} is not provided')
+        evaluator._push(evaluator.args[position])
+
+    return handler
+
+
+def _group_transaction(evaluator: Evaluator, group_index: int) -> algo_txn.Transaction:
+    if group_index >= len(evaluator.group):
+        raise EvalError(f'group index {group_index} out of range for group of size {len(evaluator.group)}')
+    return evaluator.group[group_index]
+
+
+def _op_txn(evaluator: Evaluator, instruction: Instruction):
+    field = TXN_FIELDS[instruction.immediates[0]]
+    evaluator._push(transaction_field(evaluator.txn, field, evaluator.group_index))
+
+
+def _op_global(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(evaluator._global_field(GLOBAL_FIELDS[instruction.immediates[0]]))
+
+
+def _op_gtxn(evaluator: Evaluator, instruction: Instruction):
+    group_index, field_index = instruction.immediates
+    evaluator._push(transaction_field(_group_transaction(evaluator, group_index), TXN_FIELDS[field_index],
+                                      group_index))
+
+
+def _op_txna(evaluator: Evaluator, instruction: Instruction):
+    field_index, array_index = instruction.immediates
+    evaluator._push(transaction_field(evaluator.txn, TXN_FIELDS[field_index], evaluator.group_index, array_index))
+
+
+def _op_gtxna(evaluator: Evaluator, instruction: Instruction):
+    group_index, field_index, array_index = instruction.immediates
+    evaluator._push(transaction_field(_group_transaction(evaluator, group_index), TXN_FIELDS[field_index],
+                                      group_index, array_index))
+
+
+def _op_gtxns(evaluator: Evaluator, instruction: Instruction):
+    group_index = evaluator._pop_uint()
+    evaluator._push(transaction_field(_group_transaction(evaluator, group_index),
+                                      TXN_FIELDS[instruction.immediates[0]], group_index))
+
+
+def _op_gtxnsa(evaluator: Evaluator, instruction: Instruction):
+    group_index = evaluator._pop_uint()
+    field_index, array_index = instruction.immediates
+    evaluator._push(transaction_field(_group_transaction(evaluator, group_index), TXN_FIELDS[field_index],
+                                      group_index, array_index))
+
+
+def _op_load(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(evaluator.scratch[instruction.immediates[0]])
+
+
+def _op_store(evaluator: Evaluator, instruction: Instruction):
+    evaluator.scratch[instruction.immediates[0]] = evaluator._pop()
+
+
+def _group_scratch(evaluator: Evaluator, group_index: int, slot: int) -> TealValue:
+    if group_index >= evaluator.group_index:
+        raise EvalError('gload can only read the scratch space of earlier transactions')
+    scratch = evaluator.state.group_scratch(group_index)
+    if scratch is None:
+        raise EvalError(f'transaction {group_index} is not an application call')
+    return scratch[slot]
+
+
+def _op_gload(evaluator: Evaluator, instruction: Instruction):
+    group_index, slot = instruction.immediates
+    evaluator._push(_group_scratch(evaluator, group_index, slot))
+
+
+def _op_gloads(evaluator: Evaluator, instruction: Instruction):
+    group_index = evaluator._pop_uint()
+    evaluator._push(_group_scratch(evaluator, group_index, instruction.immediates[0]))
+
+
+def _group_created_id(evaluator: Evaluator, group_index: int) -> int:
+    if group_index >= evaluator.group_index:
+        raise EvalError('gaid can only read the ids created by earlier transactions')
+    created_id = evaluator.state.group_created_id(group_index)
+    if created_id is None:
+        raise EvalError(f'transaction {group_index} did not create an asset or application')
+    return created_id
+
+
+def _op_gaid(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(_group_created_id(evaluator, instruction.immediates[0]))
+
+
+def _op_gaids(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(_group_created_id(evaluator, evaluator._pop_uint()))
+
+
+def _op_bnz(evaluator: Evaluator, instruction: Instruction):
+    if evaluator._pop_uint() != 0:
+        return instruction.immediates[0]
+
+
+def _op_bz(evaluator: Evaluator, instruction: Instruction):
+    if evaluator._pop_uint() == 0:
+        return instruction.immediates[0]
+
+
+def _op_b(evaluator: Evaluator, instruction: Instruction):
+    return instruction.immediates[0]
+
+
+def _op_return(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator._pop_uint()
+    evaluator.stack = [value]
+    return _RETURN
+
+
+def _op_assert(evaluator: Evaluator, instruction: Instruction):
+    if evaluator._pop_uint() == 0:
+        raise EvalError('assert failed')
+
+
+def _op_pop(evaluator: Evaluator, instruction: Instruction):
+    evaluator._pop()
+
+
+def _op_dup(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator._pop()
+    evaluator._push(value)
+    evaluator._push(value)
+
+
+def _op_dup2(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop()
+    a = evaluator._pop()
+    for value in (a, b, a, b):
+        evaluator._push(value)
+
+
+def _op_dig(evaluator: Evaluator, instruction: Instruction):
+    depth = instruction.immediates[0]
+    if depth >= len(evaluator.stack):
+        raise EvalError(f'dig {depth} with stack of size {len(evaluator.stack)}')
+    evaluator._push(evaluator.stack[-1 - depth])
+
+
+def _op_swap(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop()
+    a = evaluator._pop()
+    evaluator._push(b)
+    evaluator._push(a)
+
+
+def _op_select(evaluator: Evaluator, instruction: Instruction):
+    condition = evaluator._pop_uint()
+    b = evaluator._pop()
+    a = evaluator._pop()
+    evaluator._push(b if condition != 0 else a)
+
+
+def _op_concat(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_bytes()
+    a = evaluator._pop_bytes()
+    evaluator._push(a + b)
+
+
+def _substring(value: bytes, start: int, end: int) -> bytes:
+    if end < start or end > len(value):
+        raise EvalError(f'substring range {start}:{end} out of bounds for length {len(value)}')
+    return value[start:end]
+
+
+def _op_substring(evaluator: Evaluator, instruction: Instruction):
+    start, end = instruction.immediates
+    evaluator._push(_substring(evaluator._pop_bytes(), start, end))
+
+
+def _op_substring3(evaluator: Evaluator, instruction: Instruction):
+    end = evaluator._pop_uint()
+    start = evaluator._pop_uint()
+    evaluator._push(_substring(evaluator._pop_bytes(), start, end))
+
+
+def _op_getbit(evaluator: Evaluator, instruction: Instruction):
+    index = evaluator._pop_uint()
+    value = evaluator._pop()
+    if isinstance(value, int):
+        if index >= 64:
+            raise EvalError(f'getbit index {index} out of range')
+        evaluator._push((value >> index) & 1)
+    else:
+        if index >= len(value) * 8:
+            raise EvalError(f'getbit index {index} out of range')
+        evaluator._push((value[index // 8] >> (7 - index % 8)) & 1)
+
+
+def _op_setbit(evaluator: Evaluator, instruction: Instruction):
+    bit = evaluator._pop_uint()
+    index = evaluator._pop_uint()
+    value = evaluator._pop()
+    if bit > 1:
+        raise EvalError('setbit value must be 0 or 1')
+
+    if isinstance(value, int):
+        if index >= 64:
+            raise EvalError(f'setbit index {index} out of range')
+        evaluator._push(value | (1 << index) if bit else value & ~(1 << index))
+    else:
+        if index >= len(value) * 8:
+            raise EvalError(f'setbit index {index} out of range')
+        result = bytearray(value)
+        mask = 1 << (7 - index % 8)
+        result[index // 8] = result[index // 8] | mask if bit else result[index // 8] & ~mask
+        evaluator._push(bytes(result))
+
+
+def _op_getbyte(evaluator: Evaluator, instruction: Instruction):
+    index = evaluator._pop_uint()
+    value = evaluator._pop_bytes()
+    if index >= len(value):
+        raise EvalError(f'getbyte index {index} out of range')
+    evaluator._push(value[index])
+
+
+def _op_setbyte(evaluator: Evaluator, instruction: Instruction):
+    byte = evaluator._pop_uint()
+    index = evaluator._pop_uint()
+    value = evaluator._pop_bytes()
+    if index >= len(value):
+        raise EvalError(f'setbyte index {index} out of range')
+    if byte > 255:
+        raise EvalError('setbyte value must be lower than 256')
+    result = bytearray(value)
+    result[index] = byte
+    evaluator._push(bytes(result))
+
+
+def _op_balance(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(evaluator.state.balance(evaluator._resolve_account(evaluator._pop())))
+
+
+def _op_min_balance(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(evaluator.state.min_balance(evaluator._resolve_account(evaluator._pop())))
+
+
+def _op_app_opted_in(evaluator: Evaluator, instruction: Instruction):
+    app_id = evaluator._resolve_app(evaluator._pop_uint())
+    address = evaluator._resolve_account(evaluator._pop())
+    evaluator._push(int(evaluator.state.opted_in(address, app_id)))
+
+
+def _op_app_local_get(evaluator: Evaluator, instruction: Instruction):
+    key = evaluator._pop_bytes()
+    address = evaluator._resolve_account(evaluator._pop())
+    value = evaluator.state.local_get(address, evaluator.state.app_id, key)
+    evaluator._push(0 if value is None else value)
+
+
+def _op_app_local_get_ex(evaluator: Evaluator, instruction: Instruction):
+    key = evaluator._pop_bytes()
+    app_id = evaluator._resolve_app(evaluator._pop_uint())
+    address = evaluator._resolve_account(evaluator._pop())
+    value = evaluator.state.local_get(address, app_id, key)
+    evaluator._push(0 if value is None else value)
+    evaluator._push(int(value is not None))
+
+
+def _op_app_global_get(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator.state.global_get(evaluator.state.app_id, evaluator._pop_bytes())
+    evaluator._push(0 if value is None else value)
+
+
+def _op_app_global_get_ex(evaluator: Evaluator, instruction: Instruction):
+    key = evaluator._pop_bytes()
+    app_id = evaluator._resolve_app(evaluator._pop_uint())
+    value = evaluator.state.global_get(app_id, key)
+    evaluator._push(0 if value is None else value)
+    evaluator._push(int(value is not None))
+
+
+def _op_app_local_put(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator._pop()
+    key = evaluator._pop_bytes()
+    address = evaluator._resolve_account(evaluator._pop())
+    evaluator.state.local_put(address, key, value)
+
+
+def _op_app_global_put(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator._pop()
+    key = evaluator._pop_bytes()
+    evaluator.state.global_put(key, value)
+
+
+def _op_app_local_del(evaluator: Evaluator, instruction: Instruction):
+    key = evaluator._pop_bytes()
+    address = evaluator._resolve_account(evaluator._pop())
+    evaluator.state.local_del(address, key)
+
+
+def _op_app_global_del(evaluator: Evaluator, instruction: Instruction):
+    evaluator.state.global_del(evaluator._pop_bytes())
+
+
+def _op_asset_holding_get(evaluator: Evaluator, instruction: Instruction):
+    asset_id = evaluator._resolve_asset(evaluator._pop_uint())
+    address = evaluator._resolve_account(evaluator._pop())
+    field = ASSET_HOLDING_FIELDS[instruction.immediates[0]]
+
+    holding = evaluator.state.asset_holding(address, asset_id)
+    if holding is None:
+        evaluator._push(0)
+        evaluator._push(0)
+        return
+
+    evaluator._push(holding.amount if field == 'AssetBalance' else int(holding.frozen))
+    evaluator._push(1)
+
+
+def _op_asset_params_get(evaluator: Evaluator, instruction: Instruction):
+    asset_id = evaluator._resolve_asset(evaluator._pop_uint())
+    field = ASSET_PARAMS_FIELDS[instruction.immediates[0]]
+
+    asset = evaluator.state.asset_params(asset_id)
+    if asset is None:
+        evaluator._push(0)
+        evaluator._push(0)
+        return
+
+    evaluator._push(asset.teal_field(field))
+    evaluator._push(1)
+
+
+def _op_pushbytes(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(instruction.immediates[0])
+
+
+def _op_pushint(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(instruction.immediates[0])
+
+
+def _op_callsub(evaluator: Evaluator, instruction: Instruction):
+    if len(evaluator.call_stack) >= MAX_CALLSUB_DEPTH:
+        raise EvalError('callsub depth exceeded')
+    evaluator.call_stack.append(instruction.next_pc)
+    return instruction.immediates[0]
+
+
+def _op_retsub(evaluator: Evaluator, instruction: Instruction):
+    if len(evaluator.call_stack) == 0:
+        raise EvalError('retsub with an empty call stack')
+    return evaluator.call_stack.pop()
+
+
+def _op_shl(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_uint()
+    a = evaluator._pop_uint()
+    if b >= 64:
+        raise EvalError(f'shl by {b} bits')
+    evaluator._push((a << b) & MAX_UINT64)
+
+
+def _op_shr(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_uint()
+    a = evaluator._pop_uint()
+    if b >= 64:
+        raise EvalError(f'shr by {b} bits')
+    evaluator._push(a >> b)
+
+
+def _op_sqrt(evaluator: Evaluator, instruction: Instruction):
+    import math
+
+    evaluator._push(math.isqrt(evaluator._pop_uint()))
+
+
+def _op_bitlen(evaluator: Evaluator, instruction: Instruction):
+    value = evaluator._pop()
+    if isinstance(value, bytes):
+        value = int.from_bytes(value, 'big')
+    evaluator._push(value.bit_length())
+
+
+def _op_exp(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_uint()
+    a = evaluator._pop_uint()
+    if a == 0 and b == 0:
+        raise EvalError('0^0 is undefined')
+    if a > 1 and b >= 64:
+        raise EvalError('exp overflow')
+    evaluator._push(Evaluator._check_uint(a ** b))
+
+
+def _op_expw(evaluator: Evaluator, instruction: Instruction):
+    b = evaluator._pop_uint()
+    a = evaluator._pop_uint()
+    if a == 0 and b == 0:
+        raise EvalError('0^0 is undefined')
+    if a > 1 and b > 128:
+        raise EvalError('expw overflow')
+    result = a ** b
+    if result > 2 ** 128 - 1:
+        raise EvalError('expw overflow')
+    evaluator._push(result >> 64)
+    evaluator._push(result & MAX_UINT64)
+
+
+def _op_bitwise_bytes(function):
+    def handler(evaluator: Evaluator, instruction: Instruction):
+        b = evaluator._pop_bytes()
+        a = evaluator._pop_bytes()
+        length = max(len(a), len(b))
+        a = a.rjust(length, b'\x00')
+        b = b.rjust(length, b'\x00')
+        evaluator._push(bytes(function(x, y) for x, y in zip(a, b)))
+
+    return handler
+
+
+def _op_bytes_not(evaluator: Evaluator, instruction: Instruction):
+    evaluator._push(bytes(255 - x for x in evaluator._pop_bytes()))
+
+
+def _op_bzero(evaluator: Evaluator, instruction: Instruction):
+    length = evaluator._pop_uint()
+    if length > MAX_BYTE_LENGTH:
+        raise EvalError(f'bzero of length {length} exceeds {MAX_BYTE_LENGTH}')
+    evaluator._push(bytes(length))
+
+
+def _bytes_modulo(a: int, b: int) -> int:
+    if b == 0:
+        raise EvalError('modulo by zero')
+    return a % b
+
+
+def _bytes_division(a: int, b: int) -> int:
+    if b == 0:
+        raise EvalError('division by zero')
+    return a // b
+
+
+_HANDLERS = {
+    'err': _op_err,
+    'sha256': _op_hash(lambda value: hashlib.sha256(value).digest()),
+    'keccak256': _op_hash(_keccak256),
+    'sha512_256': _op_hash(_sha512_256),
+    'ed25519verify': _op_ed25519verify,
+    '+': _binary_uint(lambda a, b: a + b),
+    '-': _binary_uint(lambda a, b: a - b),
+    '/': _binary_uint(_division),
+    '*': _binary_uint(lambda a, b: a * b),
+    '<': _binary_uint(lambda a, b: int(a < b)),
+    '>': _binary_uint(lambda a, b: int(a > b)),
+    '<=': _binary_uint(lambda a, b: int(a <= b)),
+    '>=': _binary_uint(lambda a, b: int(a >= b)),
+    '&&': _binary_uint(lambda a, b: int(a != 0 and b != 0)),
+    '||': _binary_uint(lambda a, b: int(a != 0 or b != 0)),
+    '==': _op_compare(lambda a, b: a == b),
+    '!=': _op_compare(lambda a, b: a != b),
+    '!': _op_not,
+    'len': _op_len,
+    'itob': _op_itob,
+    'btoi': _op_btoi,
+    '%': _binary_uint(_modulo),
+    '|': _binary_uint(lambda a, b: a | b),
+    '&': _binary_uint(lambda a, b: a & b),
+    '^': _binary_uint(lambda a, b: a ^ b),
+    '~': _op_bitwise_not,
+    'mulw': _op_mulw,
+    'addw': _op_addw,
+    'divmodw': _op_divmodw,
+    'intcblock': _op_intcblock,
+    'intc': _int_constant(),
+    'intc_0': _int_constant(0),
+    'intc_1': _int_constant(1),
+    'intc_2': _int_constant(2),
+    'intc_3': _int_constant(3),
+    'bytecblock': _op_bytecblock,
+    'bytec': _byte_constant(),
+    'bytec_0': _byte_constant(0),
+    'bytec_1': _byte_constant(1),
+    'bytec_2': _byte_constant(2),
+    'bytec_3': _byte_constant(3),
+    'arg': _argument(),
+    'arg_0': _argument(0),
+    'arg_1': _argument(1),
+    'arg_2': _argument(2),
+    'arg_3': _argument(3),
+    'txn': _op_txn,
+    'global': _op_global,
+    'gtxn': _op_gtxn,
+    'load': _op_load,
+    'store': _op_store,
+    'txna': _op_txna,
+    'gtxna': _op_gtxna,
+    'gtxns': _op_gtxns,
+    'gtxnsa': _op_gtxnsa,
+    'gload': _op_gload,
+    'gloads': _op_gloads,
+    'gaid': _op_gaid,
+    'gaids': _op_gaids,
+    'bnz': _op_bnz,
+    'bz': _op_bz,
+    'b': _op_b,
+    'return': _op_return,
+    'assert': _op_assert,
+    'pop': _op_pop,
+    'dup': _op_dup,
+    'dup2': _op_dup2,
+    'dig': _op_dig,
+    'swap': _op_swap,
+    'select': _op_select,
+    'concat': _op_concat,
+    'substring': _op_substring,
+    'substring3': _op_substring3,
+    'getbit': _op_getbit,
+    'setbit': _op_setbit,
+    'getbyte': _op_getbyte,
+    'setbyte': _op_setbyte,
+    'balance': _op_balance,
+    'app_opted_in': _op_app_opted_in,
+    'app_local_get': _op_app_local_get,
+    'app_local_get_ex': _op_app_local_get_ex,
+    'app_global_get': _op_app_global_get,
+    'app_global_get_ex': _op_app_global_get_ex,
+    'app_local_put': _op_app_local_put,
+    'app_global_put': _op_app_global_put,
+    'app_local_del': _op_app_local_del,
+    'app_global_del': _op_app_global_del,
+    'asset_holding_get': _op_asset_holding_get,
+    'asset_params_get': _op_asset_params_get,
+    'min_balance': _op_min_balance,
+    'pushbytes': _op_pushbytes,
+    'pushint': _op_pushint,
+    'callsub': _op_callsub,
+    'retsub': _op_retsub,
+    'shl': _op_shl,
+    'shr': _op_shr,
+    'sqrt': _op_sqrt,
+    'bitlen': _op_bitlen,
+    'exp': _op_exp,
+    'expw': _op_expw,
+    'b+': _binary_bytes_math(lambda a, b: a + b),
+    'b-': _binary_bytes_math(lambda a, b: a - b),
+    'b/': _binary_bytes_math(_bytes_division),
+    'b*': _binary_bytes_math(lambda a, b: a * b),
+    'b<': _binary_bytes_math(lambda a, b: a < b, result_bytes=False),
+    'b>': _binary_bytes_math(lambda a, b: a > b, result_bytes=False),
+    'b<=': _binary_bytes_math(lambda a, b: a <= b, result_bytes=False),
+    'b>=': _binary_bytes_math(lambda a, b: a >= b, result_bytes=False),
+    'b==': _binary_bytes_math(lambda a, b: a == b, result_bytes=False),
+    'b!=': _binary_bytes_math(lambda a, b: a != b, result_bytes=False),
+    'b%': _binary_bytes_math(_bytes_modulo),
+    'b|': _op_bitwise_bytes(lambda x, y: x | y),
+    'b&': _op_bitwise_bytes(lambda x, y: x & y),
+    'b^': _op_bitwise_bytes(lambda x, y: x ^ y),
+    'b~': _op_bytes_not,
+    'bzero': _op_bzero,
+}
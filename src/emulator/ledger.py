@@ -0,0 +1,1002 @@
+import base64
+import copy
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Union
+
+from algosdk import constants, encoding
+from algosdk.future import transaction as algo_txn
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from src.emulator.avm import Evaluator, EvalResult, EvalError, TealValue, SIGNATURE_MODE, APPLICATION_MODE, \
+    address_bytes
+
+MIN_TXN_FEE = 1000
+MIN_BALANCE = 100000
+MAX_TXN_LIFE = 1000
+MAX_GROUP_SIZE = 16
+MAX_VALID_GROUPS = 4096
+
+ASSET_MIN_BALANCE = 100000
+APP_MIN_BALANCE = 100000
+SCHEMA_UINT_MIN_BALANCE = 28500
+SCHEMA_BYTES_MIN_BALANCE = 50000
+
+# Length of the approval and the clear program together, per program page.
+MAX_APP_PROGRAM_LENGTH = 2048
+
+MAX_KEY_LENGTH = 64
+MAX_KEY_VALUE_LENGTH = 128
+
+DEFAULT_BLOCK_SECONDS = 4.5
+GENESIS_ID = "tokility-emulator-v1"
+
+
+def new_genesis_hash() -> str:
+    """
+    :return: a genesis hash that is unique to a new ledger, like the one of a newly created private network, so the
+    caches keyed by the network never confuse the ASAs and applications of a restarted ledger with the old ones.
+    """
+    return base64.b64encode(hashlib.sha256(GENESIS_ID.encode() + os.urandom(32)).digest()).decode()
+
+
+SignedTransactionType = Union[algo_txn.SignedTransaction, algo_txn.LogicSigTransaction]
+
+
+class GroupRejectedError(Exception):
+    """
+    Raised when a transaction of a group can not be applied. None of the transactions of the group are committed.
+    """
+
+    def __init__(self, message: str, group_index: int, txid: str, eval_result: Optional[EvalResult] = None):
+        super().__init__(f"Transaction {txid} at group index {group_index} was rejected: {message}")
+        self.message = message
+        self.group_index = group_index
+        self.txid = txid
+        self.eval_result = eval_result
+
+
+class AssetHolding:
+    def __init__(self, amount: int, frozen: bool):
+        self.amount = amount
+        self.frozen = frozen
+
+    def clone(self) -> 'AssetHolding':
+        return AssetHolding(amount=self.amount, frozen=self.frozen)
+
+
+class Account:
+    def __init__(self, address: str, amount: int = 0):
+        self.address = address
+        self.amount = amount
+        self.auth_address: Optional[str] = None
+        self.assets: Dict[int, AssetHolding] = dict()
+        self.apps_local_state: Dict[int, Dict[bytes, TealValue]] = dict()
+        self.created_assets: Set[int] = set()
+        self.created_apps: Set[int] = set()
+
+    def clone(self) -> 'Account':
+        """
+        The holdings are shared with the clone, because the ledger replaces a holding instead of changing it.
+        This keeps the snapshots of accounts that hold many assets cheap.
+        """
+        account = Account(address=self.address, amount=self.amount)
+        account.auth_address = self.auth_address
+        account.assets = dict(self.assets)
+        account.apps_local_state = {app_id: dict(state) for app_id, state in self.apps_local_state.items()}
+        account.created_assets = set(self.created_assets)
+        account.created_apps = set(self.created_apps)
+        return account
+
+
+class Asset:
+    def __init__(self,
+                 index: int,
+                 creator: str,
+                 total: int,
+                 decimals: int,
+                 default_frozen: bool,
+                 unit_name: str,
+                 name: str,
+                 url: str,
+                 metadata_hash: bytes,
+                 manager: str,
+                 reserve: str,
+                 freeze: str,
+                 clawback: str):
+        self.index = index
+        self.creator = creator
+        self.total = total
+        self.decimals = decimals
+        self.default_frozen = default_frozen
+        self.unit_name = unit_name
+        self.name = name
+        self.url = url
+        self.metadata_hash = metadata_hash
+        self.manager = manager
+        self.reserve = reserve
+        self.freeze = freeze
+        self.clawback = clawback
+
+    def clone(self) -> 'Asset':
+        return copy.copy(self)
+
+    def teal_field(self, field: str) -> TealValue:
+        """
+        :return: the value of the asset_params_get field.
+        """
+        if field == 'AssetTotal':
+            return self.total
+        if field == 'AssetDecimals':
+            return self.decimals
+        if field == 'AssetDefaultFrozen':
+            return int(self.default_frozen)
+        if field == 'AssetUnitName':
+            return self.unit_name.encode()
+        if field == 'AssetName':
+            return self.name.encode()
+        if field == 'AssetURL':
+            return self.url.encode()
+        if field == 'AssetMetadataHash':
+            return self.metadata_hash
+        if field in ('AssetManager', 'AssetReserve', 'AssetFreeze', 'AssetClawback', 'AssetCreator'):
+            address = {'AssetManager': self.manager,
+                       'AssetReserve': self.reserve,
+                       'AssetFreeze': self.freeze,
+                       'AssetClawback': self.clawback,
+                       'AssetCreator': self.creator}[field]
+            return address_bytes(address)
+
+        raise EvalError(f'unsupported asset params field {field}')
+
+
+class Application:
+    def __init__(self,
+                 index: int,
+                 creator: str,
+                 approval_program: bytes,
+                 clear_program: bytes,
+                 global_schema: algo_txn.StateSchema,
+                 local_schema: algo_txn.StateSchema,
+                 extra_pages: int = 0):
+        self.index = index
+        self.creator = creator
+        self.approval_program = approval_program
+        self.clear_program = clear_program
+        self.global_schema = global_schema
+        self.local_schema = local_schema
+        self.extra_pages = extra_pages
+        self.global_state: Dict[bytes, TealValue] = dict()
+
+    def clone(self) -> 'Application':
+        application = copy.copy(self)
+        application.global_state = dict(self.global_state)
+        return application
+
+
+class TransactionResult:
+    """
+    The effects of a committed transaction, in the shape that algod reports for confirmed transactions.
+    """
+
+    def __init__(self, txid: str, signed_transaction: SignedTransactionType, group_index: int):
+        self.txid = txid
+        self.signed_transaction = signed_transaction
+        self.group_index = group_index
+        self.confirmed_round: Optional[int] = None
+        self.round_time: Optional[int] = None
+        self.asset_index: Optional[int] = None
+        self.application_index: Optional[int] = None
+        self.global_state_delta: List[dict] = []
+        self.local_state_delta: List[dict] = []
+        self.logic_sig_result: Optional[EvalResult] = None
+        self.app_result: Optional[EvalResult] = None
+
+    @property
+    def transaction(self) -> algo_txn.Transaction:
+        return self.signed_transaction.transaction
+
+    @property
+    def cost(self) -> int:
+        return sum(result.cost for result in (self.logic_sig_result, self.app_result) if result is not None)
+
+    def pending_transaction_info(self) -> dict:
+        info = {
+            "confirmed-round": self.confirmed_round,
+            "pool-error": "",
+            "txn": self.signed_transaction.dictify()
+        }
+        if self.asset_index is not None:
+            info["asset-index"] = self.asset_index
+        if self.application_index is not None:
+            info["application-index"] = self.application_index
+        if self.global_state_delta:
+            info["global-state-delta"] = self.global_state_delta
+        if self.local_state_delta:
+            info["local-state-delta"] = self.local_state_delta
+
+        return info
+
+
+def _schema(schema: Optional[algo_txn.StateSchema]) -> algo_txn.StateSchema:
+    # The decoded transactions leave the zero counts of the schemas as None.
+    if schema is None:
+        return algo_txn.StateSchema(num_uints=0, num_byte_slices=0)
+    return algo_txn.StateSchema(num_uints=schema.num_uints or 0, num_byte_slices=schema.num_byte_slices or 0)
+
+
+def teal_value_json(value: TealValue) -> dict:
+    if isinstance(value, bytes):
+        return {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0}
+    return {"type": 2, "bytes": "", "uint": value}
+
+
+def key_value_json(state: Dict[bytes, TealValue]) -> List[dict]:
+    return [{"key": base64.b64encode(key).decode(), "value": teal_value_json(value)}
+            for key, value in state.items()]
+
+
+def _state_delta(before: Dict[bytes, TealValue], writes: Dict[bytes, Optional[TealValue]]) -> List[dict]:
+    delta = []
+    for key, value in writes.items():
+        if value is None:
+            if key not in before:
+                continue
+            value_delta = {"action": 3}
+        else:
+            if before.get(key) == value and type(before.get(key)) == type(value):
+                continue
+            value_delta = {"action": 1, "bytes": base64.b64encode(value).decode()} if isinstance(value, bytes) \
+                else {"action": 2, "uint": value}
+
+        delta.append({"key": base64.b64encode(key).decode(), "value": value_delta})
+
+    return delta
+
+
+class _AppStateView:
+    """
+    The ledger as seen by a single application call. The state writes are buffered, so the ledger only
+    applies them when the program approves the transaction.
+    """
+
+    def __init__(self, ledger: 'Ledger', app_id: int, group_results: List[TransactionResult]):
+        self.ledger = ledger
+        self.app_id = app_id
+        self.group_results = group_results
+        self.global_writes: Dict[bytes, Optional[TealValue]] = dict()
+        self.local_writes: Dict[str, Dict[bytes, Optional[TealValue]]] = dict()
+
+    def app_creator(self) -> str:
+        return self.ledger._application(self.app_id).creator
+
+    def balance(self, address: str) -> int:
+        account = self.ledger.accounts.get(address)
+        return 0 if account is None else account.amount
+
+    def min_balance(self, address: str) -> int:
+        return self.ledger.min_balance(address)
+
+    def opted_in(self, address: str, app_id: int) -> bool:
+        account = self.ledger.accounts.get(address)
+        return account is not None and app_id in account.apps_local_state
+
+    def local_get(self, address: str, app_id: int, key: bytes) -> Optional[TealValue]:
+        if app_id == self.app_id and key in self.local_writes.get(address, {}):
+            return self.local_writes[address][key]
+
+        account = self.ledger.accounts.get(address)
+        if account is None or app_id not in account.apps_local_state:
+            return None
+        return account.apps_local_state[app_id].get(key)
+
+    def global_get(self, app_id: int, key: bytes) -> Optional[TealValue]:
+        if app_id == self.app_id and key in self.global_writes:
+            return self.global_writes[key]
+
+        application = self.ledger.applications.get(app_id)
+        if application is None:
+            return None
+        return application.global_state.get(key)
+
+    @staticmethod
+    def _check_key_value(key: bytes, value: Optional[TealValue]):
+        if len(key) > MAX_KEY_LENGTH:
+            raise EvalError(f'key of length {len(key)} exceeds {MAX_KEY_LENGTH}')
+        if isinstance(value, bytes) and len(key) + len(value) > MAX_KEY_VALUE_LENGTH:
+            raise EvalError(f'key and value of length {len(key) + len(value)} exceed {MAX_KEY_VALUE_LENGTH}')
+
+    def local_put(self, address: str, key: bytes, value: TealValue):
+        if not self.opted_in(address, self.app_id):
+            raise EvalError(f'{address} is not opted in to application {self.app_id}')
+        self._check_key_value(key, value)
+        self.local_writes.setdefault(address, dict())[key] = value
+
+    def local_del(self, address: str, key: bytes):
+        if not self.opted_in(address, self.app_id):
+            raise EvalError(f'{address} is not opted in to application {self.app_id}')
+        self.local_writes.setdefault(address, dict())[key] = None
+
+    def global_put(self, key: bytes, value: TealValue):
+        self._check_key_value(key, value)
+        self.global_writes[key] = value
+
+    def global_del(self, key: bytes):
+        self.global_writes[key] = None
+
+    def asset_holding(self, address: str, asset_id: int) -> Optional[AssetHolding]:
+        account = self.ledger.accounts.get(address)
+        return None if account is None else account.assets.get(asset_id)
+
+    def asset_params(self, asset_id: int) -> Optional[Asset]:
+        return self.ledger.assets.get(asset_id)
+
+    def group_scratch(self, group_index: int) -> Optional[List[TealValue]]:
+        app_result = self.group_results[group_index].app_result
+        return None if app_result is None else app_result.scratch
+
+    def group_created_id(self, group_index: int) -> Optional[int]:
+        result = self.group_results[group_index]
+        return result.asset_index if result.asset_index is not None else result.application_index
+
+
+class Ledger:
+    """
+    In-memory Algorand ledger that applies signed transaction groups the way algod does: the logic signatures
+    are evaluated first, then every transaction is applied in order, and the whole group is rolled back if any
+    transaction is rejected. The application calls are executed by the AVM Evaluator.
+    - auto_advance: every committed group is confirmed in its own round.
+    - verify_signatures: verifies the ed25519 signatures of the signed transactions, can be turned off to speed
+    up the benchmarks.
+    - fee_pooling: the fees are checked against the whole group instead of every transaction.
+    - profile: collects the opcode cost of every pc in the program evaluations, see EvalResult.pc_costs.
+    """
+
+    def __init__(self,
+                 auto_advance: bool = True,
+                 verify_signatures: bool = True,
+                 fee_pooling: bool = True,
+                 block_seconds: float = DEFAULT_BLOCK_SECONDS,
+                 timestamp: Optional[int] = None,
+                 profile: bool = False):
+        self.auto_advance = auto_advance
+        self.verify_signatures = verify_signatures
+        self.fee_pooling = fee_pooling
+        self.block_seconds = block_seconds
+        self.profile = profile
+
+        self.round = 1
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+        self.genesis_id = GENESIS_ID
+        self.genesis_hash = new_genesis_hash()
+
+        self.accounts: Dict[str, Account] = dict()
+        self.assets: Dict[int, Asset] = dict()
+        self.applications: Dict[int, Application] = dict()
+        self.transactions: Dict[str, TransactionResult] = dict()
+        self.confirmed: List[TransactionResult] = []
+
+        self._next_index = 1
+        self._valid_groups: OrderedDict = OrderedDict()
+        # Objects modified by the group that is being applied -> their state before the group.
+        self._snapshots: Optional[Dict[tuple, object]] = None
+
+    # Blocks.
+
+    def advance_round(self, rounds: int = 1):
+        self.round += rounds
+        self.timestamp += int(self.block_seconds * rounds)
+
+    def suggested_params(self) -> algo_txn.SuggestedParams:
+        return algo_txn.SuggestedParams(fee=MIN_TXN_FEE,
+                                        first=self.round,
+                                        last=self.round + MAX_TXN_LIFE,
+                                        gh=self.genesis_hash,
+                                        gen=self.genesis_id,
+                                        flat_fee=True)
+
+    def fund(self, address: str, amount: int):
+        """
+        Credits the account with microAlgos out of thin air.
+        """
+        account = self.accounts.get(address)
+        if account is None:
+            account = self.accounts[address] = Account(address=address)
+        account.amount += amount
+
+    # Reads.
+
+    def min_balance(self, address: str) -> int:
+        account = self.accounts.get(address)
+        if account is None:
+            return MIN_BALANCE
+
+        min_balance = MIN_BALANCE + ASSET_MIN_BALANCE * len(account.assets)
+        for app_id in account.apps_local_state:
+            schema = self.applications[app_id].local_schema if app_id in self.applications else None
+            min_balance += APP_MIN_BALANCE
+            if schema is not None:
+                min_balance += SCHEMA_UINT_MIN_BALANCE * schema.num_uints + \
+                               SCHEMA_BYTES_MIN_BALANCE * schema.num_byte_slices
+        for app_id in account.created_apps:
+            application = self.applications[app_id]
+            min_balance += APP_MIN_BALANCE * (1 + application.extra_pages) + \
+                           SCHEMA_UINT_MIN_BALANCE * application.global_schema.num_uints + \
+                           SCHEMA_BYTES_MIN_BALANCE * application.global_schema.num_byte_slices
+
+        return min_balance
+
+    def account_info(self, address: str) -> dict:
+        """
+        :return: the account in the shape of the algod /v2/accounts/{address} response.
+        """
+        account = self.accounts.get(address) or Account(address=address)
+
+        return {
+            "address": address,
+            "amount": account.amount,
+            "amount-without-pending-rewards": account.amount,
+            "min-balance": self.min_balance(address),
+            "pending-rewards": 0,
+            "rewards": 0,
+            "round": self.round,
+            "status": "Offline",
+            "auth-addr": account.auth_address,
+            "assets": [{"amount": holding.amount,
+                        "asset-id": asset_id,
+                        "creator": self.assets[asset_id].creator if asset_id in self.assets else "",
+                        "is-frozen": holding.frozen}
+                       for asset_id, holding in account.assets.items()],
+            "created-assets": [self.asset_info(asset_id) for asset_id in sorted(account.created_assets)],
+            "apps-local-state": [{"id": app_id,
+                                  "schema": self._schema_json(self.applications[app_id].local_schema
+                                                              if app_id in self.applications else None),
+                                  "key-value": key_value_json(state)}
+                                 for app_id, state in account.apps_local_state.items()],
+            "apps-total-schema": self._schema_json(algo_txn.StateSchema(
+                num_uints=sum(self.applications[app_id].local_schema.num_uints
+                              for app_id in account.apps_local_state if app_id in self.applications),
+                num_byte_slices=sum(self.applications[app_id].local_schema.num_byte_slices
+                                    for app_id in account.apps_local_state if app_id in self.applications))),
+            "created-apps": [self.application_info(app_id) for app_id in sorted(account.created_apps)]
+        }
+
+    @staticmethod
+    def _schema_json(schema: Optional[algo_txn.StateSchema]) -> dict:
+        if schema is None:
+            return {"num-uint": 0, "num-byte-slice": 0}
+        return {"num-uint": schema.num_uints, "num-byte-slice": schema.num_byte_slices}
+
+    def asset_info(self, asset_id: int) -> dict:
+        """
+        :return: the asset in the shape of the algod /v2/assets/{asset-id} response.
+        """
+        asset = self.assets[asset_id]
+        params = {
+            "creator": asset.creator,
+            "decimals": asset.decimals,
+            "default-frozen": asset.default_frozen,
+            "total": asset.total,
+            "unit-name": asset.unit_name,
+            "name": asset.name,
+            "url": asset.url,
+            "manager": asset.manager,
+            "reserve": asset.reserve,
+            "freeze": asset.freeze,
+            "clawback": asset.clawback
+        }
+        if asset.metadata_hash:
+            params["metadata-hash"] = base64.b64encode(asset.metadata_hash).decode()
+
+        return {"index": asset_id, "params": params}
+
+    def application_info(self, app_id: int) -> dict:
+        """
+        :return: the application in the shape of the algod /v2/applications/{application-id} response.
+        """
+        application = self._application(app_id)
+
+        return {
+            "id": app_id,
+            "params": {
+                "creator": application.creator,
+                "approval-program": base64.b64encode(application.approval_program).decode(),
+                "clear-state-program": base64.b64encode(application.clear_program).decode(),
+                "extra-program-pages": application.extra_pages,
+                "global-state": key_value_json(application.global_state),
+                "global-state-schema": self._schema_json(application.global_schema),
+                "local-state-schema": self._schema_json(application.local_schema)
+            }
+        }
+
+    def _application(self, app_id: int) -> Application:
+        if app_id not in self.applications:
+            raise EvalError(f'application {app_id} does not exist')
+        return self.applications[app_id]
+
+    # Copy-on-write snapshots of the objects that the current group modifies.
+
+    def _snapshot(self, key: tuple, current):
+        if self._snapshots is not None and key not in self._snapshots:
+            self._snapshots[key] = None if current is None else current.clone()
+
+    def _account_for_update(self, address: str, create: bool = True) -> Account:
+        account = self.accounts.get(address)
+        self._snapshot(('account', address), account)
+        if account is None:
+            if not create:
+                raise EvalError(f'account {address} does not exist')
+            account = self.accounts[address] = Account(address=address)
+        return account
+
+    def _asset_for_update(self, asset_id: int) -> Asset:
+        if asset_id not in self.assets:
+            raise EvalError(f'asset {asset_id} does not exist')
+        self._snapshot(('asset', asset_id), self.assets[asset_id])
+        return self.assets[asset_id]
+
+    def _application_for_update(self, app_id: int) -> Application:
+        application = self._application(app_id)
+        self._snapshot(('application', app_id), application)
+        return application
+
+    @staticmethod
+    def _update_holding(account: Account, asset_id: int, amount: int, frozen: Optional[bool] = None):
+        """
+        Replaces the holding instead of changing it, since the holding objects are shared with the snapshots.
+        """
+        holding = account.assets[asset_id]
+        account.assets[asset_id] = AssetHolding(amount=holding.amount + amount,
+                                                frozen=holding.frozen if frozen is None else frozen)
+
+    def _rollback(self, snapshots: Dict[tuple, object]):
+        for (kind, key), value in snapshots.items():
+            objects = {'account': self.accounts, 'asset': self.assets, 'application': self.applications}[kind]
+            if value is None:
+                objects.pop(key, None)
+            else:
+                objects[key] = value
+
+    def _new_index(self) -> int:
+        index = self._next_index
+        self._next_index += 1
+        return index
+
+    # Transaction application.
+
+    def apply_group(self, signed_transactions: List[SignedTransactionType], commit: bool = True) \
+            -> List[TransactionResult]:
+        """
+        Applies the signed transactions as a single atomic group.
+        :param signed_transactions: the signed transactions of the group, a single transaction is a group of 1.
+        :param commit: when False the group is evaluated and then rolled back, which is a dry run.
+        :return: the results of the transactions in the order of the group.
+        :raises GroupRejectedError: when any of the transactions is rejected, nothing is applied in that case.
+        """
+        if not isinstance(signed_transactions, list):
+            signed_transactions = [signed_transactions]
+
+        transactions = [signed_transaction.transaction for signed_transaction in signed_transactions]
+        txids = [transaction.get_txid() for transaction in transactions]
+        results = [TransactionResult(txid=txid, signed_transaction=signed_transaction, group_index=i)
+                   for i, (txid, signed_transaction) in enumerate(zip(txids, signed_transactions))]
+
+        self._check_group(transactions, txids)
+
+        for i, signed_transaction in enumerate(signed_transactions):
+            results[i].logic_sig_result = self._authorize(signed_transaction, transactions, i, txids[i])
+
+        snapshots = dict()
+        next_index = self._next_index
+        self._snapshots = snapshots
+        try:
+            for i, transaction in enumerate(transactions):
+                try:
+                    self._apply_transaction(transaction, transactions, i, results)
+                    self._check_min_balances(snapshots)
+                except EvalError as e:
+                    raise GroupRejectedError(str(e), group_index=i, txid=txids[i],
+                                             eval_result=results[i].app_result)
+        except GroupRejectedError:
+            self._rollback(snapshots)
+            self._next_index = next_index
+            raise
+        finally:
+            self._snapshots = None
+
+        if not commit:
+            self._rollback(snapshots)
+            self._next_index = next_index
+            return results
+
+        for result in results:
+            result.confirmed_round = self.round + 1
+            result.round_time = self.timestamp
+            self.transactions[result.txid] = result
+            self.confirmed.append(result)
+
+        if self.auto_advance:
+            self.advance_round()
+
+        return results
+
+    def _check_group(self, transactions: List[algo_txn.Transaction], txids: List[str]):
+        if len(transactions) == 0 or len(transactions) > MAX_GROUP_SIZE:
+            raise GroupRejectedError(f'group size {len(transactions)} is not between 1 and {MAX_GROUP_SIZE}',
+                                     group_index=0, txid=txids[0] if txids else '')
+
+        group_id = None
+        if len(transactions) > 1 and tuple(txids) in self._valid_groups:
+            group_id = transactions[0].group
+        elif len(transactions) > 1:
+            ungrouped = []
+            for transaction in transactions:
+                ungrouped.append(copy.copy(transaction))
+                ungrouped[-1].group = None
+            group_id = algo_txn.calculate_group_id(ungrouped)
+
+        fees = 0
+        for i, (transaction, txid) in enumerate(zip(transactions, txids)):
+            def reject(message: str):
+                raise GroupRejectedError(message, group_index=i, txid=txid)
+
+            if txid in self.transactions:
+                reject('transaction already in ledger')
+            if transaction.genesis_hash != self.genesis_hash:
+                reject('genesis hash mismatch')
+            if not transaction.first_valid_round <= self.round + 1 <= transaction.last_valid_round:
+                reject(f'round {self.round + 1} outside of {transaction.first_valid_round}--'
+                       f'{transaction.last_valid_round}')
+            if transaction.last_valid_round - transaction.first_valid_round > MAX_TXN_LIFE:
+                reject(f'validity window exceeds {MAX_TXN_LIFE} rounds')
+            if (transaction.group or None) != group_id:
+                reject('incomplete group or invalid group id')
+            if not self.fee_pooling and (transaction.fee or 0) < MIN_TXN_FEE:
+                reject(f'fee {transaction.fee or 0} below the minimum of {MIN_TXN_FEE}')
+            fees += transaction.fee or 0
+
+        if self.fee_pooling and fees < MIN_TXN_FEE * len(transactions):
+            raise GroupRejectedError(f'group fees {fees} below the minimum of {MIN_TXN_FEE * len(transactions)}',
+                                     group_index=0, txid=txids[0])
+
+        if len(transactions) > 1:
+            # The txids cover the group ids, so a group that was already validated is not hashed again.
+            self._valid_groups[tuple(txids)] = None
+            if len(self._valid_groups) > MAX_VALID_GROUPS:
+                self._valid_groups.popitem(last=False)
+
+    def _authorizer(self, transaction: algo_txn.Transaction) -> str:
+        account = self.accounts.get(transaction.sender)
+        return account.auth_address if account is not None and account.auth_address else transaction.sender
+
+    def _authorize(self,
+                   signed_transaction: SignedTransactionType,
+                   transactions: List[algo_txn.Transaction],
+                   group_index: int,
+                   txid: str) -> Optional[EvalResult]:
+        """
+        Verifies the signature of the transaction and evaluates its logic signature.
+        :return: the result of the logic signature evaluation, None for the transactions signed with a key.
+        """
+        transaction = signed_transaction.transaction
+        authorizer = self._authorizer(transaction)
+
+        if isinstance(signed_transaction, algo_txn.LogicSigTransaction):
+            lsig = signed_transaction.lsig
+            if not lsig.sig and not lsig.msig:
+                if lsig.address() != authorizer:
+                    raise GroupRejectedError('logic signature address does not match the authorizer',
+                                             group_index=group_index, txid=txid)
+            elif self.verify_signatures and not lsig.verify(address_bytes(authorizer)):
+                raise GroupRejectedError('invalid delegated logic signature', group_index=group_index, txid=txid)
+
+            result = Evaluator(program=lsig.logic,
+                               mode=SIGNATURE_MODE,
+                               group=transactions,
+                               group_index=group_index,
+                               args=lsig.args,
+                               globals_provider=self._global_field,
+                               profile=self.profile).run()
+            if not result.passed:
+                raise GroupRejectedError(f'rejected by logic: {result.error}', group_index=group_index, txid=txid,
+                                         eval_result=result)
+            return result
+
+        if signed_transaction.signature is None:
+            raise GroupRejectedError('transaction is not signed', group_index=group_index, txid=txid)
+
+        if self.verify_signatures:
+            message = constants.txid_prefix + base64.b64decode(encoding.msgpack_encode(transaction))
+            try:
+                VerifyKey(address_bytes(authorizer)).verify(message,
+                                                                      base64.b64decode(signed_transaction.signature))
+            except BadSignatureError:
+                raise GroupRejectedError('invalid signature', group_index=group_index, txid=txid)
+
+        return None
+
+    def _global_field(self, field: str) -> TealValue:
+        if field == 'MinTxnFee':
+            return MIN_TXN_FEE
+        if field == 'MinBalance':
+            return MIN_BALANCE
+        if field == 'MaxTxnLife':
+            return MAX_TXN_LIFE
+        if field == 'Round':
+            return self.round + 1
+        if field == 'LatestTimestamp':
+            return self.timestamp
+
+        raise EvalError(f'global {field} is not available')
+
+    def _check_min_balances(self, snapshots: Dict[tuple, object]):
+        for kind, address in snapshots:
+            if kind != 'account' or address not in self.accounts:
+                continue
+            account = self.accounts[address]
+            if account.amount == 0 and not (account.assets or account.apps_local_state or account.created_apps):
+                continue
+            min_balance = self.min_balance(address)
+            if account.amount < min_balance:
+                raise EvalError(f'account {address} balance {account.amount} below min {min_balance}')
+
+    def _apply_transaction(self,
+                           transaction: algo_txn.Transaction,
+                           transactions: List[algo_txn.Transaction],
+                           group_index: int,
+                           results: List[TransactionResult]):
+        sender = self._account_for_update(transaction.sender, create=False)
+        fee = transaction.fee or 0
+        if sender.amount < fee:
+            raise EvalError(f'sender balance {sender.amount} can not cover the fee {fee}')
+        sender.amount -= fee
+
+        txn_type = transaction.type
+        if txn_type == constants.payment_txn:
+            self._apply_payment(transaction)
+        elif txn_type == constants.assettransfer_txn:
+            self._apply_asset_transfer(transaction)
+        elif txn_type == constants.assetconfig_txn:
+            self._apply_asset_config(transaction, results[group_index])
+        elif txn_type == constants.assetfreeze_txn:
+            self._apply_asset_freeze(transaction)
+        elif txn_type == constants.appcall_txn:
+            self._apply_application_call(transaction, transactions, group_index, results)
+        elif txn_type != constants.keyreg_txn:
+            raise EvalError(f'unsupported transaction type {txn_type}')
+
+        if transaction.rekey_to:
+            sender = self._account_for_update(transaction.sender)
+            sender.auth_address = None if transaction.rekey_to == transaction.sender else transaction.rekey_to
+
+    def _apply_payment(self, transaction: algo_txn.PaymentTxn):
+        sender = self._account_for_update(transaction.sender)
+        amount = transaction.amt or 0
+        if sender.amount < amount:
+            raise EvalError(f'overspend: balance {sender.amount} lower than {amount}')
+
+        sender.amount -= amount
+        self._account_for_update(transaction.receiver).amount += amount
+
+        if transaction.close_remainder_to:
+            if sender.assets or sender.apps_local_state or sender.created_apps or sender.created_assets:
+                raise EvalError('can not close an account that holds assets or applications')
+            self._account_for_update(transaction.close_remainder_to).amount += sender.amount
+            del self.accounts[transaction.sender]
+
+    def _apply_asset_transfer(self, transaction: algo_txn.AssetTransferTxn):
+        asset = self.assets.get(transaction.index)
+        if asset is None:
+            raise EvalError(f'asset {transaction.index} does not exist')
+
+        amount = transaction.amount or 0
+        receiver = self._account_for_update(transaction.receiver)
+
+        if transaction.revocation_target:
+            # Clawback: the clawback address moves the asset out of any account, even a frozen one.
+            if transaction.sender != asset.clawback:
+                raise EvalError(f'{transaction.sender} is not the clawback address of asset {asset.index}')
+            if transaction.close_assets_to:
+                raise EvalError('clawback transactions can not close out the asset')
+            source = self._account_for_update(transaction.revocation_target, create=False)
+            source_holding = source.assets.get(asset.index)
+            if source_holding is None or asset.index not in receiver.assets:
+                raise EvalError(f'asset {asset.index} missing from the accounts of the clawback transfer')
+            if source_holding.amount < amount:
+                raise EvalError(f'underflow on asset {asset.index}: {source_holding.amount} < {amount}')
+            self._update_holding(source, asset.index, -amount)
+            self._update_holding(receiver, asset.index, amount)
+            return
+
+        sender = self._account_for_update(transaction.sender)
+        if transaction.sender == transaction.receiver and amount == 0 and asset.index not in sender.assets:
+            # Opt in.
+            sender.assets[asset.index] = AssetHolding(amount=0, frozen=asset.default_frozen)
+            return
+
+        sender_holding = sender.assets.get(asset.index)
+        receiver_holding = receiver.assets.get(asset.index)
+        if sender_holding is None or receiver_holding is None:
+            raise EvalError(f'asset {asset.index} missing from {transaction.sender} or {transaction.receiver}')
+        if sender_holding.frozen or receiver_holding.frozen:
+            raise EvalError(f'asset {asset.index} frozen')
+        if sender_holding.amount < amount:
+            raise EvalError(f'underflow on asset {asset.index}: {sender_holding.amount} < {amount}')
+
+        self._update_holding(sender, asset.index, -amount)
+        self._update_holding(receiver, asset.index, amount)
+
+        if transaction.close_assets_to:
+            if transaction.sender == asset.creator:
+                raise EvalError('the creator can not close out its own asset')
+            close_to = self._account_for_update(transaction.close_assets_to)
+            close_holding = close_to.assets.get(asset.index)
+            if close_holding is None:
+                raise EvalError(f'asset {asset.index} missing from {transaction.close_assets_to}')
+            if close_holding.frozen:
+                raise EvalError(f'asset {asset.index} frozen')
+            self._update_holding(close_to, asset.index, sender.assets[asset.index].amount)
+            del sender.assets[asset.index]
+
+    def _apply_asset_config(self, transaction: algo_txn.AssetConfigTxn, result: TransactionResult):
+        if not transaction.index:
+            asset_id = self._new_index()
+            self.assets[asset_id] = Asset(index=asset_id,
+                                          creator=transaction.sender,
+                                          total=transaction.total or 0,
+                                          decimals=transaction.decimals or 0,
+                                          default_frozen=bool(transaction.default_frozen),
+                                          unit_name=transaction.unit_name or '',
+                                          name=transaction.asset_name or '',
+                                          url=transaction.url or '',
+                                          metadata_hash=transaction.metadata_hash or b'',
+                                          manager=transaction.manager or '',
+                                          reserve=transaction.reserve or '',
+                                          freeze=transaction.freeze or '',
+                                          clawback=transaction.clawback or '')
+            self._snapshot(('asset', asset_id), None)
+
+            creator = self._account_for_update(transaction.sender)
+            creator.created_assets.add(asset_id)
+            creator.assets[asset_id] = AssetHolding(amount=transaction.total or 0, frozen=False)
+            result.asset_index = asset_id
+            return
+
+        asset = self._asset_for_update(transaction.index)
+        if not asset.manager or transaction.sender != asset.manager:
+            raise EvalError(f'{transaction.sender} is not the manager of asset {asset.index}')
+
+        addresses = [transaction.manager, transaction.reserve, transaction.freeze, transaction.clawback]
+        if not any(addresses):
+            # Destroy.
+            creator = self._account_for_update(asset.creator)
+            holding = creator.assets.get(asset.index)
+            if holding is None or holding.amount != asset.total:
+                raise EvalError(f'the creator must hold all of the units to destroy asset {asset.index}')
+            del creator.assets[asset.index]
+            creator.created_assets.discard(asset.index)
+            del self.assets[asset.index]
+            return
+
+        asset.manager, asset.reserve, asset.freeze, asset.clawback = [address or '' for address in addresses]
+
+    def _apply_asset_freeze(self, transaction: algo_txn.AssetFreezeTxn):
+        asset = self.assets.get(transaction.index)
+        if asset is None:
+            raise EvalError(f'asset {transaction.index} does not exist')
+        if not asset.freeze or transaction.sender != asset.freeze:
+            raise EvalError(f'{transaction.sender} is not the freeze address of asset {asset.index}')
+
+        target = self._account_for_update(transaction.target)
+        if asset.index not in target.assets:
+            raise EvalError(f'asset {asset.index} missing from {transaction.target}')
+        self._update_holding(target, asset.index, 0, frozen=bool(transaction.new_freeze_state))
+
+    def _apply_application_call(self,
+                                transaction: algo_txn.ApplicationCallTxn,
+                                transactions: List[algo_txn.Transaction],
+                                group_index: int,
+                                results: List[TransactionResult]):
+        on_complete = int(transaction.on_complete or 0)
+        result = results[group_index]
+
+        if not transaction.index:
+            extra_pages = getattr(transaction, 'extra_pages', 0) or 0
+            self._check_program_length(transaction, extra_pages)
+
+            app_id = self._new_index()
+            self.applications[app_id] = Application(index=app_id,
+                                                    creator=transaction.sender,
+                                                    approval_program=transaction.approval_program,
+                                                    clear_program=transaction.clear_program,
+                                                    global_schema=_schema(transaction.global_schema),
+                                                    local_schema=_schema(transaction.local_schema),
+                                                    extra_pages=extra_pages)
+            self._snapshot(('application', app_id), None)
+            self._account_for_update(transaction.sender).created_apps.add(app_id)
+            result.application_index = app_id
+        else:
+            app_id = transaction.index
+            self._application(app_id)
+
+        sender = self._account_for_update(transaction.sender)
+        opted_in = app_id in sender.apps_local_state
+
+        if on_complete == algo_txn.OnComplete.OptInOC:
+            if opted_in:
+                raise EvalError(f'{transaction.sender} has already opted in to application {app_id}')
+            sender.apps_local_state[app_id] = dict()
+        elif on_complete in (algo_txn.OnComplete.CloseOutOC, algo_txn.OnComplete.ClearStateOC) and not opted_in:
+            raise EvalError(f'{transaction.sender} is not opted in to application {app_id}')
+
+        application = self._application(app_id)
+        is_clear_state = on_complete == algo_txn.OnComplete.ClearStateOC
+        state = _AppStateView(ledger=self, app_id=app_id, group_results=results)
+
+        eval_result = Evaluator(program=application.clear_program if is_clear_state
+                                else application.approval_program,
+                                mode=APPLICATION_MODE,
+                                group=transactions,
+                                group_index=group_index,
+                                state=state,
+                                globals_provider=self._global_field,
+                                profile=self.profile).run()
+        result.app_result = eval_result
+
+        if not eval_result.passed and not is_clear_state:
+            raise EvalError(f'rejected by logic: {eval_result.error}')
+
+        if eval_result.passed:
+            self._commit_state(state, result)
+
+        if on_complete in (algo_txn.OnComplete.CloseOutOC, algo_txn.OnComplete.ClearStateOC):
+            del self._account_for_update(transaction.sender).apps_local_state[app_id]
+        elif on_complete == algo_txn.OnComplete.UpdateApplicationOC:
+            application = self._application_for_update(app_id)
+            self._check_program_length(transaction, application.extra_pages)
+            application.approval_program = transaction.approval_program
+            application.clear_program = transaction.clear_program
+        elif on_complete == algo_txn.OnComplete.DeleteApplicationOC:
+            self._application_for_update(app_id)
+            self._account_for_update(application.creator).created_apps.discard(app_id)
+            del self.applications[app_id]
+
+    @staticmethod
+    def _check_program_length(transaction: algo_txn.ApplicationCallTxn, extra_pages: int):
+        program_length = len(transaction.approval_program or b'') + len(transaction.clear_program or b'')
+        if program_length > MAX_APP_PROGRAM_LENGTH * (1 + extra_pages):
+            raise EvalError(f'app programs too long: {program_length} > '
+                            f'{MAX_APP_PROGRAM_LENGTH * (1 + extra_pages)} bytes')
+
+    def _commit_state(self, state: _AppStateView, result: TransactionResult):
+        if state.global_writes:
+            application = self._application_for_update(state.app_id)
+            result.global_state_delta = _state_delta(application.global_state, state.global_writes)
+            self._apply_writes(application.global_state, state.global_writes, application.global_schema)
+
+        for address, writes in state.local_writes.items():
+            account = self._account_for_update(address)
+            local_state = account.apps_local_state[state.app_id]
+            delta = _state_delta(local_state, writes)
+            if delta:
+                result.local_state_delta.append({"address": address, "delta": delta})
+            self._apply_writes(local_state, writes, self._application(state.app_id).local_schema)
+
+    @staticmethod
+    def _apply_writes(key_values: Dict[bytes, TealValue],
+                      writes: Dict[bytes, Optional[TealValue]],
+                      schema: algo_txn.StateSchema):
+        for key, value in writes.items():
+            if value is None:
+                key_values.pop(key, None)
+            else:
+                key_values[key] = value
+
+        num_uints = sum(1 for value in key_values.values() if isinstance(value, int))
+        num_byte_slices = len(key_values) - num_uints
+        if num_uints > schema.num_uints or num_byte_slices > schema.num_byte_slices:
+            raise EvalError(f'store integer count {num_uints} or bytes count {num_byte_slices} exceeds schema '
+                            f'({schema.num_uints}, {schema.num_byte_slices})')
@@ -0,0 +1,67 @@
+import json
+import os
+from typing import Dict, List
+
+import algosdk
+
+MAX_TEAL_VERSION = 4
+
+
+class OpSpec:
+    """
+    Specification of a single opcode, read from the TEAL language spec that is shipped with the algosdk.
+    """
+
+    def __init__(self, spec: dict):
+        self.opcode: int = spec['Opcode']
+        self.name: str = spec['Name']
+        self.cost: int = spec['Cost']
+        self.size: int = spec['Size']
+        self.args: str = spec.get('Args', '')
+        self.returns: str = spec.get('Returns', '')
+        self.arg_enum: List[str] = spec.get('ArgEnum', [])
+        self.immediate_note: str = spec.get('ImmediateNote', '')
+
+    def __repr__(self):
+        return f'OpSpec({self.name}, opcode={self.opcode}, cost={self.cost})'
+
+
+def _load_langspec() -> dict:
+    langspec_path = os.path.join(os.path.dirname(algosdk.__file__), 'data', 'langspec.json')
+    with open(langspec_path) as f:
+        return json.load(f)
+
+
+_langspec = _load_langspec()
+
+OPS_BY_NAME: Dict[str, OpSpec] = {op['Name']: OpSpec(op) for op in _langspec['Ops']}
+OPS_BY_OPCODE: Dict[int, OpSpec] = {op.opcode: op for op in OPS_BY_NAME.values()}
+
+# The transaction fields of txna/gtxna/gtxnsa are encoded with the indexes of the txn fields.
+TXN_FIELDS: List[str] = OPS_BY_NAME['txn'].arg_enum
+GLOBAL_FIELDS: List[str] = OPS_BY_NAME['global'].arg_enum
+ASSET_HOLDING_FIELDS: List[str] = OPS_BY_NAME['asset_holding_get'].arg_enum
+ASSET_PARAMS_FIELDS: List[str] = OPS_BY_NAME['asset_params_get'].arg_enum
+
+TYPE_ENUMS = {
+    "unknown": 0,
+    "pay": 1,
+    "keyreg": 2,
+    "acfg": 3,
+    "axfer": 4,
+    "afrz": 5,
+    "appl": 6
+}
+
+ON_COMPLETION_ENUMS = {
+    "NoOp": 0,
+    "OptIn": 1,
+    "CloseOut": 2,
+    "ClearState": 3,
+    "UpdateApplication": 4,
+    "DeleteApplication": 5
+}
+
+# Named integer constants that can be used with the int pseudo opcode.
+NAMED_INTEGER_CONSTANTS = {**{name: value for name, value in TYPE_ENUMS.items() if name != "unknown"},
+                           **ON_COMPLETION_ENUMS}
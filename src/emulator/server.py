@@ -0,0 +1,633 @@
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Set
+from urllib import parse
+
+import msgpack
+from algosdk import encoding, logic
+from algosdk.future import transaction as algo_txn
+
+from src.emulator.assembler import assemble
+from src.emulator.ledger import Ledger, GroupRejectedError, TransactionResult, MIN_TXN_FEE
+
+INDEXER_PREFIX = "/idx2"
+STATIC_PREFIX = "/ipfs"
+
+DEFAULT_INDEXER_LIMIT = 100
+MAX_INDEXER_LIMIT = 1000
+STATUS_WAIT_SECONDS = 60
+
+ON_COMPLETION_NAMES = {
+    0: "noop",
+    1: "optin",
+    2: "closeout",
+    3: "clear",
+    4: "update",
+    5: "delete"
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _json_safe(value):
+    """
+    Converts the msgpack dictionaries of the algosdk objects to JSON, the bytes are encoded with base64 like algod
+    does.
+    """
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def _b64(value: Optional[bytes]) -> Optional[str]:
+    return base64.b64encode(value).decode() if value else None
+
+
+def indexer_transaction(result: TransactionResult, intra_round_offset: int) -> dict:
+    """
+    :return: the confirmed transaction in the shape of the indexer /v2/transactions response.
+    """
+    transaction = result.transaction
+
+    indexed = {
+        "id": result.txid,
+        "sender": transaction.sender,
+        "fee": transaction.fee,
+        "first-valid": transaction.first_valid_round,
+        "last-valid": transaction.last_valid_round,
+        "confirmed-round": result.confirmed_round,
+        "round-time": result.round_time,
+        "intra-round-offset": intra_round_offset,
+        "tx-type": transaction.type,
+        "genesis-hash": transaction.genesis_hash,
+        "genesis-id": transaction.genesis_id
+    }
+    if transaction.group:
+        indexed["group"] = _b64(transaction.group)
+    if transaction.note:
+        indexed["note"] = _b64(transaction.note)
+    if transaction.rekey_to:
+        indexed["rekey-to"] = transaction.rekey_to
+    if result.global_state_delta:
+        indexed["global-state-delta"] = result.global_state_delta
+    if result.local_state_delta:
+        indexed["local-state-delta"] = result.local_state_delta
+
+    if isinstance(transaction, algo_txn.PaymentTxn):
+        indexed["payment-transaction"] = {"amount": transaction.amt or 0,
+                                          "receiver": transaction.receiver,
+                                          "close-remainder-to": transaction.close_remainder_to}
+    elif isinstance(transaction, algo_txn.AssetTransferTxn):
+        indexed["asset-transfer-transaction"] = {"amount": transaction.amount or 0,
+                                                 "asset-id": transaction.index,
+                                                 "receiver": transaction.receiver,
+                                                 "sender": transaction.revocation_target,
+                                                 "close-to": transaction.close_assets_to}
+    elif isinstance(transaction, algo_txn.AssetConfigTxn):
+        indexed["asset-config-transaction"] = {"asset-id": transaction.index or 0}
+        if result.asset_index is not None:
+            indexed["created-asset-index"] = result.asset_index
+    elif isinstance(transaction, algo_txn.AssetFreezeTxn):
+        indexed["asset-freeze-transaction"] = {"asset-id": transaction.index,
+                                               "address": transaction.target,
+                                               "new-freeze-status": bool(transaction.new_freeze_state)}
+    elif isinstance(transaction, algo_txn.ApplicationCallTxn):
+        indexed["application-transaction"] = {
+            "application-id": transaction.index or 0,
+            "on-completion": ON_COMPLETION_NAMES[int(transaction.on_complete or 0)],
+            "application-args": [_b64(arg) or "" for arg in (transaction.app_args or [])],
+            "accounts": list(transaction.accounts or []),
+            "foreign-assets": list(transaction.foreign_assets or []),
+            "foreign-apps": list(transaction.foreign_apps or [])
+        }
+        if result.application_index is not None:
+            indexed["created-application-index"] = result.application_index
+
+    return indexed
+
+
+class LocalAlgorandNode:
+    """
+    algod and indexer stand-in backed by an in-memory Ledger. The submitted groups are applied to the ledger
+    right away, the same way as the transaction pool of algod evaluates them against the pending block, and they
+    are confirmed when the block is sealed every block_seconds. With block_seconds=0 every submitted group is
+    confirmed in its own block immediately.
+    """
+
+    def __init__(self, ledger: Optional[Ledger] = None, block_seconds: float = 0):
+        self.ledger = ledger or Ledger(auto_advance=False, block_seconds=block_seconds or 1)
+        self.ledger.auto_advance = False
+        self.block_seconds = block_seconds
+
+        self.lock = threading.RLock()
+        self.new_block = threading.Condition(self.lock)
+        self.last_block_time = time.monotonic()
+        # Transactions of the pending block.
+        self.pending: Set[str] = set()
+
+        self._stopped = threading.Event()
+        self._block_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.block_seconds > 0 and self._block_thread is None:
+            self._block_thread = threading.Thread(target=self._produce_blocks, daemon=True)
+            self._block_thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _produce_blocks(self):
+        while not self._stopped.wait(self.block_seconds):
+            self.seal_block()
+
+    def seal_block(self):
+        with self.lock:
+            self.ledger.advance_round()
+            if self.block_seconds > 0:
+                self.ledger.timestamp = max(self.ledger.timestamp, int(time.time()))
+            self.pending.clear()
+            self.last_block_time = time.monotonic()
+            self.new_block.notify_all()
+
+    def is_sealed(self, result: TransactionResult) -> bool:
+        return result.txid not in self.pending
+
+    # algod.
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "last-round": self.ledger.round,
+                "last-version": "tokility-emulator",
+                "next-version": "tokility-emulator",
+                "next-version-round": self.ledger.round + 1,
+                "next-version-supported": True,
+                "time-since-last-round": int((time.monotonic() - self.last_block_time) * 1e9),
+                "catchup-time": 0,
+                "stopped-at-unsupported-round": False
+            }
+
+    def status_after_block(self, round_number: int) -> dict:
+        deadline = time.monotonic() + STATUS_WAIT_SECONDS
+        with self.new_block:
+            while self.ledger.round <= round_number:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.new_block.wait(remaining)
+
+        return self.status()
+
+    def transaction_params(self) -> dict:
+        with self.lock:
+            return {
+                "consensus-version": "tokility-emulator",
+                "fee": 0,
+                "genesis-hash": self.ledger.genesis_hash,
+                "genesis-id": self.ledger.genesis_id,
+                "last-round": self.ledger.round,
+                "min-fee": MIN_TXN_FEE
+            }
+
+    def send_raw_transactions(self, raw: bytes) -> str:
+        signed_transactions = self._decode_transactions(raw)
+
+        with self.lock:
+            try:
+                results = self.ledger.apply_group(signed_transactions)
+            except GroupRejectedError as e:
+                raise HTTPError(400, f'TransactionPool.Remember: {e}')
+
+            if self.block_seconds > 0:
+                self.pending.update(result.txid for result in results)
+            else:
+                self.seal_block()
+
+        return results[0].txid
+
+    @staticmethod
+    def _decode_transactions(raw: bytes) -> list:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(raw)
+
+        try:
+            signed_transactions = [encoding.future_msgpack_decode(decoded) for decoded in unpacker]
+        except Exception as e:
+            raise HTTPError(400, f'failed to decode the transactions: {e}')
+
+        for signed_transaction in signed_transactions:
+            if not isinstance(signed_transaction, (algo_txn.SignedTransaction, algo_txn.LogicSigTransaction)):
+                raise HTTPError(400, 'only signed and logic signed transactions are supported')
+        if len(signed_transactions) == 0:
+            raise HTTPError(400, 'empty transaction group')
+
+        return signed_transactions
+
+    def pending_transaction_info(self, txid: str) -> dict:
+        with self.lock:
+            result = self.ledger.transactions.get(txid)
+            if result is None:
+                raise HTTPError(404, 'txn does not exist')
+
+            if not self.is_sealed(result):
+                return {"confirmed-round": 0,
+                        "pool-error": "",
+                        "txn": _json_safe(result.signed_transaction.dictify())}
+
+            return _json_safe(result.pending_transaction_info())
+
+    def compile(self, source: str) -> dict:
+        try:
+            program = assemble(source)
+        except Exception as e:
+            raise HTTPError(400, str(e))
+
+        return {"hash": logic.address(program), "result": base64.b64encode(program).decode()}
+
+    def account_info(self, address: str) -> dict:
+        if not encoding.is_valid_address(address):
+            raise HTTPError(400, f'failed to parse the address {address}')
+
+        with self.lock:
+            return self.ledger.account_info(address)
+
+    def asset_info(self, asset_id: int) -> dict:
+        with self.lock:
+            if asset_id not in self.ledger.assets:
+                raise HTTPError(404, 'asset does not exist')
+            return self.ledger.asset_info(asset_id)
+
+    def application_info(self, app_id: int) -> dict:
+        with self.lock:
+            if app_id not in self.ledger.applications:
+                raise HTTPError(404, 'application does not exist')
+            return self.ledger.application_info(app_id)
+
+    def dispense(self, address: str, amount: int) -> dict:
+        """
+        Funds an account, replaces the testnet dispenser.
+        """
+        if not encoding.is_valid_address(address):
+            raise HTTPError(400, f'failed to parse the address {address}')
+
+        with self.lock:
+            self.ledger.fund(address, amount)
+            return {"address": address, "amount": self.ledger.accounts[address].amount}
+
+    # indexer.
+
+    @staticmethod
+    def _limit(query: Dict[str, str]) -> int:
+        return min(int(query.get("limit", DEFAULT_INDEXER_LIMIT)), MAX_INDEXER_LIMIT)
+
+    def indexer_accounts(self, query: Dict[str, str]) -> dict:
+        application_id = int(query["application-id"]) if "application-id" in query else None
+        asset_id = int(query["asset-id"]) if "asset-id" in query else None
+        limit = self._limit(query)
+        next_address = query.get("next", "")
+
+        with self.lock:
+            addresses = sorted(address for address, account in self.ledger.accounts.items()
+                               if address > next_address and
+                               (application_id is None or application_id in account.apps_local_state) and
+                               (asset_id is None or asset_id in account.assets))
+            page = addresses[:limit]
+
+            response = {"accounts": [self.ledger.account_info(address) for address in page],
+                        "current-round": self.ledger.round}
+            if len(page) == limit:
+                response["next-token"] = page[-1]
+
+            return response
+
+    def indexer_account(self, address: str) -> dict:
+        with self.lock:
+            if address not in self.ledger.accounts:
+                raise HTTPError(404, f'no accounts found for address: {address}')
+            return {"account": self.ledger.account_info(address), "current-round": self.ledger.round}
+
+    def indexer_block(self, round_number: int) -> dict:
+        with self.lock:
+            if not 1 <= round_number <= self.ledger.round:
+                raise HTTPError(404, f'error while looking up block for round: {round_number}')
+            return {"round": round_number,
+                    "genesis-hash": self.ledger.genesis_hash,
+                    "genesis-id": self.ledger.genesis_id}
+
+    def indexer_asset(self, asset_id: int) -> dict:
+        with self.lock:
+            if asset_id not in self.ledger.assets:
+                raise HTTPError(404, f'no assets found for asset-id: {asset_id}')
+            return {"asset": self.ledger.asset_info(asset_id), "current-round": self.ledger.round}
+
+    def indexer_assets(self, query: Dict[str, str]) -> dict:
+        creator = query.get("creator")
+        limit = self._limit(query)
+        next_asset_id = int(query.get("next", 0))
+
+        with self.lock:
+            asset_ids = sorted(asset_id for asset_id, asset in self.ledger.assets.items()
+                               if asset_id > next_asset_id and (creator is None or asset.creator == creator))
+            page = asset_ids[:limit]
+
+            response = {"assets": [self.ledger.asset_info(asset_id) for asset_id in page],
+                        "current-round": self.ledger.round}
+            if len(page) == limit:
+                response["next-token"] = str(page[-1])
+
+            return response
+
+    def indexer_asset_balances(self, asset_id: int, query: Dict[str, str]) -> dict:
+        greater_than = int(query["currency-greater-than"]) if "currency-greater-than" in query else None
+        less_than = int(query["currency-less-than"]) if "currency-less-than" in query else None
+        limit = self._limit(query)
+        next_address = query.get("next", "")
+
+        with self.lock:
+            if asset_id not in self.ledger.assets:
+                raise HTTPError(404, f'no assets found for asset-id: {asset_id}')
+
+            balances = []
+            for address in sorted(self.ledger.accounts):
+                holding = self.ledger.accounts[address].assets.get(asset_id)
+                if address <= next_address or holding is None or \
+                        (greater_than is not None and holding.amount <= greater_than) or \
+                        (less_than is not None and holding.amount >= less_than):
+                    continue
+
+                balances.append({"address": address,
+                                 "amount": holding.amount,
+                                 "is-frozen": holding.frozen,
+                                 "deleted": False})
+                if len(balances) == limit:
+                    break
+
+            response = {"balances": balances, "current-round": self.ledger.round}
+            if len(balances) == limit:
+                response["next-token"] = balances[-1]["address"]
+
+            return response
+
+    def indexer_transactions(self, query: Dict[str, str]) -> dict:
+        application_id = int(query["application-id"]) if "application-id" in query else None
+        asset_id = int(query["asset-id"]) if "asset-id" in query else None
+        address = query.get("address")
+        min_round = int(query.get("min-round", 0))
+        max_round = int(query["max-round"]) if "max-round" in query else None
+        limit = self._limit(query)
+        position = int(query.get("next", 0))
+
+        def matches(result: TransactionResult) -> bool:
+            transaction = result.transaction
+            if result.confirmed_round < min_round or (max_round is not None and result.confirmed_round > max_round):
+                return False
+            if application_id is not None and (transaction.type != 'appl' or
+                                               (transaction.index or result.application_index) != application_id):
+                return False
+            if asset_id is not None and getattr(transaction, 'index', None) != asset_id:
+                return False
+            if address is not None and address not in (transaction.sender, getattr(transaction, 'receiver', None)):
+                return False
+            return True
+
+        with self.lock:
+            confirmed = self.ledger.confirmed
+            transactions = []
+            intra_round_offset = 0
+            previous_round = None
+            while position < len(confirmed) and len(transactions) < limit:
+                result = confirmed[position]
+                position += 1
+                if not self.is_sealed(result):
+                    break
+
+                intra_round_offset = intra_round_offset + 1 if result.confirmed_round == previous_round else 0
+                previous_round = result.confirmed_round
+                if matches(result):
+                    transactions.append(indexer_transaction(result, intra_round_offset))
+
+            response = {"transactions": transactions, "current-round": self.ledger.round}
+            if len(transactions) == limit:
+                response["next-token"] = str(position)
+
+            return response
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: 'LocalAlgorandServer'
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written separately, which waits for the delayed ACK of the client on a kept-alive
+    # connection unless Nagle's algorithm is disabled, as it is by the Go HTTP server of algod.
+    disable_nagle_algorithm = True
+
+    ALGOD_ROUTES = [
+        ("GET", re.compile(r"^/health$"), lambda node, match, query, body: None),
+        ("GET", re.compile(r"^/v2/status$"), lambda node, match, query, body: node.status()),
+        ("GET", re.compile(r"^/v2/status/wait-for-block-after/(\d+)$"),
+         lambda node, match, query, body: node.status_after_block(int(match.group(1)))),
+        ("GET", re.compile(r"^/v2/transactions/params$"),
+         lambda node, match, query, body: node.transaction_params()),
+        ("POST", re.compile(r"^/v2/transactions$"),
+         lambda node, match, query, body: {"txId": node.send_raw_transactions(body)}),
+        ("GET", re.compile(r"^/v2/transactions/pending/([A-Z2-7]+)$"),
+         lambda node, match, query, body: node.pending_transaction_info(match.group(1))),
+        ("POST", re.compile(r"^/v2/teal/compile$"),
+         lambda node, match, query, body: node.compile(body.decode('utf-8'))),
+        ("GET", re.compile(r"^/v2/accounts/([A-Z2-7]+)$"),
+         lambda node, match, query, body: node.account_info(match.group(1))),
+        ("GET", re.compile(r"^/v2/assets/(\d+)$"),
+         lambda node, match, query, body: node.asset_info(int(match.group(1)))),
+        ("GET", re.compile(r"^/v2/applications/(\d+)$"),
+         lambda node, match, query, body: node.application_info(int(match.group(1)))),
+        ("POST", re.compile(r"^/dispense$"),
+         lambda node, match, query, body: node.dispense(query["address"], int(query.get("amount", 10_000_000)))),
+    ]
+
+    INDEXER_ROUTES = [
+        ("GET", re.compile(r"^/health$"), lambda node, match, query, body: {"round": node.ledger.round}),
+        ("GET", re.compile(r"^/v2/accounts$"), lambda node, match, query, body: node.indexer_accounts(query)),
+        ("GET", re.compile(r"^/v2/accounts/([A-Z2-7]+)$"),
+         lambda node, match, query, body: node.indexer_account(match.group(1))),
+        ("GET", re.compile(r"^/v2/blocks/(\d+)$"),
+         lambda node, match, query, body: node.indexer_block(int(match.group(1)))),
+        ("GET", re.compile(r"^/v2/assets$"), lambda node, match, query, body: node.indexer_assets(query)),
+        ("GET", re.compile(r"^/v2/assets/(\d+)$"),
+         lambda node, match, query, body: node.indexer_asset(int(match.group(1)))),
+        ("GET", re.compile(r"^/v2/assets/(\d+)/balances$"),
+         lambda node, match, query, body: node.indexer_asset_balances(int(match.group(1)), query)),
+        ("GET", re.compile(r"^/v2/transactions$"),
+         lambda node, match, query, body: node.indexer_transactions(query)),
+    ]
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _send(self, code: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        self.server.inject_latency()
+
+        url = parse.urlsplit(self.path)
+        query = dict(parse.parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length > 0 else b""
+
+        path = url.path
+        if path.startswith(STATIC_PREFIX + "/") and self.server.static_dir is not None:
+            self._send_static(path[len(STATIC_PREFIX) + 1:])
+            return
+
+        routes = self.ALGOD_ROUTES
+        if path.startswith(INDEXER_PREFIX + "/"):
+            routes = self.INDEXER_ROUTES
+            path = path[len(INDEXER_PREFIX):]
+
+        try:
+            for route_method, pattern, handler in routes:
+                match = pattern.match(path)
+                if match is not None and route_method == method:
+                    response = handler(self.server.node, match, query, body)
+                    self._send(200, json.dumps(response).encode())
+                    return
+            raise HTTPError(404, f'{method} {url.path} is not supported')
+        except HTTPError as e:
+            self._send(e.code, json.dumps({"message": e.message}).encode())
+        except Exception as e:
+            self._send(500, json.dumps({"message": f'{type(e).__name__}: {e}'}).encode())
+
+    def _send_static(self, relative_path: str):
+        root = os.path.realpath(self.server.static_dir)
+        path = os.path.realpath(os.path.join(root, parse.unquote(relative_path)))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            self._send(404, json.dumps({"message": "file not found"}).encode())
+            return
+
+        with open(path, 'rb') as f:
+            self._send(200, f.read(), content_type="application/json" if path.endswith(".json")
+                       else "application/octet-stream")
+
+
+class LocalAlgorandServer(ThreadingHTTPServer):
+    """
+    Serves the algod API at the root, the indexer API under /idx2 and, optionally, the files of static_dir under
+    /ipfs, so the IPFS urls of the tickets resolve offline as well.
+    - latency_seconds / latency_jitter_seconds: delay added to every request, to mimic a remote node.
+    """
+    daemon_threads = True
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 4001,
+                 node: Optional[LocalAlgorandNode] = None,
+                 latency_seconds: float = 0,
+                 latency_jitter_seconds: float = 0,
+                 static_dir: Optional[str] = None,
+                 verbose: bool = False):
+        super().__init__((host, port), _RequestHandler)
+        self.node = node or LocalAlgorandNode()
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.static_dir = static_dir
+        self.verbose = verbose
+
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def indexer_address(self) -> str:
+        return self.address + INDEXER_PREFIX
+
+    def inject_latency(self):
+        delay = self.latency_seconds + random.uniform(0, self.latency_jitter_seconds)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self):
+        """
+        Serves the requests from a background thread.
+        """
+        self.node.start()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.node.stop()
+        self.shutdown()
+        self.server_close()
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local algod and indexer stand-in backed by an in-memory ledger.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4001)
+    parser.add_argument("--block-seconds", type=float, default=0,
+                        help="time between blocks, 0 confirms every group immediately")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra delay added to every request")
+    parser.add_argument("--static-dir", default=None, help="directory served under /ipfs")
+    parser.add_argument("--fund", action="append", default=[], metavar="ADDRESS=MICRO_ALGOS",
+                        help="accounts funded at startup")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(args)
+
+    server = LocalAlgorandServer(host=args.host,
+                                 port=args.port,
+                                 node=LocalAlgorandNode(block_seconds=args.block_seconds),
+                                 latency_seconds=args.latency_ms / 1000,
+                                 latency_jitter_seconds=args.jitter_ms / 1000,
+                                 static_dir=args.static_dir,
+                                 verbose=args.verbose)
+
+    for funding in args.fund:
+        address, amount = funding.split("=")
+        server.node.dispense(address, int(amount))
+
+    print(f'algod: {server.address}')
+    print(f'indexer: {server.indexer_address}')
+    if args.static_dir is not None:
+        print(f'static files: {server.address}{STATIC_PREFIX}/')
+
+    server.node.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.node.stop()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
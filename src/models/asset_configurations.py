@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, NamedTuple, Tuple
 from algosdk.encoding import decode_address
 from datetime import datetime
+from hashlib import sha256
 import os
 
 
@@ -122,3 +123,39 @@ class ASAConfiguration(BaseModel):
                self.gifting_allowed_bytes + \
                self.dash_bytes + \
                self.asa_creator_address_bytes
+
+    @property
+    def configuration_arguments(self) -> Tuple[bytes, ...]:
+        """
+        The configuration arguments of the DEX application calls, in the order in which they are hashed.
+        """
+        return (self.asa_price_bytes,
+                self.tokiliy_fee_bytes,
+                self.max_sell_price_bytes,
+                self.owner_fee_bytes,
+                self.reselling_allowed_bytes,
+                self.reselling_end_date_bytes,
+                self.gifting_allowed_bytes,
+                self.asa_creator_address_bytes)
+
+
+class EncodedASAConfiguration(NamedTuple):
+    """
+    The encoding of an ASAConfiguration that the DEX transactions are built from, computed once instead of on every
+    transaction.
+    - app_args: the 8 configuration arguments of the application calls.
+    - metadata_preimage: the arguments joined with dashes, the same bytes as ASAConfiguration.metadata_hash.
+    - metadata_hash: the sha256 digest of the preimage, which is stored in the metadata hash of the ASA.
+    """
+    app_args: Tuple[bytes, ...]
+    metadata_preimage: bytes
+    metadata_hash: bytes
+
+    @classmethod
+    def from_configuration(cls, asa_configuration: ASAConfiguration) -> 'EncodedASAConfiguration':
+        app_args = asa_configuration.configuration_arguments
+        metadata_preimage = b'-'.join(app_args)
+
+        return cls(app_args=app_args,
+                   metadata_preimage=metadata_preimage,
+                   metadata_hash=sha256(metadata_preimage).digest())
@@ -1,14 +1,26 @@
+import logging
 from algosdk.v2client import algod
+from algosdk.error import AlgodHTTPError
 from src.models.asset_configurations import ASAConfiguration
-from src.blockchain_utils.transaction_repository import ASATransactionRepository
+from src.blockchain_utils.transaction_repository import ASATransactionRepository, get_default_suggested_params
 from src.services import NetworkInteraction
-from src.smart_contracts.tokility_clawback_asc1 import TokilityClawbackASC1
+from src.services.encoded_configuration_cache import get_encoded_configuration_cache
+from src.services.confirmation_tracker import get_confirmation_tracker, TransactionExpiredError, \
+    TransactionRejectedError
+from src.services.mint_journal import MintJournal
+from src.smart_contracts.compilation_cache import get_compilation_cache, clawback_program
 import algosdk
-from pyteal import compileTeal, Mode
-from hashlib import sha256
+from algosdk.future.transaction import SuggestedParams
+from typing import Optional, Iterable, List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor, Future
+import base64
+
+logger = logging.getLogger(__name__)
 
 
 class ASAService:
+    MAX_GROUP_SIZE = 16
+
     def __init__(self,
                  creator_addr: str,
                  creator_pk: str,
@@ -22,17 +34,14 @@ class ASAService:
         self.database = dict()
 
     @property
-    def clawback_address_bytes(self):
-        tokility_clawback_asc1 = TokilityClawbackASC1(app_id=self.tokility_dex_app_id)
-
-        clawback_asc1_compiled = compileTeal(tokility_clawback_asc1.pyteal_code(),
-                                             mode=Mode.Signature,
-                                             version=4)
-
-        clawback_asc1_compiled_bytes = NetworkInteraction.compile_program(client=self.client,
-                                                                          source_code=clawback_asc1_compiled)
+    def clawback_teal(self) -> str:
+        return get_compilation_cache().teal(clawback_program(app_id=self.tokility_dex_app_id))
 
-        return clawback_asc1_compiled_bytes
+    @property
+    def clawback_address_bytes(self):
+        # Served from the compilation cache, so only the first read in any process compiles the logic sig.
+        return get_compilation_cache().compile(client=self.client,
+                                               program=clawback_program(app_id=self.tokility_dex_app_id))
 
     @property
     def clawback_address(self):
@@ -44,38 +53,307 @@ class ASAService:
         :param asa_configuration: Configuration that defines the ASA.
         :return: (int, str): returns the tuple of the ASA_ID and the TXN_ID that created the ASA.
         """
-        txn = ASATransactionRepository.create_non_fungible_asa(
+        txn = self.create_asa_transaction(asa_configuration=asa_configuration,
+                                          clawback_address=self.clawback_address)
+
+        asa_id, tx_id = NetworkInteraction.submit_asa_creation(client=self.client,
+                                                               transaction=txn)
+
+        self._register_asa(asa_id=asa_id, asa_configuration=asa_configuration)
+
+        return asa_id, tx_id
+
+    def create_asa_transaction(self,
+                               asa_configuration: ASAConfiguration,
+                               clawback_address: str,
+                               suggested_params: Optional[SuggestedParams] = None,
+                               note: Optional[bytes] = None,
+                               sign_transaction: bool = True):
+        """
+        Builds the creation transaction of the ASA defined by the given ASAConfiguration.
+        :param asa_configuration: Configuration that defines the ASA.
+        :param clawback_address: address of the Tokility clawback logic signature.
+        :param suggested_params: params to use instead of the client's default suggested params.
+        :param note:
+        :param sign_transaction:
+        :return:
+        """
+        return ASATransactionRepository.create_non_fungible_asa(
             client=self.client,
             creator_private_key=self.creator_pk,
             unit_name=asa_configuration.unit_name,
             asset_name=asa_configuration.asset_name,
-            note=None,
+            note=note,
             manager_address="",
             reserve_address="",
             freeze_address="",
-            clawback_address=self.clawback_address,
+            clawback_address=clawback_address,
             url=asa_configuration.configuration_ipfs_url,
-            metadata_hash=sha256(asa_configuration.metadata_hash).digest(),
+            metadata_hash=get_encoded_configuration_cache().encode(asa_configuration).metadata_hash,
             default_frozen=True,
-            sign_transaction=True,
+            sign_transaction=sign_transaction,
+            suggested_params=suggested_params
         )
 
-        asa_id, tx_id = NetworkInteraction.submit_asa_creation(client=self.client,
-                                                               transaction=txn)
+    def create_asas(self,
+                    asa_configurations: Iterable[ASAConfiguration],
+                    journal_path: Optional[str] = None,
+                    group_size: int = MAX_GROUP_SIZE,
+                    max_groups_in_flight: int = 32,
+                    signing_workers: int = 8) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Bulk mints the ASAs defined by the given configurations. The creation transactions are submitted in
+        atomic groups of up to group_size transactions, the next batch of groups is signed in parallel while the
+        current one is being confirmed, and all confirmations are tracked concurrently.
+
+        When a journal_path is given, every group is appended to a MintJournal before it is submitted, and every
+        confirmed or failed ASA after it, so rerunning the same mint skips the already minted configurations.
+        :param asa_configurations: Configurations that define the ASAs.
+        :param journal_path: path of the append-only journal file.
+        :param group_size: number of creation transactions per atomic group, at most 16.
+        :param max_groups_in_flight: number of groups submitted before waiting for their confirmation.
+        :param signing_workers: number of threads used for signing.
+        :return: list of (ASA_ID, TXN_ID) tuples in the order of the given configurations. Both are None for the
+        ASAs whose creation failed.
+        :raises ValueError: if two of the configurations are identical apart from the asa_id.
+        """
+        if not 1 <= group_size <= self.MAX_GROUP_SIZE:
+            raise ValueError(f"group_size should be between 1 and {self.MAX_GROUP_SIZE}")
+
+        asa_configurations = list(asa_configurations)
+        journal = MintJournal(journal_path) if journal_path is not None else None
+
+        configurations_by_hash: Dict[str, ASAConfiguration] = dict()
+        for asa_configuration in asa_configurations:
+            configuration_hash = MintJournal.configuration_hash(asa_configuration)
+            if configuration_hash in configurations_by_hash:
+                raise ValueError(f"Duplicate ASA configuration {asa_configuration.asset_name}, every configuration "
+                                 f"is minted once and identified by its hash {configuration_hash}")
+            configurations_by_hash[configuration_hash] = asa_configuration
+
+        minted: Dict[str, Tuple[int, str]] = dict()
+        to_mint: List[str] = []
+        submitted: List[str] = []
+
+        for configuration_hash in configurations_by_hash:
+            entry = journal.get(configuration_hash) if journal is not None else None
+
+            if entry is None or entry["status"] == MintJournal.FAILED:
+                to_mint.append(configuration_hash)
+            elif entry["status"] == MintJournal.CONFIRMED:
+                minted[configuration_hash] = (entry["asa_id"], entry["tx_id"])
+            else:
+                submitted.append(configuration_hash)
+
+        if len(submitted) > 0:
+            to_mint.extend(self._reconcile_submitted(journal, submitted, configurations_by_hash, minted))
+
+        print(f'Minting {len(to_mint)} ASAs, {len(minted)} already minted.')
+
+        clawback_address = self.clawback_address
+        groups = [to_mint[i:i + group_size] for i in range(0, len(to_mint), group_size)]
+        batches = [groups[i:i + max_groups_in_flight] for i in range(0, len(groups), max_groups_in_flight)]
+
+        with ThreadPoolExecutor(max_workers=signing_workers) as executor:
+            signing = self._sign_batch(executor, batches[0], configurations_by_hash, clawback_address) \
+                if len(batches) > 0 else []
+
+            for i in range(len(batches)):
+                signed_groups = [future.result() for future in signing]
+
+                in_flight = [self._submit_creation_group(journal, group, signed_group)
+                             for group, signed_group in zip(batches[i], signed_groups)]
+
+                if i + 1 < len(batches):
+                    signing = self._sign_batch(executor, batches[i + 1], configurations_by_hash, clawback_address)
 
+                for group, (signed_group, futures) in zip(batches[i], in_flight):
+                    self._collect_creation_group(journal, group, signed_group, futures, minted)
+
+        results = []
+        for asa_configuration in asa_configurations:
+            configuration_hash = MintJournal.configuration_hash(asa_configuration)
+            if configuration_hash not in minted:
+                results.append((None, None))
+                continue
+
+            asa_id, tx_id = minted[configuration_hash]
+            self._register_asa(asa_id=asa_id, asa_configuration=asa_configuration)
+            results.append((asa_id, tx_id))
+
+        return results
+
+    def _reconcile_submitted(self,
+                             journal: MintJournal,
+                             submitted: List[str],
+                             configurations_by_hash: Dict[str, ASAConfiguration],
+                             minted: Dict[str, Tuple[int, str]]) -> List[str]:
+        """
+        Resolves the journal entries that were submitted but never confirmed, e.g. because of a crash.
+        The ASAs that already exist are found among the creator's created assets, the ones that are still pending
+        are waited for and the rest are returned to be minted again.
+        """
+        created_assets = dict()
+        for asset in self.client.account_info(self.creator_addr).get('created-assets', []):
+            params = asset['params']
+            created_assets[(params.get('url'), params.get('metadata-hash'), params.get('name'))] = asset['index']
+
+        tracker = get_confirmation_tracker(self.client)
+        pending = []
+        for configuration_hash in submitted:
+            asa_configuration = configurations_by_hash[configuration_hash]
+            entry = journal.get(configuration_hash)
+            key = (asa_configuration.configuration_ipfs_url,
+                   base64.b64encode(get_encoded_configuration_cache().encode(asa_configuration).metadata_hash).decode(),
+                   asa_configuration.asset_name)
+
+            if key in created_assets:
+                journal.append([MintJournal.confirmed_entry(configuration_hash=configuration_hash,
+                                                            asa_id=created_assets[key],
+                                                            tx_id=entry["tx_id"],
+                                                            confirmed_round=None)])
+                minted[configuration_hash] = (created_assets[key], entry["tx_id"])
+            else:
+                pending.append((configuration_hash, entry, tracker.track(entry["tx_id"], entry["last_valid_round"])))
+
+        to_mint = []
+        for configuration_hash, entry, future in pending:
+            try:
+                txinfo = future.result()
+            except (TransactionExpiredError, TransactionRejectedError):
+                to_mint.append(configuration_hash)
+                continue
+
+            journal.append([MintJournal.confirmed_entry(configuration_hash=configuration_hash,
+                                                        asa_id=txinfo["asset-index"],
+                                                        tx_id=entry["tx_id"],
+                                                        confirmed_round=txinfo["confirmed-round"])])
+            minted[configuration_hash] = (txinfo["asset-index"], entry["tx_id"])
+
+        return to_mint
+
+    def _sign_batch(self,
+                    executor: ThreadPoolExecutor,
+                    batch: List[List[str]],
+                    configurations_by_hash: Dict[str, ASAConfiguration],
+                    clawback_address: str) -> List[Future]:
+        suggested_params = get_default_suggested_params(client=self.client)
+
+        return [executor.submit(self._sign_creation_group, group, configurations_by_hash, clawback_address,
+                                suggested_params)
+                for group in batch]
+
+    def _sign_creation_group(self,
+                             group: List[str],
+                             configurations_by_hash: Dict[str, ASAConfiguration],
+                             clawback_address: str,
+                             suggested_params: SuggestedParams) -> list:
+        # The configuration hash is used as a note, it ties the creation transaction to its journal entry.
+        txns = [self.create_asa_transaction(asa_configuration=configurations_by_hash[configuration_hash],
+                                            clawback_address=clawback_address,
+                                            suggested_params=suggested_params,
+                                            note=bytes.fromhex(configuration_hash),
+                                            sign_transaction=False)
+                for configuration_hash in group]
+
+        if len(txns) > 1:
+            gid = algosdk.future.transaction.calculate_group_id(txns)
+            for txn in txns:
+                txn.group = gid
+
+        return [txn.sign(self.creator_pk) for txn in txns]
+
+    def _submit_creation_group(self, journal: Optional[MintJournal], group: List[str], signed_group: list):
+        # The group is journaled before it is sent. A crash after the send leaves submitted entries, which the next
+        # run reconciles, instead of configurations that look unminted and would be signed and minted again.
+        if journal is not None:
+            journal.append([MintJournal.submitted_entry(configuration_hash=configuration_hash,
+                                                        tx_id=txn.get_txid(),
+                                                        last_valid_round=txn.transaction.last_valid_round)
+                            for configuration_hash, txn in zip(group, signed_group)])
+
+        try:
+            self.client.send_transactions(signed_group)
+        except AlgodHTTPError as e:
+            logger.warning('Unsuccessful submission of an ASA creation group: %s', e)
+            # The node rejected the group, none of its transactions can be confirmed.
+            if journal is not None:
+                journal.append([MintJournal.failed_entry(configuration_hash=configuration_hash,
+                                                         tx_id=txn.get_txid(),
+                                                         reason=str(e))
+                                for configuration_hash, txn in zip(group, signed_group)])
+            return signed_group, None
+        except Exception as e:
+            logger.warning('Unsuccessful submission of an ASA creation group: %s', e)
+            # The group may have reached the node, so its entries stay submitted until their last valid round.
+            return signed_group, None
+
+        return signed_group, get_confirmation_tracker(self.client).track_transactions(signed_group)
+
+    def _collect_creation_group(self,
+                                journal: Optional[MintJournal],
+                                group: List[str],
+                                signed_group: list,
+                                futures: Optional[List[Future]],
+                                minted: Dict[str, Tuple[int, str]]):
+        if futures is None:
+            return
+
+        entries = []
+        for configuration_hash, txn, future in zip(group, signed_group, futures):
+            try:
+                txinfo = future.result()
+            except (TransactionExpiredError, TransactionRejectedError) as e:
+                logger.warning('Unsuccessful creation of Algorand Standard Asset: %s', e)
+                entries.append(MintJournal.failed_entry(configuration_hash=configuration_hash,
+                                                        tx_id=txn.get_txid(),
+                                                        reason=str(e)))
+                continue
+            except Exception as e:
+                logger.warning('Unsuccessful creation of Algorand Standard Asset: %s', e)
+                continue
+
+            minted[configuration_hash] = (txinfo["asset-index"], txn.get_txid())
+            entries.append(MintJournal.confirmed_entry(configuration_hash=configuration_hash,
+                                                       asa_id=txinfo["asset-index"],
+                                                       tx_id=txn.get_txid(),
+                                                       confirmed_round=txinfo["confirmed-round"]))
+
+        if journal is not None:
+            journal.append(entries)
+
+    def _register_asa(self, asa_id: int, asa_configuration: ASAConfiguration):
         asa_configuration.asa_id = asa_id
 
         self.database[asa_id] = dict()
         self.database[asa_id]["configuration"] = asa_configuration.dict()
 
-        return asa_id, tx_id
-
     def asa_opt_in(self, asa_id, user_pk):
-        txn = ASATransactionRepository.asa_opt_in(client=self.client,
-                                                  sender_private_key=user_pk,
-                                                  asa_id=asa_id)
+        txn = self.asa_opt_in_transaction(asa_id=asa_id, user_pk=user_pk)
 
         tx_id = NetworkInteraction.submit_transaction(self.client,
                                                       transaction=txn)
 
         return tx_id
+
+    def asa_opt_in_transaction(self, asa_id, user_pk, suggested_params: Optional[SuggestedParams] = None):
+        return ASATransactionRepository.asa_opt_in(client=self.client,
+                                                   sender_private_key=user_pk,
+                                                   asa_id=asa_id,
+                                                   suggested_params=suggested_params)
+
+    def asa_opt_in_many(self, asa_ids, user_pk):
+        """
+        Opts-in the user to all of the given ASAs, keeping all opt-in transactions in flight at once.
+        :param asa_ids: ids of the ASAs to opt-in to.
+        :param user_pk: private key of the user.
+        :return: list of the confirmed TXN_IDs.
+        """
+        txns = [self.asa_opt_in_transaction(asa_id=asa_id, user_pk=user_pk) for asa_id in asa_ids]
+
+        futures = [NetworkInteraction.submit_transaction_async(self.client, transaction=txn) for txn in txns]
+
+        for future in futures:
+            future.result()
+
+        return [txn.get_txid() for txn in txns]
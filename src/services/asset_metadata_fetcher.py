@@ -0,0 +1,158 @@
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from src.blockchain_utils.network_identity import indexer_genesis_hash, network_key
+from src.blockchain_utils.rate_limiter import TokenBucket
+from src.blockchain_utils.throttled_clients import ThrottledIndexerClient, new_session
+from src.models.ticket_models import Ticket
+from src.services.ticket_configuration_cache import get_ticket_configuration_cache, TicketConfigurationCache, \
+    TicketConfigurationMismatchError
+
+logger = logging.getLogger(__name__)
+
+# Shared by all fetchers, so concurrent refreshes stay within the same indexer budget.
+_default_indexer_rate_limiter = TokenBucket(rate=10)
+
+
+class HostLimiter:
+    """
+    Limits the concurrent requests per host. A single process-wide limiter is shared by all of the fetchers, so
+    the limit holds no matter how many refreshes and sessions fetch at the same time.
+    """
+
+    def __init__(self, per_host_limit: int = 4):
+        self.per_host_limit = per_host_limit
+
+        self._semaphores: Dict[str, threading.Semaphore] = dict()
+        self._lock = threading.Lock()
+
+    def semaphore(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc
+
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.per_host_limit)
+
+            return self._semaphores[host]
+
+
+_default_host_limiter = HostLimiter()
+_default_session = new_session()
+
+
+class AssetMetadataFetcher:
+    """
+    Resolves the tickets of many ASAs concurrently. The indexer asset lookups and the configuration downloads run
+    on a bounded thread pool. The indexer calls are paced by a token bucket, while the downloads go through the
+    process-wide http session and are limited per host so a single IPFS gateway is never flooded.
+    Use get_asset_metadata_fetcher instead of creating a fetcher per call.
+    """
+
+    def __init__(self,
+                 indexer,
+                 max_workers: int = 16,
+                 host_limiter: Optional[HostLimiter] = None,
+                 indexer_rate_limiter: Optional[TokenBucket] = None,
+                 ticket_cache: Optional[TicketConfigurationCache] = None,
+                 session: Optional[requests.Session] = None):
+        self.indexer = indexer
+        self.max_workers = max_workers
+        self.host_limiter = host_limiter or _default_host_limiter
+        if indexer_rate_limiter is None and not isinstance(indexer, ThrottledIndexerClient):
+            # The throttled indexer already paces its own requests.
+            indexer_rate_limiter = _default_indexer_rate_limiter
+        self.indexer_rate_limiter = indexer_rate_limiter
+        self.ticket_cache = ticket_cache or get_ticket_configuration_cache()
+        self.session = session or _default_session
+
+    @property
+    def network(self) -> str:
+        return network_key(indexer_genesis_hash(self.indexer))
+
+    def _asset_reference(self, asa_id: int) -> Tuple[str, Optional[str]]:
+        asset_reference = self.ticket_cache.asset_reference(asa_id=asa_id, network=self.network)
+
+        if asset_reference is None:
+            if self.indexer_rate_limiter is not None:
+                self.indexer_rate_limiter.acquire()
+            asset_info = self.indexer.asset_info(asset_id=asa_id)
+            self.ticket_cache.store_asset_reference(asa_id=asa_id,
+                                                    network=self.network,
+                                                    asset_params=asset_info['asset']['params'])
+            asset_reference = self.ticket_cache.asset_reference(asa_id=asa_id, network=self.network)
+
+        return asset_reference
+
+    def _ticket(self, asa_id: int, asset_params: Optional[dict]) -> Optional[Ticket]:
+        try:
+            if asset_params is not None:
+                url, metadata_hash = asset_params['url'], asset_params.get('metadata-hash')
+            else:
+                url, metadata_hash = self._asset_reference(asa_id=asa_id)
+
+            with self.host_limiter.semaphore(url):
+                return self.ticket_cache.ticket(url=url,
+                                                asa_id=asa_id,
+                                                network=self.network,
+                                                metadata_hash=metadata_hash,
+                                                session=self.session)
+        except TicketConfigurationMismatchError as e:
+            logger.warning('%s', e)
+        except Exception as e:
+            logger.warning('Failed to fetch the ticket of ASA %s: %s', asa_id, e)
+
+        return None
+
+    def tickets(self, asa_ids: Iterable[int]) -> Dict[int, Ticket]:
+        """
+        Resolves the tickets of ASAs for which only the id is known.
+        :param asa_ids:
+        :return: asa_id -> Ticket for every ASA whose ticket was resolved and verified.
+        """
+        return self.tickets_from_params({asa_id: None for asa_id in asa_ids})
+
+    def tickets_from_params(self, asset_params: Dict[int, Optional[dict]]) -> Dict[int, Ticket]:
+        """
+        Resolves the tickets of ASAs whose params are already known e.g from the created-assets of an account.
+        :param asset_params: asa_id -> params of the ASA, or None when they need to be looked up in the indexer.
+        :return: asa_id -> Ticket for every ASA whose ticket was resolved and verified.
+        """
+        if len(asset_params) == 0:
+            return dict()
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(asset_params))) as executor:
+            futures = {asa_id: executor.submit(self._ticket, asa_id, params)
+                       for asa_id, params in asset_params.items()}
+
+        tickets = dict()
+        for asa_id, future in futures.items():
+            ticket = future.result()
+            if ticket is not None:
+                tickets[asa_id] = ticket
+
+        return tickets
+
+
+_fetchers = weakref.WeakKeyDictionary()
+_fetchers_lock = threading.Lock()
+
+
+def get_asset_metadata_fetcher(indexer) -> AssetMetadataFetcher:
+    """
+    Returns the process-wide AssetMetadataFetcher for the given indexer client, creating it on first use.
+    :param indexer:
+    :return:
+    """
+    with _fetchers_lock:
+        fetcher = _fetchers.get(indexer)
+        if fetcher is None:
+            fetcher = AssetMetadataFetcher(indexer=indexer)
+            _fetchers[indexer] = fetcher
+
+        return fetcher
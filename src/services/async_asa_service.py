@@ -0,0 +1,92 @@
+import asyncio
+from typing import Optional, List
+
+import algosdk
+
+from src.blockchain_utils.async_clients import AsyncAlgodClient
+from src.blockchain_utils.network_identity import network_key
+from src.models.asset_configurations import ASAConfiguration
+from src.services.asa_service import ASAService
+from src.services.async_network_interaction import AsyncNetworkInteraction
+from src.smart_contracts.compilation_cache import get_compilation_cache, clawback_program
+
+
+class AsyncASAService:
+    """
+    asyncio variant of ASAService. The transactions are built and signed by ASAService, while all of the
+    network interaction goes through the AsyncAlgodClient.
+    """
+
+    def __init__(self,
+                 creator_addr: str,
+                 creator_pk: str,
+                 tokility_dex_app_id: int,
+                 client: AsyncAlgodClient,
+                 network_interaction: Optional[AsyncNetworkInteraction] = None):
+        self.creator_addr = creator_addr
+        self.creator_pk = creator_pk
+        self.tokility_dex_app_id = tokility_dex_app_id
+        self.client = client
+        self.network_interaction = network_interaction or AsyncNetworkInteraction(client=client)
+
+        # Only used to build and sign transactions, the suggested params are always provided.
+        self._transactions = ASAService(creator_addr=creator_addr,
+                                        creator_pk=creator_pk,
+                                        tokility_dex_app_id=tokility_dex_app_id,
+                                        client=None)
+
+        self._clawback_address_bytes: Optional[bytes] = None
+
+    @property
+    def database(self) -> dict:
+        return self._transactions.database
+
+    async def clawback_address_bytes(self) -> bytes:
+        if self._clawback_address_bytes is None:
+            compilation_cache = get_compilation_cache()
+            program = clawback_program(app_id=self.tokility_dex_app_id)
+
+            suggested_params = await self.network_interaction.get_default_suggested_params()
+            network = network_key(suggested_params.gh)
+
+            cached = compilation_cache.lookup(program, network=network)
+            if cached is not None:
+                self._clawback_address_bytes = cached[1]
+            else:
+                teal = compilation_cache.teal(program)
+                self._clawback_address_bytes = await self.network_interaction.compile_program(source_code=teal)
+                compilation_cache.store(program, network=network, teal=teal,
+                                        program_bytes=self._clawback_address_bytes)
+
+        return self._clawback_address_bytes
+
+    async def clawback_address(self) -> str:
+        return algosdk.logic.address(await self.clawback_address_bytes())
+
+    async def create_asa(self, asa_configuration: ASAConfiguration):
+        """
+        Creates an ASA from the given ASAConfiguration.
+        :param asa_configuration: Configuration that defines the ASA.
+        :return: (int, str): returns the tuple of the ASA_ID and the TXN_ID that created the ASA.
+        """
+        txn = self._transactions.create_asa_transaction(
+            asa_configuration=asa_configuration,
+            clawback_address=await self.clawback_address(),
+            suggested_params=await self.network_interaction.get_default_suggested_params())
+
+        asa_id, tx_id = await self.network_interaction.submit_asa_creation(transaction=txn)
+
+        self._transactions._register_asa(asa_id=asa_id, asa_configuration=asa_configuration)
+
+        return asa_id, tx_id
+
+    async def asa_opt_in(self, asa_id, user_pk):
+        txn = self._transactions.asa_opt_in_transaction(
+            asa_id=asa_id,
+            user_pk=user_pk,
+            suggested_params=await self.network_interaction.get_default_suggested_params())
+
+        return await self.network_interaction.submit_transaction(transaction=txn)
+
+    async def asa_opt_in_many(self, asa_ids, user_pk) -> List[str]:
+        return list(await asyncio.gather(*[self.asa_opt_in(asa_id=asa_id, user_pk=user_pk) for asa_id in asa_ids]))
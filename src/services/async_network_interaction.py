@@ -0,0 +1,182 @@
+import asyncio
+import base64
+import logging
+from typing import Optional, List
+
+from src.blockchain_utils.async_clients import AsyncAlgodClient, AsyncSuggestedParamsProvider
+from src.blockchain_utils.fee_estimator import FeeEstimator
+from src.services.confirmation_tracker import TransactionRejectedError, TransactionExpiredError, \
+    ConfirmationTrackingError, DEFAULT_CONFIRMATION_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConfirmationTracker:
+    """
+    asyncio counterpart of ConfirmationTracker: a single task follows the blocks with status_after_block and
+    resolves the futures of all pending transactions every round.
+    """
+
+    RETRY_DELAY_SECONDS = 1.0
+    MAX_CONSECUTIVE_ERRORS = 10
+
+    def __init__(self, client: AsyncAlgodClient, suggested_params_provider: Optional[AsyncSuggestedParamsProvider] = None):
+        self.client = client
+        self.suggested_params_provider = suggested_params_provider
+
+        self._pending = dict()
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, txid: str, last_valid_round: Optional[int] = None) -> asyncio.Future:
+        """
+        Starts tracking a submitted transaction.
+        :param txid: the id of the submitted transaction.
+        :param last_valid_round: when set, the future fails with TransactionExpiredError once this round passes.
+        :return: a future that resolves with the pending transaction info of the confirmed transaction.
+        """
+        if txid not in self._pending:
+            self._pending[txid] = (asyncio.get_running_loop().create_future(), last_valid_round)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._follow_blocks())
+
+        return self._pending[txid][0]
+
+    def track_transactions(self, transactions: list) -> List[asyncio.Future]:
+        return [self.track(transaction.get_txid(), transaction.transaction.last_valid_round)
+                for transaction in transactions]
+
+    async def _follow_blocks(self):
+        last_round = None
+        errors = 0
+
+        while len(self._pending) > 0:
+            try:
+                if last_round is None:
+                    last_round = (await self.client.status()).get('last-round')
+
+                await self._check_pending(last_round)
+
+                if len(self._pending) > 0:
+                    last_round = (await self.client.status_after_block(last_round)).get('last-round')
+                    if self.suggested_params_provider is not None:
+                        self.suggested_params_provider.observe_round(last_round)
+                errors = 0
+            except Exception as e:
+                logger.warning('Confirmation tracker error: %s', e)
+                last_round = None
+                errors += 1
+                if errors >= self.MAX_CONSECUTIVE_ERRORS:
+                    self._fail_pending(errors, e)
+                    return
+                await asyncio.sleep(self.RETRY_DELAY_SECONDS)
+
+    def _fail_pending(self, errors: int, last_error: Exception):
+        pending_items = list(self._pending.items())
+        self._pending.clear()
+
+        for txid, (future, _) in pending_items:
+            if not future.done():
+                future.set_exception(ConfirmationTrackingError(txid, errors, last_error))
+
+    async def _check_pending(self, current_round: int):
+        pending_items = list(self._pending.items())
+        txinfos = await asyncio.gather(*[self.client.pending_transaction_info(txid) for txid, _ in pending_items],
+                                       return_exceptions=True)
+
+        for (txid, (future, last_valid_round)), txinfo in zip(pending_items, txinfos):
+            if isinstance(txinfo, Exception):
+                # The transaction is not known to the node (yet), decide only on its validity window.
+                txinfo = dict()
+
+            error = None
+            if txinfo.get('confirmed-round') and txinfo.get('confirmed-round') > 0:
+                print(f"Transaction {txid} confirmed in round {txinfo.get('confirmed-round')}.")
+            elif txinfo.get('pool-error'):
+                error = TransactionRejectedError(txid, txinfo.get('pool-error'))
+            elif last_valid_round is not None and current_round > last_valid_round:
+                error = TransactionExpiredError(txid, last_valid_round)
+            else:
+                continue
+
+            del self._pending[txid]
+            if future.done():
+                continue
+
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(txinfo)
+
+
+class AsyncNetworkInteraction:
+    """
+    asyncio counterpart of NetworkInteraction. Holds the suggested params cache and the confirmation tracker
+    of a single AsyncAlgodClient.
+    """
+
+    def __init__(self, client: AsyncAlgodClient):
+        self.client = client
+        self.suggested_params_provider = AsyncSuggestedParamsProvider(client=client)
+        self.confirmation_tracker = AsyncConfirmationTracker(client=client,
+                                                             suggested_params_provider=self.suggested_params_provider)
+
+    async def get_default_suggested_params(self):
+        return await self.suggested_params_provider.get()
+
+    async def get_fee_estimator(self) -> FeeEstimator:
+        return await self.suggested_params_provider.fee_estimator()
+
+    async def wait_for_confirmation(self,
+                                    txid: str,
+                                    last_valid_round: Optional[int] = None,
+                                    timeout_seconds: Optional[float] = DEFAULT_CONFIRMATION_TIMEOUT_SECONDS):
+        """
+        :param txid:
+        :param last_valid_round: the last valid round of the transaction, looked up on the node when not given.
+        :param timeout_seconds: how long to wait for the confirmation, None waits until the transaction is confirmed,
+        rejected or expired.
+        :return: the pending transaction info of the confirmed transaction.
+        :raises AlgodHTTPError: if the node does not know the transaction.
+        :raises TransactionExpiredError: if the transaction was not confirmed before its last valid round.
+        :raises asyncio.TimeoutError: if the transaction was not confirmed within timeout_seconds.
+        """
+        if last_valid_round is None:
+            txinfo = await self.client.pending_transaction_info(txid)
+            last_valid_round = txinfo.get('txn', dict()).get('txn', dict()).get('lv')
+
+        # The future is shared by every waiter of the transaction, so a timeout must not cancel it.
+        return await asyncio.wait_for(asyncio.shield(self.confirmation_tracker.track(txid, last_valid_round)),
+                                      timeout=timeout_seconds)
+
+    async def submit_transaction(self, transaction) -> str:
+        txid = await self.client.send_transaction(transaction)
+
+        await self.confirmation_tracker.track(txid, transaction.transaction.last_valid_round)
+
+        return txid
+
+    async def submit_group(self, transactions: list) -> str:
+        """
+        Submits an atomic group and waits until all of its transactions are confirmed.
+        :param transactions: the signed transactions of the group, in group order.
+        :return: the id of the first transaction of the group.
+        """
+        txid = await self.client.send_transactions(transactions)
+
+        await asyncio.gather(*self.confirmation_tracker.track_transactions(transactions))
+
+        return txid
+
+    async def submit_asa_creation(self, transaction) -> (Optional[int], str):
+        txid = await self.client.send_transaction(transaction)
+
+        try:
+            ptx = await self.confirmation_tracker.track(txid, transaction.transaction.last_valid_round)
+            return ptx["asset-index"], txid
+        except Exception as e:
+            logger.warning('Unsuccessful creation of Algorand Standard Asset: %s', e)
+
+    async def compile_program(self, source_code: str) -> bytes:
+        compile_response = await self.client.compile(source_code)
+        return base64.b64decode(compile_response['result'])
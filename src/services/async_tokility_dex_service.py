@@ -0,0 +1,153 @@
+from typing import Optional, List
+
+import algosdk
+
+from src.blockchain_utils.async_clients import AsyncAlgodClient
+from src.models.asset_configurations import ASAConfiguration
+from src.services.async_network_interaction import AsyncNetworkInteraction
+from src.services.tokility_dex_service import TokilityDEXService
+
+
+class AsyncTokilityDEXService:
+    """
+    asyncio variant of TokilityDEXService for an already deployed Tokility DEX application. The transaction
+    groups are built and signed by TokilityDEXService, while all of the network interaction goes through the
+    AsyncAlgodClient, so thousands of purchases can be in flight from a single process.
+    """
+
+    def __init__(self,
+                 app_creator_addr,
+                 app_creator_pk,
+                 client: AsyncAlgodClient,
+                 app_id: int,
+                 network_interaction: Optional[AsyncNetworkInteraction] = None):
+        self.app_creator_addr = app_creator_addr
+        self.app_creator_pk = app_creator_pk
+        self.client = client
+        self.app_id = app_id
+        self.network_interaction = network_interaction or AsyncNetworkInteraction(client=client)
+
+        # Only used to build and sign transactions, the suggested params are always provided.
+        self._transactions = TokilityDEXService(app_creator_addr=app_creator_addr,
+                                                app_creator_pk=app_creator_pk,
+                                                client=None,
+                                                app_id=app_id)
+
+    async def initial_buy(self,
+                          buyer_addr: str,
+                          buyer_pk: str,
+                          asa_configuration: ASAConfiguration,
+                          asa_clawback_addr: str,
+                          asa_clawback_bytes):
+        signed_group = self._transactions.initial_buy_group(
+            buyer_addr=buyer_addr,
+            buyer_pk=buyer_pk,
+            asa_configuration=asa_configuration,
+            asa_clawback_addr=asa_clawback_addr,
+            asa_clawback_bytes=asa_clawback_bytes,
+            suggested_params=await self.network_interaction.get_default_suggested_params(),
+            fee_estimator=await self.network_interaction.get_fee_estimator())
+
+        tx_id = await self.client.send_transactions(signed_group)
+
+        print("Initial buy completed.")
+        return tx_id
+
+    async def initial_buy_many(self,
+                               buyer_addr: str,
+                               buyer_pk: str,
+                               asa_configurations: List[ASAConfiguration],
+                               asa_clawback_addr: str,
+                               asa_clawback_bytes):
+        signed_group = self._transactions.initial_buy_many_group(
+            buyer_addr=buyer_addr,
+            buyer_pk=buyer_pk,
+            asa_configurations=asa_configurations,
+            asa_clawback_addr=asa_clawback_addr,
+            asa_clawback_bytes=asa_clawback_bytes,
+            suggested_params=await self.network_interaction.get_default_suggested_params(),
+            fee_estimator=await self.network_interaction.get_fee_estimator())
+
+        tx_id = await self.client.send_transactions(signed_group)
+
+        print(f"Initial buy of {len(asa_configurations)} tickets completed.")
+        return tx_id
+
+    async def make_sell_offer(self,
+                              seller_pk: str,
+                              sell_price: int,
+                              asa_configuration: ASAConfiguration):
+        seller_address = algosdk.account.address_from_private_key(seller_pk)
+        TokilityDEXService.check_sell_offer_slot(
+            seller_address=seller_address,
+            asa_id=asa_configuration.asa_id,
+            sell_offers=TokilityDEXService.local_sell_offers(account_info=await self.client.account_info(seller_address),
+                                                             app_id=self.app_id))
+
+        make_sell_order_txn = self._transactions.make_sell_offer_transaction(
+            seller_pk=seller_pk,
+            sell_price=sell_price,
+            asa_configuration=asa_configuration,
+            suggested_params=await self.network_interaction.get_default_suggested_params())
+
+        tx_id = await self.network_interaction.submit_transaction(make_sell_order_txn)
+        print("Sell order has been placed.")
+        return tx_id
+
+    async def buy_from_seller(self,
+                              buyer_addr: str,
+                              buyer_pk: str,
+                              seller_addr: str,
+                              price: int,
+                              asa_configuration: ASAConfiguration,
+                              asa_clawback_addr: str,
+                              asa_clawback_bytes):
+        signed_group = self._transactions.buy_from_seller_group(
+            buyer_addr=buyer_addr,
+            buyer_pk=buyer_pk,
+            seller_addr=seller_addr,
+            price=price,
+            asa_configuration=asa_configuration,
+            asa_clawback_addr=asa_clawback_addr,
+            asa_clawback_bytes=asa_clawback_bytes,
+            suggested_params=await self.network_interaction.get_default_suggested_params(),
+            fee_estimator=await self.network_interaction.get_fee_estimator())
+
+        tx_id = await self.client.send_transactions(signed_group)
+
+        print(f"Second hand buy completed in {tx_id}")
+        return tx_id
+
+    async def stop_selling(self,
+                           seller_pk: str,
+                           asa_configuration: ASAConfiguration):
+        stop_sell_order_txn = self._transactions.stop_selling_transaction(
+            seller_pk=seller_pk,
+            asa_configuration=asa_configuration,
+            suggested_params=await self.network_interaction.get_default_suggested_params())
+
+        tx_id = await self.network_interaction.submit_transaction(stop_sell_order_txn)
+        print("Sell order has been stopped.")
+        return tx_id
+
+    async def gift_asa(self,
+                       asa_owner_addr: str,
+                       asa_owner_pk: str,
+                       asa_receiver_addr: str,
+                       asa_configuration: ASAConfiguration,
+                       asa_clawback_addr: str,
+                       asa_clawback_bytes):
+        signed_group = self._transactions.gift_asa_group(
+            asa_owner_addr=asa_owner_addr,
+            asa_owner_pk=asa_owner_pk,
+            asa_receiver_addr=asa_receiver_addr,
+            asa_configuration=asa_configuration,
+            asa_clawback_addr=asa_clawback_addr,
+            asa_clawback_bytes=asa_clawback_bytes,
+            suggested_params=await self.network_interaction.get_default_suggested_params(),
+            fee_estimator=await self.network_interaction.get_fee_estimator())
+
+        tx_id = await self.client.send_transactions(signed_group)
+
+        print("ASA has been gifted.")
+        return tx_id
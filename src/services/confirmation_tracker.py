@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Dict, Optional, List, Union
+
+from algosdk.error import AlgodHTTPError
+from algosdk.future.transaction import SignedTransaction, LogicSigTransaction
+from algosdk.v2client import algod
+
+from src.blockchain_utils.suggested_params_provider import get_suggested_params_provider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIRMATION_TIMEOUT_SECONDS = 120.0
+
+
+class TransactionRejectedError(Exception):
+    """
+    Raised when the node drops a transaction from its pool, e.g. because the smart contract rejected it.
+    """
+
+    def __init__(self, txid: str, pool_error: str):
+        super().__init__(f"Transaction {txid} was rejected: {pool_error}")
+        self.txid = txid
+        self.pool_error = pool_error
+
+
+class TransactionExpiredError(Exception):
+    """
+    Raised when the network has passed the last valid round of a transaction that was never confirmed.
+    """
+
+    def __init__(self, txid: str, last_valid_round: int):
+        super().__init__(f"Transaction {txid} was not confirmed before its last valid round {last_valid_round}")
+        self.txid = txid
+        self.last_valid_round = last_valid_round
+
+
+class ConfirmationTrackingError(Exception):
+    """
+    Raised for all of the pending transactions when the node could not be followed for MAX_CONSECUTIVE_ERRORS
+    attempts in a row, so their confirmation is unknown.
+    """
+
+    def __init__(self, txid: str, errors: int, last_error: Exception):
+        super().__init__(f"Transaction {txid} could not be tracked after {errors} failed requests: {last_error}")
+        self.txid = txid
+        self.errors = errors
+        self.last_error = last_error
+
+
+class _PendingTransaction:
+    def __init__(self, future: Future, last_valid_round: Optional[int]):
+        self.future = future
+        self.last_valid_round = last_valid_round
+
+
+class ConfirmationTracker:
+    """
+    Tracks the confirmation of many submitted transactions at once. A single background thread follows the
+    chain with status_after_block and, after every new round, resolves the futures of all pending
+    transactions that got confirmed, rejected or expired in the meantime.
+    """
+
+    RETRY_DELAY_SECONDS = 1.0
+    MAX_CONSECUTIVE_ERRORS = 10
+
+    def __init__(self, client: algod.AlgodClient):
+        self.client = client
+
+        self._pending: Dict[str, _PendingTransaction] = dict()
+        self._lock = threading.Lock()
+        self._has_pending = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, txid: str, last_valid_round: Optional[int] = None) -> Future:
+        """
+        Starts tracking a submitted transaction.
+        :param txid: the id of the submitted transaction.
+        :param last_valid_round: when set, the future fails with TransactionExpiredError once this round passes.
+        :return: a future that resolves with the pending transaction info of the confirmed transaction.
+        """
+        with self._lock:
+            pending = self._pending.get(txid)
+            if pending is None:
+                pending = _PendingTransaction(future=Future(), last_valid_round=last_valid_round)
+                self._pending[txid] = pending
+
+            self._start()
+            self._has_pending.set()
+
+            return pending.future
+
+    def track_transaction(self, transaction: Union[SignedTransaction, LogicSigTransaction]) -> Future:
+        return self.track(txid=transaction.get_txid(),
+                          last_valid_round=transaction.transaction.last_valid_round)
+
+    def track_transactions(self, transactions: List[Union[SignedTransaction, LogicSigTransaction]]) -> List[Future]:
+        return [self.track_transaction(transaction) for transaction in transactions]
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._follow_blocks,
+                                            name="confirmation-tracker",
+                                            daemon=True)
+            self._thread.start()
+
+    def _follow_blocks(self):
+        last_round = None
+        errors = 0
+
+        while True:
+            self._has_pending.wait()
+
+            try:
+                if last_round is None:
+                    last_round = self.client.status().get('last-round')
+
+                self._check_pending(last_round)
+
+                with self._lock:
+                    if len(self._pending) == 0:
+                        self._has_pending.clear()
+                        last_round = None
+                        continue
+
+                last_round = self.client.status_after_block(last_round).get('last-round')
+                get_suggested_params_provider(self.client).observe_round(last_round)
+                errors = 0
+            except Exception as e:
+                logger.warning('Confirmation tracker error: %s', e)
+                last_round = None
+                errors += 1
+                if errors >= self.MAX_CONSECUTIVE_ERRORS:
+                    self._fail_pending(errors, e)
+                    errors = 0
+                    continue
+                time.sleep(self.RETRY_DELAY_SECONDS)
+
+    def _check_pending(self, current_round: int):
+        with self._lock:
+            pending_items = list(self._pending.items())
+
+        for txid, pending in pending_items:
+            try:
+                txinfo = self.client.pending_transaction_info(txid)
+            except AlgodHTTPError:
+                # The transaction is not known to the node (yet), decide only on its validity window.
+                txinfo = dict()
+
+            if txinfo.get('confirmed-round') and txinfo.get('confirmed-round') > 0:
+                print(f"Transaction {txid} confirmed in round {txinfo.get('confirmed-round')}.")
+                self._resolve(txid, result=txinfo)
+            elif txinfo.get('pool-error'):
+                self._resolve(txid, error=TransactionRejectedError(txid, txinfo.get('pool-error')))
+            elif pending.last_valid_round is not None and current_round > pending.last_valid_round:
+                self._resolve(txid, error=TransactionExpiredError(txid, pending.last_valid_round))
+
+    def _fail_pending(self, errors: int, last_error: Exception):
+        with self._lock:
+            pending_items = list(self._pending.items())
+            self._pending.clear()
+            self._has_pending.clear()
+
+        for txid, pending in pending_items:
+            pending.future.set_exception(ConfirmationTrackingError(txid, errors, last_error))
+
+    def _resolve(self, txid: str, result: Optional[dict] = None, error: Optional[Exception] = None):
+        with self._lock:
+            pending = self._pending.pop(txid, None)
+
+        if pending is None:
+            return
+
+        if error is not None:
+            pending.future.set_exception(error)
+        else:
+            pending.future.set_result(result)
+
+
+_trackers = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def get_confirmation_tracker(client: algod.AlgodClient) -> ConfirmationTracker:
+    """
+    Returns the process-wide ConfirmationTracker for the given client, creating it on first use.
+    :param client:
+    :return:
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(client)
+        if tracker is None:
+            tracker = ConfirmationTracker(client=client)
+            _trackers[client] = tracker
+
+        return tracker
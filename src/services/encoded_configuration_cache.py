@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+from src.models.asset_configurations import ASAConfiguration, EncodedASAConfiguration
+
+
+class EncodedConfigurationCache:
+    """
+    Memory LRU of the EncodedASAConfiguration of every ASA that the DEX transactions are built for. The configuration
+    of a minted ASA is immutable, so it is encoded once per ASA. The entries are keyed by the fields that are
+    encoded, so a configuration that differs from the cached one, e.g. an ASA with the same id on another network,
+    is never served the encoding of the other configuration.
+    """
+
+    def __init__(self, max_entries: int = 65536):
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(asa_configuration: ASAConfiguration) -> tuple:
+        """
+        :return: the fields of the configuration that EncodedASAConfiguration.from_configuration encodes.
+        """
+        initial_offering_configuration = asa_configuration.initial_offering_configuration
+        economy_configuration = asa_configuration.economy_configuration
+
+        return (initial_offering_configuration.asa_price,
+                initial_offering_configuration.tokiliy_fee,
+                economy_configuration.max_sell_price,
+                economy_configuration.owner_fee,
+                economy_configuration.reselling_allowed,
+                economy_configuration.reselling_end_date,
+                economy_configuration.gifting_allowed,
+                asa_configuration.asa_creator_address)
+
+    def encode(self, asa_configuration: ASAConfiguration) -> EncodedASAConfiguration:
+        """
+        :param asa_configuration: the configuration of the ASA.
+        :return:
+        """
+        key = self._key(asa_configuration)
+
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return encoded
+
+        encoded = EncodedASAConfiguration.from_configuration(asa_configuration)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = encoded
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return encoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total > 0 else 0.0
+        }
+
+
+_encoded_configuration_cache = EncodedConfigurationCache()
+
+
+def get_encoded_configuration_cache() -> EncodedConfigurationCache:
+    return _encoded_configuration_cache
@@ -0,0 +1,190 @@
+import base64
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from hashlib import sha256
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import requests
+from algosdk.encoding import decode_address
+
+from src.blockchain_utils.credentials import get_indexer
+from src.blockchain_utils.network_identity import indexer_genesis_hash, network_key
+from src.models.asset_configurations import ASAConfiguration
+from src.models.ticket_models import Ticket
+from src.services.ticket_configuration_cache import get_ticket_configuration_cache
+
+logger = logging.getLogger(__name__)
+
+_UINT_FIELDS = ["asa_price",
+                "tokiliy_fee",
+                "max_sell_price",
+                "owner_fee",
+                "reselling_allowed",
+                "reselling_end_date",
+                "gifting_allowed"]
+
+# A record of this dtype has the same bytes as ASAConfiguration.metadata_hash: the big-endian uint fields and the
+# creator address, separated with dashes.
+PREIMAGE_DTYPE = np.dtype([field for name in _UINT_FIELDS for field in ((name, '>u8'), (f'{name}_dash', 'S1'))] +
+                          [("asa_creator_address", 'u1', (32,))])
+
+DIGEST_SIZE = 32
+
+
+def _sha256_records(buffer: bytes) -> bytes:
+    """
+    Hashes every record of a packed buffer of preimages.
+    :return: the concatenated digests.
+    """
+    record_size = PREIMAGE_DTYPE.itemsize
+    return b''.join(sha256(buffer[offset:offset + record_size]).digest()
+                    for offset in range(0, len(buffer), record_size))
+
+
+class MetadataHashVerifier:
+    """
+    Verifies the configurations of many ASAs against their on-chain metadata hashes at once. The fixed width fields
+    of all configurations are packed into a single NumPy structured array, whose records are the preimages of the
+    hashes. Large batches are hashed in chunks on a process pool.
+    """
+
+    def __init__(self,
+                 workers: Optional[int] = None,
+                 chunk_size: int = 8192,
+                 min_parallel_batch: int = 32768):
+        """
+        :param workers: the number of hashing processes, by default the number of CPUs.
+        :param chunk_size: the number of preimages hashed by a single task.
+        :param min_parallel_batch: smaller batches are hashed in the calling process, where starting the pool would
+        take longer than the hashing itself.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel_batch = min_parallel_batch
+
+    @staticmethod
+    def preimages(asa_configurations: Sequence[ASAConfiguration]) -> np.ndarray:
+        """
+        :return: the structured array of the metadata hash preimages, one record per configuration.
+        """
+        records = np.zeros(len(asa_configurations), dtype=PREIMAGE_DTYPE)
+
+        initial_offering = [asa_configuration.initial_offering_configuration for asa_configuration in asa_configurations]
+        economy = [asa_configuration.economy_configuration for asa_configuration in asa_configurations]
+
+        records["asa_price"] = [configuration.asa_price for configuration in initial_offering]
+        records["tokiliy_fee"] = [configuration.tokiliy_fee for configuration in initial_offering]
+        for name in _UINT_FIELDS[2:]:
+            records[name] = [getattr(configuration, name) for configuration in economy]
+
+        for name in _UINT_FIELDS:
+            records[f'{name}_dash'] = b'-'
+
+        if len(asa_configurations) > 0:
+            # A catalog has few creators, so every address is decoded once.
+            decoded_addresses = dict()
+            for asa_configuration in asa_configurations:
+                if asa_configuration.asa_creator_address not in decoded_addresses:
+                    decoded_addresses[asa_configuration.asa_creator_address] = \
+                        decode_address(asa_configuration.asa_creator_address)
+
+            creator_addresses = b''.join(decoded_addresses[asa_configuration.asa_creator_address]
+                                         for asa_configuration in asa_configurations)
+            records["asa_creator_address"] = np.frombuffer(creator_addresses, dtype=np.uint8).reshape(-1, 32)
+
+        return records
+
+    def digests(self, asa_configurations: Sequence[ASAConfiguration]) -> np.ndarray:
+        """
+        :return: the (N, 32) uint8 array of the sha256 digests of the configurations.
+        """
+        buffer = self.preimages(asa_configurations).tobytes()
+        chunk_bytes = self.chunk_size * PREIMAGE_DTYPE.itemsize
+        chunks = [buffer[offset:offset + chunk_bytes] for offset in range(0, len(buffer), chunk_bytes)]
+
+        if len(asa_configurations) < self.min_parallel_batch or self.workers == 1:
+            digests = b''.join(_sha256_records(chunk) for chunk in chunks)
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+                digests = b''.join(executor.map(_sha256_records, chunks))
+
+        return np.frombuffer(digests, dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+
+    @staticmethod
+    def _expected_digests(metadata_hashes: Sequence[Optional[Union[str, bytes]]]) -> (np.ndarray, np.ndarray):
+        missing_digest = bytes(DIGEST_SIZE)
+        digests = []
+        missing = np.zeros(len(metadata_hashes), dtype=bool)
+
+        for i, metadata_hash in enumerate(metadata_hashes):
+            if isinstance(metadata_hash, str):
+                metadata_hash = base64.b64decode(metadata_hash)
+
+            if metadata_hash is None or len(metadata_hash) != DIGEST_SIZE:
+                missing[i] = True
+                metadata_hash = missing_digest
+
+            digests.append(metadata_hash)
+
+        return np.frombuffer(b''.join(digests), dtype=np.uint8).reshape(-1, DIGEST_SIZE), missing
+
+    def mismatches(self,
+                   asa_configurations: Sequence[ASAConfiguration],
+                   metadata_hashes: Sequence[Optional[Union[str, bytes]]]) -> np.ndarray:
+        """
+        :param asa_configurations: the configurations, e.g. fetched from the urls of the ASAs.
+        :param metadata_hashes: the on-chain metadata hash of every ASA, either the raw digest or base64 encoded as
+        returned by algod and the indexer.
+        :return: a boolean mask that is True for every configuration that does not match its metadata hash, or whose
+        ASA has no metadata hash.
+        """
+        if len(asa_configurations) != len(metadata_hashes):
+            raise ValueError(f'Got {len(asa_configurations)} configurations for {len(metadata_hashes)} metadata hashes.')
+
+        expected, missing = self._expected_digests(metadata_hashes)
+
+        return (self.digests(asa_configurations) != expected).any(axis=1) | missing
+
+
+def audit_created_assets(creator_address: str,
+                         indexer=None,
+                         verifier: Optional[MetadataHashVerifier] = None,
+                         download_workers: int = 16) -> List[int]:
+    """
+    Verifies the configurations of all ASAs created by the address against their metadata hashes.
+    :param creator_address: the address that created the tickets.
+    :param indexer: the indexer client to use instead of the configured one.
+    :param verifier:
+    :param download_workers: the number of concurrent configuration downloads.
+    :return: the ids of the ASAs whose configuration could not be loaded or does not match.
+    """
+    indexer = indexer or get_indexer()
+    verifier = verifier or MetadataHashVerifier()
+    ticket_cache = get_ticket_configuration_cache()
+    network = network_key(indexer_genesis_hash(indexer))
+    session = requests.Session()
+
+    created_assets = indexer.account_info(address=creator_address)['account'].get('created-assets', [])
+
+    def load_configuration(asset: dict) -> Optional[ASAConfiguration]:
+        try:
+            # Loaded without the metadata hash, so a mismatching configuration is returned instead of raising.
+            configuration = ticket_cache.configuration(url=asset['params']['url'], network=network, session=session)
+            return Ticket(**configuration).asa_configuration
+        except Exception as e:
+            logger.warning('Failed to load the configuration of ASA %s: %s', asset["index"], e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=download_workers) as executor:
+        configurations = list(executor.map(load_configuration, created_assets))
+
+    failed = [asset['index'] for asset, configuration in zip(created_assets, configurations) if configuration is None]
+    loaded = [(asset, configuration) for asset, configuration in zip(created_assets, configurations)
+              if configuration is not None]
+
+    mask = verifier.mismatches([configuration for _, configuration in loaded],
+                               [asset['params'].get('metadata-hash') for asset, _ in loaded])
+
+    return sorted(failed + [asset['index'] for (asset, _), mismatch in zip(loaded, mask) if mismatch])
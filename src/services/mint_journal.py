@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+from hashlib import sha256
+from typing import Dict, Optional, List
+
+from src.blockchain_utils.network_identity import algod_genesis_hash, network_key
+from src.models.asset_configurations import ASAConfiguration
+
+
+class MintJournal:
+    """
+    Local append-only journal of minted ASAs. Every line is a JSON record keyed by the hash of the
+    ASAConfiguration:
+    - status "submitted": the creation transaction was sent, with its tx_id and last_valid_round.
+    - status "confirmed": the ASA exists, with its asa_id, tx_id and confirmed_round.
+    - status "failed": the node rejected the transaction or it expired, so the ASA can be minted again.
+    The last record of a configuration hash wins, so rerunning a bulk mint skips confirmed ASAs and
+    reconciles the ones that were submitted before a crash.
+    """
+
+    SUBMITTED = "submitted"
+    CONFIRMED = "confirmed"
+    FAILED = "failed"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = dict()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash in the middle of a write leaves a partial last line.
+                        continue
+                    self.entries[entry["configuration_hash"]] = entry
+
+    @staticmethod
+    def configuration_hash(asa_configuration: ASAConfiguration) -> str:
+        configuration = asa_configuration.dict(exclude={'asa_id'})
+        return sha256(json.dumps(configuration, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, configuration_hash: str) -> Optional[dict]:
+        return self.entries.get(configuration_hash)
+
+    def confirmed(self, configuration_hash: str) -> Optional[dict]:
+        entry = self.entries.get(configuration_hash)
+        if entry is not None and entry["status"] == self.CONFIRMED:
+            return entry
+
+        return None
+
+    @classmethod
+    def submitted_entry(cls, configuration_hash: str, tx_id: str, last_valid_round: int) -> dict:
+        return {
+            "configuration_hash": configuration_hash,
+            "status": cls.SUBMITTED,
+            "tx_id": tx_id,
+            "last_valid_round": last_valid_round
+        }
+
+    @classmethod
+    def confirmed_entry(cls, configuration_hash: str, asa_id: int, tx_id: str, confirmed_round: int) -> dict:
+        return {
+            "configuration_hash": configuration_hash,
+            "status": cls.CONFIRMED,
+            "asa_id": asa_id,
+            "tx_id": tx_id,
+            "confirmed_round": confirmed_round
+        }
+
+    @classmethod
+    def failed_entry(cls, configuration_hash: str, tx_id: str, reason: str) -> dict:
+        return {
+            "configuration_hash": configuration_hash,
+            "status": cls.FAILED,
+            "tx_id": tx_id,
+            "reason": reason
+        }
+
+    def append(self, entries: List[dict]):
+        """
+        Appends the entries with a single write and fsync, so a whole transaction group is journaled at once.
+        :param entries:
+        """
+        if len(entries) == 0:
+            return
+
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+                f.flush()
+                os.fsync(f.fileno())
+
+            for entry in entries:
+                self.entries[entry["configuration_hash"]] = entry
+
+
+def journal_path(name: str, client, app_id: int, directory: str = 'data') -> str:
+    """
+    :param name: the name of the mint, e.g. "conference".
+    :param client: algorand client of the network that the ASAs are minted on.
+    :param app_id: the id of the TokilityDEX application that the ASAs are minted for.
+    :param directory:
+    :return: the path of the journal of the mint on this network and application. A journal of another network, or
+    of a previous deployment, would mark every configuration as minted.
+    """
+    return os.path.join(directory, f'{name}_mint_journal_{network_key(algod_genesis_hash(client))}_{app_id}.jsonl')
@@ -1,27 +1,38 @@
 import base64
-from typing import Optional
+from concurrent.futures import Future
+from typing import Optional, List
 
 from algosdk.future.transaction import SignedTransaction
 from algosdk.v2client import algod
+from src.blockchain_utils.suggested_params_provider import get_suggested_params_provider
+from src.services.confirmation_tracker import get_confirmation_tracker, DEFAULT_CONFIRMATION_TIMEOUT_SECONDS
 
 
 class NetworkInteraction:
 
     @staticmethod
-    def wait_for_confirmation(client: algod.AlgodClient, txid):
+    def wait_for_confirmation(client: algod.AlgodClient,
+                              txid,
+                              last_valid_round: Optional[int] = None,
+                              timeout_seconds: Optional[float] = DEFAULT_CONFIRMATION_TIMEOUT_SECONDS):
         """
         Utility function to wait until the transaction is
         confirmed before proceeding.
+        :param client:
+        :param txid:
+        :param last_valid_round: the last valid round of the transaction, looked up on the node when not given.
+        :param timeout_seconds: how long to wait for the confirmation, None waits until the transaction is confirmed,
+        rejected or expired.
+        :return: the pending transaction info of the confirmed transaction.
+        :raises AlgodHTTPError: if the node does not know the transaction.
+        :raises TransactionExpiredError: if the transaction was not confirmed before its last valid round.
+        :raises concurrent.futures.TimeoutError: if the transaction was not confirmed within timeout_seconds.
         """
-        last_round = client.status().get('last-round')
-        txinfo = client.pending_transaction_info(txid)
-        while not (txinfo.get('confirmed-round') and txinfo.get('confirmed-round') > 0):
-            print("Waiting for confirmation")
-            last_round += 1
-            client.status_after_block(last_round)
+        if last_valid_round is None:
             txinfo = client.pending_transaction_info(txid)
-        print(f"Transaction {txid} confirmed in round {txinfo.get('confirmed-round')}.")
-        return txinfo
+            last_valid_round = txinfo.get('txn', dict()).get('txn', dict()).get('lv')
+
+        return get_confirmation_tracker(client).track(txid, last_valid_round).result(timeout=timeout_seconds)
 
     @staticmethod
     def get_default_suggested_params(client: algod.AlgodClient):
@@ -30,12 +41,7 @@ class NetworkInteraction:
         :param client:
         :return:
         """
-        suggested_params = client.suggested_params()
-
-        suggested_params.flat_fee = True
-        suggested_params.fee = 1000
-
-        return suggested_params
+        return get_suggested_params_provider(client).get()
 
     @staticmethod
     def submit_asa_creation(client: algod.AlgodClient, transaction: SignedTransaction) -> (Optional[int], str):
@@ -47,10 +53,8 @@ class NetworkInteraction:
         """
         txid = client.send_transaction(transaction)
 
-        NetworkInteraction.wait_for_confirmation(client, txid)
-
         try:
-            ptx = client.pending_transaction_info(txid)
+            ptx = get_confirmation_tracker(client).track_transaction(transaction).result()
             return ptx["asset-index"], txid
         except Exception as e:
             # TODO: Proper logging needed.
@@ -61,10 +65,34 @@ class NetworkInteraction:
     def submit_transaction(client: algod.AlgodClient, transaction: SignedTransaction) -> Optional[str]:
         txid = client.send_transaction(transaction)
 
-        NetworkInteraction.wait_for_confirmation(client, txid)
+        get_confirmation_tracker(client).track_transaction(transaction).result()
 
         return txid
 
+    @staticmethod
+    def submit_transaction_async(client: algod.AlgodClient, transaction: SignedTransaction) -> Future:
+        """
+        Submits a transaction without waiting for its confirmation.
+        :param client:
+        :param transaction:
+        :return: a future that resolves with the pending transaction info once the transaction is confirmed.
+        """
+        client.send_transaction(transaction)
+
+        return get_confirmation_tracker(client).track_transaction(transaction)
+
+    @staticmethod
+    def submit_group_async(client: algod.AlgodClient, transactions: List[SignedTransaction]) -> List[Future]:
+        """
+        Submits an atomic group without waiting for its confirmation.
+        :param client:
+        :param transactions: the signed transactions of the group, in group order.
+        :return: a future for every transaction of the group.
+        """
+        client.send_transactions(transactions)
+
+        return get_confirmation_tracker(client).track_transactions(transactions)
+
     @staticmethod
     def compile_program(client: algod.AlgodClient, source_code):
         """
@@ -0,0 +1,170 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.models.asset_sale_offer import SaleOffer
+
+
+class OfferQueryResult(Sequence):
+    """
+    The offers that match a query, sorted by the amount that the buyer pays. Only the offers that are actually read,
+    e.g. the page that is rendered, are looked up.
+    """
+
+    def __init__(self, offers: Tuple[SaleOffer, ...], positions: np.ndarray):
+        self._offers = offers
+        self._positions = positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self._offers[position] for position in self._positions[index].tolist()]
+
+        return self._offers[int(self._positions[index])]
+
+    def __iter__(self) -> Iterator[SaleOffer]:
+        for position in self._positions.tolist():
+            yield self._offers[position]
+
+
+class OfferCatalog:
+    """
+    Immutable index of the offers of a snapshot, for the filters of the marketplace. The offers are sorted by the
+    amount that the buyer pays, so a price range is a binary search. Every business type has its own price sorted
+    bucket of positions, and the reselling and gifting flags and the sellers are kept in arrays aligned with the
+    sorted offers, so the remaining filters are vectorized over the candidates of the price range only.
+    """
+
+    def __init__(self, offers: Sequence[SaleOffer]):
+        amounts = np.fromiter((offer.amount for offer in offers), dtype=np.int64, count=len(offers))
+        order = np.argsort(amounts, kind='stable')
+
+        self._offers: Tuple[SaleOffer, ...] = tuple(offers[i] for i in order.tolist())
+        self._amounts = amounts[order]
+
+        economy_configurations = [offer.ticket.asa_configuration.economy_configuration for offer in self._offers]
+        self._reselling_allowed = np.fromiter((configuration.reselling_allowed == 1
+                                               for configuration in economy_configurations),
+                                              dtype=bool, count=len(self._offers))
+        self._gifting_allowed = np.fromiter((configuration.gifting_allowed == 1
+                                             for configuration in economy_configurations),
+                                            dtype=bool, count=len(self._offers))
+
+        self._seller_codes: Dict[str, int] = dict()
+        self._sellers = np.fromiter((self._seller_codes.setdefault(offer.seller_address, len(self._seller_codes))
+                                     for offer in self._offers),
+                                    dtype=np.int32, count=len(self._offers))
+
+        business_type_codes: Dict[str, int] = dict()
+        business_types = np.fromiter((business_type_codes.setdefault(offer.ticket.business_type,
+                                                                      len(business_type_codes))
+                                      for offer in self._offers),
+                                     dtype=np.int16, count=len(self._offers))
+        self._buckets: Dict[str, np.ndarray] = {business_type: np.flatnonzero(business_types == code)
+                                                for business_type, code in business_type_codes.items()}
+        self._bucket_amounts: Dict[str, np.ndarray] = {business_type: self._amounts[positions]
+                                                       for business_type, positions in self._buckets.items()}
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    @property
+    def business_types(self) -> List[str]:
+        return sorted(self._buckets)
+
+    def _candidates(self,
+                    business_type: Optional[str],
+                    min_amount: int,
+                    max_amount: Optional[int]) -> Union[slice, np.ndarray]:
+        """
+        :return: the positions of the offers of the business type in the price range, in the order of the amounts.
+        Without a business type they are a contiguous range, returned as a slice so the arrays are not copied.
+        """
+        if business_type is None:
+            amounts = self._amounts
+        elif business_type in self._buckets:
+            amounts = self._bucket_amounts[business_type]
+        else:
+            return np.empty(0, dtype=np.int64)
+
+        start = int(np.searchsorted(amounts, min_amount, side='left'))
+        end = len(amounts) if max_amount is None else int(np.searchsorted(amounts, max_amount, side='right'))
+
+        if business_type is None:
+            return slice(start, end)
+
+        return self._buckets[business_type][start:end]
+
+    def _mask(self,
+              candidates: Union[slice, np.ndarray],
+              reselling_allowed: Optional[bool],
+              gifting_allowed: Optional[bool],
+              exclude_seller: Optional[str]) -> Optional[np.ndarray]:
+        """
+        :return: which of the candidates pass the filters, or None if there are no filters.
+        """
+        keep = None
+        if reselling_allowed is not None:
+            keep = self._reselling_allowed[candidates] == reselling_allowed
+        if gifting_allowed is not None:
+            gifting_keep = self._gifting_allowed[candidates] == gifting_allowed
+            keep = gifting_keep if keep is None else keep & gifting_keep
+        if exclude_seller is not None and exclude_seller in self._seller_codes:
+            seller_keep = self._sellers[candidates] != self._seller_codes[exclude_seller]
+            keep = seller_keep if keep is None else keep & seller_keep
+
+        return keep
+
+    def query(self,
+              min_amount: int = 0,
+              max_amount: Optional[int] = None,
+              business_type: Optional[str] = None,
+              reselling_allowed: Optional[bool] = None,
+              gifting_allowed: Optional[bool] = None,
+              exclude_seller: Optional[str] = None) -> OfferQueryResult:
+        """
+        :param min_amount: the minimal amount in microAlgos that the buyer pays, inclusive.
+        :param max_amount: the maximal amount in microAlgos that the buyer pays, inclusive.
+        :param business_type: only the offers of tickets of this business type.
+        :param reselling_allowed: only the offers whose tickets allow, or do not allow, reselling.
+        :param gifting_allowed: only the offers whose tickets allow, or do not allow, gifting.
+        :param exclude_seller: leaves out the offers of this seller, e.g. of the buyer.
+        :return: the matching offers sorted by the amount.
+        """
+        candidates = self._candidates(business_type=business_type, min_amount=min_amount, max_amount=max_amount)
+        keep = self._mask(candidates=candidates,
+                          reselling_allowed=reselling_allowed,
+                          gifting_allowed=gifting_allowed,
+                          exclude_seller=exclude_seller)
+
+        positions = np.arange(candidates.start, candidates.stop) if isinstance(candidates, slice) else candidates
+        return OfferQueryResult(self._offers, positions if keep is None else positions[keep])
+
+    def amount_bounds(self,
+                      business_type: Optional[str] = None,
+                      reselling_allowed: Optional[bool] = None,
+                      gifting_allowed: Optional[bool] = None,
+                      exclude_seller: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """
+        :return: the minimal and the maximal amount of the offers that match the filters, or None if no offer
+        matches.
+        """
+        candidates = self._candidates(business_type=business_type, min_amount=0, max_amount=None)
+        amounts = self._amounts[candidates]
+        keep = self._mask(candidates=candidates,
+                          reselling_allowed=reselling_allowed,
+                          gifting_allowed=gifting_allowed,
+                          exclude_seller=exclude_seller)
+
+        if keep is not None:
+            if not keep.any():
+                return None
+            # The candidates are sorted by the amount, so the bounds are the first and the last kept candidate.
+            return int(amounts[np.argmax(keep)]), int(amounts[len(keep) - 1 - np.argmax(keep[::-1])])
+
+        if len(amounts) == 0:
+            return None
+
+        return int(amounts[0]), int(amounts[-1])
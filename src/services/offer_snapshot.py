@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from src.models.asset_sale_offer import SaleOffer
+from src.services.offer_catalog import OfferCatalog
+from src.services.order_book_service import OrderBookService, get_order_book
+from src.services.sale_offer_service import InitialBuyOfferingsService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 10.0
+
+
+class OfferSnapshot(NamedTuple):
+    """
+    Immutable view of all of the offers of the marketplace at a point in time, with the catalog that indexes them
+    for the filters. A refresh builds a new snapshot and swaps it in, so the sessions that still render the previous
+    one are never affected.
+    """
+    offers: Tuple[SaleOffer, ...]
+    catalog: OfferCatalog
+    refreshed_at: Optional[float]
+    last_round: Optional[int]
+    refresh_seconds: float
+    error: Optional[str] = None
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        if self.refreshed_at is None:
+            return None
+
+        return max(0.0, time.time() - self.refreshed_at)
+
+
+class OfferSnapshotRefresher:
+    """
+    Process-wide snapshot of the initial buy offers of the creator and of the second hand offers of the order book.
+    A background thread refreshes it every interval_seconds, so serving the offers to a session costs neither
+    indexer nor IPFS requests, no matter how many sessions are open.
+    """
+
+    def __init__(self,
+                 app_id: int,
+                 creator_address: str,
+                 interval_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 order_book: Optional[OrderBookService] = None,
+                 indexer=None):
+        """
+        :param app_id: the id of the TokilityDEX application.
+        :param creator_address: the address that sells the tickets on the initial offering.
+        :param interval_seconds: the seconds between the end of a refresh and the start of the next one.
+        :param order_book: the order book of the second hand offers, by default the process-wide one.
+        :param indexer: the indexer client to use instead of the configured one.
+        """
+        self.app_id = app_id
+        self.creator_address = creator_address
+        self.interval_seconds = interval_seconds
+        self.order_book = order_book or get_order_book(app_id=app_id)
+        self.indexer = indexer
+
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+        self._snapshot = OfferSnapshot(offers=(),
+                                       catalog=OfferCatalog(()),
+                                       refreshed_at=None, last_round=None, refresh_seconds=0.0)
+        self._first_snapshot = threading.Event()
+        self._wake_up = threading.Event()
+        self._stopped = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def refresh(self) -> OfferSnapshot:
+        """
+        Loads the offers and swaps in the new snapshot. A failed refresh keeps the offers of the previous snapshot
+        and records the error on it.
+        :return: the current snapshot.
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+
+            try:
+                initial_offers = InitialBuyOfferingsService.available_sell_offers(creator_address=self.creator_address,
+                                                                                  indexer=self.indexer)
+                self.order_book.sync()
+                second_hand_offers = self.order_book.offers()
+
+                offers = tuple(initial_offers) + tuple(second_hand_offers)
+                # The catalog is indexed here, once per refresh, instead of on every run of every session.
+                catalog = OfferCatalog(offers)
+            except Exception as e:
+                logger.warning('Failed to refresh the offers of the application %s: %s', self.app_id, e)
+                self.failed_refreshes += 1
+                self._snapshot = self._snapshot._replace(error=f'{type(e).__name__}: {e}')
+                self._first_snapshot.set()
+                return self._snapshot
+
+            self._snapshot = OfferSnapshot(offers=offers,
+                                           catalog=catalog,
+                                           refreshed_at=time.time(),
+                                           last_round=self.order_book.last_round,
+                                           refresh_seconds=time.perf_counter() - start)
+            self.refreshes += 1
+            self._first_snapshot.set()
+
+            return self._snapshot
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                # The thread must outlive any error, otherwise the sessions are served a stale snapshot forever.
+                logger.exception('Unexpected error while refreshing the offers of the application %s', self.app_id)
+
+            self._wake_up.wait(self.interval_seconds)
+            self._wake_up.clear()
+
+    def start(self) -> 'OfferSnapshotRefresher':
+        """
+        Starts the background refresh, if it is not running yet.
+        """
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name=f'offer-snapshot-{self.app_id}', daemon=True)
+                self._thread.start()
+
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake_up.set()
+
+        with self._thread_lock:
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+
+    def request_refresh(self):
+        """
+        Refreshes the snapshot on the background thread without waiting for the interval, e.g. after a purchase.
+        """
+        self._wake_up.set()
+
+    def snapshot(self, timeout_seconds: Optional[float] = None) -> OfferSnapshot:
+        """
+        :param timeout_seconds: how long to wait for the first refresh of the process, None waits until it is
+        done. Every later call returns immediately.
+        :return: the latest snapshot, with no offers and refreshed_at None if no refresh succeeded yet.
+        """
+        self._first_snapshot.wait(timeout_seconds)
+        return self._snapshot
+
+    @property
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "offers": len(snapshot.offers),
+            "age_seconds": snapshot.age_seconds,
+            "refresh_seconds": snapshot.refresh_seconds
+        }
+
+
+_refreshers: Dict[int, OfferSnapshotRefresher] = dict()
+_refreshers_lock = threading.Lock()
+
+
+def get_offer_snapshot_refresher(app_id: int,
+                                 creator_address: str,
+                                 interval_seconds: float = DEFAULT_REFRESH_SECONDS) -> OfferSnapshotRefresher:
+    """
+    :return: the process-wide OfferSnapshotRefresher of the application, started on the first call.
+    """
+    with _refreshers_lock:
+        if app_id not in _refreshers:
+            _refreshers[app_id] = OfferSnapshotRefresher(app_id=app_id,
+                                                         creator_address=creator_address,
+                                                         interval_seconds=interval_seconds).start()
+
+        return _refreshers[app_id]
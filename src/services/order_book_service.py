@@ -0,0 +1,271 @@
+import base64
+import bisect
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.blockchain_utils.credentials import get_indexer, get_project_root_path
+from src.blockchain_utils.file_utils import write_json_atomically
+from src.blockchain_utils.network_identity import indexer_genesis_hash
+from src.models.asset_sale_offer import SaleOffer
+from src.services.asset_metadata_fetcher import get_asset_metadata_fetcher
+from src.services.sale_offer_service import SecondHandOfferingsService
+from src.smart_contracts.dex_constants import AppMethods
+
+# (seller_address, asa_id) - the local state of every seller can hold an offer for the same ASA.
+OfferKey = Tuple[str, int]
+
+
+class OrderBookService:
+    """
+    Local index of the second hand sell offers of the TokilityDEX application.
+    The order book is bootstrapped once from the local state of the opted in accounts. Afterwards it advances
+    incrementally by replaying the application calls to the TokilityDEX since the last processed round:
+    - sell_asa: puts the offer of the sender.
+    - stop_selling: removes the offer of the sender.
+    - buy_from_seller: removes the offer of the seller in the accounts array.
+    - closeout/clear: removes all of the offers of the sender.
+    The offers and the last processed round are persisted in a JSON file, so a restart only replays the new rounds.
+    The file records the genesis hash of the network as well, the order book is bootstrapped again when the indexer
+    serves another network or is behind the last processed round, e.g. a restarted local node.
+    """
+
+    def __init__(self, app_id: int, indexer=None, state_path: Optional[str] = None):
+        self.app_id = app_id
+        self.indexer = indexer or get_indexer()
+        self.state_path = state_path or os.path.join(get_project_root_path(), 'data', f'order_book_{app_id}.json')
+
+        self.last_round: Optional[int] = None
+        self.genesis_hash: Optional[str] = None
+        self._prices: Dict[OfferKey, int] = dict()
+        self._sale_offers: Dict[OfferKey, SaleOffer] = dict()
+        # Sorted (amount, seller_address, asa_id) of the offers whose tickets are resolved.
+        self._price_index: List[Tuple[int, str, int]] = []
+
+        self._lock = threading.RLock()
+        self._fetcher = get_asset_metadata_fetcher(self.indexer)
+
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except ValueError:
+            return
+
+        if state.get("app_id") != self.app_id:
+            return
+
+        self.last_round = state["last_round"]
+        self.genesis_hash = state.get("genesis_hash")
+        self._prices = {(seller_address, asa_id): price for seller_address, asa_id, price in state["offers"]}
+
+    def _save(self):
+        state = {
+            "app_id": self.app_id,
+            "genesis_hash": self.genesis_hash,
+            "last_round": self.last_round,
+            "offers": [[seller_address, asa_id, price] for (seller_address, asa_id), price in self._prices.items()]
+        }
+
+        write_json_atomically(self.state_path, state)
+
+    def _put(self, key: OfferKey, price: int):
+        self._remove(key)
+        self._prices[key] = price
+
+    def _remove(self, key: OfferKey):
+        self._prices.pop(key, None)
+
+        sale_offer = self._sale_offers.pop(key, None)
+        if sale_offer is not None:
+            index_entry = (sale_offer.amount, key[0], key[1])
+            position = bisect.bisect_left(self._price_index, index_entry)
+            if position < len(self._price_index) and self._price_index[position] == index_entry:
+                del self._price_index[position]
+
+    def _resolve_tickets(self):
+        """
+        Builds the SaleOffers of the offers whose tickets were not resolved yet.
+        """
+        unresolved = [key for key in self._prices if key not in self._sale_offers]
+        if len(unresolved) == 0:
+            return
+
+        tickets = self._fetcher.tickets(asa_ids=set(asa_id for _, asa_id in unresolved))
+
+        for seller_address, asa_id in unresolved:
+            if asa_id not in tickets:
+                continue
+
+            sale_offer = SaleOffer(sale_type="second_hand",
+                                   ticket=tickets[asa_id],
+                                   asa_id=asa_id,
+                                   second_hand_seller_address=seller_address,
+                                   second_hand_amount=self._prices[(seller_address, asa_id)])
+
+            self._sale_offers[(seller_address, asa_id)] = sale_offer
+            bisect.insort(self._price_index, (sale_offer.amount, seller_address, asa_id))
+
+    def _matches_indexer(self) -> bool:
+        """
+        :return: whether the order book was built from the network of the indexer and the indexer has caught up with
+        the last processed round.
+        """
+        if self.genesis_hash != indexer_genesis_hash(self.indexer):
+            return False
+
+        return self.last_round <= self.indexer.health()['round']
+
+    def _bootstrap(self):
+        bootstrap_round = None
+        prices = dict()
+        genesis_hash = indexer_genesis_hash(self.indexer)
+
+        for current_round, accounts in SecondHandOfferingsService._account_pages(indexer=self.indexer,
+                                                                                 app_id=self.app_id,
+                                                                                 sellers_of_interest=None,
+                                                                                 page_size=None):
+            # The pages can be served at different rounds, replaying from the earliest one converges to the
+            # latest state since every replayed operation sets or removes a single offer.
+            if current_round is not None and (bootstrap_round is None or current_round < bootstrap_round):
+                bootstrap_round = current_round
+
+            for account in accounts:
+                for seller_address, asa_id, asa_price in \
+                        SecondHandOfferingsService._account_offers(account=account, app_id=self.app_id):
+                    prices[(seller_address, asa_id)] = asa_price
+
+        self._prices = dict()
+        self._sale_offers = dict()
+        self._price_index = []
+        for key, price in prices.items():
+            self._put(key, price)
+
+        self.last_round = bootstrap_round or 0
+        self.genesis_hash = genesis_hash
+
+    def _apply_transaction(self, transaction: dict):
+        application_transaction = transaction.get('application-transaction')
+        if application_transaction is None:
+            return
+
+        sender = transaction['sender']
+        on_completion = application_transaction.get('on-completion')
+
+        if on_completion in ('closeout', 'clear'):
+            for key in [key for key in self._prices if key[0] == sender]:
+                self._remove(key)
+            return
+
+        application_args = [base64.b64decode(arg) for arg in application_transaction.get('application-args', [])]
+        foreign_assets = application_transaction.get('foreign-assets', [])
+        if len(application_args) == 0 or len(foreign_assets) == 0:
+            return
+
+        app_method = application_args[0].decode('utf-8', errors='ignore')
+        asa_id = foreign_assets[0]
+
+        if app_method == AppMethods.sell_asa:
+            self._put((sender, asa_id), int.from_bytes(application_args[9], 'big'))
+        elif app_method == AppMethods.stop_selling:
+            self._remove((sender, asa_id))
+        elif app_method == AppMethods.buy_from_seller:
+            seller_address = application_transaction.get('accounts', [])[0]
+            self._remove((seller_address, asa_id))
+
+    def _replay(self) -> int:
+        """
+        Applies the application calls confirmed after the last processed round.
+        :return: the number of applied transactions.
+        """
+        applied = 0
+        next_page = None
+        current_round = None
+
+        while True:
+            response = self.indexer.search_transactions(application_id=self.app_id,
+                                                        min_round=self.last_round + 1,
+                                                        next_page=next_page)
+            if current_round is None:
+                current_round = response.get('current-round')
+
+            for transaction in response.get('transactions', []):
+                self._apply_transaction(transaction)
+                applied += 1
+                current_round = max(current_round or 0, transaction.get('confirmed-round', 0))
+
+            next_page = response.get('next-token')
+            if not next_page or len(response.get('transactions', [])) == 0:
+                break
+
+        if current_round is not None:
+            self.last_round = max(self.last_round, current_round)
+
+        return applied
+
+    def sync(self) -> int:
+        """
+        Advances the order book to the latest round of the indexer.
+        :return: the number of application calls that were applied.
+        """
+        with self._lock:
+            if self.last_round is None or not self._matches_indexer():
+                self._bootstrap()
+
+            applied = self._replay()
+            self._resolve_tickets()
+            self._save()
+
+            return applied
+
+    def offers(self) -> List[SaleOffer]:
+        """
+        :return: all of the offers whose tickets are resolved, sorted by the amount that the buyer pays.
+        """
+        with self._lock:
+            return [self._sale_offers[(seller_address, asa_id)] for _, seller_address, asa_id in self._price_index]
+
+    def offers_in_price_range(self, min_amount: int = 0, max_amount: Optional[int] = None) -> List[SaleOffer]:
+        """
+        :param min_amount: the minimal amount in microAlgos that the buyer pays, inclusive.
+        :param max_amount: the maximal amount in microAlgos that the buyer pays, inclusive.
+        :return: the offers in the price range sorted by the amount.
+        """
+        with self._lock:
+            start = bisect.bisect_left(self._price_index, (min_amount,))
+            end = len(self._price_index) if max_amount is None \
+                else bisect.bisect_left(self._price_index, (max_amount + 1,))
+
+            return [self._sale_offers[(seller_address, asa_id)]
+                    for _, seller_address, asa_id in self._price_index[start:end]]
+
+    def offers_for_asa(self, asa_id: int) -> List[SaleOffer]:
+        with self._lock:
+            return [sale_offer for (_, offer_asa_id), sale_offer in self._sale_offers.items()
+                    if offer_asa_id == asa_id]
+
+    def offers_of_seller(self, seller_address: str) -> List[SaleOffer]:
+        with self._lock:
+            return [sale_offer for (offer_seller_address, _), sale_offer in self._sale_offers.items()
+                    if offer_seller_address == seller_address]
+
+
+_order_books: Dict[int, OrderBookService] = dict()
+_order_books_lock = threading.Lock()
+
+
+def get_order_book(app_id: int) -> OrderBookService:
+    """
+    :return: the process-wide OrderBookService of the application.
+    """
+    with _order_books_lock:
+        if app_id not in _order_books:
+            _order_books[app_id] = OrderBookService(app_id=app_id)
+
+        return _order_books[app_id]
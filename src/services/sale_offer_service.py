@@ -1,52 +1,177 @@
+import logging
 from typing import List
 from src.blockchain_utils.credentials import get_indexer
-from src.models.ticket_models import Ticket
 from src.models.asset_sale_offer import SaleOffer
+from src.services.asset_metadata_fetcher import get_asset_metadata_fetcher
 import base64
-import time
-import requests
-from typing import Set, Optional
+from typing import Set, Optional, Iterator, Tuple, Dict
+from algosdk.error import IndexerHTTPError
+
+logger = logging.getLogger(__name__)
 
 
 class SecondHandOfferingsService:
 
     @staticmethod
-    def available_offers(app_id: int, sellers_of_interest: Optional[Set[str]] = None) -> List[SaleOffer]:
-        indexer = get_indexer()
-        acc_app_info = indexer.accounts(application_id=app_id)
-        sale_offers: List[SaleOffer] = []
-        for account in acc_app_info['accounts']:
-            if sellers_of_interest is not None:
-                if account['address'] not in sellers_of_interest:
+    def _account_offers(account: dict, app_id: int) -> List[Tuple[str, int, int]]:
+        """
+        :return: the (seller_address, asa_id, asa_price) of every offer stored in the local state of the account.
+        """
+        offers = []
+        for local_state in account.get('apps-local-state', []):
+            if local_state['id'] == app_id:
+                for local_state_stored in local_state.get('key-value', []):
+                    seller_address = account['address']
+                    asa_id = int.from_bytes(base64.b64decode(local_state_stored['key']), "big")
+                    asa_price = local_state_stored['value']['uint']
+                    offers.append((seller_address, asa_id, asa_price))
+
+        return offers
+
+    @staticmethod
+    def _account_pages(indexer, app_id: int, sellers_of_interest: Optional[Set[str]], page_size: Optional[int]):
+        """
+        Yields the (current_round, accounts) pages of the accounts that are opted in the application. When the
+        sellers of interest are known only their accounts are looked up, instead of scanning all of the opted in
+        accounts.
+        """
+        if sellers_of_interest is not None:
+            current_round = None
+            accounts = []
+            for seller_address in sorted(sellers_of_interest):
+                try:
+                    account_info = indexer.account_info(address=seller_address)
+                except IndexerHTTPError as e:
+                    logger.warning('Failed to load the account %s: %s', seller_address, e)
                     continue
 
-            for local_state in account['apps-local-state']:
-                if local_state['id'] == app_id:
-                    if 'key-value' in local_state:
-                        for local_state_stored in local_state['key-value']:
-                            seller_address = account['address']
-                            asa_id = int.from_bytes(base64.b64decode(local_state_stored['key']), "big")
-                            asa_price = local_state_stored['value']['uint']
-                            # TODO: We can remove this once we have fast node or pay.
-                            time.sleep(1.5)
-                            asset_info = indexer.asset_info(asset_id=asa_id)
-                            r = requests.get(asset_info['asset']['params']['url'])
-                            ticket = Ticket(**r.json())
-                            ticket.asa_configuration.asa_id = asa_id
-                            sale_offers.append(SaleOffer(sale_type="second_hand",
-                                                         ticket=ticket,
-                                                         asa_id=asa_id,
-                                                         second_hand_seller_address=seller_address,
-                                                         second_hand_amount=asa_price))
+                accounts.append(account_info['account'])
+                if current_round is None or account_info.get('current-round', current_round) < current_round:
+                    current_round = account_info.get('current-round')
+            yield current_round, accounts
+            return
 
-        return sale_offers
+        next_page = None
+        while True:
+            acc_app_info = indexer.accounts(application_id=app_id, limit=page_size, next_page=next_page)
+            yield acc_app_info.get('current-round'), acc_app_info['accounts']
+
+            next_page = acc_app_info.get('next-token')
+            if not next_page or len(acc_app_info['accounts']) == 0:
+                return
+
+    @staticmethod
+    def iter_offers(app_id: int,
+                    sellers_of_interest: Optional[Set[str]] = None,
+                    page_size: Optional[int] = None,
+                    indexer=None) -> Iterator[SaleOffer]:
+        """
+        Streams the second hand sale offers page by page, following the next-token pagination of the indexer.
+        The tickets of every page are fetched concurrently before its offers are yielded.
+        :param app_id: the id of the TokilityDEX application.
+        :param sellers_of_interest: when set, only the offers of those sellers are returned.
+        :param page_size: the number of accounts requested per indexer page.
+        :param indexer: the indexer client to use instead of the configured one.
+        :return:
+        """
+        indexer = indexer or get_indexer()
+        fetcher = get_asset_metadata_fetcher(indexer)
+
+        for _, accounts in SecondHandOfferingsService._account_pages(indexer=indexer,
+                                                                  app_id=app_id,
+                                                                  sellers_of_interest=sellers_of_interest,
+                                                                  page_size=page_size):
+            offers = []
+            for account in accounts:
+                offers.extend(SecondHandOfferingsService._account_offers(account=account, app_id=app_id))
+
+            tickets = fetcher.tickets(asa_ids=set(asa_id for _, asa_id, _ in offers))
+
+            for seller_address, asa_id, asa_price in offers:
+                if asa_id not in tickets:
+                    continue
+
+                yield SaleOffer(sale_type="second_hand",
+                                ticket=tickets[asa_id],
+                                asa_id=asa_id,
+                                second_hand_seller_address=seller_address,
+                                second_hand_amount=asa_price)
+
+    @staticmethod
+    def _asa_holders(indexer, asa_id: int) -> List[str]:
+        """
+        :return: the addresses of the accounts that currently hold the ASA. A ticket has a single holder.
+        """
+        holders = []
+        next_page = None
+        while True:
+            balances = indexer.asset_balances(asset_id=asa_id, next_page=next_page)
+            holders.extend(balance['address'] for balance in balances['balances'] if balance['amount'] >= 1)
+
+            next_page = balances.get('next-token')
+            if not next_page or len(balances['balances']) == 0:
+                return holders
+
+    @staticmethod
+    def offers_for_asas(app_id: int, asa_ids: Set[int], indexer=None) -> Dict[int, SaleOffer]:
+        """
+        Looks up the second hand offers of the given ASAs without scanning the accounts that are opted in the
+        application. The offer of an ASA can only be stored in the local state of its holder, under the Itob(asa_id)
+        key, so per ASA the holder is resolved from the asset balances and only that account is loaded.
+        :param app_id: the id of the TokilityDEX application.
+        :param asa_ids: the ids of the ASAs of interest.
+        :param indexer: the indexer client to use instead of the configured one.
+        :return: the sale offer of every ASA that is currently offered for sale, keyed by the asa_id.
+        """
+        indexer = indexer or get_indexer()
+
+        offers = []
+        for asa_id in sorted(asa_ids):
+            try:
+                holders = SecondHandOfferingsService._asa_holders(indexer=indexer, asa_id=asa_id)
+            except IndexerHTTPError as e:
+                logger.warning('Failed to load the holders of the ASA %s: %s', asa_id, e)
+                continue
+
+            for holder_address in holders:
+                try:
+                    account = indexer.account_info(address=holder_address)['account']
+                except IndexerHTTPError as e:
+                    logger.warning('Failed to load the account %s: %s', holder_address, e)
+                    continue
+
+                offers.extend(offer for offer in SecondHandOfferingsService._account_offers(account=account,
+                                                                                            app_id=app_id)
+                              if offer[1] == asa_id)
+
+        tickets = get_asset_metadata_fetcher(indexer).tickets(asa_ids=set(asa_id for _, asa_id, _ in offers))
+
+        return {asa_id: SaleOffer(sale_type="second_hand",
+                                  ticket=tickets[asa_id],
+                                  asa_id=asa_id,
+                                  second_hand_seller_address=seller_address,
+                                  second_hand_amount=asa_price)
+                for seller_address, asa_id, asa_price in offers if asa_id in tickets}
+
+    @staticmethod
+    def offer_for_asa(app_id: int, asa_id: int, indexer=None) -> Optional[SaleOffer]:
+        """
+        :return: the second hand offer of the ASA, or None when the ASA is not offered for sale.
+        """
+        return SecondHandOfferingsService.offers_for_asas(app_id=app_id, asa_ids={asa_id}, indexer=indexer).get(asa_id)
+
+    @staticmethod
+    def available_offers(app_id: int, sellers_of_interest: Optional[Set[str]] = None, indexer=None) -> List[SaleOffer]:
+        return list(SecondHandOfferingsService.iter_offers(app_id=app_id,
+                                                           sellers_of_interest=sellers_of_interest,
+                                                           indexer=indexer))
 
 
 class InitialBuyOfferingsService:
 
     @staticmethod
-    def available_sell_offers(creator_address) -> List[SaleOffer]:
-        indexer = get_indexer()
+    def available_sell_offers(creator_address, indexer=None) -> List[SaleOffer]:
+        indexer = indexer or get_indexer()
         assets = indexer.account_info(address=creator_address)
         available_for_sell_assets = set()
 
@@ -54,14 +179,17 @@ class InitialBuyOfferingsService:
             if asset['amount'] == 1:
                 available_for_sell_assets.add(asset['asset-id'])
 
+        available_assets = [created_asset for created_asset in assets['account']['created-assets']
+                            if created_asset['index'] in available_for_sell_assets]
+
+        tickets = get_asset_metadata_fetcher(indexer).tickets_from_params(
+            {created_asset['index']: created_asset['params'] for created_asset in available_assets})
+
         sale_offers: List[SaleOffer] = []
-        for created_asset in assets['account']['created-assets']:
-            if created_asset['index'] in available_for_sell_assets:
-                r = requests.get(created_asset['params']['url'])
-                ticket = Ticket(**r.json())
-                ticket.asa_configuration.asa_id = created_asset['index']
+        for created_asset in available_assets:
+            if created_asset['index'] in tickets:
                 sale_offers.append(SaleOffer(sale_type="initial_buy",
-                                             ticket=ticket,
+                                             ticket=tickets[created_asset['index']],
                                              asa_id=created_asset['index']))
 
         return sale_offers
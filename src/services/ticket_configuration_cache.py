@@ -0,0 +1,186 @@
+import base64
+import json
+import os
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+import requests
+
+from src.blockchain_utils.file_utils import write_json_atomically
+from src.models.ticket_models import Ticket
+
+DEFAULT_CACHE_DIR = Path(os.path.dirname(__file__)).parent.parent / '.ticket_cache'
+
+
+class TicketConfigurationMismatchError(Exception):
+    def __init__(self, url: str, expected_metadata_hash: str, metadata_hash: str):
+        super().__init__(f'The ticket configuration at {url} hashes to {metadata_hash}, '
+                         f'but the ASA metadata hash is {expected_metadata_hash}.')
+        self.url = url
+        self.expected_metadata_hash = expected_metadata_hash
+        self.metadata_hash = metadata_hash
+
+
+class TicketConfigurationCache:
+    """
+    Content-addressed cache of the ticket configurations that the ASAs point to with their url. The configuration
+    of a minted ticket is immutable, because its hash is pinned in the metadata hash of the ASA. Each configuration
+    is fetched once, verified against the on-chain metadata hash and afterwards served from a memory LRU backed
+    by an on-disk store. The entries are kept per network, see network_identity.network_key, since the same asa id
+    or local url refers to different tickets on another network.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_memory_entries: int = 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_entries = max_memory_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        # <network>:url:<url> -> {"key": ..., "configuration": dict, "metadata_hash": str}
+        # <network>:asset:<asa_id> -> {"key": ..., "url": str, "metadata_hash": Optional[str]}
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _metadata_hash(configuration: dict) -> str:
+        ticket = Ticket(**configuration)
+        return base64.b64encode(sha256(ticket.asa_configuration.metadata_hash).digest()).decode()
+
+    def _cache_file(self, key: str) -> Path:
+        return self.cache_dir / f"{sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        cache_file = self._cache_file(key)
+        if not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file) as f:
+                entry = json.load(f)
+            if entry["key"] != key:
+                return None
+        except (ValueError, KeyError):
+            return None
+
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, entry: dict):
+        self._remember(entry["key"], entry)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        write_json_atomically(self._cache_file(entry["key"]), entry)
+
+    def configuration(self,
+                      url: str,
+                      network: str,
+                      metadata_hash: Optional[str] = None,
+                      session: Optional[requests.Session] = None) -> Dict:
+        """
+        Returns the raw ticket configuration stored at the url.
+        :param url: the url of the ASA.
+        :param network: the network key of the ASA.
+        :param metadata_hash: the base64 encoded metadata hash of the ASA, when set the configuration is verified
+        against it.
+        :param session: optional http session used to fetch the configuration on a cache miss.
+        :return:
+        """
+        key = f'{network}:url:{url}'
+        entry = self._lookup(key)
+
+        if entry is not None and (metadata_hash is None or entry["metadata_hash"] == metadata_hash):
+            with self._lock:
+                self.hits += 1
+            return entry["configuration"]
+
+        # Either not cached or cached for a different metadata hash, e.g. the file at the url changed, so the
+        # configuration is fetched again.
+        with self._lock:
+            self.misses += 1
+        r = (session or requests).get(url)
+        r.raise_for_status()
+        configuration = r.json()
+
+        configuration_hash = self._metadata_hash(configuration)
+        if metadata_hash is not None and configuration_hash != metadata_hash:
+            raise TicketConfigurationMismatchError(url=url,
+                                                   expected_metadata_hash=metadata_hash,
+                                                   metadata_hash=configuration_hash)
+
+        self._store({"key": key, "configuration": configuration, "metadata_hash": configuration_hash})
+
+        return configuration
+
+    def ticket(self,
+               url: str,
+               asa_id: int,
+               network: str,
+               metadata_hash: Optional[str] = None,
+               session: Optional[requests.Session] = None) -> Ticket:
+        """
+        :param url: the url of the ASA.
+        :param asa_id: the id of the ASA.
+        :param network: the network key of the ASA.
+        :param metadata_hash: the base64 encoded metadata hash of the ASA.
+        :param session: optional http session used to fetch the configuration on a cache miss.
+        :return: a new Ticket of the ASA, built from the cached configuration.
+        """
+        ticket = Ticket(**self.configuration(url=url, network=network, metadata_hash=metadata_hash, session=session))
+        ticket.asa_configuration.asa_id = asa_id
+
+        return ticket
+
+    def asset_reference(self, asa_id: int, network: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        The url and the metadata hash of an ASA are immutable after its creation, so they are cached as well.
+        :param asa_id:
+        :param network: the network key of the ASA.
+        :return: the (url, base64 metadata hash) of the ASA if it is cached.
+        """
+        entry = self._lookup(f'{network}:asset:{asa_id}')
+        if entry is None:
+            return None
+
+        return entry["url"], entry["metadata_hash"]
+
+    def store_asset_reference(self, asa_id: int, network: str, asset_params: dict):
+        """
+        :param asa_id:
+        :param network: the network key of the ASA.
+        :param asset_params: the params of the ASA as returned from algod or the indexer.
+        """
+        self._store({"key": f'{network}:asset:{asa_id}',
+                     "url": asset_params['url'],
+                     "metadata_hash": asset_params.get('metadata-hash')})
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory)
+        }
+
+
+_ticket_configuration_cache = TicketConfigurationCache()
+
+
+def get_ticket_configuration_cache() -> TicketConfigurationCache:
+    return _ticket_configuration_cache
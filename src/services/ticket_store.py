@@ -0,0 +1,306 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Type, Union
+
+from src.models.ticket_models import (Ticket, ConcertTicket, CinemaTicket, ConferenceTicket, AppointmentTicket,
+                                      RestaurantTicket)
+
+DEFAULT_DATABASE_PATH = 'data/ui/tickets.sqlite3'
+
+TICKET_CLASSES: Dict[str, Type[Ticket]] = {
+    Ticket.BusinessType.concert: ConcertTicket,
+    Ticket.BusinessType.cinema: CinemaTicket,
+    Ticket.BusinessType.conference: ConferenceTicket,
+    Ticket.BusinessType.appointment: AppointmentTicket,
+    Ticket.BusinessType.restaurant: RestaurantTicket,
+}
+
+# How long a writer waits for the write lock of another process before it fails.
+BUSY_TIMEOUT_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asa_id INTEGER,
+    business_type TEXT NOT NULL,
+    creator TEXT NOT NULL,
+    reselling_end_date INTEGER,
+    data TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS tickets_business_type ON tickets (business_type, id);
+CREATE INDEX IF NOT EXISTS tickets_creator ON tickets (creator, id);
+CREATE INDEX IF NOT EXISTS tickets_asa_id ON tickets (asa_id);
+CREATE INDEX IF NOT EXISTS tickets_reselling_end_date ON tickets (reselling_end_date);
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    tickets INTEGER NOT NULL,
+    imported_at REAL NOT NULL,
+    mtime_ns INTEGER,
+    size INTEGER
+);
+"""
+
+# The columns added after the first release, (table, column, definition), added to the existing databases.
+_MIGRATIONS = [
+    ('tickets', 'source', 'TEXT'),
+    ('imported_files', 'mtime_ns', 'INTEGER'),
+    ('imported_files', 'size', 'INTEGER'),
+]
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS tickets_source ON tickets (source);
+"""
+
+
+class TicketQueryResult(Sequence):
+    """
+    The tickets that match a query, in the order in which they were stored. The length is a COUNT and a slice is a
+    LIMIT/OFFSET query, so rendering a page parses only the tickets of the page.
+    """
+
+    def __init__(self, store: 'TicketStore', where: str, parameters: tuple):
+        self._store = store
+        self._where = where
+        self._parameters = parameters
+        self._length: Optional[int] = None
+
+    def __len__(self) -> int:
+        if self._length is None:
+            row = self._store._connection().execute(f'SELECT COUNT(*) FROM tickets{self._where}',
+                                                    self._parameters).fetchone()
+            self._length = row[0]
+
+        return self._length
+
+    def _rows(self, limit: int, offset: int) -> List[Ticket]:
+        rows = self._store._connection().execute(f'SELECT business_type, data FROM tickets{self._where} '
+                                                 f'ORDER BY id LIMIT ? OFFSET ?',
+                                                 self._parameters + (limit, offset)).fetchall()
+        return [TicketStore.to_ticket(business_type, data) for business_type, data in rows]
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self._rows(limit=len(self), offset=0)[index]
+            return self._rows(limit=max(0, stop - start), offset=start)
+
+        if index < 0:
+            index += len(self)
+        tickets = self._rows(limit=1, offset=index) if index >= 0 else []
+        if not tickets:
+            raise IndexError('ticket index out of range')
+
+        return tickets[0]
+
+    def __iter__(self) -> Iterator[Ticket]:
+        rows = self._store._connection().execute(f'SELECT business_type, data FROM tickets{self._where} ORDER BY id',
+                                                 self._parameters)
+        for business_type, data in rows:
+            yield TicketStore.to_ticket(business_type, data)
+
+
+class TicketStore:
+    """
+    SQLite store of the tickets of all of the business types, created by the sellers in the client UI. Every ticket
+    is one row with the JSON of the ticket and the indexed columns that the UIs filter on, so storing a ticket is a
+    single insert no matter how many tickets there are. The database runs in WAL mode: readers never block the
+    writer, and the writers of all of the processes are serialized by SQLite itself.
+    Every thread has its own connection, since the sessions of streamlit run in different threads. The connection
+    is closed when its thread ends.
+    """
+
+    def __init__(self, path: str = DEFAULT_DATABASE_PATH):
+        self.path = path
+
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # executescript commits on its own, every statement of the schema is idempotent.
+        connection = self._connection()
+        connection.executescript(_SCHEMA)
+        self._migrate(connection)
+        connection.executescript(_INDEXES)
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection):
+        with _Transaction(connection):
+            for table, column, definition in _MIGRATIONS:
+                columns = [row[1] for row in connection.execute(f'PRAGMA table_info({table})')]
+                if column not in columns:
+                    connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # The transactions are explicit, see _transaction. The connection is only used by this thread, but it
+            # is closed by the thread that releases the thread-local data.
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            # The thread-local data of a thread is released when the thread ends, which closes its connection.
+            self._local.closer = _ConnectionCloser(connection)
+
+        return connection
+
+    def _transaction(self) -> '_Transaction':
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def to_ticket(business_type: str, data: str) -> Ticket:
+        """
+        :return: the ticket cast to the class of its business type.
+        """
+        return TICKET_CLASSES.get(business_type, Ticket)(**json.loads(data))
+
+    @staticmethod
+    def _row(ticket: Ticket) -> tuple:
+        asa_configuration = ticket.asa_configuration
+        return (asa_configuration.asa_id,
+                ticket.business_type,
+                asa_configuration.asa_creator_address,
+                asa_configuration.economy_configuration.reselling_end_date,
+                ticket.json())
+
+    def insert(self, ticket: Ticket):
+        self.insert_many([ticket])
+
+    def insert_many(self, tickets: Iterable[Ticket]) -> int:
+        """
+        Stores the tickets in a single transaction, either all of them or none.
+        :return: the number of stored tickets.
+        """
+        rows = [self._row(ticket) for ticket in tickets]
+        with self._transaction() as connection:
+            connection.executemany('INSERT INTO tickets (asa_id, business_type, creator, reselling_end_date, data) '
+                                   'VALUES (?, ?, ?, ?, ?)', rows)
+
+        return len(rows)
+
+    def tickets(self,
+                business_type: Optional[str] = None,
+                creator: Optional[str] = None,
+                asa_id: Optional[int] = None,
+                reselling_ends_after: Optional[int] = None) -> TicketQueryResult:
+        """
+        :param business_type: only the tickets of this business type.
+        :param creator: only the tickets created by this address.
+        :param asa_id: only the tickets of this ASA.
+        :param reselling_ends_after: only the tickets whose reselling end date, a unix timestamp, is later.
+        :return: the matching tickets, in the order in which they were stored.
+        """
+        conditions = []
+        parameters = []
+        for column, operator, value in (('business_type', '=', business_type),
+                                        ('creator', '=', creator),
+                                        ('asa_id', '=', asa_id),
+                                        ('reselling_end_date', '>', reselling_ends_after)):
+            if value is not None:
+                conditions.append(f'{column} {operator} ?')
+                parameters.append(value)
+
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        return TicketQueryResult(self, where=where, parameters=tuple(parameters))
+
+    def import_json(self, path: str, business_type: str) -> int:
+        """
+        Imports the tickets of a JSON file in the format of data/ui/*_tickets_dummy.json, e.g.
+        {"concert_tickets": [...]}. A file is imported again only when its modification time or size changed, in
+        which case its previously imported tickets are replaced.
+        :return: the number of imported tickets.
+        """
+        with self._transaction() as connection:
+            stat = os.stat(path)
+            imported = connection.execute('SELECT mtime_ns, size FROM imported_files WHERE path = ?',
+                                          (path,)).fetchone()
+            if imported is not None:
+                if imported == (stat.st_mtime_ns, stat.st_size):
+                    return 0
+
+                if imported == (None, None):
+                    # Imported before the modification times were recorded, the tickets of the file are not known.
+                    connection.execute('UPDATE imported_files SET mtime_ns = ?, size = ? WHERE path = ?',
+                                       (stat.st_mtime_ns, stat.st_size, path))
+                    return 0
+
+            with open(path) as f:
+                json_data = json.load(f)
+
+            ticket_class = TICKET_CLASSES[business_type]
+            rows = [self._row(ticket_class(**ticket_data)) + (path,)
+                    for ticket_data in json_data[f'{business_type}_tickets']]
+            connection.execute('DELETE FROM tickets WHERE source = ?', (path,))
+            connection.executemany('INSERT INTO tickets (asa_id, business_type, creator, reselling_end_date, data, '
+                                   'source) VALUES (?, ?, ?, ?, ?, ?)', rows)
+            connection.execute('INSERT OR REPLACE INTO imported_files (path, tickets, imported_at, mtime_ns, size) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               (path, len(rows), time.time(), stat.st_mtime_ns, stat.st_size))
+
+        return len(rows)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+            self._local.closer = None
+
+
+class _ConnectionCloser:
+    """
+    Closes the connection of a thread when the thread-local data that holds it is released.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._finalizer = weakref.finalize(self, connection.close)
+
+
+class _Transaction:
+    """
+    Write transaction that takes the write lock up front, so two writers never deadlock upgrading their read locks.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.connection.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        return False
+
+
+_ticket_stores: Dict[str, TicketStore] = dict()
+_ticket_stores_lock = threading.Lock()
+
+
+def get_ticket_store(path: str = DEFAULT_DATABASE_PATH, json_directory: Optional[str] = 'data/ui') -> TicketStore:
+    """
+    :param path: the SQLite database.
+    :param json_directory: the directory of the *_tickets_dummy.json files, they are imported on the first open of
+    the database. None skips the import.
+    :return: the process-wide TicketStore of the database.
+    """
+    with _ticket_stores_lock:
+        if path not in _ticket_stores:
+            store = TicketStore(path=path)
+            if json_directory is not None:
+                for business_type in TICKET_CLASSES:
+                    json_path = os.path.join(json_directory, f'{business_type}_tickets_dummy.json')
+                    if os.path.exists(json_path):
+                        store.import_json(json_path, business_type)
+            _ticket_stores[path] = store
+
+        return _ticket_stores[path]
@@ -1,12 +1,31 @@
 from algosdk.v2client import algod
 from src.models.asset_configurations import ASAConfiguration
 from src.blockchain_utils.transaction_repository import ApplicationTransactionRepository, PaymentTransactionRepository, \
-    ASATransactionRepository
+    ASATransactionRepository, get_default_suggested_params
+from src.blockchain_utils.fee_estimator import FeeEstimator
+from src.blockchain_utils.suggested_params_provider import get_suggested_params_provider
 from src.services import NetworkInteraction
-from src.smart_contracts.tokility_clawback_asc1 import TokilityClawbackASC1
-from src.smart_contracts.tokility_dex_asc1 import TokilityDEX
+from src.services.encoded_configuration_cache import get_encoded_configuration_cache
+from src.smart_contracts.compilation_cache import get_compilation_cache, dex_approval_program, dex_clear_program
+from src.smart_contracts import dex_constants
+from src.smart_contracts.dex_constants import AppMethods
 import algosdk
-from pyteal import compileTeal, Mode
+from algosdk.future.transaction import SuggestedParams
+from typing import Optional, Dict, List
+import base64
+
+
+class SellOfferLimitError(Exception):
+    """
+    Raised before submitting a sell offer when the seller already uses all of the sell offer slots of its local state.
+    """
+
+    def __init__(self, seller_address: str, asa_id: int, max_sell_offers: int):
+        super().__init__(f"{seller_address} already has {max_sell_offers} open sell offers, stop selling one of them "
+                         f"before offering the ASA {asa_id}.")
+        self.seller_address = seller_address
+        self.asa_id = asa_id
+        self.max_sell_offers = max_sell_offers
 
 
 class TokilityDEXService:
@@ -25,21 +44,11 @@ class TokilityDEXService:
             self.app_id = self._deploy_application()
 
     def _deploy_application(self):
-        tokility_dex = TokilityDEX()
-
-        approval_program_compiled = compileTeal(tokility_dex.approval_program(),
-                                                mode=Mode.Application,
-                                                version=4)
+        approval_program_bytes = get_compilation_cache().compile(client=self.client,
+                                                                 program=dex_approval_program())
 
-        clear_program_compiled = compileTeal(tokility_dex.clear_program(),
-                                             mode=Mode.Application,
-                                             version=4)
-
-        approval_program_bytes = NetworkInteraction.compile_program(client=self.client,
-                                                                    source_code=approval_program_compiled)
-
-        clear_program_bytes = NetworkInteraction.compile_program(client=self.client,
-                                                                 source_code=clear_program_compiled)
+        clear_program_bytes = get_compilation_cache().compile(client=self.client,
+                                                              program=dex_clear_program())
 
         app_args = [
             algosdk.encoding.decode_address(self.app_creator_addr)
@@ -49,8 +58,8 @@ class TokilityDEXService:
             creator_private_key=self.app_creator_pk,
             approval_program=approval_program_bytes,
             clear_program=clear_program_bytes,
-            global_schema=tokility_dex.global_schema,
-            local_schema=tokility_dex.local_schema,
+            global_schema=dex_constants.global_schema(),
+            local_schema=dex_constants.local_schema(),
             # TODO: Maybe pass a new wallet address.
             app_args=app_args
         )
@@ -67,18 +76,22 @@ class TokilityDEXService:
 
         return app_id
 
+    def _fee_estimator(self, suggested_params: SuggestedParams) -> FeeEstimator:
+        """
+        The fees of the groups are pooled: the application call pays for all of the transactions, so the clawback
+        logic signature never pays a fee. Without a client only the fee of the given params is known.
+        """
+        if self.client is None:
+            return FeeEstimator.from_suggested_params(suggested_params)
+
+        return get_suggested_params_provider(self.client).fee_estimator()
+
     @staticmethod
     def dex_configuration_arguments(asa_configuration: ASAConfiguration):
-        return [
-            asa_configuration.asa_price_bytes,
-            asa_configuration.tokiliy_fee_bytes,
-            asa_configuration.max_sell_price_bytes,
-            asa_configuration.owner_fee_bytes,
-            asa_configuration.reselling_allowed_bytes,
-            asa_configuration.reselling_end_date_bytes,
-            asa_configuration.gifting_allowed_bytes,
-            asa_configuration.asa_creator_address_bytes
-        ]
+        """
+        :return: the configuration arguments of the application calls, encoded once per ASA.
+        """
+        return list(get_encoded_configuration_cache().encode(asa_configuration).app_args)
 
     def fund_address(self, receiver_address: str, amount: int = 1000000):
         fund_clawback_txn = PaymentTransactionRepository.payment(
@@ -110,73 +123,207 @@ class TokilityDEXService:
                     asa_configuration: ASAConfiguration,
                     asa_clawback_addr: str,
                     asa_clawback_bytes):
-        # 1. App call.
-        app_args = [
-            TokilityDEX.AppMethods.initial_buy
-        ]
-        app_args.extend(TokilityDEXService.dex_configuration_arguments(asa_configuration))
+        signed_group = self.initial_buy_group(buyer_addr=buyer_addr,
+                                              buyer_pk=buyer_pk,
+                                              asa_configuration=asa_configuration,
+                                              asa_clawback_addr=asa_clawback_addr,
+                                              asa_clawback_bytes=asa_clawback_bytes)
 
-        app_call_txn = \
-            ApplicationTransactionRepository.call_application(client=self.client,
-                                                              caller_private_key=buyer_pk,
-                                                              app_id=self.app_id,
-                                                              on_complete=algosdk.future.transaction.OnComplete.NoOpOC,
-                                                              app_args=app_args,
-                                                              foreign_assets=[asa_configuration.asa_id],
-                                                              sign_transaction=False)
+        tx_id = self.client.send_transactions(signed_group)
 
-        # 2. Payment transaction: buyer -> seller.
+        print("Initial buy completed.")
+        return tx_id
+
+    def initial_buy_group(self,
+                          buyer_addr: str,
+                          buyer_pk: str,
+                          asa_configuration: ASAConfiguration,
+                          asa_clawback_addr: str,
+                          asa_clawback_bytes,
+                          suggested_params: Optional[SuggestedParams] = None,
+                          fee_estimator: Optional[FeeEstimator] = None) -> list:
+        """
+        Builds and signs the atomic group of the initial buy.
+        0. Application call.
+        1. Payment from buyer to ASA_CREATOR.
+        2. Asset transfer from Clawback to buyer.
+        """
+        return self.initial_buy_many_group(buyer_addr=buyer_addr,
+                                           buyer_pk=buyer_pk,
+                                           asa_configurations=[asa_configuration],
+                                           asa_clawback_addr=asa_clawback_addr,
+                                           asa_clawback_bytes=asa_clawback_bytes,
+                                           suggested_params=suggested_params,
+                                           fee_estimator=fee_estimator)
+
+    def initial_buy_many(self,
+                         buyer_addr: str,
+                         buyer_pk: str,
+                         asa_configurations: List[ASAConfiguration],
+                         asa_clawback_addr: str,
+                         asa_clawback_bytes):
+        signed_group = self.initial_buy_many_group(buyer_addr=buyer_addr,
+                                                   buyer_pk=buyer_pk,
+                                                   asa_configurations=asa_configurations,
+                                                   asa_clawback_addr=asa_clawback_addr,
+                                                   asa_clawback_bytes=asa_clawback_bytes)
+
+        tx_id = self.client.send_transactions(signed_group)
+
+        print(f"Initial buy of {len(asa_configurations)} tickets completed.")
+        return tx_id
+
+    def initial_buy_many_group(self,
+                               buyer_addr: str,
+                               buyer_pk: str,
+                               asa_configurations: List[ASAConfiguration],
+                               asa_clawback_addr: str,
+                               asa_clawback_bytes,
+                               suggested_params: Optional[SuggestedParams] = None,
+                               fee_estimator: Optional[FeeEstimator] = None) -> list:
+        """
+        Builds and signs the atomic group that buys up to dex_constants.MAX_INITIAL_BUY_TICKETS tickets of the same
+        creator at once, so all of them are confirmed in a single round.
+        0 ... N-1. Application call per ticket.
+        N. Payment from buyer to ASA_CREATOR, the sum of the prices of all tickets.
+        N+1 ... 2N. Asset transfer from Clawback to buyer per ticket.
+        """
+        if not 1 <= len(asa_configurations) <= dex_constants.MAX_INITIAL_BUY_TICKETS:
+            raise ValueError(f"An initial buy group holds from 1 to {dex_constants.MAX_INITIAL_BUY_TICKETS} tickets, "
+                             f"got {len(asa_configurations)}.")
+
+        asa_creator_address = asa_configurations[0].asa_creator_address
+        if any(asa_configuration.asa_creator_address != asa_creator_address
+               for asa_configuration in asa_configurations):
+            raise ValueError("All of the tickets of an initial buy group must be issued by the same creator.")
+
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=self.client)
+
+        # 0 ... N-1. App calls.
+        app_call_txns = []
+        for asa_configuration in asa_configurations:
+            app_args = [
+                AppMethods.initial_buy
+            ]
+            app_args.extend(TokilityDEXService.dex_configuration_arguments(asa_configuration))
+
+            app_call_txns.append(
+                ApplicationTransactionRepository.call_application(client=self.client,
+                                                                  caller_private_key=buyer_pk,
+                                                                  app_id=self.app_id,
+                                                                  on_complete=algosdk.future.transaction.OnComplete.NoOpOC,
+                                                                  app_args=app_args,
+                                                                  foreign_assets=[asa_configuration.asa_id],
+                                                                  sign_transaction=False,
+                                                                  suggested_params=suggested_params))
+
+        # N. Payment transaction: buyer -> asa creator, for all of the tickets.
         asa_buy_payment_txn = \
             PaymentTransactionRepository.payment(client=self.client,
                                                  sender_address=buyer_addr,
-                                                 receiver_address=asa_configuration.asa_creator_address,
-                                                 amount=asa_configuration.initial_offering_configuration.asa_price,
+                                                 receiver_address=asa_creator_address,
+                                                 amount=sum(asa_configuration.initial_offering_configuration.asa_price
+                                                            for asa_configuration in asa_configurations),
                                                  sender_private_key=None,
-                                                 sign_transaction=False)
-
-        # 3. Asset transfer transaction: escrow -> buyer
+                                                 sign_transaction=False,
+                                                 suggested_params=suggested_params)
+
+        # N+1 ... 2N. Asset transfer transactions: escrow -> buyer
+        asa_transfer_txns = []
+        for asa_configuration in asa_configurations:
+            asa_transfer_txns.append(
+                ASATransactionRepository.asa_transfer(client=self.client,
+                                                      sender_address=asa_clawback_addr,
+                                                      receiver_address=buyer_addr,
+                                                      amount=1,
+                                                      asa_id=asa_configuration.asa_id,
+                                                      revocation_target=asa_creator_address,
+                                                      sender_private_key=None,
+                                                      sign_transaction=False,
+                                                      suggested_params=suggested_params))
 
-        asa_transfer_txn = ASATransactionRepository.asa_transfer(client=self.client,
-                                                                 sender_address=asa_clawback_addr,
-                                                                 receiver_address=buyer_addr,
-                                                                 amount=1,
-                                                                 asa_id=asa_configuration.asa_id,
-                                                                 revocation_target=asa_configuration.asa_creator_address,
-                                                                 sender_private_key=None,
-                                                                 sign_transaction=False)
+        asa_transfer_txn_logic_signature = algosdk.future.transaction.LogicSig(asa_clawback_bytes)
 
-        # Atomic transfer
-        gid = algosdk.future.transaction.calculate_group_id([app_call_txn,
-                                                             asa_buy_payment_txn,
-                                                             asa_transfer_txn])
+        # Atomic transfer, the first application call pays the fees of the whole group.
+        group = app_call_txns + [asa_buy_payment_txn] + asa_transfer_txns
+        fee_estimator = fee_estimator or self._fee_estimator(suggested_params)
+        fee_estimator.pool(group, logic_sigs={len(asa_configurations) + 1 + i: asa_transfer_txn_logic_signature
+                                              for i in range(len(asa_transfer_txns))})
 
-        app_call_txn.group = gid
-        asa_buy_payment_txn.group = gid
-        asa_transfer_txn.group = gid
+        gid = algosdk.future.transaction.calculate_group_id(group)
+        for txn in group:
+            txn.group = gid
 
-        app_call_txn_signed = app_call_txn.sign(buyer_pk)
+        return [app_call_txn.sign(buyer_pk) for app_call_txn in app_call_txns] + \
+               [asa_buy_payment_txn.sign(buyer_pk)] + \
+               [algosdk.future.transaction.LogicSigTransaction(asa_transfer_txn, asa_transfer_txn_logic_signature)
+                for asa_transfer_txn in asa_transfer_txns]
 
-        asa_buy_txn_signed = asa_buy_payment_txn.sign(buyer_pk)
+    @staticmethod
+    def local_sell_offers(account_info: dict, app_id: int) -> Dict[int, int]:
+        """
+        :param account_info: the account as returned by the algod or the indexer account endpoint.
+        :param app_id: the id of the TokilityDEX application.
+        :return: the price of every ASA that the account offers for sale, keyed by the asa_id.
+        """
+        sell_offers = dict()
+        for local_state in account_info.get('apps-local-state', []):
+            if local_state['id'] == app_id:
+                for key_value in local_state.get('key-value', []):
+                    asa_id = int.from_bytes(base64.b64decode(key_value['key']), "big")
+                    sell_offers[asa_id] = key_value['value']['uint']
 
-        asa_transfer_txn_logic_signature = algosdk.future.transaction.LogicSig(asa_clawback_bytes)
-        asa_transfer_txn_signed = algosdk.future.transaction.LogicSigTransaction(asa_transfer_txn,
-                                                                                 asa_transfer_txn_logic_signature)
+        return sell_offers
 
-        signed_group = [app_call_txn_signed,
-                        asa_buy_txn_signed,
-                        asa_transfer_txn_signed]
+    def open_sell_offers(self, seller_address: str) -> Dict[int, int]:
+        """
+        :return: the price of every ASA that the seller currently offers for sale, keyed by the asa_id.
+        """
+        return TokilityDEXService.local_sell_offers(account_info=self.client.account_info(seller_address),
+                                                    app_id=self.app_id)
 
-        tx_id = self.client.send_transactions(signed_group)
+    def free_sell_offer_slots(self, seller_address: str) -> int:
+        """
+        :return: how many more ASAs the seller can offer for sale before the local state of the seller is full.
+        """
+        return dex_constants.MAX_SELL_OFFERS - len(self.open_sell_offers(seller_address))
 
-        print("Initial buy completed.")
-        return tx_id
+    @staticmethod
+    def check_sell_offer_slot(seller_address: str, asa_id: int, sell_offers: Dict[int, int]):
+        """
+        Changing the price of an already offered ASA reuses its slot, while a new offer needs a free one.
+        :raises SellOfferLimitError: when the seller has no free slot for the ASA.
+        """
+        if asa_id not in sell_offers and len(sell_offers) >= dex_constants.MAX_SELL_OFFERS:
+            raise SellOfferLimitError(seller_address=seller_address,
+                                      asa_id=asa_id,
+                                      max_sell_offers=dex_constants.MAX_SELL_OFFERS)
 
     def make_sell_offer(self,
                         seller_pk: str,
                         sell_price: int,
                         asa_configuration: ASAConfiguration):
+        seller_address = algosdk.account.address_from_private_key(seller_pk)
+        TokilityDEXService.check_sell_offer_slot(seller_address=seller_address,
+                                                 asa_id=asa_configuration.asa_id,
+                                                 sell_offers=self.open_sell_offers(seller_address))
+
+        make_sell_order_txn = self.make_sell_offer_transaction(seller_pk=seller_pk,
+                                                               sell_price=sell_price,
+                                                               asa_configuration=asa_configuration)
+
+        tx_id = NetworkInteraction.submit_transaction(self.client, make_sell_order_txn)
+        print("Sell order has been placed.")
+        return tx_id
+
+    def make_sell_offer_transaction(self,
+                                    seller_pk: str,
+                                    sell_price: int,
+                                    asa_configuration: ASAConfiguration,
+                                    suggested_params: Optional[SuggestedParams] = None):
         app_args = [
-            TokilityDEX.AppMethods.sell_asa,
+            AppMethods.sell_asa,
         ]
         app_args.extend(TokilityDEXService.dex_configuration_arguments(asa_configuration))
         app_args.append(sell_price)
@@ -188,11 +335,10 @@ class TokilityDEXService:
                                                               on_complete=algosdk.future.transaction.OnComplete.NoOpOC,
                                                               app_args=app_args,
                                                               foreign_assets=[asa_configuration.asa_id],
-                                                              sign_transaction=True)
+                                                              sign_transaction=True,
+                                                              suggested_params=suggested_params)
 
-        tx_id = NetworkInteraction.submit_transaction(self.client, make_sell_order_txn)
-        print("Sell order has been placed.")
-        return tx_id
+        return make_sell_order_txn
 
     def buy_from_seller(self,
                         buyer_addr: str,
@@ -202,7 +348,31 @@ class TokilityDEXService:
                         asa_configuration: ASAConfiguration,
                         asa_clawback_addr: str,
                         asa_clawback_bytes):
+        signed_group = self.buy_from_seller_group(buyer_addr=buyer_addr,
+                                                  buyer_pk=buyer_pk,
+                                                  seller_addr=seller_addr,
+                                                  price=price,
+                                                  asa_configuration=asa_configuration,
+                                                  asa_clawback_addr=asa_clawback_addr,
+                                                  asa_clawback_bytes=asa_clawback_bytes)
+
+        tx_id = self.client.send_transactions(signed_group)
+
+        print(f"Second hand buy completed in {tx_id}")
+        return tx_id
+
+    def buy_from_seller_group(self,
+                              buyer_addr: str,
+                              buyer_pk: str,
+                              seller_addr: str,
+                              price: int,
+                              asa_configuration: ASAConfiguration,
+                              asa_clawback_addr: str,
+                              asa_clawback_bytes,
+                              suggested_params: Optional[SuggestedParams] = None,
+                              fee_estimator: Optional[FeeEstimator] = None) -> list:
         """
+        Builds and signs the atomic group of the second hand buy.
         Atomic Transfer:
         0. Application call.
         1. Payment from buyer to ASA_CREATOR. (fees are paid to the asa_creator)
@@ -210,9 +380,12 @@ class TokilityDEXService:
         3. Payment from buyer to TOKILITY. (fees for the platform).
         4. Asset transfer from Clawback to buyer.
         """
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=self.client)
+
         # 1. App call.
         app_args = [
-            TokilityDEX.AppMethods.buy_from_seller
+            AppMethods.buy_from_seller
         ]
         app_args.extend(TokilityDEXService.dex_configuration_arguments(asa_configuration))
 
@@ -225,7 +398,8 @@ class TokilityDEXService:
                                                               app_args=app_args,
                                                               accounts=[seller_addr],
                                                               foreign_assets=[asa_configuration.asa_id],
-                                                              sign_transaction=False)
+                                                              sign_transaction=False,
+                                                              suggested_params=suggested_params)
 
         # 1. Payment transaction: buyer -> asa creator.
         creator_fee_txn = \
@@ -234,7 +408,8 @@ class TokilityDEXService:
                                                  receiver_address=asa_configuration.asa_creator_address,
                                                  amount=asa_configuration.economy_configuration.owner_fee,
                                                  sender_private_key=None,
-                                                 sign_transaction=False)
+                                                 sign_transaction=False,
+                                                 suggested_params=suggested_params)
 
         # 2. Payment transaction: buyer -> asa seller
         asa_sell_price_txn = \
@@ -243,7 +418,8 @@ class TokilityDEXService:
                                                  receiver_address=seller_addr,
                                                  amount=price,
                                                  sender_private_key=None,
-                                                 sign_transaction=False)
+                                                 sign_transaction=False,
+                                                 suggested_params=suggested_params)
 
         # 3. Platform fees: buyer -> platform address
         platform_fee_txn = \
@@ -252,7 +428,8 @@ class TokilityDEXService:
                                                  receiver_address=self.app_creator_addr,
                                                  amount=asa_configuration.initial_offering_configuration.tokiliy_fee,
                                                  sender_private_key=None,
-                                                 sign_transaction=False)
+                                                 sign_transaction=False,
+                                                 suggested_params=suggested_params)
 
         # 4. Asset transfer transaction: escrow -> buyer
 
@@ -263,9 +440,20 @@ class TokilityDEXService:
                                                                  asa_id=asa_configuration.asa_id,
                                                                  revocation_target=seller_addr,
                                                                  sender_private_key=None,
-                                                                 sign_transaction=False)
+                                                                 sign_transaction=False,
+                                                                 suggested_params=suggested_params)
+
+        asa_transfer_txn_logic_signature = algosdk.future.transaction.LogicSig(asa_clawback_bytes)
+
+        # Atomic transfer, the application call pays the fees of the whole group.
+        fee_estimator = fee_estimator or self._fee_estimator(suggested_params)
+        fee_estimator.pool([app_call_txn,
+                            creator_fee_txn,
+                            asa_sell_price_txn,
+                            platform_fee_txn,
+                            asa_transfer_txn],
+                           logic_sigs={4: asa_transfer_txn_logic_signature})
 
-        # Atomic transfer
         gid = algosdk.future.transaction.calculate_group_id([app_call_txn,
                                                              creator_fee_txn,
                                                              asa_sell_price_txn,
@@ -283,26 +471,31 @@ class TokilityDEXService:
         asa_sell_price_txn_signed = asa_sell_price_txn.sign(buyer_pk)
         platform_fee_txn_signed = platform_fee_txn.sign(buyer_pk)
 
-        asa_transfer_txn_logic_signature = algosdk.future.transaction.LogicSig(asa_clawback_bytes)
         asa_transfer_txn_signed = algosdk.future.transaction.LogicSigTransaction(asa_transfer_txn,
                                                                                  asa_transfer_txn_logic_signature)
 
-        signed_group = [app_call_txn_signed,
-                        creator_fee_txn_txn_signed,
-                        asa_sell_price_txn_signed,
-                        platform_fee_txn_signed,
-                        asa_transfer_txn_signed]
-
-        tx_id = self.client.send_transactions(signed_group)
-
-        print(f"Second hand buy completed in {tx_id}")
-        return tx_id
+        return [app_call_txn_signed,
+                creator_fee_txn_txn_signed,
+                asa_sell_price_txn_signed,
+                platform_fee_txn_signed,
+                asa_transfer_txn_signed]
 
     def stop_selling(self,
                      seller_pk: str,
                      asa_configuration: ASAConfiguration):
+        stop_sell_order_txn = self.stop_selling_transaction(seller_pk=seller_pk,
+                                                            asa_configuration=asa_configuration)
+
+        tx_id = NetworkInteraction.submit_transaction(self.client, stop_sell_order_txn)
+        print("Sell order has been stopped.")
+        return tx_id
+
+    def stop_selling_transaction(self,
+                                 seller_pk: str,
+                                 asa_configuration: ASAConfiguration,
+                                 suggested_params: Optional[SuggestedParams] = None):
         app_args = [
-            TokilityDEX.AppMethods.stop_selling,
+            AppMethods.stop_selling,
         ]
         app_args.extend(TokilityDEXService.dex_configuration_arguments(asa_configuration))
 
@@ -313,11 +506,10 @@ class TokilityDEXService:
                                                               on_complete=algosdk.future.transaction.OnComplete.NoOpOC,
                                                               app_args=app_args,
                                                               foreign_assets=[asa_configuration.asa_id],
-                                                              sign_transaction=True)
+                                                              sign_transaction=True,
+                                                              suggested_params=suggested_params)
 
-        tx_id = NetworkInteraction.submit_transaction(self.client, stop_sell_order_txn)
-        print("Sell order has been stopped.")
-        return tx_id
+        return stop_sell_order_txn
 
     def gift_asa(self,
                  asa_owner_addr: str,
@@ -326,16 +518,41 @@ class TokilityDEXService:
                  asa_configuration: ASAConfiguration,
                  asa_clawback_addr: str,
                  asa_clawback_bytes):
+        signed_group = self.gift_asa_group(asa_owner_addr=asa_owner_addr,
+                                           asa_owner_pk=asa_owner_pk,
+                                           asa_receiver_addr=asa_receiver_addr,
+                                           asa_configuration=asa_configuration,
+                                           asa_clawback_addr=asa_clawback_addr,
+                                           asa_clawback_bytes=asa_clawback_bytes)
+
+        tx_id = self.client.send_transactions(signed_group)
+
+        print("ASA has been gifted.")
+        return tx_id
+
+    def gift_asa_group(self,
+                       asa_owner_addr: str,
+                       asa_owner_pk: str,
+                       asa_receiver_addr: str,
+                       asa_configuration: ASAConfiguration,
+                       asa_clawback_addr: str,
+                       asa_clawback_bytes,
+                       suggested_params: Optional[SuggestedParams] = None,
+                       fee_estimator: Optional[FeeEstimator] = None) -> list:
         """
+        Builds and signs the atomic group of the gifting.
         Atomic Transfer:
         0. Application call.
         1. Payment from ASA_OWNER to ASA_CREATOR. (fees for creator).
         2. Payment from ASA_OWNER to TOKILITY_ADDR. (fees for platform).
         3. Asset transfer from Clawback to GIFT_ADDRESS.
         """
+        if suggested_params is None:
+            suggested_params = get_default_suggested_params(client=self.client)
+
         # 1. App call.
         app_args = [
-            TokilityDEX.AppMethods.gift_asa,
+            AppMethods.gift_asa,
         ]
         app_args.extend(TokilityDEXService.dex_configuration_arguments(asa_configuration))
 
@@ -349,7 +566,8 @@ class TokilityDEXService:
                                                               on_complete=algosdk.future.transaction.OnComplete.NoOpOC,
                                                               app_args=app_args,
                                                               foreign_assets=[asa_configuration.asa_id],
-                                                              sign_transaction=False)
+                                                              sign_transaction=False,
+                                                              suggested_params=suggested_params)
 
         # 1. Fee for the creator: asa_owner -> asa_creator
         creator_fee_txn = \
@@ -358,7 +576,8 @@ class TokilityDEXService:
                                                  receiver_address=asa_configuration.asa_creator_address,
                                                  amount=asa_configuration.economy_configuration.owner_fee,
                                                  sender_private_key=None,
-                                                 sign_transaction=False)
+                                                 sign_transaction=False,
+                                                 suggested_params=suggested_params)
 
         # 2. Fee for the platform: asa_owner -> platform_address
         platform_fee_txn = \
@@ -367,7 +586,8 @@ class TokilityDEXService:
                                                  receiver_address=self.app_creator_addr,
                                                  amount=asa_configuration.initial_offering_configuration.tokiliy_fee,
                                                  sender_private_key=None,
-                                                 sign_transaction=False)
+                                                 sign_transaction=False,
+                                                 suggested_params=suggested_params)
 
         # 3. Asset transfer transaction: escrow -> asa_receiver
 
@@ -378,9 +598,19 @@ class TokilityDEXService:
                                                                  asa_id=asa_configuration.asa_id,
                                                                  revocation_target=asa_owner_addr,
                                                                  sender_private_key=None,
-                                                                 sign_transaction=False)
+                                                                 sign_transaction=False,
+                                                                 suggested_params=suggested_params)
+
+        asa_transfer_txn_logic_signature = algosdk.future.transaction.LogicSig(asa_clawback_bytes)
+
+        # Atomic transfer, the application call pays the fees of the whole group.
+        fee_estimator = fee_estimator or self._fee_estimator(suggested_params)
+        fee_estimator.pool([app_call_txn,
+                            creator_fee_txn,
+                            platform_fee_txn,
+                            asa_transfer_txn],
+                           logic_sigs={3: asa_transfer_txn_logic_signature})
 
-        # Atomic transfer
         gid = algosdk.future.transaction.calculate_group_id([app_call_txn,
                                                              creator_fee_txn,
                                                              platform_fee_txn,
@@ -396,16 +626,10 @@ class TokilityDEXService:
         creator_fee_txn_signed = creator_fee_txn.sign(asa_owner_pk)
         platform_fee_txn_signed = platform_fee_txn.sign(asa_owner_pk)
 
-        asa_transfer_txn_logic_signature = algosdk.future.transaction.LogicSig(asa_clawback_bytes)
         asa_transfer_txn_signed = algosdk.future.transaction.LogicSigTransaction(asa_transfer_txn,
                                                                                  asa_transfer_txn_logic_signature)
 
-        signed_group = [app_call_txn_signed,
-                        creator_fee_txn_signed,
-                        platform_fee_txn_signed,
-                        asa_transfer_txn_signed]
-
-        tx_id = self.client.send_transactions(signed_group)
-
-        print("ASA has been gifted.")
-        return tx_id
+        return [app_call_txn_signed,
+                creator_fee_txn_signed,
+                platform_fee_txn_signed,
+                asa_transfer_txn_signed]
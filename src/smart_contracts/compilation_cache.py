@@ -0,0 +1,308 @@
+import argparse
+import base64
+import importlib
+import json
+import os
+import threading
+from functools import lru_cache
+from hashlib import sha256
+from importlib import metadata
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+from src.blockchain_utils.file_utils import write_json_atomically
+from src.blockchain_utils.network_identity import algod_genesis_hash, network_key
+
+SMART_CONTRACTS_DIR = Path(os.path.dirname(__file__))
+DEFAULT_CACHE_DIR = SMART_CONTRACTS_DIR.parent.parent / '.teal_cache'
+
+
+class ContractProgram:
+    """
+    Identifies a single program of a smart contract: the contract class, the method that builds its PyTeal
+    expression, the constructor parameters and the compilation settings.
+    The contract is only imported when the program actually needs to be compiled.
+    """
+
+    def __init__(self,
+                 module: str,
+                 class_name: str,
+                 method: str,
+                 mode: str,
+                 version: int = 4,
+                 parameters: Optional[Dict] = None):
+        self.module = module
+        self.class_name = class_name
+        self.method = method
+        self.mode = mode
+        self.version = version
+        self.parameters = parameters or dict()
+
+    @property
+    def cache_key(self) -> str:
+        key = {
+            "module": self.module,
+            "class_name": self.class_name,
+            "method": self.method,
+            "mode": self.mode,
+            "version": self.version,
+            "parameters": self.parameters,
+            "pyteal_version": _pyteal_version(),
+            "contracts_source_hash": _contracts_source_hash()
+        }
+        return sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def to_teal(self) -> str:
+        from pyteal import compileTeal, Mode
+
+        contract_class = getattr(importlib.import_module(self.module), self.class_name)
+        contract = contract_class(**self.parameters)
+
+        return compileTeal(getattr(contract, self.method)(),
+                           mode=getattr(Mode, self.mode),
+                           version=self.version)
+
+
+def clawback_program(app_id: int) -> ContractProgram:
+    return ContractProgram(module="src.smart_contracts.tokility_clawback_asc1",
+                           class_name="TokilityClawbackASC1",
+                           method="pyteal_code",
+                           mode="Signature",
+                           parameters={"app_id": app_id})
+
+
+def dex_approval_program() -> ContractProgram:
+    return ContractProgram(module="src.smart_contracts.tokility_dex_asc1",
+                           class_name="TokilityDEX",
+                           method="approval_program",
+                           mode="Application")
+
+
+def dex_clear_program() -> ContractProgram:
+    return ContractProgram(module="src.smart_contracts.tokility_dex_asc1",
+                           class_name="TokilityDEX",
+                           method="clear_program",
+                           mode="Application")
+
+
+@lru_cache(maxsize=1)
+def _pyteal_version() -> str:
+    try:
+        return metadata.version('pyteal')
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+@lru_cache(maxsize=1)
+def _contracts_source_hash() -> str:
+    """
+    Hash of all of the smart contract sources, so any change to the contracts invalidates the cache.
+    """
+    source_hash = sha256()
+    for source_file in sorted(SMART_CONTRACTS_DIR.glob('*.py')):
+        source_hash.update(source_file.name.encode('utf-8'))
+        source_hash.update(source_file.read_bytes())
+
+    return source_hash.hexdigest()
+
+
+class CompilationCache:
+    """
+    Caches the TEAL source and the compiled bytes of contract programs in memory and in an on-disk cache
+    directory, so the programs are compiled with PyTeal and algod only once across processes.
+    The TEAL only depends on the program, the compiled bytes are kept per network, since every node compiles with
+    its own version of the TEAL assembler.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: Dict[str, Tuple[str, bytes]] = dict()
+        self._teal: Dict[str, str] = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def network(client) -> str:
+        """
+        :param client: algorand client
+        :return: the network key under which the programs compiled by the client are cached.
+        """
+        return network_key(algod_genesis_hash(client))
+
+    def _cache_file(self, program: ContractProgram, network: str) -> Path:
+        return self.cache_dir / f'{program.cache_key}_{network}.json'
+
+    def _teal_file(self, program: ContractProgram) -> Path:
+        return self.cache_dir / f'{program.cache_key}_teal.json'
+
+    def lookup(self, program: ContractProgram, network: str) -> Optional[Tuple[str, bytes]]:
+        """
+        :param program:
+        :param network: the network key of the node that compiles the program, see network.
+        :return: the (teal source, compiled bytes) of the program if it is cached in memory or on disk.
+        """
+        cache_file = self._cache_file(program, network)
+
+        with self._lock:
+            if cache_file.name in self._memory:
+                self.hits += 1
+                return self._memory[cache_file.name]
+
+        if not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            compiled = cached["teal"], base64.b64decode(cached["program"])
+        except (ValueError, KeyError):
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._memory[cache_file.name] = compiled
+
+        return compiled
+
+    def store(self, program: ContractProgram, network: str, teal: str, program_bytes: bytes):
+        cache_file = self._cache_file(program, network)
+
+        with self._lock:
+            self._memory[cache_file.name] = teal, program_bytes
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        write_json_atomically(cache_file,
+                              {"teal": teal, "program": base64.b64encode(program_bytes).decode('utf-8')})
+        self._store_teal(program, teal)
+
+    def _store_teal(self, program: ContractProgram, teal: str):
+        teal_file = self._teal_file(program)
+
+        with self._lock:
+            self._teal[teal_file.name] = teal
+
+        if not teal_file.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_json_atomically(teal_file, {"teal": teal})
+
+    def _cached_teal(self, program: ContractProgram) -> Optional[str]:
+        teal_file = self._teal_file(program)
+
+        with self._lock:
+            if teal_file.name in self._teal:
+                return self._teal[teal_file.name]
+
+        try:
+            with open(teal_file) as f:
+                teal = json.load(f)["teal"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        with self._lock:
+            self._teal[teal_file.name] = teal
+
+        return teal
+
+    def teal(self, program: ContractProgram) -> str:
+        """
+        :param program:
+        :return: the TEAL source of the program, generated with PyTeal only on a cache miss.
+        """
+        teal = self._cached_teal(program)
+        if teal is not None:
+            with self._lock:
+                self.hits += 1
+            return teal
+
+        teal = program.to_teal()
+        self._store_teal(program, teal)
+
+        return teal
+
+    def compile(self, client, program: ContractProgram) -> bytes:
+        """
+        Returns the compiled bytes of the program, compiling it with PyTeal and algod only on a cache miss.
+        :param client: algorand client
+        :param program:
+        :return:
+        """
+        network = self.network(client)
+
+        cached = self.lookup(program, network=network)
+        if cached is not None:
+            return cached[1]
+
+        # Imported here to avoid a circular import between the services and the smart contracts.
+        from src.services.network_interaction import NetworkInteraction
+
+        with self._lock:
+            self.misses += 1
+
+        teal = self._cached_teal(program) or program.to_teal()
+        program_bytes = NetworkInteraction.compile_program(client=client, source_code=teal)
+        self.store(program, network=network, teal=teal, program_bytes=program_bytes)
+
+        return program_bytes
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+_compilation_cache = CompilationCache()
+
+
+def get_compilation_cache() -> CompilationCache:
+    return _compilation_cache
+
+
+def prebuild(client, app_id: Optional[int] = None, cache: Optional[CompilationCache] = None) -> List[ContractProgram]:
+    """
+    Compiles the programs of the TokilityDEX into the cache directory ahead of time, e.g. while building the image of
+    the marketplace, so the services and the UIs load them from disk and never import PyTeal.
+    :param client: algorand client used to compile the TEAL.
+    :param app_id: the id of the deployed TokilityDEX, whose clawback logic signature is compiled as well.
+    :param cache: the cache to fill, by default the process-wide one.
+    :return: the compiled programs.
+    """
+    cache = cache or get_compilation_cache()
+
+    programs = [dex_approval_program(), dex_clear_program()]
+    if app_id is not None:
+        programs.append(clawback_program(app_id=app_id))
+
+    for program in programs:
+        cache.compile(client=client, program=program)
+
+    return programs
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compiles the TokilityDEX programs into the compilation cache.")
+    parser.add_argument("--app-id", type=int, default=None,
+                        help="id of the deployed TokilityDEX, to compile the clawback logic signature for")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="directory of the compiled programs")
+    args = parser.parse_args(args)
+
+    from src.blockchain_utils.credentials import get_client
+
+    cache = get_compilation_cache()
+    cache.cache_dir = Path(args.cache_dir)
+
+    client = get_client()
+    network = cache.network(client)
+    for program in prebuild(client=client, app_id=args.app_id, cache=cache):
+        print(f'{program.class_name}.{program.method} {program.parameters}: {cache._cache_file(program, network)}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,30 @@
+"""
+The interface of the TokilityDEX application that its clients need: the method names, the limits and the state
+schemas. It does not import PyTeal, so the services and the UIs can use it without loading the contract code.
+"""
+from algosdk.future.transaction import StateSchema
+
+
+class AppMethods:
+    initial_buy = "initial_buy"
+    sell_asa = "sell_asa"
+    buy_from_seller = "buy_from_seller"
+    stop_selling = "stop_selling"
+    gift_asa = "gift_asa"
+
+
+MIN_NUM_PARAMETERS = 9
+
+# Every sell offer takes one uint of the local state of the seller, keyed by Itob(asa_id).
+MAX_SELL_OFFERS = 16
+
+# The initial buy group holds 2 transactions per ticket and a single payment, a group has at most 16 transactions.
+MAX_INITIAL_BUY_TICKETS = 5
+
+
+def global_schema() -> StateSchema:
+    return StateSchema(num_uints=0, num_byte_slices=1)
+
+
+def local_schema() -> StateSchema:
+    return StateSchema(num_uints=MAX_SELL_OFFERS, num_byte_slices=0)
@@ -4,6 +4,10 @@ from src.smart_contracts.tokility_dex_asc1 import TokilityDEX
 
 
 class TokilityClawbackASC1:
+    """
+    Logic signature of the clawback address of the tickets. The fees of every group are pooled on the application
+    call, so the transfers of the clawback pay no fee and the clawback can not be drained through fees.
+    """
 
     def __init__(self,
                  app_id: int):
@@ -11,20 +15,29 @@ class TokilityClawbackASC1:
 
     def initial_buy(self):
         """
-        Atomic Transfer:
-        0. Application call.
-        1. Payment from buyer to ASA_CREATOR.
-        2. Asset transfer from Clawback to buyer.
+        Atomic Transfer of N tickets:
+        0 ... N-1. Application call per ticket.
+        N. Payment from buyer to ASA_CREATOR.
+        N+1 ... 2N. Asset transfer from Clawback to buyer.
+
+        Every asset transfer is approved by the application call at the same position among the application calls.
         """
+        tickets_count = (Global.group_size() - Int(1)) / Int(2)
+        payment_txn = Gtxn[tickets_count]
+        app_call_txn = Gtxn[Txn.group_index() - tickets_count - Int(1)]
 
         return Seq([
-            Assert(Gtxn[1].fee() <= Int(1000)),
-            Assert(Gtxn[1].close_remainder_to() == Global.zero_address()),
-            Assert(Gtxn[1].rekey_to() == Global.zero_address()),
+            Assert(Txn.group_index() > tickets_count),
+            Assert(app_call_txn.application_id() == Int(self.app_id)),
+            Assert(app_call_txn.application_args[0] == Bytes(TokilityDEX.AppMethods.initial_buy)),
 
-            Assert(Gtxn[2].fee() <= Int(1000)),
-            Assert(Gtxn[2].asset_close_to() == Global.zero_address()),
-            Assert(Gtxn[2].rekey_to() == Global.zero_address()),
+            Assert(payment_txn.fee() <= Int(1000)),
+            Assert(payment_txn.close_remainder_to() == Global.zero_address()),
+            Assert(payment_txn.rekey_to() == Global.zero_address()),
+
+            Assert(Txn.fee() == Int(0)),
+            Assert(Txn.asset_close_to() == Global.zero_address()),
+            Assert(Txn.rekey_to() == Global.zero_address()),
 
             Return(Int(1))
         ])
@@ -54,7 +67,7 @@ class TokilityClawbackASC1:
             Assert(Gtxn[3].close_remainder_to() == Global.zero_address()),
             Assert(Gtxn[3].rekey_to() == Global.zero_address()),
 
-            Assert(Gtxn[4].fee() <= Int(1000)),
+            Assert(Gtxn[4].fee() == Int(0)),
             Assert(Gtxn[4].asset_close_to() == Global.zero_address()),
             Assert(Gtxn[4].rekey_to() == Global.zero_address()),
 
@@ -89,7 +102,7 @@ class TokilityClawbackASC1:
             Assert(Gtxn[2].close_remainder_to() == Global.zero_address()),
             Assert(Gtxn[3].rekey_to() == Global.zero_address()),
 
-            Assert(Gtxn[3].fee() <= Int(1000)),
+            Assert(Gtxn[3].fee() == Int(0)),
             Assert(Gtxn[3].asset_close_to() == Global.zero_address()),
             Assert(Gtxn[3].rekey_to() == Global.zero_address()),
 
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-import algosdk
 from pyteal import *
+from src.smart_contracts import dex_constants
 
 
 class TokilityDEXInterface(ABC):
@@ -35,12 +35,7 @@ class TokilityDEX(TokilityDEXInterface):
     This ensures that whenever we try to interact we the token we are following the rules defined by the owner.
     """
 
-    class AppMethods:
-        initial_buy = "initial_buy"
-        sell_asa = "sell_asa"
-        buy_from_seller = "buy_from_seller"
-        stop_selling = "stop_selling"
-        gift_asa = "gift_asa"
+    AppMethods = dex_constants.AppMethods
 
     class ASAConfiguration:
         asa_price = Btoi(Txn.application_args[1])
@@ -55,7 +50,11 @@ class TokilityDEX(TokilityDEXInterface):
     class GlobalVariables:
         tokility_fee_address = Bytes("tokility_fee_address")
 
-    MIN_NUM_PARAMETERS = 9
+    MIN_NUM_PARAMETERS = dex_constants.MIN_NUM_PARAMETERS
+
+    MAX_SELL_OFFERS = dex_constants.MAX_SELL_OFFERS
+
+    MAX_INITIAL_BUY_TICKETS = dex_constants.MAX_INITIAL_BUY_TICKETS
 
     def application_start(self):
         return Cond(
@@ -65,7 +64,12 @@ class TokilityDEX(TokilityDEXInterface):
 
         )
 
-    def execute_actions(self):
+    def verify_asa_configuration(self):
+        """
+        The work shared by all of the AppMethods, before the dispatch: the configuration arguments must hash to
+        the metadata hash of the ASA.
+        :return:
+        """
         metadata_hash = AssetParam.metadataHash(asset=Txn.assets[0])
         concat_args = Concat(Txn.application_args[1],
                              Bytes('-'),
@@ -86,7 +90,12 @@ class TokilityDEX(TokilityDEXInterface):
         return Seq([
             metadata_hash,
             Assert(metadata_hash.hasValue()),
-            Assert(metadata_hash.value() == Sha256(concat_args)),
+            Assert(metadata_hash.value() == Sha256(concat_args))
+        ])
+
+    def execute_actions(self):
+        return Seq([
+            self.verify_asa_configuration(),
 
             Cond([Txn.application_args[0] == Bytes(self.AppMethods.initial_buy),
                   self.initial_buy()],
@@ -138,10 +147,11 @@ class TokilityDEX(TokilityDEXInterface):
         Foreign assets:
         - asa_id - the ID of the asa that the user wants to buy.
 
-        Atomic Transfer:
-        0. Application call.
-        1. Payment from buyer to ASA_CREATOR.
-        2. Asset transfer from Clawback to buyer.
+        Atomic Transfer of N tickets, 1 <= N <= MAX_INITIAL_BUY_TICKETS, all of them issued by the same ASA_CREATOR:
+        0 ... N-1. Application call per ticket.
+        N. Payment from buyer to ASA_CREATOR, the sum of the prices of all tickets.
+        N+1 ... 2N. Asset transfer from Clawback to buyer, in the order of the application calls.
+        With a single ticket this is the group of 3 transactions: application call, payment and asset transfer.
         :return:
         """
 
@@ -153,6 +163,13 @@ class TokilityDEX(TokilityDEXInterface):
         reserve_address = AssetParam.reserve(Txn.assets[0])
         default_frozen = AssetParam.defaultFrozen(Txn.assets[0])
 
+        tickets_count = (Global.group_size() - Int(1)) / Int(2)
+        payment_txn = Gtxn[tickets_count]
+        asset_transfer_txn = Gtxn[tickets_count + Int(1) + Txn.group_index()]
+
+        i = ScratchVar(TealType.uint64)
+        total_price = ScratchVar(TealType.uint64)
+
         return Seq([
             # Valid Token
             asset_escrow,
@@ -167,19 +184,35 @@ class TokilityDEX(TokilityDEXInterface):
             Assert(reserve_address.value() == Global.zero_address()),
 
             # Valid app call transaction
-            Assert(Global.group_size() == Int(3)),
+            Assert(Global.group_size() % Int(2) == Int(1)),
+            Assert(Global.group_size() >= Int(3)),
+            Assert(Global.group_size() <= Int(2 * self.MAX_INITIAL_BUY_TICKETS + 1)),
+            Assert(Txn.group_index() < tickets_count),
             Assert(Txn.application_args.length() == Int(self.MIN_NUM_PARAMETERS)),
-            Assert(Gtxn[0].sender() == Gtxn[1].sender()),
+
+            # Every ticket of the group is bought by the same buyer from the same creator, so a single payment
+            # covers all of them. The prices can be trusted, because every application call verifies its own
+            # configuration.
+            total_price.store(Int(0)),
+            For(i.store(Int(0)), i.load() < tickets_count, i.store(i.load() + Int(1))).Do(Seq([
+                Assert(Gtxn[i.load()].type_enum() == TxnType.ApplicationCall),
+                Assert(Gtxn[i.load()].application_id() == Global.current_application_id()),
+                Assert(Gtxn[i.load()].application_args[0] == Bytes(self.AppMethods.initial_buy)),
+                Assert(Gtxn[i.load()].application_args[8] == self.ASAConfiguration.creator_address),
+                Assert(Gtxn[i.load()].sender() == Txn.sender()),
+                total_price.store(total_price.load() + Btoi(Gtxn[i.load()].application_args[1]))
+            ])),
 
             # Valid payment transaction
-            Assert(Gtxn[1].type_enum() == TxnType.Payment),
-            Assert(Gtxn[1].receiver() == self.ASAConfiguration.creator_address),
-            Assert(Gtxn[1].amount() == self.ASAConfiguration.asa_price),
+            Assert(payment_txn.type_enum() == TxnType.Payment),
+            Assert(payment_txn.sender() == Txn.sender()),
+            Assert(payment_txn.receiver() == self.ASAConfiguration.creator_address),
+            Assert(payment_txn.amount() == total_price.load()),
 
             # Valid asset transfer
-            Assert(Gtxn[2].asset_amount() == Int(1)),  # Currently we only support NFTs... this should change.
-            Assert(Gtxn[2].xfer_asset() == Txn.assets[0]),
-            Assert(Gtxn[2].asset_receiver() == Txn.sender()),
+            Assert(asset_transfer_txn.asset_amount() == Int(1)),  # Currently we only support NFTs... this should change.
+            Assert(asset_transfer_txn.xfer_asset() == Txn.assets[0]),
+            Assert(asset_transfer_txn.asset_receiver() == Txn.sender()),
 
             Return(Int(1))
         ])
@@ -379,10 +412,8 @@ class TokilityDEX(TokilityDEXInterface):
 
     @property
     def global_schema(self):
-        return algosdk.future.transaction.StateSchema(num_uints=0,
-                                                      num_byte_slices=1)
+        return dex_constants.global_schema()
 
     @property
     def local_schema(self):
-        return algosdk.future.transaction.StateSchema(num_uints=16,
-                                                      num_byte_slices=0)
+        return dex_constants.local_schema()
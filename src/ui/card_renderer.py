@@ -0,0 +1,106 @@
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Optional, Sequence, Tuple, TypeVar
+
+import streamlit as st
+
+from src.ui.cards import COLORS, CardCache, TicketCard, get_card_cache, stylesheet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+
+Item = TypeVar('Item')
+
+# Builds the cards of the next page while the current one is shown.
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='card-prefetch')
+
+
+class CardRenderer:
+    """
+    Renders a list of items as ticket cards, a page at a time. The stylesheet is written once per run of the page
+    instead of with every card, and the HTML of the cards comes from the process-wide CardCache. After a page is
+    rendered, the cards of the next page are built in the background, so turning the page is a cache hit.
+    A renderer is created on every run of the page, the page number is kept in the session state.
+    """
+
+    def __init__(self,
+                 name: str,
+                 card_key: Callable[[Item], Hashable],
+                 build_card: Callable[[Item], TicketCard],
+                 color: Tuple[str, str] = COLORS[0],
+                 page_size: int = DEFAULT_PAGE_SIZE,
+                 cache: Optional[CardCache] = None):
+        """
+        :param name: unique name of the list within the page, it prefixes the keys of the session state and of the
+        widgets.
+        :param card_key: the key of the card of an item, it has to change whenever the card of the item changes.
+        :param build_card: builds the card of an item.
+        :param color: the gradient of the cards.
+        :param page_size: the number of cards on a page.
+        :param cache: the cache of the card HTML, by default the process-wide one.
+        """
+        self.name = name
+        self.card_key = card_key
+        self.build_card = build_card
+        self.color = color
+        self.page_size = page_size
+        self.cache = cache or get_card_cache()
+
+        self._stylesheet_written = False
+
+    @property
+    def _page_state_key(self) -> str:
+        return f'{self.name}_page'
+
+    def _set_page(self, page: int):
+        st.session_state[self._page_state_key] = page
+
+    def write_stylesheet(self):
+        if not self._stylesheet_written:
+            st.write(stylesheet(self.color), unsafe_allow_html=True)
+            self._stylesheet_written = True
+
+    def card_html(self, item: Item) -> str:
+        return self.cache.get((self.name, self.card_key(item)), lambda: self.build_card(item))
+
+    def _prefetch(self, items: Sequence[Item]):
+        for item in items:
+            try:
+                self.card_html(item)
+            except Exception as e:
+                logger.warning('Failed to prefetch a card of %s: %s', self.name, e)
+
+    def render(self, items: Sequence[Item], actions: Optional[Callable[[Item], None]] = None):
+        """
+        Renders the current page of the items, followed by the page controls.
+        :param items: all of the items of the list.
+        :param actions: renders the widgets of an item under its card, e.g. the buy button.
+        """
+        self.write_stylesheet()
+
+        pages = max(1, math.ceil(len(items) / self.page_size))
+        page = min(max(0, st.session_state.get(self._page_state_key, 0)), pages - 1)
+
+        start = page * self.page_size
+        for item in items[start:start + self.page_size]:
+            st.write(self.card_html(item), unsafe_allow_html=True)
+            if actions is not None:
+                actions(item)
+
+        next_items = items[start + self.page_size:start + 2 * self.page_size]
+        if len(next_items) > 0:
+            _prefetch_executor.submit(self._prefetch, next_items)
+
+        if pages > 1:
+            cols = st.columns(3)
+            _ = cols[0].button("⬅ Previous",
+                               key=f"{self.name}_previous_page",
+                               on_click=self._set_page,
+                               args=(max(0, page - 1),))
+            cols[1].write(f'Page {page + 1} of {pages}, {len(items)} tickets')
+            _ = cols[2].button("Next ➡",
+                               key=f"{self.name}_next_page",
+                               on_click=self._set_page,
+                               args=(min(pages - 1, page + 1),))
@@ -0,0 +1,228 @@
+import html
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from string import Template
+from typing import Callable, Hashable, NamedTuple, Optional, Tuple
+
+from src.models.ticket_models import Ticket
+
+COLORS = [
+    ("#9E392B", "#B98888"),
+]
+
+_STYLESHEET = """
+@import url('https://fonts.googleapis.com/css?family=Asap+Condensed:600i,700');
+
+h1 {
+  font-size: 25px;
+  color: #fff;
+  text-transform: uppercase;
+}
+h3 {
+  font-size: 20px;
+  color: #fff;
+  text-transform: uppercase;
+}
+
+h4 {
+  font-size: 18px;
+  color: #fff;
+}
+
+.card {
+  display: flex;
+  font-family: 'Asap Condensed', sans-serif;
+  position: relative;
+  margin: auto;
+  height: 350px;
+  width: 600px;
+  text-align: center;
+  background: linear-gradient($color_from, $color_to);
+  border-radius: 2px;
+  box-shadow: 0 6px 12px -3px rgba(0,0,0,.3);
+  color: #fff;
+  padding: 30px;
+}
+
+.card header {
+  position: absolute;
+  top: 31px;
+  left: 0;
+  width: 100%;
+  padding: 0 10%;
+  transform: translateY(-50%);
+  display: grid;
+  grid-template-columns: 1fr 1fr 1fr;
+  align-items: center;
+}
+
+.card header > *:first-child {
+  text-align: left;
+}
+.card header > *:last-child {
+  text-align: right;
+}
+
+.id {
+  font-size: 24px;
+  position: relative;
+}
+
+.announcement {
+  position: relative;
+  border: 3px solid currentColor;
+  border-top: 0;
+  width: 100%;
+  height: 100%;
+  display: flex;
+  flex-direction: column;
+  justify-content: center;
+  align-items: center;
+}
+
+.announcement:before,
+.announcement:after {
+  content: '';
+  position: absolute;
+  top: 0px;
+  border-top: 3px solid currentColor;
+  height: 0;
+  width: 15px;
+}
+.announcement:before {
+  left: -3px;
+}
+.announcement:after {
+  right: -3px;
+}
+
+* {
+  box-sizing: border-box;
+  margin: 0;
+  padding: 0;
+}
+
+html, body {
+  height: 100%;
+}
+
+h1, h2, h3, h4 {
+  margin: .15em 0;
+}
+"""
+
+_CARD_TEMPLATE = Template('<div class="card"><header><time>$datetime</time><div class="id">$badge</div>'
+                          '<div class="sponsor">ID: $asa_id</div></header><div class="announcement">'
+                          '<h1>$name</h1><h3>$info</h3><h4>$row1</h4><h4>$row2</h4><h4>$row3</h4></div></div>')
+
+
+class TicketCard(NamedTuple):
+    """
+    The texts shown on the card of a ticket.
+    """
+    asa_id: Optional[int]
+    datetime: Optional[str]
+    badge: str
+    name: str
+    info: str
+    rows: Tuple[str, str, str]
+
+    @classmethod
+    def from_ticket(cls, ticket: Ticket, badge: str = "") -> 'TicketCard':
+        """
+        :param ticket: the ticket, cast to the class of its business type.
+        :param badge: the text in the middle of the header, e.g. the price.
+        """
+        economy_configuration = ticket.asa_configuration.economy_configuration
+        return cls(asa_id=ticket.asa_configuration.asa_id,
+                   datetime=ticket.datetime,
+                   badge=badge,
+                   name=str(ticket.ticket_name),
+                   info=str(ticket.ticket_info),
+                   rows=(economy_configuration.show_info_row1(),
+                         economy_configuration.show_info_row2(),
+                         economy_configuration.show_info_row3()))
+
+    def to_html(self) -> str:
+        return _CARD_TEMPLATE.substitute(datetime=html.escape(str(self.datetime)),
+                                         badge=html.escape(self.badge),
+                                         asa_id=html.escape(str(self.asa_id)),
+                                         name=html.escape(self.name),
+                                         info=html.escape(self.info),
+                                         row1=html.escape(self.rows[0]),
+                                         row2=html.escape(self.rows[1]),
+                                         row3=html.escape(self.rows[2]))
+
+
+@lru_cache(maxsize=16)
+def stylesheet(color: Tuple[str, str] = COLORS[0]) -> str:
+    """
+    :return: the <style> element of the cards with the given gradient, without the indentation and the line breaks.
+    """
+    css = Template(_STYLESHEET).substitute(color_from=color[0], color_to=color[1])
+    return '<style>' + re.sub(r'\s*\n\s*', '', css) + '</style>'
+
+
+class CardCache:
+    """
+    Memory LRU of the HTML of the cards, shared by all of the sessions of the process. The UIs key the cards by what
+    the card shows, e.g. the asa_id and the price of an offer, so a changed offer is rendered again.
+    """
+
+    def __init__(self, max_entries: int = 8192):
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build_card: Callable[[], TicketCard]) -> str:
+        """
+        :param key: the key of the card.
+        :param build_card: builds the card on a cache miss.
+        :return: the HTML of the card.
+        """
+        with self._lock:
+            card_html = self._entries.get(key)
+            if card_html is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return card_html
+
+        card_html = build_card().to_html()
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = card_html
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return card_html
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total > 0 else 0.0
+        }
+
+
+_card_cache = CardCache()
+
+
+def get_card_cache() -> CardCache:
+    return _card_cache